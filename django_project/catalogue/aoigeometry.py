@@ -20,8 +20,41 @@ __copyright__ = 'South African National Space Agency'
 import logging
 logger = logging.getLogger(__name__)
 
+import math
+
 from django import forms
-from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.geos import Polygon
+
+# mean earth radius in km
+EARTH_RADIUS = 6371.0088
+# number of segments of a circular area of interest
+CIRCLE_SEGMENTS = 32
+
+
+def geodesicCircle(theLon, theLat, theRadius, theSegments=CIRCLE_SEGMENTS):
+    """
+    Returns a polygon of the points at a distance from a center
+
+    The vertices are at theRadius km from the center on a sphere, so the
+    circle is not squashed away from the equator like a buffer in degrees.
+    Longitudes are not wrapped, a circle crossing the antimeridian extends
+    beyond -180 or 180.
+    """
+    myLat = math.radians(theLat)
+    myDistance = theRadius / EARTH_RADIUS
+    myPoints = []
+    for mySegment in range(theSegments):
+        # clockwise from east, like GEOS buffers
+        myBearing = math.radians(90 + 360. * mySegment / theSegments)
+        myPointLat = math.asin(
+            math.sin(myLat) * math.cos(myDistance) +
+            math.cos(myLat) * math.sin(myDistance) * math.cos(myBearing))
+        myPointLon = theLon + math.degrees(math.atan2(
+            math.sin(myBearing) * math.sin(myDistance) * math.cos(myLat),
+            math.cos(myDistance) - math.sin(myLat) * math.sin(myPointLat)))
+        myPoints.append((myPointLon, math.degrees(myPointLat)))
+    myPoints.append(myPoints[0])
+    return Polygon(myPoints, srid=4326)
 
 
 class AOIGeometryField(forms.CharField):
@@ -132,9 +165,8 @@ class AOIGeometryField(forms.CharField):
 
     def to_python(self, theValue):
         if len(theValue) == 3:
-            #calculate radius in degrees 1 deg ~= 111 km
-            myRadius = theValue[2] / 111.
-            myGeometry = Point(theValue[0], theValue[1]).buffer(myRadius)
+            #radius is in km
+            myGeometry = geodesicCircle(theValue[0], theValue[1], theValue[2])
         else:
             myGeometry = Polygon.from_bbox(
                 (theValue[0], theValue[1], theValue[2], theValue[3]))
@@ -0,0 +1,209 @@
+"""
+SANSA-EO Catalogue - In process thumbnail georeferencing
+
+The thumbnails are georeferenced with the GDAL python bindings. The GCP
+dataset and the warped dataset are kept in GDAL's in-memory filesystem
+(/vsimem/) and only the final JPEG and its world file are written to disk.
+Without the bindings the GDAL command line tools are used, with the
+intermediate datasets in a temporary directory.
+
+Web requests georeference the thumbnails they bundle in process with
+georeference_thumbnails, pregeoreference_thumbnails georeferences many
+products in a pool of processes ahead of time (see the
+georeference_thumbnails management command).
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+try:
+    from osgeo import gdal
+    HAS_NATIVE_BINDINGS = True
+    # raise RuntimeError instead of returning None on failures
+    gdal.UseExceptions()
+except ImportError:
+    HAS_NATIVE_BINDINGS = False
+
+logger = logging.getLogger(__name__)
+
+
+def georeference_thumbnail(theInputFile, theOutputFile, theCorners):
+    """
+    Georeference a thumbnail and write it as a JPEG with a world file
+
+    Args:
+        theInputFile - path to the source thumbnail
+        theOutputFile - path of the georeferenced JPEG, the world file is
+            written next to it with a .wld extension
+        theCorners - (x, y) coordinates of the top left, top right, bottom
+            right and bottom left image corners, see sortCandidates
+    Returns:
+        str - theOutputFile
+    Exceptions:
+        RuntimeError - the thumbnail can not be processed
+    """
+    if not HAS_NATIVE_BINDINGS:
+        return _georeference_with_commands(
+            theInputFile, theOutputFile, theCorners)
+    mySource = gdal.Open(theInputFile)
+    myWidth = mySource.RasterXSize
+    myHeight = mySource.RasterYSize
+    myTopLeft, myTopRight, myBottomRight, myBottomLeft = theCorners
+    myGCPs = [
+        gdal.GCP(myTopLeft[0], myTopLeft[1], 0, 0, 0),
+        gdal.GCP(myTopRight[0], myTopRight[1], 0, myWidth, 0),
+        gdal.GCP(myBottomRight[0], myBottomRight[1], 0, myWidth, myHeight),
+        gdal.GCP(myBottomLeft[0], myBottomLeft[1], 0, 0, myHeight)
+    ]
+    myId = uuid.uuid4().hex
+    myGCPFile = '/vsimem/%s.tif' % myId
+    myWarpedFile = '/vsimem/%s-warped.tif' % myId
+    try:
+        gdal.Translate(
+            myGCPFile, mySource, format='GTiff', GCPs=myGCPs,
+            outputSRS='EPSG:4326')
+        # warp so that the gcps are used to georeference the image
+        gdal.Warp(myWarpedFile, myGCPFile, format='GTiff')
+        gdal.Translate(
+            theOutputFile, myWarpedFile, format='JPEG',
+            creationOptions=['WORLDFILE=YES'])
+    finally:
+        mySource = None
+        gdal.Unlink(myGCPFile)
+        gdal.Unlink(myWarpedFile)
+    return theOutputFile
+
+
+def _georeference_with_commands(theInputFile, theOutputFile, theCorners):
+    """
+    Georeference a thumbnail with the GDAL command line tools
+
+    See georeference_thumbnail, used when the bindings are not installed.
+    """
+    try:
+        myWidth, myHeight = Image.open(theInputFile).size
+    except (IOError, OSError) as e:
+        raise RuntimeError('Can not open %s: %s' % (theInputFile, e))
+    myTopLeft, myTopRight, myBottomRight, myBottomLeft = theCorners
+    myGCPArgs = []
+    for myPixel, myLine, myCorner in (
+            (0, 0, myTopLeft), (myWidth, 0, myTopRight),
+            (myWidth, myHeight, myBottomRight), (0, myHeight, myBottomLeft)):
+        myGCPArgs += ['-gcp'] + [
+            str(myValue) for myValue in (myPixel, myLine) + tuple(myCorner)]
+    myDirectory = tempfile.mkdtemp()
+    myGCPFile = os.path.join(myDirectory, 'gcp.tif')
+    myWarpedFile = os.path.join(myDirectory, 'warped.tif')
+    try:
+        for myCommand in (
+                ['gdal_translate', '-a_srs', 'EPSG:4326'] + myGCPArgs + [
+                    '-of', 'GTiff', theInputFile, myGCPFile],
+                ['gdalwarp', '-of', 'GTiff', myGCPFile, myWarpedFile],
+                ['gdal_translate', '-of', 'JPEG', '-co', 'WORLDFILE=YES',
+                 myWarpedFile, theOutputFile]):
+            subprocess.check_call(
+                myCommand, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError('Georeferencing %s failed: %s' % (
+            theInputFile, e))
+    finally:
+        shutil.rmtree(myDirectory, ignore_errors=True)
+    return theOutputFile
+
+
+def _georeference_thumbnail_safe(theJob):
+    """
+    Wrapper which logs instead of failing the whole batch
+    """
+    try:
+        return georeference_thumbnail(*theJob)
+    except Exception as e:
+        logger.error('Failed to georeference %s: %s', theJob[0], e)
+        return None
+
+
+def _georeference_jobs(theProducts, theForceFlag):
+    """
+    Return the georeference_thumbnail arguments of the products to process
+    """
+    myJobs = []
+    for myProduct in theProducts:
+        try:
+            myJob = myProduct.georeferencedThumbnailJob(theForceFlag)
+        except Exception:
+            logger.exception(
+                'Could not prepare georeferencing of %s', myProduct.pk)
+            continue
+        if myJob:
+            myJobs.append(myJob)
+    return myJobs
+
+
+def georeference_thumbnails(theProducts, theForceFlag=False):
+    """
+    Georeference the thumbnails of many products
+
+    Products with an existing georeferenced thumbnail or without a thumbnail
+    are skipped, so it is cheap to call this before bundling thumbnails. It
+    runs in the calling process since it is used by web requests.
+
+    Args:
+        theProducts - iterable of GenericProduct instances
+        theForceFlag - georeference even if a georeferenced thumb exists
+    Returns:
+        int - number of georeferenced thumbnails
+    Exceptions:
+        None
+    """
+    return len([
+        myJob for myJob in _georeference_jobs(theProducts, theForceFlag)
+        if _georeference_thumbnail_safe(myJob) is not None])
+
+
+def pregeoreference_thumbnails(
+        theProducts, theForceFlag=False, theWorkers=None):
+    """
+    Georeference the thumbnails of many products in a pool of processes
+
+    Meant for batch jobs, web requests use georeference_thumbnails.
+
+    Args:
+        theProducts - iterable of GenericProduct instances
+        theForceFlag - georeference even if a georeferenced thumb exists
+        theWorkers - number of worker processes, defaults to the cpu count
+    Returns:
+        int - number of georeferenced thumbnails
+    Exceptions:
+        None
+    """
+    myJobs = _georeference_jobs(theProducts, theForceFlag)
+    if not myJobs:
+        return 0
+    with ProcessPoolExecutor(max_workers=theWorkers) as myExecutor:
+        return len([
+            myResult for myResult in myExecutor.map(
+                _georeference_thumbnail_safe, myJobs, chunksize=16)
+            if myResult is not None])
@@ -2,20 +2,13 @@ __author__ = 'rischan - <--rischan@kartoza.com-->'
 __date__ = '3/4/16'
 
 import os
-import sys
 import glob
-from cmath import log
 from datetime import datetime
-from xml.dom.minidom import parse
-import traceback
 import shutil
 
-from django.db import transaction
 from django.contrib.gis.geos import WKTReader
-from django.core.management.base import CommandError
-from django.core.exceptions import ObjectDoesNotExist
-from django.conf import settings
 
+from catalogue.ingestors.resolver import dictionary_resolver
 from dictionaries.models import (
     SpectralMode,
     SatelliteInstrument,
@@ -26,7 +19,34 @@ from dictionaries.models import (
     SatelliteInstrumentGroup,
     Quality
 )
-from catalogue.models import OpticalProduct
+from catalogue.ingestors.engine import (
+    ingest_sources,
+    get_checkpoint_path,
+    silent_log_message
+)
+from catalogue.ingestors.metadata import MetadataField, read_metadata
+
+# metadata elements read from a CBERS scene xml file
+CBERS_FIELDS = {
+    'upper_left_lat': MetadataField('productUpperLeftLat'),
+    'upper_left_long': MetadataField('productUpperLeftLong'),
+    'upper_right_lat': MetadataField('productUpperRightLat'),
+    'upper_right_long': MetadataField('productUpperRightLong'),
+    'lower_left_lat': MetadataField('productLowerLeftLat'),
+    'lower_left_long': MetadataField('productLowerLeftLong'),
+    'lower_right_lat': MetadataField('productLowerRightLat'),
+    'lower_right_long': MetadataField('productLowerRightLong'),
+    'start': MetadataField('imagingStartTime'),
+    'product_date': MetadataField('productDate'),
+    'bands': MetadataField('bands'),
+    'sun_azimuth': MetadataField('sunAzimuthElevation'),
+    'scene_row': MetadataField('sceneRow'),
+    'scene_path': MetadataField('scenePath'),
+    'pixel_spacing': MetadataField('pixelSpacing'),
+    'sensor_id': MetadataField('sensorId'),
+    'zone': MetadataField('zone'),
+    'overall_quality': MetadataField('overallQuality')
+}
 
 
 def parse_date_time(date_stamp):
@@ -62,40 +82,25 @@ def parse_date_time(date_stamp):
     return parsed_date_time
 
 
-def get_geometry(log_message, dom):
+def get_geometry(log_message, fields):
     """Extract the bounding box as a geometry from the xml file.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: DOM Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with CBERS_FIELDS.
+    :type fields: dict
 
     :return: geoemtry
     """
-    up_left_lat_value = dom.getElementsByTagName('productUpperLeftLat')[0]
-    up_left_lat = up_left_lat_value.firstChild.nodeValue
-
-    up_left_long_value = dom.getElementsByTagName('productUpperLeftLong')[0]
-    up_left_long = up_left_long_value.firstChild.nodeValue
-
-    up_right_lat_value = dom.getElementsByTagName('productUpperRightLat')[0]
-    up_right_lat = up_right_lat_value.firstChild.nodeValue
-
-    up_right_long_value = dom.getElementsByTagName('productUpperRightLong')[0]
-    up_right_long = up_right_long_value.firstChild.nodeValue
-
-    low_left_lat_value = dom.getElementsByTagName('productLowerLeftLat')[0]
-    low_left_lat = low_left_lat_value.firstChild.nodeValue
-
-    low_left_long_value = dom.getElementsByTagName('productLowerLeftLong')[0]
-    low_left_long = low_left_long_value.firstChild.nodeValue
-
-    low_right_lat_value = dom.getElementsByTagName('productLowerRightLat')[0]
-    low_right_lat = low_right_lat_value.firstChild.nodeValue
-
-    low_right_long_value = dom.getElementsByTagName('productLowerRightLong')[0]
-    low_right_long = low_right_long_value.firstChild.nodeValue
+    up_left_lat = fields['upper_left_lat']
+    up_left_long = fields['upper_left_long']
+    up_right_lat = fields['upper_right_lat']
+    up_right_long = fields['upper_right_long']
+    low_left_lat = fields['lower_left_lat']
+    low_left_long = fields['lower_left_long']
+    low_right_lat = fields['lower_right_lat']
+    low_right_long = fields['lower_right_long']
 
     polygon = 'POLYGON((' '%s %s, ' \
               '%s %s, %s %s, %s %s, %s %s' '))' % (
@@ -111,27 +116,23 @@ def get_geometry(log_message, dom):
     return myGeometry
 
 
-def get_dates(log_message, dom):
+def get_dates(log_message, fields):
     """Get the start, mid scene and end dates.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with CBERS_FIELDS.
+    :type fields: dict
 
     :return: A two-tuple of dates for the start, and mid scene
         respectively.
     :rtype: (datetime, datetime)
     """
-    start_element = dom.getElementsByTagName('imagingStartTime')[0]
-    start_date = start_element.firstChild.nodeValue
-    start_date = parse_date_time(start_date)
+    start_date = parse_date_time(fields['start'])
     log_message('Product Start Date: %s' % start_date, 2)
 
-    product_date = dom.getElementsByTagName('productDate')[0]
-    center_date = product_date.firstChild.nodeValue
-    center_date = parse_date_time(center_date)
+    center_date = parse_date_time(fields['product_date'])
     log_message('Product Date: %s' % center_date, 2)
 
     return start_date, center_date
@@ -145,31 +146,24 @@ def get_original_product_id(filename):
     return product_name
 
 
-def get_band_count(dom):
-    band_count_data = dom.getElementsByTagName('bands')[0]
-    band_count = band_count_data.firstChild.nodeValue
+def get_band_count(fields):
+    band_count = fields['bands']
     if len(band_count) == 1:
         return 1
     else:
         return len(eval(band_count))
 
 
-def get_solar_azimuth_angle(dom):
-    sun_azimuth = dom.getElementsByTagName('sunAzimuthElevation')[0]
-    solar_azimuth = sun_azimuth.firstChild.nodeValue
-    return solar_azimuth
+def get_solar_azimuth_angle(fields):
+    return fields['sun_azimuth']
 
 
-def get_scene_row(dom):
-    scene_row = dom.getElementsByTagName('sceneRow')[0]
-    row = scene_row.firstChild.nodeValue
-    return row
+def get_scene_row(fields):
+    return fields['scene_row']
 
 
-def get_scene_path(dom):
-    scene_path = dom.getElementsByTagName('scenePath')[0]
-    path = scene_path.firstChild.nodeValue
-    return path
+def get_scene_path(fields):
+    return fields['scene_path']
 
 
 def get_sensor_inclination():
@@ -178,16 +172,12 @@ def get_sensor_inclination():
     return 98.5
 
 
-def get_spatial_resolution_x(dom):
-    spatial_resolution_data = dom.getElementsByTagName('pixelSpacing')[0]
-    spatial_resolution = spatial_resolution_data.firstChild.nodeValue
-    return spatial_resolution
+def get_spatial_resolution_x(fields):
+    return fields['pixel_spacing']
 
 
-def get_spatial_resolution_y(dom):
-    spatial_resolution_data = dom.getElementsByTagName('pixelSpacing')[0]
-    spatial_resolution = spatial_resolution_data.firstChild.nodeValue
-    return spatial_resolution
+def get_spatial_resolution_y(fields):
+    return fields['pixel_spacing']
 
 
 def get_product_profile(log_message, product_id):
@@ -208,7 +198,8 @@ def get_product_profile(log_message, product_id):
     mission_index = product_id[0:4]
 
     try:
-        instrument_type = InstrumentType.objects.get(
+        instrument_type = dictionary_resolver.get(
+            InstrumentType,
             operator_abbreviation=sensor_value)  # e.g. MUX, P10
     except Exception as e:
         # print e.message
@@ -221,38 +212,42 @@ def get_product_profile(log_message, product_id):
         mission_value = 'CB05'
     else:
         raise Exception('Unknown mission in CBERS')
-    satellite = Satellite.objects.get(abbreviation=mission_value)
+    satellite = dictionary_resolver.get(Satellite, abbreviation=mission_value)
 
     try:
-        satellite_instrument_group = SatelliteInstrumentGroup.objects.get(
+        satellite_instrument_group = dictionary_resolver.get(
+            SatelliteInstrumentGroup,
             satellite=satellite, instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument Group %s' %
                 satellite_instrument_group, 2)
     try:
-        satellite_instrument = SatelliteInstrument.objects.get(
+        satellite_instrument = dictionary_resolver.get(
+            SatelliteInstrument,
             satellite_instrument_group=satellite_instrument_group)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument %s' % satellite_instrument, 2)
 
     try:
-        spectral_modes = SpectralMode.objects.filter(
+        spectral_modes = dictionary_resolver.filter(
+            SpectralMode,
             instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise
     log_message('Spectral Modes %s' % spectral_modes, 2)
 
     try:
-        product_profile = OpticalProductProfile.objects.get(
+        product_profile = dictionary_resolver.get(
+            OpticalProductProfile,
             satellite_instrument=satellite_instrument,
             spectral_mode__in=spectral_modes)
     except Exception as e:
-        print(e.message)
+        print(e)
         print('Searched for satellite instrument: %s and spectral modes %s' % (
             satellite_instrument, spectral_modes
         ))
@@ -262,7 +257,7 @@ def get_product_profile(log_message, product_id):
     return product_profile
 
 
-def get_radiometric_resolution(dom):
+def get_radiometric_resolution(fields):
     """Get the radiometric resolution for the supplied product record.
     source = http://www.cbers.inpe.br/ingles/satellites/cameras_cbers3_4.php
 
@@ -271,14 +266,13 @@ def get_radiometric_resolution(dom):
     IRSCAM = 8 bits
     WFICAM = 10 bits
 
-    :param resolution_element: Dom Document containing the bounds of the scene.
-    :type resolution_element: DOM document.
+    :param fields: Metadata values read with CBERS_FIELDS.
+    :type fields: dict
 
     :returns: The bit depth for the image.
     :rtype: int
     """
-    get_sensor_id = dom.getElementsByTagName('sensorId')[0]
-    sensor_id = get_sensor_id.firstChild.nodeValue
+    sensor_id = fields['sensor_id']
     # sensor_id : MUX, P10, P5M, WFI
     if sensor_id == 'MUX':
         return 8
@@ -292,41 +286,154 @@ def get_radiometric_resolution(dom):
         return 0
 
 
-def get_projection(dom):
+def get_zone(fields):
+    """Get the UTM zone of the scene."""
+    return fields['zone']
+
+
+def get_projection(zone_value):
     """Get the projection for this product record.
 
     The project is always expressed as an EPSG code and we fetch the related
     Projection model for that code.
 
-    :param specific_parameters: Dom Document containing the bounds of the scene.
-    :type specific_parameters: DOM document.
+    :param zone_value: UTM zone of the scene e.g. 35S.
+    :type zone_value: str
 
     :returns: A projection model for the specified EPSG.
     :rtype: Projection
     """
     epsg_default_code = '32'
-    get_zone = dom.getElementsByTagName('zone')[0]
-    zone_value = get_zone.firstChild.nodeValue
     zone = zone_value[0:2]
     location_code = '7'  # 6 for north and 7 for south
     epsg_code = epsg_default_code + location_code + zone
 
-    projection = Projection.objects.get(epsg_code=epsg_code)
+    projection = dictionary_resolver.get(Projection, epsg_code=epsg_code)
     return projection
 
 
-def get_quality(dom):
-    """Get the quality for this record - currently hard coded to unknown.
+def get_overall_quality(fields):
+    """Get the overall quality name of the scene."""
+    return str(fields['overall_quality'])
+
+
+def get_quality(quality_xml):
+    """Get the quality for this record.
 
-    :returns: A quality object fixed to 'unknown'.
+    :param quality_xml: Overall quality name of the scene.
+    :type quality_xml: str
+
+    :returns: The quality object with that name.
     :rtype: Quality
     """
-    overall_quality = dom.getElementsByTagName('overallQuality')[0]
-    quality_xml = str(overall_quality.firstChild.nodeValue)
-    quality = Quality.objects.get(name=quality_xml)
+    quality = dictionary_resolver.get(Quality, name=quality_xml)
     return quality
 
 
+def parse_source(xml_file):
+    """Read the metadata of a CBERS scene xml file.
+
+    Runs in an ingest engine worker process, so no database access here.
+
+    :param xml_file: A CBERS scene xml file, the thumbnail is next to it.
+    :type xml_file: str
+
+    :returns: The plain values needed to create the product.
+    :rtype: dict
+    """
+    file_name = os.path.splitext(os.path.basename(xml_file))[0]
+    # The scene text is not stored for CBERS, only the fields
+    _, fields = read_metadata(xml_file, CBERS_FIELDS)
+    start_date_time, center_date_time = get_dates(silent_log_message, fields)
+    return {
+        'xml_file': xml_file,
+        'original_product_id': get_original_product_id(file_name),
+        'geometry': get_geometry(silent_log_message, fields),
+        'start_date_time': start_date_time,
+        'center_date_time': center_date_time,
+        'zone': get_zone(fields),
+        'band_count': get_band_count(fields),
+        'row': get_scene_row(fields),
+        'path': get_scene_path(fields),
+        'solar_azimuth_angle': get_solar_azimuth_angle(fields),
+        'spatial_resolution_x': float(get_spatial_resolution_x(fields)),
+        'spatial_resolution_y': float(get_spatial_resolution_y(fields)),
+        'radiometric_resolution': get_radiometric_resolution(fields),
+        'quality': get_overall_quality(fields)
+    }
+
+
+def resolve_record(log_message, record):
+    """Get the product field values of a parsed CBERS scene.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :returns: OpticalProduct field values.
+    :rtype: dict
+    """
+    # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
+    spatial_resolution = (
+        record['spatial_resolution_x'] + record['spatial_resolution_y']) / 2
+    log_message('Spatial resolution: %s' % spatial_resolution, 2)
+    return {
+        'spatial_coverage': record['geometry'],
+        'radiometric_resolution': record['radiometric_resolution'],
+        'band_count': record['band_count'],
+        'original_product_id': record['original_product_id'],
+        'unique_product_id': record['original_product_id'],
+        'spatial_resolution_x': record['spatial_resolution_x'],
+        'spatial_resolution_y': record['spatial_resolution_y'],
+        'spatial_resolution': spatial_resolution,
+        'product_profile': get_product_profile(
+            log_message, record['original_product_id']),
+        'product_acquisition_start': record['start_date_time'],
+        'product_date': record['center_date_time'],
+        'sensor_inclination_angle': get_sensor_inclination(),
+        'solar_azimuth_angle': record['solar_azimuth_angle'],
+        'row': record['row'],
+        'path': record['path'],
+        'projection': get_projection(record['zone']),
+        'quality': get_quality(record['quality'])
+    }
+
+
+def store_files(log_message, product, record, created):
+    """Copy the thumbnail of a product into the thumbnail folder.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param product: The ingested product.
+    :type product: OpticalProduct
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :param created: Whether the product was created by this run.
+    :type created: bool
+
+    :returns: The path of the stored thumbnail.
+    :rtype: str
+    """
+    # Store thumbnail where the product looks for it
+    thumbnail_file = product.thumbnailFile()
+    try:
+        os.makedirs(os.path.dirname(thumbnail_file))
+    except OSError:
+        # TODO: check for creation failure rather than
+        # attempt to  recreate an existing dir
+        pass
+
+    jpeg_path = record['xml_file'].replace('.XML', '-THUMB.JPG')
+    shutil.copyfile(jpeg_path, thumbnail_file)
+    log_message(thumbnail_file, 2)
+    return thumbnail_file
+
+
 def ingest(
         test_only_flag=True,
         source_path=(
@@ -334,7 +441,9 @@ def ingest(
                 'CBERS/'),
         verbosity_level=2,
         halt_on_error_flag=True,
-        ignore_missing_thumbs=False):
+        ignore_missing_thumbs=False,
+        workers=None,
+        resume_flag=True):
     """
     Ingest a collection of CBERS metadata folders.
 
@@ -356,6 +465,14 @@ def ingest(
     :param ignore_missing_thumbs: Whether we should raise an error
         if we find we are missing a thumbnails. Default is False.
     :type ignore_missing_thumbs: bool
+
+    :param workers: Number of processes parsing the metadata, defaults to the
+        number of cpus.
+    :type workers: int
+
+    :param resume_flag: Whether to skip the files ingested by an earlier,
+        interrupted run. Default is True.
+    :type resume_flag: bool
     """
 
     def log_message(message, level=1):
@@ -381,203 +498,16 @@ def ingest(
     # The sub-folder names should be e.g.
     # L5-_TM-_HRF_SAM-_0176_00_0078_00_920606_080254_L0Ra_UTM34S
     log_message('Scanning folders in %s' % source_path, 1)
-    # Loop through each folder found
 
     ingestor_version = 'CBERS 04 ingestor version 1.1'
-    record_count = 0
-    updated_record_count = 0
-    created_record_count = 0
-    failed_record_count = 0
-    log_message('Starting directory scan...', 2)
-
-    for myFolder in glob.glob(os.path.join(source_path, '*.XML')):
-        record_count += 1
-        try:
-            log_message('', 2)
-            log_message('---------------', 2)
-            # Get the folder name
-            product_folder = os.path.split(myFolder)[-1]
-            log_message(product_folder, 2)
-
-            # Find the first and only xml file in the folder
-            # search_path = os.path.join(str(myFolder), '*.XML')
-            log_message(myFolder, 2)
-            xml_file = glob.glob(myFolder)[0]
-            file = os.path.basename(xml_file)
-            file_name = os.path.splitext(file)[0]
-            original_product_id = get_original_product_id(file_name)
-
-            # Create a DOM document from the file
-            dom = parse(xml_file)
-
-            # First grab all the generic properties that any CBERS will have...
-            geometry = get_geometry(log_message, dom)
-            start_date_time, center_date_time = get_dates(
-                log_message, dom)
-            # projection for GenericProduct
-            projection = get_projection(dom)
-
-            # Band count for GenericImageryProduct
-            band_count = get_band_count(dom)
-            row = get_scene_row(dom)
-            path = get_scene_path(dom)
-            solar_azimuth_angle = get_solar_azimuth_angle(dom)
-            sensor_inclination = get_sensor_inclination()
-            # # Spatial resolution x for GenericImageryProduct
-            spatial_resolution_x = float(get_spatial_resolution_x(dom))
-            # # Spatial resolution y for GenericImageryProduct
-            spatial_resolution_y = float(
-                get_spatial_resolution_y(dom))
-            log_message('Spatial resolution y: %s' % spatial_resolution_y, 2)
-
-            # # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
-            spatial_resolution = (spatial_resolution_x + spatial_resolution_y) / 2
-            log_message('Spatial resolution: %s' % spatial_resolution, 2)
-            radiometric_resolution = get_radiometric_resolution(dom)
-            log_message('Radiometric resolution: %s' % radiometric_resolution, 2)
-            quality = get_quality(dom)
-            # ProductProfile for OpticalProduct
-            product_profile = get_product_profile(log_message, original_product_id)
-
-            # Do the ingestion here...
-            data = {
-                'spatial_coverage': geometry,
-                'radiometric_resolution': radiometric_resolution,
-                'band_count': band_count,
-                'original_product_id': original_product_id,
-                'unique_product_id': original_product_id,
-                'spatial_resolution_x': spatial_resolution_x,
-                'spatial_resolution_y': spatial_resolution_y,
-                'spatial_resolution': spatial_resolution,
-                'product_profile': product_profile,
-                'product_acquisition_start': start_date_time,
-                'product_date': center_date_time,
-                'sensor_inclination_angle': sensor_inclination,
-                'solar_azimuth_angle': solar_azimuth_angle,
-                'row': row,
-                'path': path,
-                'projection': projection,
-                'quality': quality
-            }
-            log_message(data, 3)
-            # Check if it's already in catalogue:
-            try:
-                today = datetime.today()
-                time_stamp = today.strftime("%Y-%m-%d")
-                log_message('Time Stamp: %s' % time_stamp, 2)
-            except Exception as e:
-                print(e.message)
-
-            update_mode = True
-            try:
-                log_message('Trying to update')
-                # original_product_id is not necessarily unique
-                # so we use product_id
-                product = OpticalProduct.objects.get(
-                    original_product_id=original_product_id
-                ).getConcreteInstance()
-                log_message(('Already in catalogue: updating %s.'
-                             % original_product_id), 2)
-                new_record_flag = False
-                message = product.ingestion_log
-                message += '\n'
-                message += '%s : %s - updating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                product.__dict__.update(data)
-            except ObjectDoesNotExist:
-                log_message('Not in catalogue: creating.', 2)
-                update_mode = False
-                message = '%s : %s - creating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                try:
-                    product = OpticalProduct(**data)
-                    log_message('Product: %s' % product)
-
-                except Exception as e:
-                    log_message(e.message, 2)
-
-                new_record_flag = True
-            except Exception as e:
-                print(e.message)
-
-            log_message('Saving product and setting thumb', 2)
-            try:
-                product.save()
-                if update_mode:
-                    updated_record_count += 1
-                else:
-                    created_record_count += 1
-                if test_only_flag:
-                    log_message('Testing: image not saved.', 2)
-                    pass
-                else:
-                    # Store thumbnail
-                    thumbs_folder = os.path.join(
-                        settings.THUMBS_ROOT,
-                        product.thumbnailDirectory())
-                    try:
-                        os.makedirs(thumbs_folder)
-                    except OSError:
-                        # TODO: check for creation failure rather than
-                        # attempt to  recreate an existing dir
-                        pass
-
-                    jpeg_path = os.path.join(str(myFolder))
-                    # log_message(jpeg_path, 2)
-                    jpeg_path = jpeg_path.replace(".XML", "-THUMB.JPG")
-
-                    if jpeg_path:
-                        print(jpeg_path)
-                        new_name = '%s.JPG' % product.original_product_id
-                        shutil.copyfile(
-                            jpeg_path,
-                            os.path.join(thumbs_folder, new_name))
-                        print(new_name)
-                        # Transform and store .wld file
-                    #     log_message('Referencing thumb', 2)
-                    #     try:
-                    #         path = product.georeferencedThumbnail()
-                    #         log_message('Georeferenced Thumb: %s' % path, 2)
-                    #     except:
-                    #         traceback.print_exc(file=sys.stdout)
-                    # elif ignore_missing_thumbs:
-                    #         log_message('IGNORING missing thumb:')
-                    else:
-                        raise Exception('Missing thumbnail in %s' % jpeg_path)
-                if new_record_flag:
-                    log_message('Product %s imported.' % record_count, 2)
-                    pass
-                else:
-                    log_message('Product %s updated.' % updated_record_count, 2)
-                    pass
-            except Exception as e:
-                traceback.print_exc(file=sys.stdout)
-                raise CommandError('Cannot import: %s' % e)
-
-            if test_only_flag:
-                transaction.rollback()
-                log_message('Imported scene : %s' % product_folder, 1)
-                log_message('Testing only: transaction rollback.', 1)
-            else:
-                transaction.commit()
-                log_message('Imported scene : %s' % product_folder, 1)
-        except Exception as e:
-            log_message('Record import failed. AAAAAAARGH! : %s' %
-                        product_folder, 1)
-            failed_record_count += 1
-            if halt_on_error_flag:
-                print(e.message)
-                break
-            else:
-                continue
-
-    # To decide: should we remove ingested product folders?
-
-    print('===============================')
-    print('Products processed : %s ' % record_count)
-    print('Products updated : %s ' % updated_record_count)
-    print('Products imported : %s ' % created_record_count)
-    print('Products failed to import : %s ' % failed_record_count)
-    print('===============================')
+    return ingest_sources(
+        glob.glob(os.path.join(source_path, '*.XML')),
+        parse_source,
+        resolve_record,
+        ingestor_version,
+        log_message,
+        test_only_flag=test_only_flag,
+        halt_on_error_flag=halt_on_error_flag,
+        store_files=store_files,
+        checkpoint_path=get_checkpoint_path(source_path, resume_flag),
+        workers=workers)
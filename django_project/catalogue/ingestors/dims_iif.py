@@ -18,20 +18,16 @@ __date__ = '14/08/2013'
 __copyright__ = 'South African National Space Agency'
 
 import os
-import sys
 import glob
 from cmath import log
 from datetime import datetime
-from xml.dom.minidom import parse
+from functools import partial
 import traceback
 import shutil
 
-from django.db import transaction
 from django.contrib.gis.geos import WKTReader
-from django.core.management.base import CommandError
-from django.core.exceptions import ObjectDoesNotExist
-from django.conf import settings
 
+from catalogue.ingestors.resolver import dictionary_resolver
 from dictionaries.models import (
     SpectralMode,
     SatelliteInstrument,
@@ -42,7 +38,62 @@ from dictionaries.models import (
     SatelliteInstrumentGroup,
     Quality
 )
-from catalogue.models import OpticalProduct
+from catalogue.ingestors.engine import (
+    ingest_sources,
+    get_checkpoint_path,
+    silent_log_message
+)
+from catalogue.ingestors.metadata import MetadataField, read_metadata
+
+
+def specific_parameter(*keys):
+    """Field for a (nested) <feature> of the item specificParameters."""
+    return MetadataField('/'.join(
+        ['item', 'specificParameters'] +
+        ['feature[@key=%s]' % key for key in keys]))
+
+
+# metadata elements read from a DIMS IIF file, only the first <item>
+# (the scene) has the spatial coverage and the specific parameters
+DIMS_IIF_FIELDS = {
+    'latitudes': MetadataField(
+        'item/parameters/spatialCoverage/boundingPolygon/point/latitude',
+        many=True),
+    'longitudes': MetadataField(
+        'item/parameters/spatialCoverage/boundingPolygon/point/longitude',
+        many=True),
+    'start_time': MetadataField('item/parameters/temporalCoverage/startTime'),
+    'center_time': MetadataField('centerTime'),
+    'stop_time': MetadataField('stopTime'),
+    'quality': MetadataField('item/parameters/quality'),
+    'projection_code': MetadataField(
+        'item/specificParameters/feature[@key=projectionName]/'
+        'feature[@key=code]', required=False),
+    'orbit_number': specific_parameter('orbitNumber'),
+    'product_name': specific_parameter('productName'),
+    'number_of_bands': specific_parameter('resolution', 'numberOfBands'),
+    'resolution_x': specific_parameter(
+        'resolution', 'groundSamplingDistance', 'x'),
+    'resolution_y': specific_parameter(
+        'resolution', 'groundSamplingDistance', 'y'),
+    'quantisation_min': specific_parameter(
+        'resolution', 'quantitisation', 'min'),
+    'quantisation_max': specific_parameter(
+        'resolution', 'quantitisation', 'max'),
+    'path': specific_parameter('path'),
+    'row': specific_parameter('row'),
+    'earth_sun_distance': specific_parameter('earthSunDistance'),
+    'solar_azimuth_angle': specific_parameter('solarAzimuthAngle'),
+    'solar_zenith_angle': specific_parameter('solarZenithAngle'),
+    'sensor_viewing_angle': specific_parameter('sensorViewingAngle'),
+    'sensor_inclination_angle': specific_parameter('sensorInclinationAngle'),
+    'cloud_cover': specific_parameter('cloudCoverPercentage'),
+    'type': specific_parameter('type'),
+    'sensor': specific_parameter('sensor'),
+    'mission': specific_parameter('mission'),
+    'dims_product_id': MetadataField(
+        'item/administration/keys/feature[@key=productID]')
+}
 
 
 def parse_date_time(date):
@@ -78,76 +129,23 @@ def parse_date_time(date):
     return parsed_date_time
 
 
-def get_parameters_element(dom):
-    """Get the parameters element from the dom.
-
-    :param dom: DOM Document containing the parameters.
-    :type dom: DOM document.
-
-    :returns: A DOM element representing the parameters.
-    :type: DOM
-    """
-    iif = dom.getElementsByTagName('IIF')[0]
-    item = iif.getElementsByTagName('item')[0]
-    parameters = item.getElementsByTagName('parameters')[0]
-    return parameters
-
-
-def get_specific_parameters_element(dom):
-    """Get the specificParameters element from the dom.
-
-    :param dom: DOM Document containing the specificParameters element.
-    :type dom: DOM document.
-
-    :returns: A dom element representing the specificParameters element.
-    :type: DOM
-    """
-    iif = dom.getElementsByTagName('IIF')[0]
-    item = iif.getElementsByTagName('item')[0]
-    specific_parameters = item.getElementsByTagName('specificParameters')[0]
-    return specific_parameters
-
-
-def get_administration_keys_element(dom):
-    """Get the IIF -> Item -> Administration -> Keys element from the dom.
-
-    :param dom: DOM Document containing the keys.element.
-    :type dom: DOM document.
-
-    :returns: A dom element representing the keys element.
-    :type: DOM
-    """
-    iif = dom.getElementsByTagName('IIF')[0]
-    item = iif.getElementsByTagName('item')[0]
-    administration = item.getElementsByTagName('administration')[0]
-    keys = administration.getElementsByTagName('keys')[0]
-    return keys
-
-
-def get_geometry(log_message, dom):
+def get_geometry(log_message, fields):
     """Extract the bounding box as a geometry from the xml file.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: DOM Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with DIMS_IIF_FIELDS.
+    :type fields: dict
 
     :return: geoemtry
     """
-    parameters = get_parameters_element(dom)
-    coverage = parameters.getElementsByTagName('spatialCoverage')[0]
-    polygon = coverage.getElementsByTagName('boundingPolygon')[0]
-    points = polygon.getElementsByTagName('point')
     polygon = 'POLYGON(('
     is_first = True
     first_longitude = None
     first_latitude = None
-    for point in points:
-        latitude = point.getElementsByTagName('latitude')[0]
-        latitude = latitude.firstChild.nodeValue
-        longitude = point.getElementsByTagName('longitude')[0]
-        longitude = longitude.firstChild.nodeValue
+    for latitude, longitude in zip(
+            fields['latitudes'], fields['longitudes']):
         if not is_first:
             polygon += ','
         else:
@@ -165,41 +163,32 @@ def get_geometry(log_message, dom):
     return myGeometry
 
 
-def get_dates(log_message, dom):
+def get_dates(log_message, fields):
     """Get the start, mid scene and end dates.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with DIMS_IIF_FIELDS.
+    :type fields: dict
 
     :return: A three-tuple of dates for the start, mid scene and end dates
         respectively.
     :rtype: (datetime, datetime, datetime)
     """
-    parameters = get_parameters_element(dom)
-    coverage = parameters.getElementsByTagName('temporalCoverage')[0]
-
-    start_element = coverage.getElementsByTagName('startTime')[0]
-    start_date = start_element.firstChild.nodeValue
-    start_date = parse_date_time(start_date)
+    start_date = parse_date_time(fields['start_time'])
     log_message('Product Start Date: %s' % start_date, 2)
 
-    center_element = dom.getElementsByTagName('centerTime')[0]
-    center_date = center_element.firstChild.nodeValue
-    center_date = parse_date_time(center_date)
+    center_date = parse_date_time(fields['center_time'])
     log_message('Product Date: %s' % center_date, 2)
 
-    end_element = dom.getElementsByTagName('stopTime')[0]
-    end_date = end_element.firstChild.nodeValue
-    end_date = parse_date_time(end_date)
+    end_date = parse_date_time(fields['stop_time'])
     log_message('Product End Date: %s' % end_date, 2)
 
     return start_date, center_date, end_date
 
 
-def get_acquisition_quality(log_message, dom):
+def get_acquisition_quality(log_message, fields):
     """The DIMS quality indication for this scene (APPROVED or NOT_APPROVED).
 
     The quality is based on drop outs or any other acquisition anomalies -
@@ -208,16 +197,14 @@ def get_acquisition_quality(log_message, dom):
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with DIMS_IIF_FIELDS.
+    :type fields: dict
 
     :return: A boolean indicating if the product is approved for
         redistribution (according to DIMS).
     :rtype: bool
     """
-    parameters = get_parameters_element(dom)
-    quality_element = parameters.getElementsByTagName('quality')[0]
-    quality = quality_element.firstChild.nodeValue
+    quality = fields['quality']
     quality_flag = False
     if 'APPROVED' in quality:
         quality_flag = True
@@ -225,85 +212,7 @@ def get_acquisition_quality(log_message, dom):
     return quality_flag
 
 
-def get_feature(key, dom):
-    """Find the <feature> element with key 'key' and return it as an element.
-
-    Example::
-
-        <feature key="resolution">
-          <feature key="numberOfBands">12</feature>
-          <feature key="groundSamplingDistance">
-            <feature key="x">30.0</feature>
-            <feature key="y">30.0</feature>
-         </feature>
-
-    Calling get_feature_value('resolution', dom) would return the dom element
-     '<feature key="resolution">' and its children.
-
-    :param key: The key to search for (represented in the xml document as
-        key='foo').
-    :type key: str
-
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
-
-    :return: The node for this feature
-    :rtype: DOM
-    """
-    features = dom.getElementsByTagName('feature')
-    result = None
-    for feature in features:
-        attributes = list(feature.attributes.items())
-        for attribute in attributes:
-            if 'key' in attribute[0]:
-                value = attribute[1]
-                if key in value:
-                    result = feature
-                    break
-        if result is not None:
-            break
-    return result
-
-
-def get_feature_value(key, dom):
-    """Find the <feature> element whose key matches key and return its value.
-
-    Example::
-
-        <feature key="fileFormatVersion">x.x</feature>
-        <feature key="fileFormat">GEOTIFF</feature>
-        <feature key="trackNumber">173</feature>
-        <feature key="orbitNumber">20</feature>
-        <feature key="productName">LC81730832013162JSA00</feature>
-
-    Calling get_feature_value('orbitNumber', dom) would return 20.
-
-    :param key: The key to search for (represented in the xml document as
-        key='foo').
-    :type key: str
-
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
-
-    :return: The value of the node for this feature
-    :rtype: str
-    """
-    features = dom.getElementsByTagName('feature')
-    result = None
-    for feature in features:
-        attributes = list(feature.attributes.items())
-        for attribute in attributes:
-            if 'key' in attribute[0]:
-                value = attribute[1]
-                if key in value:
-                    result = feature.firstChild.nodeValue
-                    break
-        if result is not None:
-            break
-    return result
-
-
-def get_product_profile(log_message, dom):
+def get_product_profile(log_message, fields):
     """Find the product_profile for this record.
 
     It can be that one or more spectral modes are associated with a product.
@@ -325,24 +234,25 @@ def get_product_profile(log_message, dom):
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with DIMS_IIF_FIELDS.
+    :type fields: dict
 
     :return: A product profile for the given product.
     :rtype: OpticalProductProfile
     """
     # We need type, sensor and mission so that we can look up the
     # OpticalProductProfile that applies to this product
-    type_value = get_feature_value('type', dom)
-    sensor_value = get_feature_value('sensor', dom)
-    mission_value = get_feature_value('mission', dom)
+    type_value = fields['type']
+    sensor_value = fields['sensor']
+    mission_value = fields['mission']
     log_message('Type (used to determine spectral mode): %s' % type_value, 2)
     log_message(
         'Sensor (used to determine instrument type): %s' % sensor_value, 2)
     log_message('Mission(used to determine satellite): %s' % mission_value, 2)
 
     try:
-        instrument_type = InstrumentType.objects.get(
+        instrument_type = dictionary_resolver.get(
+            InstrumentType,
             operator_abbreviation=sensor_value)  # e.g. OLI_TIRS
     except Exception as e:
         # print e.message
@@ -357,10 +267,11 @@ def get_product_profile(log_message, dom):
         mission_value = 'L5'
     else:
         raise Exception('Unknown mission in IIF')
-    satellite = Satellite.objects.get(abbreviation=mission_value)
+    satellite = dictionary_resolver.get(Satellite, abbreviation=mission_value)
 
     try:
-        satellite_instrument_group = SatelliteInstrumentGroup.objects.get(
+        satellite_instrument_group = dictionary_resolver.get(
+            SatelliteInstrumentGroup,
             satellite=satellite, instrument_type=instrument_type)
     except Exception as e:
         print(e.message)
@@ -374,7 +285,8 @@ def get_product_profile(log_message, dom):
     # For the mean time, we can assume that Landsat will return only one.
 
     try:
-        satellite_instrument = SatelliteInstrument.objects.get(
+        satellite_instrument = dictionary_resolver.get(
+            SatelliteInstrument,
             satellite_instrument_group=satellite_instrument_group)
     except Exception as e:
         print(e.message)
@@ -382,7 +294,8 @@ def get_product_profile(log_message, dom):
     log_message('Satellite Instrument %s' % satellite_instrument, 2)
 
     try:
-        spectral_modes = SpectralMode.objects.filter(
+        spectral_modes = dictionary_resolver.filter(
+            SpectralMode,
             instrument_type=instrument_type)
     except Exception as e:
         print(e.message)
@@ -390,7 +303,8 @@ def get_product_profile(log_message, dom):
     log_message('Spectral Modes %s' % spectral_modes, 2)
 
     try:
-        product_profile = OpticalProductProfile.objects.get(
+        product_profile = dictionary_resolver.get(
+            OpticalProductProfile,
             satellite_instrument=satellite_instrument,
             spectral_mode__in=spectral_modes)
     except Exception as e:
@@ -404,7 +318,7 @@ def get_product_profile(log_message, dom):
     return product_profile
 
 
-def get_radiometric_resolution(resolution_element):
+def get_radiometric_resolution(fields):
     """Get the radiometric resolution for the supplied product record.
 
     Note that the resolution (quantisation) is stored in the document as an
@@ -418,14 +332,14 @@ def get_radiometric_resolution(resolution_element):
     If min in the product description is 0, the max number is base 0,
     otherwise it is base 1.
 
-    :param resolution_element: Dom Document containing the bounds of the scene.
-    :type resolution_element: DOM document.
+    :param fields: Metadata values read with DIMS_IIF_FIELDS.
+    :type fields: dict
 
     :returns: The bit depth for the image.
     :rtype: int
     """
-    base_number = int(float(get_feature_value('min', resolution_element)))
-    bit_depth = int(float(get_feature_value('max', resolution_element)))
+    base_number = int(float(fields['quantisation_min']))
+    bit_depth = int(float(fields['quantisation_max']))
     if base_number == 0:
         bit_depth += 1
     base = 2  # to get to bit depth in base 2
@@ -433,7 +347,7 @@ def get_radiometric_resolution(resolution_element):
     return radiometric_resolution
 
 
-def get_projection(specific_parameters):
+def get_projection(fields):
     """Get the projection for this product record.
 
     The project is always expressed as an EPSG code and we fetch the related
@@ -442,18 +356,16 @@ def get_projection(specific_parameters):
     In IIF we only get 'UTM' for the CRS which is basically unusable for
     us (since we need the zone too) so we will always fail and return EPSG:4326
 
-    :param specific_parameters: Dom Document containing the bounds of the scene.
-    :type specific_parameters: DOM document.
+    :param fields: Metadata values read with DIMS_IIF_FIELDS.
+    :type fields: dict
 
     :returns: A projection model for the specified EPSG.
     :rtype: Projection
     """
 
     try:
-        projection_element = get_feature(
-            'projectionName', specific_parameters)
-        projection = get_feature_value('code', projection_element)
-        projection = Projection.objects.get(epsg_code=int(projection))
+        projection = dictionary_resolver.get(
+            Projection, epsg_code=int(fields['projection_code']))
     except:
         # If projection not found default to WGS84 - some IIF files
         # may not have a projection if they are 'scene identifying IIF's'
@@ -461,7 +373,7 @@ def get_projection(specific_parameters):
         # Discussion with Linda 29 Jan 2014 - eventually we should probably
         # just remove projection from GenericProduct and only worry about
         # CRS on deliver of the product.
-        projection = Projection.objects.get(epsg_code=4326)
+        projection = dictionary_resolver.get(Projection, epsg_code=4326)
     return projection
 
 
@@ -471,11 +383,158 @@ def get_quality():
     :returns: A quality object fixed to 'unknown'.
     :rtype: Quality
     """
-    quality = Quality.objects.get(name='Unknown')
+    quality = dictionary_resolver.get(Quality, name='Unknown')
     return quality
 
 
-@transaction.atomic
+def parse_source(folder, ignore_missing_thumbs=False):
+    """Read the metadata of a DIMS IIF scene folder.
+
+    Runs in an ingest engine worker process, so no database access here.
+
+    :param folder: A DIMS scene folder with one xml file and a thumbnail.
+    :type folder: str
+
+    :param ignore_missing_thumbs: Whether to ingest a scene without a
+        thumbnail. Default is False.
+    :type ignore_missing_thumbs: bool
+
+    :returns: The plain values needed to create the product, None when the
+        scene quality is not 'APPROVED'.
+    :rtype: dict
+
+    :raises: Exception if the folder has no thumbnail and missing thumbnails
+        are not ignored.
+    """
+    # Find the first and only xml file in the folder
+    xml_file = glob.glob(os.path.join(str(folder), '*.xml'))[0]
+    # Read the original text and the fields in one pass over the file
+    metadata, fields = read_metadata(xml_file, DIMS_IIF_FIELDS)
+    # Skip this record if the quality is not 'APPROVED'
+    if not get_acquisition_quality(silent_log_message, fields):
+        return None
+    thumbnail_files = glob.glob(os.path.join(str(folder), '*.jpeg'))
+    if not thumbnail_files and not ignore_missing_thumbs:
+        raise Exception('Missing thumbnail in %s' % folder)
+    start_date_time, center_date_time, end_date_time = get_dates(
+        silent_log_message, fields)
+    return {
+        'metadata': metadata,
+        'geometry': get_geometry(silent_log_message, fields),
+        'start_date_time': start_date_time,
+        'center_date_time': center_date_time,
+        'end_date_time': end_date_time,
+        'projection_code': fields['projection_code'],
+        'orbit_number': fields['orbit_number'],
+        'original_product_id': fields['product_name'],
+        'band_count': fields['number_of_bands'],
+        'spatial_resolution_x': float(fields['resolution_x']),
+        'spatial_resolution_y': float(fields['resolution_y']),
+        'radiometric_resolution': get_radiometric_resolution(fields),
+        'path': fields['path'],
+        'row': fields['row'],
+        'earth_sun_distance': fields['earth_sun_distance'],
+        'solar_azimuth_angle': fields['solar_azimuth_angle'],
+        'solar_zenith_angle': fields['solar_zenith_angle'],
+        'sensor_viewing_angle': fields['sensor_viewing_angle'],
+        'sensor_inclination_angle': fields['sensor_inclination_angle'],
+        # integer percent - must be scaled to 0-100 for all ingestors
+        'cloud_cover': int(fields['cloud_cover']),
+        'type': fields['type'],
+        'sensor': fields['sensor'],
+        'mission': fields['mission'],
+        'dims_product_id': fields['dims_product_id'],
+        'thumbnail_file': thumbnail_files[0] if thumbnail_files else None
+    }
+
+
+def resolve_record(log_message, record):
+    """Get the product field values of a parsed DIMS IIF scene.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :returns: OpticalProduct field values.
+    :rtype: dict
+    """
+    # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
+    spatial_resolution = (
+        record['spatial_resolution_x'] + record['spatial_resolution_y']) / 2
+    log_message('Spatial resolution: %s' % spatial_resolution, 2)
+    log_message('DIMS product ID: %s' % record['dims_product_id'], 2)
+    return {
+        'metadata': record['metadata'],
+        'spatial_coverage': record['geometry'],
+        'radiometric_resolution': record['radiometric_resolution'],
+        'band_count': record['band_count'],
+        'cloud_cover': record['cloud_cover'],
+        'sensor_inclination_angle': record['sensor_inclination_angle'],
+        'sensor_viewing_angle': record['sensor_viewing_angle'],
+        'original_product_id': record['original_product_id'],
+        'unique_product_id': record['dims_product_id'],
+        'solar_zenith_angle': record['solar_zenith_angle'],
+        'solar_azimuth_angle': record['solar_azimuth_angle'],
+        'spatial_resolution_x': record['spatial_resolution_x'],
+        'spatial_resolution_y': record['spatial_resolution_y'],
+        'spatial_resolution': spatial_resolution,
+        'product_profile': get_product_profile(log_message, record),
+        'product_acquisition_start': record['start_date_time'],
+        'product_acquisition_end': record['end_date_time'],
+        'product_date': record['center_date_time'],
+        'earth_sun_distance': record['earth_sun_distance'],
+        'orbit_number': record['orbit_number'],
+        'path': record['path'],
+        'row': record['row'],
+        'projection': get_projection(record),
+        'quality': get_quality()
+    }
+
+
+def store_files(log_message, product, record, created):
+    """Copy the thumbnail of a product and georeference it.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param product: The ingested product.
+    :type product: OpticalProduct
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :param created: Whether the product was created by this run.
+    :type created: bool
+
+    :returns: The path of the stored thumbnail, None when the scene has no
+        thumbnail.
+    :rtype: str
+    """
+    if record['thumbnail_file'] is None:
+        log_message('IGNORING missing thumb: %s' % (
+            record['original_product_id']), 1)
+        return None
+    # Store thumbnail where the product looks for it
+    thumbnail_file = product.thumbnailFile()
+    try:
+        os.makedirs(os.path.dirname(thumbnail_file))
+    except OSError:
+        # TODO: check for creation failure rather than
+        # attempt to  recreate an existing dir
+        pass
+    shutil.copyfile(record['thumbnail_file'], thumbnail_file)
+    # Transform and store .wld file
+    log_message('Referencing thumb', 2)
+    try:
+        path = product.georeferencedThumbnail()
+        log_message('Georeferenced Thumb: %s' % path, 2)
+    except Exception:
+        log_message(traceback.format_exc(), 1)
+    return thumbnail_file
+
+
 def ingest(
         test_only_flag=True,
         source_path=(
@@ -483,7 +542,9 @@ def ingest(
                 'landsat/'),
         verbosity_level=2,
         halt_on_error_flag=True,
-        ignore_missing_thumbs=False):
+        ignore_missing_thumbs=False,
+        workers=None,
+        resume_flag=True):
     """
     Ingest a collection of Landsat metadata folders.
 
@@ -505,6 +566,17 @@ def ingest(
     :param ignore_missing_thumbs: Whether we should raise an error
         if we find we are missing a thumbnails. Default is False.
     :type ignore_missing_thumbs: bool
+
+    :param workers: Number of processes parsing the metadata, defaults to the
+        number of cpus.
+    :type workers: int
+
+    :param resume_flag: Whether to skip the folders ingested by an earlier,
+        interrupted run. Default is True.
+    :type resume_flag: bool
+
+    :returns: The statistics of the run.
+    :rtype: IngestStatistics
     """
 
     def log_message(message, level=1):
@@ -530,290 +602,16 @@ def ingest(
     # The sub-folder names should be e.g.
     # L5-_TM-_HRF_SAM-_0176_00_0078_00_920606_080254_L0Ra_UTM34S
     log_message('Scanning folders in %s' % source_path, 1)
-    # Loop through each folder found
 
     ingestor_version = 'DIMS IIF ingestor version 1'
-    record_count = 0
-    updated_record_count = 0
-    created_record_count = 0
-    failed_record_count = 0
-    log_message('Starting directory scan...', 2)
-
-    for myFolder in glob.glob(os.path.join(source_path, '*')):
-        record_count += 1
-        try:
-            log_message('', 2)
-            log_message('---------------', 2)
-            # Get the folder name
-            product_folder = os.path.split(myFolder)[-1]
-            log_message(product_folder, 2)
-
-            # Find the first and only xml file in the folder
-            search_path = os.path.join(str(myFolder), '*.xml')
-            log_message(search_path, 2)
-            xml_file = glob.glob(search_path)[0]
-            log_message(xml_file)
-
-            # Create a DOM document from the file
-            dom = parse(xml_file)
-            # Skip this record if the quality is not 'APPROVED'
-            if not get_acquisition_quality(log_message, dom):
-                log_message('Skipping %s' % xml_file)
-                continue
-
-            # First grab all the generic properties that any IIF will have...
-            geometry = get_geometry(log_message, dom)
-            start_date_time, center_date_time, end_date_time = get_dates(
-                log_message, dom)
-
-            # Now get all sensor specific metadata
-            specific_parameters = get_specific_parameters_element(dom)
-
-            # projection for GenericProduct
-            # print specific_parameters.toxml()
-            projection = get_projection(specific_parameters)
-            log_message('Projection: %s' % projection)
-
-            # Orbit number for GenericSensorProduct
-            orbit_number = get_feature_value(
-                'orbitNumber', specific_parameters)
-            log_message('Orbit: %s' % orbit_number)
-
-            # Original product id for GenericProduct
-            original_product_id = get_feature_value(
-                'productName', specific_parameters)
-            log_message('Product Number: %s' % original_product_id)
-
-            resolution_element = get_feature(
-                'resolution', specific_parameters)
-
-            # Band count for GenericImageryProduct
-            band_count = get_feature_value('numberOfBands', resolution_element)
-            log_message('Band count: %s' % band_count)
-
-            # Spatial resolution x for GenericImageryProduct
-            spatial_resolution_x = float(
-                get_feature_value('x', resolution_element))
-            log_message('Spatial resolution x: %s' % spatial_resolution_x)
-
-            # Spatial resolution y for GenericImageryProduct
-            spatial_resolution_y = float(
-                get_feature_value('y', resolution_element))
-            log_message('Spatial resolution y: %s' % spatial_resolution_y)
-
-            # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
-            spatial_resolution = (
-                                         spatial_resolution_x + spatial_resolution_y) / 2
-            log_message('Spatial resolution: %s' % spatial_resolution)
-
-            # Radiometric resolution for GenericImageryProduct
-            radiometric_resolution = get_radiometric_resolution(
-                resolution_element)
-            log_message(
-                'Radiometric resolution: %s' % radiometric_resolution)
-
-            # path for GenericSensorProduct
-            path = get_feature_value('path', specific_parameters)
-            log_message('Path: %s' % path)
-
-            # row for GenericSensorProduct
-            row = get_feature_value('row', specific_parameters)
-            log_message('Row: %s' % row)
-
-            # earth_sun_distance for OpticalProduct
-            earth_sun_distance = get_feature_value(
-                'earthSunDistance', specific_parameters)
-            log_message('Earth Sun Distance: %s' % earth_sun_distance)
-
-            # solar azimuth angle for OpticalProduct
-            solar_azimuth_angle = get_feature_value(
-                'solarAzimuthAngle', specific_parameters)
-            log_message('Solar Azimuth Angle: %s' % solar_azimuth_angle)
-
-            # solar zenith angle for OpticalProduct
-            solar_zenith_angle = get_feature_value(
-                'solarZenithAngle', specific_parameters)
-            log_message('Solar Azimuth Angle: %s' % solar_zenith_angle)
-
-            # sensor viewing angle for OpticalProduct
-            sensor_viewing_angle = get_feature_value(
-                'sensorViewingAngle', specific_parameters)
-            log_message('Sensor viewing angle: %s' % sensor_viewing_angle)
-
-            # sensor inclination angle for OpticalProduct
-            sensor_inclination_angle = get_feature_value(
-                'sensorInclinationAngle', specific_parameters)
-            log_message(
-                'Sensor inclination angle: %s' % sensor_inclination_angle)
-
-            # cloud cover as percentage for OpticalProduct
-            # integer percent - must be scaled to 0-100 for all ingestors
-            cloud_cover = int(get_feature_value(
-                'cloudCoverPercentage', specific_parameters))
-            log_message('Cloud cover percentage: %s' % cloud_cover)
-
-            # Get the quality for GenericProduct
-            quality = get_quality()
-
-            # ProductProfile for OpticalProduct
-            product_profile = get_product_profile(
-                log_message, specific_parameters)
-
-            # Get the original text file metadata
-            metadata_file = open(xml_file, 'rt')
-            metadata = metadata_file.readlines()
-            metadata_file.close()
-            log_message('Metadata retrieved')
-
-            keys = get_administration_keys_element(dom)
-            dims_product_id = get_feature_value('productID', keys)
-
-            log_message('DIMS product ID: %s' % dims_product_id)
-            # Check if there is already a matching product based
-            # on original_product_id
-
-            # Do the ingestion here...
-            data = {
-                'metadata': metadata,
-                'spatial_coverage': geometry,
-                'radiometric_resolution': radiometric_resolution,
-                'band_count': band_count,
-                'cloud_cover': cloud_cover,
-                'sensor_inclination_angle': sensor_inclination_angle,
-                'sensor_viewing_angle': sensor_viewing_angle,
-                'original_product_id': original_product_id,
-                'unique_product_id': dims_product_id,
-                'solar_zenith_angle': solar_zenith_angle,
-                'solar_azimuth_angle': solar_azimuth_angle,
-                'spatial_resolution_x': spatial_resolution_x,
-                'spatial_resolution_y': spatial_resolution_y,
-                'spatial_resolution': spatial_resolution,
-                'product_profile': product_profile,
-                'product_acquisition_start': start_date_time,
-                'product_acquisition_end': end_date_time,
-                'product_date': center_date_time,
-                'earth_sun_distance': earth_sun_distance,
-                'orbit_number': orbit_number,
-                'path': path,
-                'row': row,
-                'projection': projection,
-                'quality': quality
-            }
-            # Check if it's already in catalogue:
-            try:
-                today = datetime.today()
-                time_stamp = today.strftime("%Y-%m-%d")
-                log_message('Time Stamp: %s' % time_stamp, 2)
-            except Exception as e:
-                print(e.message)
-
-            update_mode = True
-            try:
-                log_message('Trying to update')
-                # original_product_id is not necessarily unique
-                # so we use product_id
-                product = OpticalProduct.objects.get(
-                    original_product_id=original_product_id
-                ).getConcreteInstance()
-                log_message(('Already in catalogue: updating %s.'
-                             % original_product_id))
-                new_record_flag = False
-                message = product.ingestion_log
-                message += '\n'
-                message += '%s : %s - updating record' % (
-                    time_stamp)
-                data['ingestion_log'] = message
-                product.__dict__.update(data)
-            except ObjectDoesNotExist:
-                log_message('Not in catalogue: creating.')
-                update_mode = False
-                message = '%s : %s - creating record' % (
-                    time_stamp)
-                data['ingestion_log'] = message
-                try:
-                    product = OpticalProduct(**data)
-                    log_message('Product: %s' % product)
-
-                except Exception as e:
-                    log_message(e.message)
-
-                new_record_flag = True
-            except Exception as e:
-                print(e.message)
-
-            log_message('Saving product and setting thumb')
-            try:
-                product.save()
-                if update_mode:
-                    updated_record_count += 1
-                else:
-                    created_record_count += 1
-                if test_only_flag:
-                    log_message('Testing: image not saved.')
-                    pass
-                else:
-                    # Store thumbnail
-                    thumbs_folder = os.path.join(
-                        settings.THUMBS_ROOT,
-                        product.thumbnailDirectory())
-                    try:
-                        os.makedirs(thumbs_folder)
-                    except OSError:
-                        # TODO: check for creation failure rather than
-                        # attempt to  recreate an existing dir
-                        pass
-
-                    jpeg_path = os.path.join(str(myFolder), '*.jpeg')
-                    jpeg_path = glob.glob(jpeg_path)
-                    if len(jpeg_path) > 0:
-                        jpeg_path = jpeg_path[0]
-                        new_name = '%s.jpg' % product.original_product_id
-                        shutil.copyfile(
-                            jpeg_path,
-                            os.path.join(thumbs_folder, new_name))
-                        # Transform and store .wld file
-                        log_message('Referencing thumb')
-                        try:
-                            path = product.georeferencedThumbnail()
-                            log_message('Georeferenced Thumb: %s' % path)
-                        except:
-                            traceback.print_exc(file=sys.stdout)
-                    elif ignore_missing_thumbs:
-                        log_message('IGNORING missing thumb:')
-                    else:
-                        raise Exception('Missing thumbnail in %s' % myFolder)
-                if new_record_flag:
-                    log_message('Product %s imported.' % record_count)
-                    pass
-                else:
-                    log_message('Product %s updated.' % updated_record_count)
-                    pass
-            except Exception as e:
-                traceback.print_exc(file=sys.stdout)
-                raise CommandError('Cannot import: %s' % e)
-
-            if test_only_flag:
-                transaction.rollback()
-                log_message('Imported scene : %s' % product_folder)
-                log_message('Testing only: transaction rollback.')
-            else:
-                transaction.commit()
-                log_message('Imported scene : %s' % product_folder)
-        except Exception as e:
-            log_message('Record import failed. AAAAAAARGH! : %s' %
-                        product_folder)
-            failed_record_count += 1
-            if halt_on_error_flag:
-                print(e.message)
-                break
-            else:
-                continue
-
-    # To decide: should we remove ingested product folders?
-
-    print('===============================')
-    print('Products processed : %s ' % record_count)
-    print('Products updated : %s ' % updated_record_count)
-    print('Products imported : %s ' % created_record_count)
-    print('Products failed to import : %s ' % failed_record_count)
-    print('===============================')
+    return ingest_sources(
+        glob.glob(os.path.join(source_path, '*')),
+        partial(parse_source, ignore_missing_thumbs=ignore_missing_thumbs),
+        resolve_record,
+        ingestor_version,
+        log_message,
+        test_only_flag=test_only_flag,
+        halt_on_error_flag=halt_on_error_flag,
+        store_files=store_files,
+        checkpoint_path=get_checkpoint_path(source_path, resume_flag),
+        workers=workers)
@@ -0,0 +1,438 @@
+# coding=utf-8
+"""Parallel, resumable bulk ingest engine shared by the metadata ingestors.
+
+An ingestor provides two functions:
+
+* ``parse_source(source)`` reads one metadata folder or file and returns a
+  dict of plain (picklable) values, or None for a source which is not
+  ingested. It must not touch the database since it runs in a worker
+  process.
+* ``resolve_record(log_message, record)`` turns a parsed record into the
+  OpticalProduct field values, resolving the dictionary rows it references.
+
+The engine parses the sources in a process pool, looks up the existing
+products of a chunk with a single query and writes the chunk in one
+transaction. Source names of committed chunks are appended to a checkpoint
+file so a killed run skips them when it is restarted.
+"""
+
+__author__ = 'tim@linfiniti.com'
+__date__ = '18/10/2026'
+
+import os
+import time
+import traceback
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.db import router, transaction
+
+from catalogue.ingestors.resolver import dictionary_resolver
+from catalogue.models import OpticalProduct
+from catalogue.models.signals import (
+    setGenericProductDate,
+    products_bulk_saved
+)
+from catalogue.sensorcounts import (
+    sensor_year_key,
+    update_sensor_year_counts
+)
+from catalogue.thumbnails import pregenerate_thumbnails
+
+# number of records written per transaction
+INGEST_CHUNK_SIZE = 500
+# number of sources handed to a parser process at once
+PARSE_CHUNK_SIZE = 16
+# name of the checkpoint file kept in the source folder
+CHECKPOINT_FILE_NAME = '.ingest_checkpoint'
+
+
+def get_checkpoint_path(source_path, resume_flag=True):
+    """Return the checkpoint file of a source folder.
+
+    :param resume_flag: Whether to keep the checkpoint of earlier runs, when
+        False it is removed and all sources are ingested again.
+    :type resume_flag: bool
+    """
+    path = os.path.join(source_path, CHECKPOINT_FILE_NAME)
+    if not resume_flag and os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def silent_log_message(message, level=1):
+    """Log function for the parser processes, which have no console."""
+    pass
+
+
+class IngestCheckpoint(object):
+    """Names of the sources committed by earlier runs of an ingestor.
+
+    The names are appended to a text file, one per line, after each
+    committed chunk. Removing the file forces a full ingest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.names = set()
+        if path and os.path.exists(path):
+            with open(path, 'rt') as checkpoint_file:
+                self.names = set(checkpoint_file.read().splitlines())
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, names):
+        """Record committed source names."""
+        if not self.path or not names:
+            return
+        with open(self.path, 'at') as checkpoint_file:
+            checkpoint_file.write(''.join('%s\n' % name for name in names))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        self.names.update(names)
+
+
+class IngestStatistics(object):
+    """Record counts and throughput per ingest stage."""
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.counts = OrderedDict([
+            ('processed', 0),
+            ('skipped', 0),
+            ('updated', 0),
+            ('imported', 0),
+            ('failed', 0)])
+
+    def add_time(self, stage, seconds, count):
+        """Add the time spent on count records in a stage."""
+        total_seconds, total_count = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (total_seconds + seconds, total_count + count)
+
+    def report(self, log_message):
+        """Print the record counts and the throughput of each stage."""
+        log_message('===============================', 0)
+        for name, count in self.counts.items():
+            log_message('Products %s : %s ' % (name, count), 0)
+        for stage, (seconds, count) in self.stages.items():
+            log_message('%s : %s records in %.1fs (%.1f records/s)' % (
+                stage.capitalize(), count, seconds,
+                count / seconds if seconds else 0), 0)
+        log_message('===============================', 0)
+
+
+def _parse_source_safe(parse_source, source):
+    """Parse a source in a worker process, returning errors as text."""
+    started = time.time()
+    try:
+        record = parse_source(source)
+        error = None
+    except Exception:
+        record = None
+        error = traceback.format_exc()
+    return source, record, error, time.time() - started
+
+
+def _parse_batch(parse_source, sources):
+    """Parse a batch of sources in a worker process."""
+    return [_parse_source_safe(parse_source, source) for source in sources]
+
+
+def _parse_sources(parse_source, sources, workers):
+    """Yield (source, record, error, seconds) tuples in source order.
+
+    Only a few batches per worker are queued at a time so parsed records do
+    not pile up in memory when writing is slower than parsing.
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = (
+        sources[start:start + PARSE_CHUNK_SIZE]
+        for start in range(0, len(sources), PARSE_CHUNK_SIZE))
+    if workers == 1:
+        for batch in batches:
+            for result in _parse_batch(parse_source, batch):
+                yield result
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for batch in batches:
+                pending.append(
+                    executor.submit(_parse_batch, parse_source, batch))
+                if len(pending) < 4 * workers:
+                    continue
+                for result in pending.popleft().result():
+                    yield result
+            while pending:
+                for result in pending.popleft().result():
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def bulk_create_products(products):
+    """Insert new optical products with one statement per table.
+
+    Django can not bulk create multi table inherited models, so the rows of
+    each table of the inheritance chain are inserted in turn from
+    GenericProduct down, as Model.save does for a single product. No
+    pre_save or post_save signals are sent.
+
+    :param products: Unsaved OpticalProduct instances.
+    :type products: list
+    """
+    if not products:
+        return
+    using = router.db_for_write(OpticalProduct)
+    models = [OpticalProduct] + OpticalProduct._meta.get_parent_list()
+    root = models.pop()
+    ids = root._base_manager._insert(
+        products,
+        fields=[
+            field for field in root._meta.local_concrete_fields
+            if field is not root._meta.auto_field],
+        return_id=True,
+        using=using)
+    if not isinstance(ids, list):
+        ids = [ids]
+    for product, product_id in zip(products, ids):
+        setattr(product, root._meta.pk.attname, product_id)
+        for model in models:
+            for link in model._meta.parents.values():
+                setattr(product, link.attname, product_id)
+    for model in reversed(models):
+        model._base_manager._insert(
+            products, fields=model._meta.local_concrete_fields, using=using)
+    for product in products:
+        product._state.adding = False
+        product._state.db = using
+
+
+def write_chunk(
+        chunk, ingestor_version, test_only_flag, log_message, statistics):
+    """Create or update the products of a chunk of resolved records.
+
+    New products are bulk created and existing products bulk updated, a
+    single products_bulk_saved signal is sent for all of them once the
+    chunk is committed.
+
+    :param chunk: A list of (source, record, data) tuples. When several
+        tuples have the same original_product_id the last one is written.
+
+    :returns: A list of (source, record, product, created) tuples of the
+        written products.
+    """
+    started = time.time()
+    time_stamp = datetime.today().strftime('%Y-%m-%d')
+    records = OrderedDict()
+    for source, record, data in chunk:
+        original_product_id = data['original_product_id']
+        if original_product_id in records:
+            log_message('Duplicate product %s: skipping %s.' % (
+                original_product_id, records[original_product_id][0]), 1)
+            statistics.counts['skipped'] += 1
+        records[original_product_id] = (source, record, data)
+    existing_products = OpticalProduct.objects.in_bulk(
+        list(records), field_name='original_product_id')
+    written = []
+    new_products = []
+    updated_products = []
+    update_fields = set(['ingestion_log', 'product_date'])
+    # sensor year count changes, no signal is sent by bulk_create and
+    # bulk_update
+    count_deltas = Counter()
+    for source, record, data in records.values():
+        product = existing_products.get(data['original_product_id'])
+        if product is None:
+            data['ingestion_log'] = '%s : %s - creating record' % (
+                time_stamp, ingestor_version)
+            product = OpticalProduct(**data)
+            new_products.append(product)
+            log_message('Not in catalogue: creating %s.' % (
+                data['original_product_id']), 2)
+            created = True
+        else:
+            data['ingestion_log'] = '%s\n%s : %s - updating record' % (
+                product.ingestion_log, time_stamp, ingestor_version)
+            count_deltas[sensor_year_key(
+                product.product_profile_id, product.product_date)] -= 1
+            for field, value in data.items():
+                setattr(product, field, value)
+            update_fields.update(data)
+            updated_products.append(product)
+            log_message('Already in catalogue: updating %s.' % (
+                data['original_product_id']), 2)
+            created = False
+        # pre_save is not sent by bulk_create and bulk_update
+        setGenericProductDate(OpticalProduct, product)
+        count_deltas[sensor_year_key(
+            product.product_profile_id, product.product_date)] += 1
+        written.append((source, record, product, created))
+
+    with transaction.atomic():
+        bulk_create_products(new_products)
+        OpticalProduct.objects.bulk_update(
+            updated_products, sorted(update_fields))
+        update_sensor_year_counts(count_deltas)
+        if test_only_flag:
+            transaction.set_rollback(True)
+            log_message('Testing only: transaction rollback.', 1)
+
+    if written and not test_only_flag:
+        products_bulk_saved.send(
+            sender=OpticalProduct,
+            product_ids=[product.pk for _, _, product, _ in written])
+    statistics.counts['imported'] += len(new_products)
+    statistics.counts['updated'] += len(updated_products)
+    statistics.add_time('write', time.time() - started, len(written))
+    return written
+
+
+def ingest_sources(
+        sources,
+        parse_source,
+        resolve_record,
+        ingestor_version,
+        log_message,
+        test_only_flag=True,
+        halt_on_error_flag=True,
+        store_files=None,
+        checkpoint_path=None,
+        workers=None,
+        chunk_size=INGEST_CHUNK_SIZE):
+    """Ingest metadata sources in parallel, chunked transactions.
+
+    :param sources: Paths of the metadata folders or files to ingest.
+    :type sources: list
+
+    :param parse_source: Module level function (or a partial of one)
+        returning a dict of plain values for a source, None skips the
+        source. It runs in a worker process.
+    :type parse_source: function
+
+    :param resolve_record: Function returning the OpticalProduct field values
+        for a parsed record, called as resolve_record(log_message, record).
+    :type resolve_record: function
+
+    :param ingestor_version: Name and version written to the ingestion log.
+    :type ingestor_version: str
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param test_only_flag: Whether to roll back the database changes and skip
+        storing files.
+    :type test_only_flag: bool
+
+    :param halt_on_error_flag: Whether to stop at the first failed record.
+    :type halt_on_error_flag: bool
+
+    :param store_files: Optional function called as store_files(log_message,
+        product, record, created) after a chunk was committed. It can return
+        the path of a stored thumbnail to render its derivatives.
+    :type store_files: function
+
+    :param checkpoint_path: File with the names of already ingested sources,
+        None disables resuming.
+    :type checkpoint_path: str
+
+    :param workers: Number of parser processes, defaults to the cpu count.
+    :type workers: int
+
+    :param chunk_size: Number of records written per transaction.
+    :type chunk_size: int
+
+    :returns: The statistics of the run.
+    :rtype: IngestStatistics
+    """
+    # dictionary rows are resolved from memory for the whole run
+    dictionary_resolver.preload()
+    statistics = IngestStatistics()
+    checkpoint = IngestCheckpoint(None if test_only_flag else checkpoint_path)
+    pending_sources = []
+    for source in sorted(sources):
+        if os.path.basename(source) in checkpoint:
+            statistics.counts['skipped'] += 1
+        else:
+            pending_sources.append(source)
+    log_message('%s sources to ingest, %s ingested by earlier runs.' % (
+        len(pending_sources), statistics.counts['skipped']), 1)
+
+    thumbnail_files = []
+
+    def flush(chunk):
+        """Write a chunk and store the files of its products."""
+        if not chunk:
+            return True
+        try:
+            written = write_chunk(
+                chunk, ingestor_version, test_only_flag, log_message,
+                statistics)
+        except Exception:
+            log_message(traceback.format_exc(), 1)
+            log_message('Chunk import failed: %s records' % len(chunk), 1)
+            statistics.counts['failed'] += len(chunk)
+            return not halt_on_error_flag
+        if test_only_flag:
+            log_message('Testing: images not saved.', 1)
+            return True
+        if store_files is not None:
+            started = time.time()
+            for source, record, product, created in written:
+                try:
+                    thumbnail_file = store_files(
+                        log_message, product, record, created)
+                except Exception:
+                    log_message(traceback.format_exc(), 1)
+                    continue
+                if thumbnail_file:
+                    thumbnail_files.append(thumbnail_file)
+            statistics.add_time('files', time.time() - started, len(written))
+        checkpoint.add([os.path.basename(item[0]) for item in chunk])
+        log_message('Committed %s records.' % len(written), 1)
+        return True
+
+    chunk = []
+    for source, record, error, seconds in _parse_sources(
+            parse_source, pending_sources, workers):
+        statistics.counts['processed'] += 1
+        statistics.add_time('parse', seconds, 1)
+        if error is None and record is None:
+            log_message('Skipped : %s' % os.path.basename(source), 2)
+            statistics.counts['skipped'] += 1
+            continue
+        if error is None:
+            started = time.time()
+            try:
+                data = resolve_record(log_message, record)
+            except Exception:
+                error = traceback.format_exc()
+            statistics.add_time('resolve', time.time() - started, 1)
+        if error is not None:
+            log_message('Record import failed: %s' % source, 1)
+            log_message(error, 2)
+            statistics.counts['failed'] += 1
+            if halt_on_error_flag:
+                break
+            continue
+        log_message('Parsed scene : %s' % os.path.basename(source), 2)
+        chunk.append((source, record, data))
+        if len(chunk) >= chunk_size:
+            completed = flush(chunk)
+            chunk = []
+            if not completed:
+                break
+    flush(chunk)
+
+    if thumbnail_files:
+        log_message('Rendering thumbnails...', 2)
+        pregenerate_thumbnails(thumbnail_files)
+
+    statistics.report(log_message)
+    return statistics
@@ -5,20 +5,12 @@ __author__ = 'rischan - <--rischan@kartoza.com-->'
 __date__ = '3/3/16'
 
 import os
-import sys
 import glob
-from cmath import log
 from datetime import datetime
-from xml.dom.minidom import parse
-import traceback
-import shutil
 
-from django.db import transaction
 from django.contrib.gis.geos import WKTReader
-from django.core.management.base import CommandError
-from django.core.exceptions import ObjectDoesNotExist
-from django.conf import settings
 
+from catalogue.ingestors.resolver import dictionary_resolver
 from dictionaries.models import (
     SpectralMode,
     SatelliteInstrument,
@@ -29,7 +21,32 @@ from dictionaries.models import (
     SatelliteInstrumentGroup,
     Quality
 )
-from catalogue.models import OpticalProduct
+from catalogue.ingestors.engine import (
+    ingest_sources,
+    get_checkpoint_path,
+    silent_log_message
+)
+from catalogue.ingestors.metadata import MetadataField, read_metadata
+
+# metadata elements read from a Landsat scene xml file
+LANDSAT_FIELDS = {
+    'ul_lat': MetadataField('SCENEDATAEXTENT/UL_LAT'),
+    'ul_long': MetadataField('SCENEDATAEXTENT/UL_LONG'),
+    'ur_lat': MetadataField('SCENEDATAEXTENT/UR_LAT'),
+    'ur_long': MetadataField('SCENEDATAEXTENT/UR_LONG'),
+    'lr_lat': MetadataField('SCENEDATAEXTENT/LR_LAT'),
+    'lr_long': MetadataField('SCENEDATAEXTENT/LR_LONG'),
+    'll_lat': MetadataField('SCENEDATAEXTENT/LL_LAT'),
+    'll_long': MetadataField('SCENEDATAEXTENT/LL_LONG'),
+    'date': MetadataField('CITATION/DATE'),
+    'alternate_title': MetadataField('ALTERNATETITLE'),
+    'instrument_name': MetadataField('INSTRUMENTNAME'),
+    'platform_name': MetadataField('PLATFORMNAME'),
+    'cloud_cover': MetadataField('CLOUDCOVERPERCENTAGE'),
+    'solar_zenith_angle': MetadataField('ILLUMINATIONELEVATIONANGLE'),
+    'solar_azimuth_angle': MetadataField('ILLUMINATIONELEVATIONAZIMUTH'),
+    'zone': MetadataField('ZONE')
+}
 
 
 def parse_date_time(date_stamp):
@@ -65,74 +82,42 @@ def parse_date_time(date_stamp):
     return parsed_date_time
 
 
-def get_geometry(dom):
+def get_geometry(fields):
     """Extract the bounding box as a geometry from the xml file.
-    :param dom: DOM Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with LANDSAT_FIELDS.
+    :type fields: dict
 
     :return: geoemtry
     """
-    geo_area = dom.getElementsByTagName('SCENEDATAEXTENT')[0]
-
-    ul_lat_value = geo_area.getElementsByTagName('UL_LAT')[0]
-    ul_lat = ul_lat_value.firstChild.nodeValue
-
-    ul_long_value = geo_area.getElementsByTagName('UL_LONG')[0]
-    ul_long = ul_long_value.firstChild.nodeValue
-
-    ur_lat_value = geo_area.getElementsByTagName('UR_LAT')[0]
-    ur_lat = ur_lat_value.firstChild.nodeValue
-
-    ur_long_value = geo_area.getElementsByTagName('UR_LONG')[0]
-    ur_long = ur_long_value.firstChild.nodeValue
-
-    lr_lat_value = geo_area.getElementsByTagName('LR_LAT')[0]
-    lr_lat = lr_lat_value.firstChild.nodeValue
-
-    lr_long_value = geo_area.getElementsByTagName('LR_LONG')[0]
-    lr_long = lr_long_value.firstChild.nodeValue
-
-    ll_lat_value = geo_area.getElementsByTagName('LL_LAT')[0]
-    ll_lat = ll_lat_value.firstChild.nodeValue
-
-    ll_long_value = geo_area.getElementsByTagName('LL_LONG')[0]
-    ll_long = ll_long_value.firstChild.nodeValue
-
     polygon = 'POLYGON ((' ' %s %s, %s %s, %s %s, %s %s, %s %s' '))' % (
-        ul_long, ul_lat,
-        ur_long, ur_lat,
-        lr_long, lr_lat,
-        ll_long, ll_lat,
-        ul_long, ul_lat,
+        fields['ul_long'], fields['ul_lat'],
+        fields['ur_long'], fields['ur_lat'],
+        fields['lr_long'], fields['lr_lat'],
+        fields['ll_long'], fields['ll_lat'],
+        fields['ul_long'], fields['ul_lat'],
     )
 
     polygon_geometry = WKTReader().read(polygon)
     return polygon_geometry
 
 
-def get_dates(log_message, dom):
+def get_dates(log_message, fields):
     """Get the start, mid scene and end dates.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with LANDSAT_FIELDS.
+    :type fields: dict
 
     :return: A two-tuple of dates for the start, and mid scene
         respectively.
     :rtype: (datetime, datetime)
     """
-    start_date = dom.getElementsByTagName('CITATION')[0]
-    start_element = start_date.getElementsByTagName('DATE')[0]
-    start_date = start_element.firstChild.nodeValue
-    start_date = parse_date_time(start_date)
+    start_date = parse_date_time(fields['date'])
     log_message('Product Start Date: %s' % start_date, 2)
 
-    production_date = dom.getElementsByTagName('CITATION')[0]
-    product_date = production_date.getElementsByTagName('DATE')[0]
-    center_date = product_date.firstChild.nodeValue
-    center_date = parse_date_time(center_date)
+    center_date = parse_date_time(fields['date'])
     log_message('Product Date: %s' % center_date, 2)
 
     return start_date, center_date
@@ -144,11 +129,10 @@ def get_band_count():
     return 10
 
 
-def get_original_product_id(dom, filename):
+def get_original_product_id(fields, filename):
     constant = 'JSA00'
-    # Get part of product name from dom
-    dataset_name = dom.getElementsByTagName('ALTERNATETITLE')[0]
-    product_name_full = dataset_name.firstChild.nodeValue
+    # Get part of product name from the metadata
+    product_name_full = fields['alternate_title']
     tokens = product_name_full.split(' ')
     product_name_dom = tokens[2]
 
@@ -181,7 +165,17 @@ def get_spatial_resolution_y(filename):
         return 30
 
 
-def get_product_profile(log_message, dom):
+def get_instrument_name(fields):
+    """Get the instrument name of the scene e.g. OLI_TIRS."""
+    return fields['instrument_name']
+
+
+def get_mission(fields):
+    """Get the platform name of the scene e.g. Landsat-8."""
+    return fields['platform_name']
+
+
+def get_product_profile(log_message, sensor_value, mission_index_value):
     """Find the product_profile for this record.
 
     It can be that one or more spectral modes are associated with a product.
@@ -203,21 +197,18 @@ def get_product_profile(log_message, dom):
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param sensor_value: Instrument name of the scene e.g. OLI_TIRS.
+    :type sensor_value: str
+
+    :param mission_index_value: Platform name of the scene e.g. Landsat-8.
+    :type mission_index_value: str
 
     :return: A product profile for the given product.
     :rtype: OpticalProductProfile
     """
-    # We need type, sensor and mission so that we can look up the
-    # OpticalProductProfile that applies to this product
-    sensor_value_landsat = dom.getElementsByTagName('INSTRUMENTNAME')[0]
-    sensor_value = sensor_value_landsat.firstChild.nodeValue
-    mission_index = dom.getElementsByTagName('PLATFORMNAME')[0]
-    mission_index_value = mission_index.firstChild.nodeValue
-
     try:
-        instrument_type = InstrumentType.objects.get(
+        instrument_type = dictionary_resolver.get(
+            InstrumentType,
             operator_abbreviation=sensor_value)  # e.g. OLI_TIRS
     except Exception as e:
         # print e.message
@@ -230,13 +221,14 @@ def get_product_profile(log_message, dom):
         mission_value = 'L8'
     else:
         raise Exception('Unknown mission in Landsat')
-    satellite = Satellite.objects.get(abbreviation=mission_value)
+    satellite = dictionary_resolver.get(Satellite, abbreviation=mission_value)
 
     try:
-        satellite_instrument_group = SatelliteInstrumentGroup.objects.get(
+        satellite_instrument_group = dictionary_resolver.get(
+            SatelliteInstrumentGroup,
             satellite=satellite, instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument Group %s' %
                 satellite_instrument_group, 2)
@@ -247,27 +239,30 @@ def get_product_profile(log_message, dom):
     # For the mean time, we can assume that Landsat will return only one.
 
     try:
-        satellite_instrument = SatelliteInstrument.objects.get(
+        satellite_instrument = dictionary_resolver.get(
+            SatelliteInstrument,
             satellite_instrument_group=satellite_instrument_group)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument %s' % satellite_instrument, 2)
 
     try:
-        spectral_modes = SpectralMode.objects.filter(
+        spectral_modes = dictionary_resolver.filter(
+            SpectralMode,
             instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise
     log_message('Spectral Modes %s' % spectral_modes, 2)
 
     try:
-        product_profile = OpticalProductProfile.objects.get(
+        product_profile = dictionary_resolver.get(
+            OpticalProductProfile,
             satellite_instrument=satellite_instrument,
             spectral_mode__in=spectral_modes)
     except Exception as e:
-        print(e.message)
+        print(e)
         print('Searched for satellite instrument: %s and spectral modes %s' % (
             satellite_instrument, spectral_modes
         ))
@@ -277,36 +272,37 @@ def get_product_profile(log_message, dom):
     return product_profile
 
 
-def get_radiometric_resolution(dom):
+def get_radiometric_resolution(fields):
     """Get the radiometric resolution for the supplied product record."""
 
-    mission_index = dom.getElementsByTagName('PLATFORMNAME')[0]
-    mission_index_value = mission_index.firstChild.nodeValue
+    mission_index_value = fields['platform_name']
     if mission_index_value == 'Landsat-7':
         return 8
     elif mission_index_value == 'Landsat-8':
         return 16
 
 
-def get_cloud_cover(dom):
+def get_cloud_cover(fields):
     """Get the scene's cloud cover"""
-    return dom.getElementsByTagName(
-        'CLOUDCOVERPERCENTAGE')[0].firstChild.nodeValue
+    return fields['cloud_cover']
 
 
-def get_solar_zenith_angle(dom):
+def get_solar_zenith_angle(fields):
     """Get the solar zenith angle"""
-    return dom.getElementsByTagName(
-        'ILLUMINATIONELEVATIONANGLE')[0].firstChild.nodeValue
+    return fields['solar_zenith_angle']
 
 
-def get_solar_azimuth_angle(dom):
+def get_solar_azimuth_angle(fields):
     """Get the solar azimuth angle"""
-    return dom.getElementsByTagName(
-        'ILLUMINATIONELEVATIONAZIMUTH')[0].firstChild.nodeValue
+    return fields['solar_azimuth_angle']
 
 
-def get_projection(dom):
+def get_zone(fields):
+    """Get the UTM zone of the scene."""
+    return fields['zone']
+
+
+def get_projection(zone):
     """Get the projection for this product record.
 
     The project is always expressed as an EPSG code and we fetch the related
@@ -315,19 +311,17 @@ def get_projection(dom):
     In Landsat we only get 'UTM' for the CRS which is basically unusable for
     us (since we need the zone too) so we will always fail and return EPSG:4326
 
-    :param specific_parameters: Dom Document containing the bounds of the scene.
-    :type specific_parameters: DOM document.
+    :param zone: UTM zone of the scene.
+    :type zone: str
 
     :returns: A projection model for the specified EPSG.
     :rtype: Projection
     """
     epsg_default_code = '32'
-    zone_value = dom.getElementsByTagName('ZONE')[0]
-    zone = zone_value.firstChild.nodeValue
     location_code = '7'  # 6 for north and 7 for south
     epsg_code = epsg_default_code + location_code + zone
 
-    projection = Projection.objects.get(epsg_code=epsg_code)
+    projection = dictionary_resolver.get(Projection, epsg_code=epsg_code)
     return projection
 
 
@@ -337,10 +331,84 @@ def get_quality():
     :returns: A quality object fixed to 'unknown'.
     :rtype: Quality
     """
-    quality = Quality.objects.get(name='Unknown')
+    quality = dictionary_resolver.get(Quality, name='Unknown')
     return quality
 
 
+def parse_source(folder):
+    """Read the metadata of a Landsat scene folder.
+
+    Runs in an ingest engine worker process, so no database access here.
+
+    :param folder: A Landsat scene folder with one xml file.
+    :type folder: str
+
+    :returns: The plain values needed to create the product.
+    :rtype: dict
+    """
+    # Find the first and only xml file in the folder
+    xml_file = glob.glob(os.path.join(str(folder), '*.xml'))[0]
+    filename = os.path.splitext(os.path.basename(xml_file))[0]
+    # Read the original text and the fields in one pass over the file
+    metadata, fields = read_metadata(xml_file, LANDSAT_FIELDS)
+    start_date_time, center_date_time = get_dates(silent_log_message, fields)
+    return {
+        'metadata': metadata,
+        'geometry': get_geometry(fields),
+        'start_date_time': start_date_time,
+        'center_date_time': center_date_time,
+        'zone': get_zone(fields),
+        'original_product_id': get_original_product_id(fields, filename),
+        'spatial_resolution_x': float(get_spatial_resolution_x(filename)),
+        'spatial_resolution_y': float(get_spatial_resolution_y(filename)),
+        'radiometric_resolution': get_radiometric_resolution(fields),
+        'cloud_cover': get_cloud_cover(fields),
+        'solar_zenith_angle': get_solar_zenith_angle(fields),
+        'solar_azimuth_angle': get_solar_azimuth_angle(fields),
+        'sensor': get_instrument_name(fields),
+        'mission': get_mission(fields)
+    }
+
+
+def resolve_record(log_message, record):
+    """Get the product field values of a parsed Landsat scene.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :returns: OpticalProduct field values.
+    :rtype: dict
+    """
+    # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
+    spatial_resolution = (
+        record['spatial_resolution_x'] + record['spatial_resolution_y']) / 2
+    log_message('Spatial resolution: %s' % spatial_resolution, 2)
+    return {
+        'metadata': record['metadata'],
+        'spatial_coverage': record['geometry'],
+        'radiometric_resolution': record['radiometric_resolution'],
+        'band_count': get_band_count(),
+        'original_product_id': record['original_product_id'],
+        'unique_product_id': record['original_product_id'],
+        'spatial_resolution_x': record['spatial_resolution_x'],
+        'spatial_resolution_y': record['spatial_resolution_y'],
+        'spatial_resolution': spatial_resolution,
+        'product_profile': get_product_profile(
+            log_message, record['sensor'], record['mission']),
+        'product_acquisition_start': record['start_date_time'],
+        'product_date': record['center_date_time'],
+        # 'orbit_number': orbit_number,  # Not in current metadata
+        'cloud_cover': record['cloud_cover'],
+        'projection': get_projection(record['zone']),
+        'quality': get_quality(),
+        'solar_zenith_angle': record['solar_zenith_angle'],
+        'solar_azimuth_angle': record['solar_azimuth_angle']
+    }
+
+
 def ingest(
         test_only_flag=True,
         source_path=(
@@ -348,7 +416,9 @@ def ingest(
             'landsat/'),
         verbosity_level=2,
         halt_on_error_flag=True,
-        ignore_missing_thumbs=False):
+        ignore_missing_thumbs=False,
+        workers=None,
+        resume_flag=True):
     """
     Ingest a collection of Landsat metadata folders.
 
@@ -370,6 +440,14 @@ def ingest(
     :param ignore_missing_thumbs: Whether we should raise an error
         if we find we are missing a thumbnails. Default is False.
     :type ignore_missing_thumbs: bool
+
+    :param workers: Number of processes parsing the metadata, defaults to the
+        number of cpus.
+    :type workers: int
+
+    :param resume_flag: Whether to skip the folders ingested by an earlier,
+        interrupted run. Default is True.
+    :type resume_flag: bool
     """
     def log_message(log_message_content, level=1):
         """Log a message for a given level.
@@ -394,180 +472,15 @@ def ingest(
     # The sub-folder names should be e.g.
     # L5-_TM-_HRF_SAM-_0176_00_0078_00_920606_080254_L0Ra_UTM34S
     log_message('Scanning folders in %s' % source_path, 1)
-    # Loop through each folder found
 
     ingestor_version = 'Landsat7/8 ingestor version 1.1'
-    record_count = 0
-    updated_record_count = 0
-    created_record_count = 0
-    failed_record_count = 0
-    log_message('Starting directory scan...', 2)
-
-    for myFolder in glob.glob(os.path.join(source_path, '*')):
-        record_count += 1
-        try:
-            log_message('', 2)
-            log_message('---------------', 2)
-            # Get the folder name
-            product_folder = os.path.split(myFolder)[-1]
-            log_message(product_folder, 2)
-
-            # Find the first and only xml file in the folder
-            search_path = os.path.join(str(myFolder), '*.xml')
-            log_message(search_path, 2)
-            xml_file = glob.glob(search_path)[0]
-            log_message(xml_file, 2)
-            file_path = os.path.basename(xml_file)
-            filename = os.path.splitext(file_path)[0]
-
-            # Create a DOM document from the file
-            dom = parse(xml_file)
-            #
-            # First grab all the generic properties that any
-            # Landsat will have...
-            geometry = get_geometry(dom)
-            start_date_time, center_date_time = get_dates(
-                log_message, dom)
-            # projection for GenericProduct
-            projection = get_projection(dom)
-            original_product_id = get_original_product_id(dom, filename)
-            # Band count for GenericImageryProduct
-            band_count = get_band_count()
-            # orbit_number = get_orbit_number(dom) -- NOT SPECIFIED IN METADATA
-            # # Spatial resolution x for GenericImageryProduct
-            spatial_resolution_x = float(get_spatial_resolution_x(filename))
-            # # Spatial resolution y for GenericImageryProduct
-            spatial_resolution_y = float(
-                get_spatial_resolution_y(filename))
-            log_message('Spatial resolution y: %s' % spatial_resolution_y, 2)
-            # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
-            spatial_resolution = (
-                spatial_resolution_x + spatial_resolution_y) / 2
-            log_message('Spatial resolution: %s' % spatial_resolution, 2)
-            radiometric_resolution = get_radiometric_resolution(dom)
-            log_message(
-                'Radiometric resolution: %s' % radiometric_resolution, 2)
-            quality = get_quality()
-            # ProductProfile for OpticalProduct
-            product_profile = get_product_profile(log_message, dom)
-            # Get the original text file metadata
-            metadata_file = open(xml_file, 'rt')
-            metadata = metadata_file.readlines()
-            metadata_file.close()
-            log_message('Metadata retrieved', 2)
-
-            unique_product_id = original_product_id
-            # Check if there is already a matching product based
-            # on original_product_id
-
-            # Other data
-            cloud_cover = get_cloud_cover(dom)
-            solar_zenith_angle = get_solar_zenith_angle(dom)
-            solar_azimuth_angle = get_solar_azimuth_angle(dom)
-
-            # Do the ingestion here...
-            data = {
-                'metadata': metadata,
-                'spatial_coverage': geometry,
-                'radiometric_resolution': radiometric_resolution,
-                'band_count': band_count,
-                'original_product_id': original_product_id,
-                'unique_product_id': unique_product_id,
-                'spatial_resolution_x': spatial_resolution_x,
-                'spatial_resolution_y': spatial_resolution_y,
-                'spatial_resolution': spatial_resolution,
-                'product_profile': product_profile,
-                'product_acquisition_start': start_date_time,
-                'product_date': center_date_time,
-                # 'orbit_number': orbit_number,  # Not in current metadata
-                'cloud_cover': cloud_cover,
-                'projection': projection,
-                'quality': quality,
-                'solar_zenith_angle': solar_zenith_angle,
-                'solar_azimuth_angle': solar_azimuth_angle
-            }
-            log_message(data, 3)
-            # Check if it's already in catalogue:
-            try:
-                today = datetime.today()
-                time_stamp = today.strftime("%Y-%m-%d")
-                log_message('Time Stamp: %s' % time_stamp, 2)
-            except Exception as e:
-                print(e.message)
-
-            update_mode = True
-            try:
-                log_message('Trying to update')
-                # original_product_id is not necessarily unique
-                # so we use product_id
-                product = OpticalProduct.objects.get(
-                    original_product_id=original_product_id
-                ).getConcreteInstance()
-                log_message(('Already in catalogue: updating %s.'
-                            % original_product_id), 2)
-                new_record_flag = False
-                message = product.ingestion_log
-                message += '\n'
-                message += '%s : %s - updating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                product.__dict__.update(data)
-            except ObjectDoesNotExist:
-                log_message('Not in catalogue: creating.', 2)
-                update_mode = False
-                message = '%s : %s - creating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                try:
-                    product = OpticalProduct(**data)
-                    log_message('Product: %s' % product)
-
-                except Exception as e:
-                    log_message(e.message, 2)
-
-                new_record_flag = True
-            except Exception as e:
-                print(e.message)
-
-            log_message('Saving product and setting thumb', 2)
-            try:
-                product.save()
-                if update_mode:
-                    updated_record_count += 1
-                else:
-                    created_record_count += 1
-                if new_record_flag:
-                    log_message('Product %s imported.' % record_count, 2)
-                    pass
-                else:
-                    log_message('Product %s updated.' % updated_record_count, 2)
-                    pass
-            except Exception as e:
-                traceback.print_exc(file=sys.stdout)
-                raise CommandError('Cannot import: %s' % e)
-
-            if test_only_flag:
-                transaction.rollback()
-                log_message('Imported scene : %s' % product_folder, 1)
-                log_message('Testing only: transaction rollback.', 1)
-            else:
-                transaction.commit()
-                log_message('Imported scene : %s' % product_folder, 1)
-        except Exception as e:
-            log_message('Record import failed. AAAAAAARGH! : %s' %
-                        product_folder, 1)
-            failed_record_count += 1
-            if halt_on_error_flag:
-                print(e.message)
-                break
-            else:
-                continue
-
-    # To decide: should we remove ingested product folders?
-
-    print('===============================')
-    print('Products processed : %s ' % record_count)
-    print('Products updated : %s ' % updated_record_count)
-    print('Products imported : %s ' % created_record_count)
-    print('Products failed to import : %s ' % failed_record_count)
-    print('===============================')
+    return ingest_sources(
+        glob.glob(os.path.join(source_path, '*')),
+        parse_source,
+        resolve_record,
+        ingestor_version,
+        log_message,
+        test_only_flag=test_only_flag,
+        halt_on_error_flag=halt_on_error_flag,
+        checkpoint_path=get_checkpoint_path(source_path, resume_flag),
+        workers=workers)
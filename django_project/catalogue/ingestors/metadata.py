@@ -0,0 +1,152 @@
+# coding=utf-8
+"""Streaming extraction of the fields the ingestors read from metadata xml.
+
+Each ingestor declares the elements it needs as a field map::
+
+    LANDSAT_FIELDS = {
+        'zone': MetadataField('ZONE'),
+        'ul_lat': MetadataField('SCENEDATAEXTENT/UL_LAT'),
+    }
+
+A path is a list of element names separated by ``/`` where each element is
+a descendant of the previous one, like chained getElementsByTagName calls.
+An element name can be restricted to an attribute value, e.g.
+``feature[@key=orbitNumber]``. Namespaces are ignored.
+
+read_metadata reads the file once, keeps its text for the metadata field of
+the product and extracts the fields with iterparse, clearing the elements
+once they were matched so a DIMAP document is never held as a tree.
+"""
+
+__author__ = 'tim@linfiniti.com'
+__date__ = '18/10/2026'
+
+import re
+from io import BytesIO
+
+try:
+    from lxml import etree
+except ImportError:
+    from xml.etree import ElementTree as etree
+
+# e.g. feature[@key=orbitNumber]
+PATH_STEP = re.compile(r'^([\w.-]+)(?:\[@([\w.-]+)=([^\]]*)\])?$')
+
+
+class MetadataField(object):
+    """A field read from the text of a metadata element."""
+
+    def __init__(self, path, many=False, required=True):
+        """Constructor.
+
+        :param path: Element path, see the module documentation.
+        :type path: str
+
+        :param many: Whether to collect the text of every matching element
+            in document order rather than the first one.
+        :type many: bool
+
+        :param required: Whether a missing element is an error, otherwise
+            the field value is None (or an empty list).
+        :type required: bool
+        """
+        self.path = path
+        self.many = many
+        self.required = required
+        self.steps = []
+        for step in path.split('/'):
+            match = PATH_STEP.match(step)
+            if match is None:
+                raise ValueError('Invalid metadata path: %s' % path)
+            self.steps.append(match.groups())
+
+    @staticmethod
+    def _step_matches(step, element):
+        name, attribute, value = step
+        return element[0] == name and (
+            attribute is None or element[1].get(attribute) == value)
+
+    def matches(self, stack):
+        """Whether the innermost element of stack is matched by the path.
+
+        :param stack: (name, attributes) of the open elements, outermost
+            first.
+        :type stack: list
+        """
+        if not self._step_matches(self.steps[-1], stack[-1]):
+            return False
+        position = len(stack) - 1
+        for step in reversed(self.steps[:-1]):
+            position -= 1
+            while position >= 0 and not self._step_matches(
+                    step, stack[position]):
+                position -= 1
+            if position < 0:
+                return False
+        return True
+
+
+def _local_name(tag):
+    """Strip the namespace from an element tag."""
+    return tag.rsplit('}', 1)[-1].rsplit(':', 1)[-1]
+
+
+def read_metadata(xml_file, field_map):
+    """Read a metadata file once, returning its text and its field values.
+
+    :param xml_file: Path of the metadata xml file.
+    :type xml_file: str
+
+    :param field_map: MetadataField instances by field name.
+    :type field_map: dict
+
+    :returns: A two-tuple of the file text and a dict with the text of the
+        matched element of each field (a list of texts for many fields).
+    :rtype: (str, dict)
+
+    :raises: ValueError if a required field is missing.
+    """
+    with open(xml_file, 'rb') as metadata_file:
+        content = metadata_file.read()
+
+    fields_by_name = {}
+    for name, field in field_map.items():
+        fields_by_name.setdefault(field.steps[-1][0], []).append(
+            (name, field))
+    values = dict(
+        (name, [] if field.many else None)
+        for name, field in field_map.items())
+    pending = set(
+        name for name, field in field_map.items() if not field.many)
+    has_many = len(pending) < len(field_map)
+    found = set()
+
+    stack = []
+    for event, element in etree.iterparse(
+            BytesIO(content), events=('start', 'end')):
+        if event == 'start':
+            stack.append((_local_name(element.tag), dict(element.attrib)))
+            continue
+        for name, field in fields_by_name.get(stack[-1][0], ()):
+            if name in found and not field.many:
+                continue
+            if not field.matches(stack):
+                continue
+            found.add(name)
+            if field.many:
+                values[name].append(element.text)
+            else:
+                values[name] = element.text
+                pending.discard(name)
+        stack.pop()
+        element.clear()
+        if not pending and not has_many:
+            break
+
+    missing = sorted(
+        name for name, field in field_map.items()
+        if field.required and name not in found)
+    if missing:
+        raise ValueError('%s is missing metadata fields: %s' % (
+            xml_file, ', '.join(missing)))
+    return content.decode('utf-8'), values
@@ -0,0 +1,147 @@
+# coding=utf-8
+"""In memory resolution of the dictionary rows referenced by ingested products.
+
+Every ingested scene looks up the same handful of satellites, instruments,
+spectral modes, product profiles, projections and qualities. The resolver
+loads these tables once per ingest run and answers ``get`` and ``filter``
+calls with exact (and ``__in``) lookups from memory, memoising each distinct
+lookup. Saving or deleting a dictionary row invalidates its cached table.
+"""
+
+__author__ = 'tim@linfiniti.com'
+__date__ = '18/10/2026'
+
+from django.contrib.gis.db import models
+
+from dictionaries.models import (
+    SpectralMode,
+    SatelliteInstrument,
+    OpticalProductProfile,
+    InstrumentType,
+    Satellite,
+    Projection,
+    SatelliteInstrumentGroup,
+    Quality
+)
+
+# dictionary models cached by the resolver
+RESOLVER_MODELS = (
+    InstrumentType,
+    Satellite,
+    SatelliteInstrumentGroup,
+    SatelliteInstrument,
+    SpectralMode,
+    OpticalProductProfile,
+    Projection,
+    Quality
+)
+
+
+def _lookup_value(value):
+    """Return a hashable value to compare with, model instances by pk."""
+    if isinstance(value, models.Model):
+        return value.pk
+    return value
+
+
+class DictionaryResolver(object):
+    """Keyed in memory cache of dictionary rows."""
+
+    def __init__(self):
+        self.rows = {}
+        self.results = {}
+
+    def preload(self):
+        """(Re)load all cached dictionary tables, one query per table."""
+        self.rows = dict(
+            (model, list(model.objects.all())) for model in RESOLVER_MODELS)
+        self.results = {}
+
+    def invalidate(self, model=None):
+        """Forget the cached rows of one dictionary model or of all of them.
+
+        :param model: The dictionary model to reload on the next lookup, None
+            for all models.
+        :type model: Model
+        """
+        if model is None:
+            self.rows = {}
+        else:
+            self.rows.pop(model, None)
+        self.results = {}
+
+    def _get_rows(self, model):
+        if model not in self.rows:
+            self.rows[model] = list(model.objects.all())
+        return self.rows[model]
+
+    @staticmethod
+    def _normalise(model, lookups):
+        """Return lookups as (attname, value or frozenset of values) pairs,
+        converting the values to the python type of their field."""
+        normalised = []
+        for name, value in lookups.items():
+            field_name = name[:-4] if name.endswith('__in') else name
+            field = model._meta.get_field(field_name)
+            if field.is_relation:
+                convert = _lookup_value
+            else:
+                convert = field.to_python
+            if name.endswith('__in'):
+                value = frozenset(convert(_lookup_value(item)) for item in value)
+            else:
+                value = convert(_lookup_value(value))
+            normalised.append((field.attname, name.endswith('__in'), value))
+        return tuple(sorted(normalised, key=lambda item: item[0]))
+
+    def filter(self, model, **lookups):
+        """Return the cached rows matching exact or __in lookups.
+
+        :param model: A dictionary model from RESOLVER_MODELS.
+        :type model: Model
+
+        :returns: The matching rows.
+        :rtype: list
+        """
+        key = (model, self._normalise(model, lookups))
+        if key not in self.results:
+            self.results[key] = [
+                row for row in self._get_rows(model)
+                if all(
+                    (getattr(row, attname) in value) if is_in else
+                    (getattr(row, attname) == value)
+                    for attname, is_in, value in key[1])]
+        return self.results[key]
+
+    def get(self, model, **lookups):
+        """Return the single cached row matching the lookups.
+
+        :raises: model.DoesNotExist, model.MultipleObjectsReturned like
+            QuerySet.get
+        """
+        rows = self.filter(model, **lookups)
+        if not rows:
+            raise model.DoesNotExist(
+                '%s matching query does not exist: %s' % (
+                    model._meta.object_name, lookups))
+        if len(rows) > 1:
+            raise model.MultipleObjectsReturned(
+                'get() returned more than one %s -- it returned %s: %s' % (
+                    model._meta.object_name, len(rows), lookups))
+        return rows[0]
+
+
+# resolver shared by all ingestors
+dictionary_resolver = DictionaryResolver()
+
+
+def invalidate_dictionary_resolver(sender, **kwargs):
+    """Drop the cached table of a saved or deleted dictionary row."""
+    dictionary_resolver.invalidate(sender)
+
+
+for myModel in RESOLVER_MODELS:
+    models.signals.post_save.connect(
+        invalidate_dictionary_resolver, sender=myModel)
+    models.signals.post_delete.connect(
+        invalidate_dictionary_resolver, sender=myModel)
@@ -52,13 +52,18 @@ __copyright__ = 'South African National Space Agency'
 
 import os
 import sys
+import time
 import traceback
 import urllib.error
 import urllib.parse
 import urllib.request
+from collections import OrderedDict
+from ctypes import c_char_p, c_void_p
 from datetime import datetime
 
 from catalogue.models import OpticalProduct
+from catalogue.ingestors.engine import IngestStatistics, write_chunk
+from catalogue.ingestors.resolver import dictionary_resolver
 from dictionaries.models import (
     SpectralMode,
     SatelliteInstrument,
@@ -71,12 +76,22 @@ from dictionaries.models import (
 from django.conf import settings
 from django.contrib.gis.gdal import DataSource
 from django.contrib.gis.gdal import OGRGeometry
+from django.contrib.gis.gdal.libgdal import lgdal
+from django.contrib.gis.gdal.prototypes.generation import void_output
 from django.contrib.gis.gdal.feature import Feature
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from django.core.management.base import CommandError
 from django.db import transaction
 from mercurial import lock, error, vfs
 
+# number of index records written per transaction
+INDEX_CHUNK_SIZE = 5000
+# extension of the file with the next feature id to ingest from an index
+FID_CHECKPOINT_EXTENSION = '.ingest_fid'
+
+# OGR_L_SetAttributeFilter is not wrapped by the django gdal Layer
+set_attribute_filter = void_output(
+    lgdal.OGR_L_SetAttributeFilter, [c_void_p, c_char_p])
 
 # from django.db import transaction
 # from django.contrib.gis.geos import WKTReader
@@ -160,7 +175,8 @@ def get_product_profile(log_message, feature):
 
     satellite_abbreviation = 'SPOT-%s' % satellite_number
     log_message('Satellite abbreviation: %s' % satellite_abbreviation, 2)
-    satellite = Satellite.objects.get(
+    satellite = dictionary_resolver.get(
+        Satellite,
         operator_abbreviation=satellite_abbreviation)
     log_message('Satellite: %s' % satellite, 2)
 
@@ -174,13 +190,15 @@ def get_product_profile(log_message, feature):
     elif satellite_number == 5:
         instrument_type_abbreviation = 'HRG'
 
-    instrument_type = InstrumentType.objects.get(
+    instrument_type = dictionary_resolver.get(
+        InstrumentType,
         abbreviation=instrument_type_abbreviation)
     log_message('Instrument type: %s' % instrument_type, 2)
 
     # Work out the instrument group
     try:
-        satellite_instrument_group = SatelliteInstrumentGroup.objects.get(
+        satellite_instrument_group = dictionary_resolver.get(
+            SatelliteInstrumentGroup,
             satellite=satellite, instrument_type=instrument_type)
     except Exception as e:
         print(e.message)
@@ -200,7 +218,8 @@ def get_product_profile(log_message, feature):
         satellite_number, instrument_type_abbreviation, camera_number
     )
     try:
-        satellite_instrument = SatelliteInstrument.objects.get(
+        satellite_instrument = dictionary_resolver.get(
+            SatelliteInstrument,
             satellite_instrument_group=satellite_instrument_group,
             operator_abbreviation=satellite_instrument_abbreviation)
     except Exception as e:
@@ -218,7 +237,8 @@ def get_product_profile(log_message, feature):
 
     spectral_mode_string = feature.get('TYPE')
     try:
-        spectral_modes = SpectralMode.objects.filter(
+        spectral_modes = dictionary_resolver.filter(
+            SpectralMode,
             instrument_type=instrument_type,
             abbreviation=spectral_mode_string)
     except Exception as e:
@@ -229,7 +249,8 @@ def get_product_profile(log_message, feature):
     # Work out the product profile
 
     try:
-        product_profile = OpticalProductProfile.objects.get(
+        product_profile = dictionary_resolver.get(
+            OpticalProductProfile,
             satellite_instrument=satellite_instrument,
             spectral_mode__in=spectral_modes)
     except Exception as e:
@@ -317,7 +338,7 @@ def get_projection(feature):
     :rtype: Projection
     """
     _ = feature
-    projection = Projection.objects.get(epsg_code=4326)
+    projection = dictionary_resolver.get(Projection, epsg_code=4326)
     return projection
 
 
@@ -327,10 +348,191 @@ def get_quality():
     :returns: A quality object fixed to 'unknown'.
     :rtype: Quality
     """
-    quality = Quality.objects.get(name='Unknown')
+    quality = dictionary_resolver.get(Quality, name='Unknown')
     return quality
 
 
+def get_area_of_interest(area_of_interest):
+    """Validate an area of interest.
+
+    :param area_of_interest: A polygon in well known text (WKT), or None.
+    :type area_of_interest: str
+
+    :returns: The area of interest geometry, None when no area was given.
+    :rtype: OGRGeometry
+
+    :raises: CommandError if the area is not a valid polygon.
+    """
+    if area_of_interest is None:
+        return None
+    try:
+        aoi_geometry = OGRGeometry(area_of_interest)
+        if not aoi_geometry.area:
+            raise CommandError(
+                'Unable to create the area of interest'
+                ' polygon: invalid polygon.')
+        if not aoi_geometry.geom_type.name == 'Polygon':
+            raise CommandError(
+                'Unable to create the area of interest'
+                ' polygon: not a polygon.')
+    except Exception as e:
+        raise CommandError(
+            'Unable to create the area of interest'
+            ' polygon: %s.' % e)
+    return aoi_geometry
+
+
+def get_original_product_id(feature):
+    """Get the original product id of a feature from its A21 code.
+
+    :param feature: A shapefile feature.
+    :type feature: Feature
+
+    :returns: The original product id.
+    :rtype: str
+    """
+    original_product_id = feature.get('A21')
+    # SPOT has a wierd thing they do on their catalogue where they
+    # assign the same number to two kinds of products. For example:
+    #
+    # 51204201301160834432A  5m A BW image (the original product) and
+    # 51204201301160834432A  2.5m T BW image (supersampled from A and B)
+    #
+    # Attempting to import both will cause errors because upstream
+    # vendor ID's should be unique per product. To deal with this we
+    # are replacing the terminating 'A' with a 'T' for the supersampled
+    # products. Decision made by Linda & Tim in Jan workshop 2014
+    #
+    if feature.get('RESOL') == 2.5 and feature.get('TYPE') == 'T':
+        original_product_id = list(original_product_id)
+        original_product_id[-1:] = 'T'
+        original_product_id = "".join(original_product_id)
+    return original_product_id
+
+
+def get_product_data(log_message, feature, original_product_id):
+    """Get the OpticalProduct field values of a feature.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param feature: A shapefile feature.
+    :type feature: Feature
+
+    :param original_product_id: The product id, see get_original_product_id.
+    :type original_product_id: str
+
+    :returns: The field values of the product.
+    :rtype: dict
+    """
+    # First grab all the generic properties that any scene will have...
+    geometry = feature.geom.geos
+
+    start_date_time, center_date_time, end_date_time = get_dates(
+        log_message, feature)
+
+    # projection for GenericProduct
+    #print specific_parameters.toxml()
+    projection = get_projection(feature)
+    log_message('Projection: %s' % projection, 2)
+
+    # Band count for GenericImageryProduct
+    product_band_count = get_band_count(feature)
+    log_message('Band count: %s' % product_band_count, 2)
+
+    # Spatial resolution x for GenericImageryProduct
+    spatial_resolution_x = feature.get('RESOL')
+    log_message('Spatial resolution x: %s' % spatial_resolution_x, 2)
+
+    # Spatial resolution y for GenericImageryProduct (same as x)
+    spatial_resolution_y = feature.get('RESOL')
+    log_message('Spatial resolution y: %s' % spatial_resolution_y, 2)
+
+    # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
+    spatial_resolution = spatial_resolution_x
+    log_message('Spatial resolution: %s' % spatial_resolution, 2)
+
+    # Radiometric resolution for GenericImageryProduct
+    radiometric_resolution = 8  # 8 bits will need to change in spot 6
+
+    # path for GenericSensorProduct
+    path = feature.get('a21')[1:4].rjust(4, '0')
+    log_message('Path: %s' % path, 2)
+
+    # row for GenericSensorProduct
+    row = feature.get('a21')[4:7].rjust(4, '0')
+    log_message('Row: %s' % row, 2)
+
+    # earth_sun_distance for OpticalProduct
+    # Not provided
+
+    # solar azimuth angle for OpticalProduct
+    # Not provided
+
+    # solar zenith angle for OpticalProduct
+    # Not provided
+
+    # sensor viewing angle for OpticalProduct
+    sensor_viewing_angle = feature.get('ANG_ACQ')
+    log_message('Sensor viewing angle: %s' % sensor_viewing_angle, 2)
+
+    # sensor inclination angle for OpticalProduct
+    sensor_inclination_angle = feature.get('ANG_INC')
+    log_message(
+        'Sensor inclination angle: %s' % sensor_inclination_angle, 2)
+
+    # cloud cover as percentage for OpticalProduct
+    # integer percent - must be scaled to 0-100 for all ingestors
+    cloud_cover = int(feature.get('CLOUD_PER'))
+    log_message('Cloud cover percentage: %s' % cloud_cover, 2)
+
+    # Get the quality for GenericProduct
+    quality = get_quality()
+    log_message('Quality: %s' % quality, 2)
+
+    # ProductProfile for OpticalProduct
+    product_profile = get_product_profile(log_message, feature)
+    log_message('Product Profile: %s' % product_profile, 2)
+
+    # Get the original text file metadata
+    metadata = '\n'.join(['%s=%s' % (
+        f, feature.get(f)) for f in feature.fields])
+    log_message('Metadata retrieved', 2)
+
+    # Metadata comes from shpfile dump not DIMS...
+    dims_product_id = original_product_id
+    log_message('Using original product ID for DIMS ID', 2)
+
+    # Check if there is already a matching product based
+    # on original_product_id
+
+    # Do the ingestion here...
+    data = {
+        'metadata': metadata,
+        'spatial_coverage': geometry,
+        'radiometric_resolution': radiometric_resolution,
+        'band_count': product_band_count,
+        'cloud_cover': cloud_cover,
+        'sensor_inclination_angle': sensor_inclination_angle,
+        'sensor_viewing_angle': sensor_viewing_angle,
+        'original_product_id': original_product_id,
+        'unique_product_id': dims_product_id,
+        'spatial_resolution_x': spatial_resolution_x,
+        'spatial_resolution_y': spatial_resolution_y,
+        'spatial_resolution': spatial_resolution,
+        'product_profile': product_profile,
+        'product_acquisition_start': start_date_time,
+        'product_acquisition_end': end_date_time,
+        'product_date': center_date_time,
+        'path': path,
+        'row': row,
+        'projection': projection,
+        'quality': quality
+    }
+    log_message(data, 3)
+    return data
+
+
 def fetch_features(shapefile, area_of_interest):
     """
     Open the index and parses it, returns a generator list of features.
@@ -358,6 +560,237 @@ def fetch_features(shapefile, area_of_interest):
                 yield feature
 
 
+def fetch_index_features(shapefile, area_of_interest=None, start_fid=0):
+    """Yield the features of an index, optionally from a feature id onwards.
+
+    With an area of interest the layer gets an OGR spatial filter, which
+    reads only the features whose bounding box overlaps the area from the
+    spatial index of the shapefile (a .qix file) when there is one, and an
+    attribute filter on the feature id skips the features before start_fid.
+    Without one the features are read directly by their ids.
+
+    :param shapefile: A shapefile downloaded from
+           http://catalog.spotimage.com/pagedownload.aspx
+
+    :param area_of_interest: A geometry defining which features to include.
+    :type area_of_interest: OGRGeometry
+
+    :param start_fid: Id of the first feature to yield.
+    :type start_fid: int
+
+    :returns: The features in feature id order, all intersecting with the area
+        of interest if it was specified.
+    """
+    try:
+        data_source = DataSource(shapefile)
+    except Exception as e:
+        raise CommandError('Loading index failed %s' % e)
+    layer = data_source[0]
+
+    if area_of_interest is None:
+        for fid in range(start_fid, layer.num_feat):
+            yield layer[fid]
+        return
+
+    layer.spatial_filter = area_of_interest
+    if start_fid:
+        # features before the checkpoint are skipped by OGR too
+        set_attribute_filter(
+            layer.ptr, str.encode('FID >= %d' % start_fid))
+    for feature in layer:
+        if area_of_interest.intersects(feature.geom):
+            yield feature
+
+
+def get_fid_checkpoint_path(shapefile, resume_flag=True):
+    """Return the checkpoint file of an index.
+
+    :param resume_flag: Whether to keep the checkpoint of earlier runs, when
+        False it is removed and the index is ingested from the start.
+    :type resume_flag: bool
+    """
+    path = os.path.splitext(shapefile)[0] + FID_CHECKPOINT_EXTENSION
+    if not resume_flag and os.path.exists(path):
+        os.remove(path)
+    return path
+
+
+def read_fid_checkpoint(path):
+    """Return the next feature id to ingest, 0 without a checkpoint."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rt') as checkpoint_file:
+        return int(checkpoint_file.read().strip() or 0)
+
+
+def write_fid_checkpoint(path, fid):
+    """Record the next feature id to ingest, replacing the file atomically."""
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wt') as checkpoint_file:
+        checkpoint_file.write('%s\n' % fid)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def ingest_index(
+        shapefile,
+        area_of_interest=None,
+        test_only_flag=True,
+        verbosity_level=2,
+        halt_on_error_flag=True,
+        start_fid=None,
+        resume_flag=True,
+        chunk_size=INDEX_CHUNK_SIZE):
+    """Ingest a collection of Spot scenes from a shapefile in chunks.
+
+    Unlike ingest, the features outside the area of interest are filtered
+    by OGR, the existing products of a chunk are looked up with one query
+    and each chunk is written in its own transaction. The id of the next
+    feature is stored next to the shapefile after each committed chunk, so a
+    killed run continues where it stopped. Thumbnails are not downloaded,
+    new products get the url of their quicklook instead.
+
+    :param shapefile: A shapefile downloaded from
+            http://catalog.spotimage.com/pagedownload.aspx
+
+    :param area_of_interest: A geometry in well known text (WKT) defining which
+        features to include.
+
+    :param test_only_flag: Whether to do a dummy run ( database will not be
+        updated. Default True.
+
+    :param verbosity_level: How verbose the logging output should be. 0-2
+        where 2 is very very very very verbose! Default is 2.
+
+    :param halt_on_error_flag: Whether we should stop processing when the first
+        error is encountered. Default is True.
+
+    :param start_fid: Optional feature id to start from, overriding the
+        checkpoint of earlier runs.
+    :type start_fid: int
+
+    :param resume_flag: Whether to continue from the checkpoint of earlier
+        runs. Default is True.
+    :type resume_flag: bool
+
+    :param chunk_size: Number of records written per transaction.
+    :type chunk_size: int
+
+    :returns: The statistics of the run.
+    :rtype: IngestStatistics
+    """
+    def log_message(message, level=1):
+        """Log a message for a given level.
+
+        :param message: A message.
+        :param level: A log level.
+        """
+        if verbosity_level >= level:
+            print(message)
+
+    try:
+        lock_file = lock.lock(
+            vfs.vfs("/tmp/"), str.encode("/tmp/spot_harvest.lock"),
+            timeout=60)
+    except error.LockHeld:
+        # couldn't take the lock
+        raise CommandError('Could not acquire lock.')
+
+    ingestor_version = 'SPOT ingestor version 4'
+    aoi_geometry = get_area_of_interest(area_of_interest)
+    checkpoint_path = get_fid_checkpoint_path(shapefile, resume_flag)
+    if start_fid is None:
+        start_fid = read_fid_checkpoint(checkpoint_path)
+    log_message((
+        'Running SPOT Importer v%s with these options:\n'
+        'Test Only Flag: %s\n'
+        'Shapefile: %s\n'
+        'Area of Interest: %s\n'
+        'Start feature: %s\n'
+        'Verbosity Level: %s\n'
+        'Halt on error: %s\n'
+        '------------------')
+        % (ingestor_version, test_only_flag, shapefile, area_of_interest,
+           start_fid, verbosity_level, halt_on_error_flag), 2)
+
+    # dictionary rows are resolved from memory for the whole run
+    dictionary_resolver.preload()
+    statistics = IngestStatistics()
+
+    def flush(chunk, next_fid):
+        """Write a chunk and record the next feature id to ingest."""
+        if chunk:
+            # only new products get the quicklook url, existing products
+            # may have a local copy of their thumbnail
+            existing_ids = set(OpticalProduct.objects.filter(
+                original_product_id__in=list(chunk)
+            ).values_list('original_product_id', flat=True))
+            for original_product_id, (fid, url, data) in chunk.items():
+                if original_product_id not in existing_ids:
+                    data['remote_thumbnail_url'] = url
+            try:
+                write_chunk(
+                    list(chunk.values()), ingestor_version, test_only_flag,
+                    log_message, statistics)
+            except Exception:
+                log_message(traceback.format_exc(), 1)
+                log_message('Chunk import failed: %s records' % len(chunk), 1)
+                statistics.counts['failed'] += len(chunk)
+                return not halt_on_error_flag
+            log_message('Committed %s records.' % len(chunk), 1)
+        if not test_only_flag:
+            write_fid_checkpoint(checkpoint_path, next_fid)
+        return True
+
+    try:
+        # records by original product id, the index has duplicate products
+        # of which the last one is kept
+        chunk = OrderedDict()
+        next_fid = start_fid
+        completed = True
+        started = time.time()
+        for feature in fetch_index_features(
+                shapefile, aoi_geometry, start_fid):
+            statistics.counts['processed'] += 1
+            original_product_id = get_original_product_id(feature)
+            if skip_record(feature):
+                statistics.counts['skipped'] += 1
+                log_message('%s Skipped' % original_product_id, 2)
+            else:
+                try:
+                    data = get_product_data(
+                        log_message, feature, original_product_id)
+                except Exception:
+                    log_message(
+                        'Record import failed: %s' % original_product_id, 1)
+                    log_message(traceback.format_exc(), 2)
+                    statistics.counts['failed'] += 1
+                    if halt_on_error_flag:
+                        break
+                else:
+                    chunk.pop(original_product_id, None)
+                    chunk[original_product_id] = (
+                        feature.fid, feature.get('URL_QL'), data)
+            next_fid = feature.fid + 1
+            if len(chunk) >= chunk_size:
+                statistics.add_time(
+                    'read', time.time() - started, len(chunk))
+                completed = flush(chunk, next_fid)
+                chunk = OrderedDict()
+                started = time.time()
+                if not completed:
+                    break
+        if completed:
+            statistics.add_time('read', time.time() - started, len(chunk))
+            flush(chunk, next_fid)
+    finally:
+        lock_file.release()
+
+    statistics.report(log_message)
+    return statistics
+
+
 # noinspection PyDeprecation
 @transaction.atomic
 def ingest(
@@ -431,6 +864,7 @@ def ingest(
         raise CommandError('Could not acquire lock.')
 
     ingestor_version = 'SPOT ingestor version 3'
+    dictionary_resolver.preload()
     log_message((
         'Running SPOT Importer v%s with these options:\n'
         'Test Only Flag: %s\n'
@@ -442,23 +876,8 @@ def ingest(
         % (ingestor_version, test_only_flag, shapefile, area_of_interest,
            verbosity_level, halt_on_error_flag), 2)
 
-    aoi_geometry = None
-    # Validate area_of_interest
-    if area_of_interest is not None:
-        try:
-            aoi_geometry = OGRGeometry(area_of_interest)
-            if not aoi_geometry.area:
-                raise CommandError(
-                    'Unable to create the area of interest'
-                    ' polygon: invalid polygon.')
-            if not aoi_geometry.geom_type.name == 'Polygon':
-                raise CommandError(
-                    'Unable to create the area of interest'
-                    ' polygon: not a polygon.')
-        except Exception as e:
-            raise CommandError(
-                'Unable to create the area of interest'
-                ' polygon: %s.' % e)
+    aoi_geometry = get_area_of_interest(area_of_interest)
+    if aoi_geometry is not None:
         log_message('Area of interest filtering activated.', 1)
 
     record_count = 0
@@ -477,28 +896,12 @@ def ingest(
             print('Products imported : %s ' % created_record_count)
             transaction.commit()
 
-        original_product_id = feature.get('A21')
-
-        if start_from is not None and start_from != original_product_id:
+        if start_from is not None and start_from != feature.get('A21'):
             continue
         else:
             start_from = None
 
-        # SPOT has a wierd thing they do on their catalogue where they
-        # assign the same number to two kinds of products. For example:
-        #
-        # 51204201301160834432A  5m A BW image (the original product) and
-        # 51204201301160834432A  2.5m T BW image (supersampled from A and B)
-        #
-        # Attempting to import both will cause errors because upstream
-        # vendor ID's should be unique per product. To deal with this we
-        # are replacing the terminating 'A' with a 'T' for the supersampled
-        # products. Decision made by Linda & Tim in Jan workshop 2014
-        #
-        if feature.get('RESOL') == 2.5 and feature.get('TYPE') == 'T':
-            original_product_id = list(original_product_id)
-            original_product_id[-1:] = 'T'
-            original_product_id = "".join(original_product_id)
+        original_product_id = get_original_product_id(feature)
 
         log_message('', 2)
         log_message('---------------', 2)
@@ -510,111 +913,8 @@ def ingest(
             continue
 
         try:
-            # First grab all the generic properties that any scene will have...
-            geometry = feature.geom.geos
-
-            start_date_time, center_date_time, end_date_time = get_dates(
-                log_message, feature)
-
-            # projection for GenericProduct
-            #print specific_parameters.toxml()
-            projection = get_projection(feature)
-            log_message('Projection: %s' % projection, 2)
-
-            # Band count for GenericImageryProduct
-            product_band_count = get_band_count(feature)
-            log_message('Band count: %s' % product_band_count, 2)
-
-            # Spatial resolution x for GenericImageryProduct
-            spatial_resolution_x = feature.get('RESOL')
-            log_message('Spatial resolution x: %s' % spatial_resolution_x, 2)
-
-            # Spatial resolution y for GenericImageryProduct (same as x)
-            spatial_resolution_y = feature.get('RESOL')
-            log_message('Spatial resolution y: %s' % spatial_resolution_y, 2)
-
-            # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
-            spatial_resolution = spatial_resolution_x
-            log_message('Spatial resolution: %s' % spatial_resolution, 2)
-
-            # Radiometric resolution for GenericImageryProduct
-            radiometric_resolution = 8  # 8 bits will need to change in spot 6
-
-            # path for GenericSensorProduct
-            path = feature.get('a21')[1:4].rjust(4, '0')
-            log_message('Path: %s' % path, 2)
-
-            # row for GenericSensorProduct
-            row = feature.get('a21')[4:7].rjust(4, '0')
-            log_message('Row: %s' % row, 2)
-
-            # earth_sun_distance for OpticalProduct
-            # Not provided
-
-            # solar azimuth angle for OpticalProduct
-            # Not provided
-
-            # solar zenith angle for OpticalProduct
-            # Not provided
-
-            # sensor viewing angle for OpticalProduct
-            sensor_viewing_angle = feature.get('ANG_ACQ')
-            log_message('Sensor viewing angle: %s' % sensor_viewing_angle, 2)
-
-            # sensor inclination angle for OpticalProduct
-            sensor_inclination_angle = feature.get('ANG_INC')
-            log_message(
-                'Sensor inclination angle: %s' % sensor_inclination_angle, 2)
-
-            # cloud cover as percentage for OpticalProduct
-            # integer percent - must be scaled to 0-100 for all ingestors
-            cloud_cover = int(feature.get('CLOUD_PER'))
-            log_message('Cloud cover percentage: %s' % cloud_cover, 2)
-
-            # Get the quality for GenericProduct
-            quality = get_quality()
-            log_message('Quality: %s' % quality, 2)
-
-            # ProductProfile for OpticalProduct
-            product_profile = get_product_profile(log_message, feature)
-            log_message('Product Profile: %s' % product_profile, 2)
-
-            # Get the original text file metadata
-            metadata = '\n'.join(['%s=%s' % (
-                f, feature.get(f)) for f in feature.fields])
-            log_message('Metadata retrieved', 2)
-
-            # Metadata comes from shpfile dump not DIMS...
-            dims_product_id = original_product_id
-            log_message('Using original product ID for DIMS ID', 2)
-
-            # Check if there is already a matching product based
-            # on original_product_id
-
-            # Do the ingestion here...
-            data = {
-                'metadata': metadata,
-                'spatial_coverage': geometry,
-                'radiometric_resolution': radiometric_resolution,
-                'band_count': product_band_count,
-                'cloud_cover': cloud_cover,
-                'sensor_inclination_angle': sensor_inclination_angle,
-                'sensor_viewing_angle': sensor_viewing_angle,
-                'original_product_id': original_product_id,
-                'unique_product_id': dims_product_id,
-                'spatial_resolution_x': spatial_resolution_x,
-                'spatial_resolution_y': spatial_resolution_y,
-                'spatial_resolution': spatial_resolution,
-                'product_profile': product_profile,
-                'product_acquisition_start': start_date_time,
-                'product_acquisition_end': end_date_time,
-                'product_date': center_date_time,
-                'path': path,
-                'row': row,
-                'projection': projection,
-                'quality': quality
-            }
-            log_message(data, 3)
+            data = get_product_data(
+                log_message, feature, original_product_id)
             # Check if it's already in catalogue:
             try:
                 today = datetime.today()
@@ -2,20 +2,12 @@ __author__ = 'rischan - <--rischan@kartoza.com-->'
 __date__ = '2/24/16'
 
 import os
-import sys
 import glob
-from cmath import log
 from datetime import datetime
-from xml.dom.minidom import parse
-import traceback
-import shutil
 
-from django.db import transaction
 from django.contrib.gis.geos import WKTReader
-from django.core.management.base import CommandError
-from django.core.exceptions import ObjectDoesNotExist
-from django.conf import settings
 
+from catalogue.ingestors.resolver import dictionary_resolver
 from dictionaries.models import (
     SpectralMode,
     SatelliteInstrument,
@@ -26,7 +18,24 @@ from dictionaries.models import (
     SatelliteInstrumentGroup,
     Quality
 )
-from catalogue.models import OpticalProduct
+from catalogue.ingestors.engine import (
+    ingest_sources,
+    get_checkpoint_path,
+    silent_log_message
+)
+from catalogue.ingestors.metadata import MetadataField, read_metadata
+
+# metadata elements read from a SPOT6 DIMAP file
+SPOT6_FIELDS = {
+    'latitudes': MetadataField(
+        'Dataset_Extent/Vertex/LAT', many=True),
+    'longitudes': MetadataField(
+        'Dataset_Extent/Vertex/LON', many=True),
+    'start': MetadataField('Located_Geometric_Values/TIME'),
+    'dataset_name': MetadataField('DATASET_NAME'),
+    'solar_azimuth': MetadataField('SUN_AZIMUTH'),
+    'mission_index': MetadataField('MISSION_INDEX')
+}
 
 
 def parse_date_time(date_stamp):
@@ -62,28 +71,23 @@ def parse_date_time(date_stamp):
     return parsed_date_time
 
 
-def get_geometry(log_message, dom):
+def get_geometry(log_message, fields):
     """Extract the bounding box as a geometry from the xml file.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: DOM Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with SPOT6_FIELDS.
+    :type fields: dict
 
     :return: geometry
     """
-    dataset_extent = dom.getElementsByTagName('Dataset_Extent')[0]
-    points = dataset_extent.getElementsByTagName('Vertex')
     polygon = 'POLYGON(('
     is_first = True
     first_longitude = None
     first_latitude = None
-    for point in points:
-        latitude = point.getElementsByTagName('LAT')[0]
-        latitude = latitude.firstChild.nodeValue
-        longitude = point.getElementsByTagName('LON')[0]
-        longitude = longitude.firstChild.nodeValue
+    for latitude, longitude in zip(
+            fields['latitudes'], fields['longitudes']):
         if not is_first:
             polygon += ','
         else:
@@ -101,29 +105,23 @@ def get_geometry(log_message, dom):
     return myGeometry
 
 
-def get_dates(log_message, dom):
+def get_dates(log_message, fields):
     """Get the start, mid scene and end dates.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with SPOT6_FIELDS.
+    :type fields: dict
 
     :return: A two-tuple of dates for the start and product dates
         respectively.
     :rtype: (datetime, datetime)
     """
-    located_geometric_value = dom.getElementsByTagName('Located_Geometric_Values')[0]
-
-    start_element = located_geometric_value.getElementsByTagName('TIME')[0]
-    start_date = start_element.firstChild.nodeValue
-    start_date = parse_date_time(start_date)
+    start_date = parse_date_time(fields['start'])
     log_message('Product Start Date: %s' % start_date, 2)
 
-    center_element = located_geometric_value.getElementsByTagName('TIME')[0]
-    center_date = center_element.firstChild.nodeValue
-    center_date = parse_date_time(center_date)
+    center_date = parse_date_time(fields['start'])
     log_message('Product Date: %s' % center_date, 2)
 
     return start_date, center_date
@@ -133,10 +131,9 @@ def get_band_count():
     return 5  # static value based on client information
 
 
-def get_original_product_id(dom):
+def get_original_product_id(fields):
     constant = 'S6'
-    dataset_name = dom.getElementsByTagName('DATASET_NAME')[0]
-    product_name_full = dataset_name.firstChild.nodeValue
+    product_name_full = fields['dataset_name']
     tokens = product_name_full.split('_')
     product_name = constant + tokens[2] + tokens[3] + tokens[4]
     return product_name
@@ -150,20 +147,23 @@ def get_spatial_resolution_y():
     return 1.5  # static value based on client information
 
 
-def get_solar_azimuth(dom):
-    sun_azimuth = dom.getElementsByTagName('SUN_AZIMUTH')[0]
-    solar_azimuth = sun_azimuth.firstChild.nodeValue
-    return solar_azimuth
+def get_solar_azimuth(fields):
+    return fields['solar_azimuth']
+
+
+def get_mission_index(fields):
+    """Get the mission index of the scene e.g. 6 or 7."""
+    return fields['mission_index']
 
 
-def get_product_profile(log_message, dom):
+def get_product_profile(log_message, mission_index_value):
     """Find the product_profile for this record.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param mission_index_value: Mission index of the scene e.g. 6 or 7.
+    :type mission_index_value: str
 
     :return: A product profile for the given product.
     :rtype: OpticalProductProfile
@@ -171,11 +171,10 @@ def get_product_profile(log_message, dom):
     # We need type, sensor and mission so that we can look up the
     # OpticalProductProfile that applies to this product
     sensor_value = "HRV"
-    mission_index = dom.getElementsByTagName('MISSION_INDEX')[0]
-    mission_index_value = mission_index.firstChild.nodeValue
 
     try:
-        instrument_type = InstrumentType.objects.get(
+        instrument_type = dictionary_resolver.get(
+            InstrumentType,
             operator_abbreviation=sensor_value)  # e.g. HRV
     except Exception as e:
         # print e.message
@@ -188,38 +187,42 @@ def get_product_profile(log_message, dom):
         mission_value = 'S7'
     else:
         raise Exception('Unknown mission in SPOT')
-    satellite = Satellite.objects.get(abbreviation=mission_value)
+    satellite = dictionary_resolver.get(Satellite, abbreviation=mission_value)
 
     try:
-        satellite_instrument_group = SatelliteInstrumentGroup.objects.get(
+        satellite_instrument_group = dictionary_resolver.get(
+            SatelliteInstrumentGroup,
             satellite=satellite, instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument Group %s' %
                 satellite_instrument_group, 2)
     try:
-        satellite_instrument = SatelliteInstrument.objects.get(
+        satellite_instrument = dictionary_resolver.get(
+            SatelliteInstrument,
             satellite_instrument_group=satellite_instrument_group)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument %s' % satellite_instrument, 2)
 
     try:
-        spectral_modes = SpectralMode.objects.filter(
+        spectral_modes = dictionary_resolver.filter(
+            SpectralMode,
             instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise
     log_message('Spectral Modes %s' % spectral_modes, 2)
 
     try:
-        product_profile = OpticalProductProfile.objects.get(
+        product_profile = dictionary_resolver.get(
+            OpticalProductProfile,
             satellite_instrument=satellite_instrument,
             spectral_mode__in=spectral_modes)
     except Exception as e:
-        print(e.message)
+        print(e)
         print('Searched for satellite instrument: %s and spectral modes %s' % (
             satellite_instrument, spectral_modes
         ))
@@ -236,7 +239,7 @@ def get_radiometric_resolution():
 
 def get_projection():
     # If projection not found default to WGS84
-    projection = Projection.objects.get(epsg_code=4326)
+    projection = dictionary_resolver.get(Projection, epsg_code=4326)
     return projection
 
 
@@ -246,10 +249,75 @@ def get_quality():
     :returns: A quality object fixed to 'unknown'.
     :rtype: Quality
     """
-    quality = Quality.objects.get(name='Unknown')
+    quality = dictionary_resolver.get(Quality, name='Unknown')
     return quality
 
 
+def parse_source(folder):
+    """Read the metadata of a SPOT6 scene folder.
+
+    Runs in an ingest engine worker process, so no database access here.
+
+    :param folder: A SPOT6 scene folder with one xml file.
+    :type folder: str
+
+    :returns: The plain values needed to create the product.
+    :rtype: dict
+    """
+    # Find the first and only xml file in the folder
+    xml_file = glob.glob(os.path.join(str(folder), '*.XML'))[0]
+    # Read the original text and the fields in one pass over the file
+    metadata, fields = read_metadata(xml_file, SPOT6_FIELDS)
+    start_date_time, center_date_time = get_dates(silent_log_message, fields)
+    return {
+        'folder': folder,
+        'metadata': metadata,
+        'geometry': get_geometry(silent_log_message, fields),
+        'start_date_time': start_date_time,
+        'center_date_time': center_date_time,
+        'original_product_id': get_original_product_id(fields),
+        'solar_azimuth_angle': get_solar_azimuth(fields),
+        'mission_index': get_mission_index(fields)
+    }
+
+
+def resolve_record(log_message, record):
+    """Get the product field values of a parsed SPOT6 scene.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :returns: OpticalProduct field values.
+    :rtype: dict
+    """
+    spatial_resolution_x = float(get_spatial_resolution_x())
+    spatial_resolution_y = float(get_spatial_resolution_y())
+    # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
+    spatial_resolution = (spatial_resolution_x + spatial_resolution_y) / 2
+    log_message('Spatial resolution: %s' % spatial_resolution, 2)
+    return {
+        'metadata': record['metadata'],
+        'spatial_coverage': record['geometry'],
+        'radiometric_resolution': get_radiometric_resolution(),
+        'band_count': get_band_count(),
+        'original_product_id': record['original_product_id'],
+        'unique_product_id': record['original_product_id'],
+        'spatial_resolution_x': spatial_resolution_x,
+        'spatial_resolution_y': spatial_resolution_y,
+        'spatial_resolution': spatial_resolution,
+        'product_profile': get_product_profile(
+            log_message, record['mission_index']),
+        'product_acquisition_start': record['start_date_time'],
+        'product_date': record['center_date_time'],
+        'solar_azimuth_angle': record['solar_azimuth_angle'],
+        'projection': get_projection(),
+        'quality': get_quality()
+    }
+
+
 def ingest(
         test_only_flag=True,
         source_path=(
@@ -257,7 +325,9 @@ def ingest(
                 'landsat/'),
         verbosity_level=2,
         halt_on_error_flag=True,
-        ignore_missing_thumbs=False):
+        ignore_missing_thumbs=False,
+        workers=None,
+        resume_flag=True):
     """
     Ingest a collection of Landsat metadata folders.
 
@@ -279,6 +349,14 @@ def ingest(
     :param ignore_missing_thumbs: Whether we should raise an error
         if we find we are missing a thumbnails. Default is False.
     :type ignore_missing_thumbs: bool
+
+    :param workers: Number of processes parsing the metadata, defaults to the
+        number of cpus.
+    :type workers: int
+
+    :param resume_flag: Whether to skip the folders ingested by an earlier,
+        interrupted run. Default is True.
+    :type resume_flag: bool
     """
 
     def log_message(message, level=1):
@@ -304,176 +382,15 @@ def ingest(
     # The sub-folder names should be e.g.
     # L5-_TM-_HRF_SAM-_0176_00_0078_00_920606_080254_L0Ra_UTM34S
     log_message('Scanning folders in %s' % source_path, 1)
-    # Loop through each folder found
 
     ingestor_version = 'SPOT6 ingestor version 1'
-    record_count = 0
-    updated_record_count = 0
-    created_record_count = 0
-    failed_record_count = 0
-    log_message('Starting directory scan...', 2)
-
-    for myFolder in glob.glob(os.path.join(source_path, '*')):
-        record_count += 1
-        try:
-            log_message('', 2)
-            log_message('---------------', 2)
-            # Get the folder name
-            product_folder = os.path.split(myFolder)[-1]
-            log_message(product_folder, 2)
-
-            # Find the first and only xml file in the folder
-            search_path = os.path.join(str(myFolder), '*.XML')
-            log_message(search_path, 2)
-            xml_file = glob.glob(search_path)[0]
-            log_message(xml_file, 2)
-
-            # Create a DOM document from the file
-            dom = parse(xml_file)
-            #
-            # First grab all the generic properties that any spot will have...
-            geometry = get_geometry(log_message, dom)
-            start_date_time, center_date_time = get_dates(
-                log_message, dom)
-            # projection for GenericProduct
-            projection = get_projection()
-            # Original product id for GenericProduct
-            original_product_id = get_original_product_id(dom)
-            # Band count for GenericImageryProduct
-            band_count = get_band_count()
-            solar_azimuth_angle = get_solar_azimuth(dom)
-            # Spatial resolution x for GenericImageryProduct
-            spatial_resolution_x = float(get_spatial_resolution_x())
-            # Spatial resolution y for GenericImageryProduct
-            spatial_resolution_y = float(
-                get_spatial_resolution_y())
-            log_message('Spatial resolution y: %s' % spatial_resolution_y, 2)
-
-            # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
-            spatial_resolution = (spatial_resolution_x + spatial_resolution_y) / 2
-            log_message('Spatial resolution: %s' % spatial_resolution, 2)
-
-            # Radiometric resolution for GenericImageryProduct
-            radiometric_resolution = get_radiometric_resolution()
-            log_message('Radiometric resolution: %s' % radiometric_resolution, 2)
-
-            # Get the quality for GenericProduct
-            quality = get_quality()
-
-            # ProductProfile for OpticalProduct
-            product_profile = get_product_profile(
-                log_message, dom)
-
-            # Get the original text file metadata
-            metadata_file = open(xml_file, 'rt')
-            metadata = metadata_file.readlines()
-            metadata_file.close()
-            log_message('Metadata retrieved', 2)
-
-            unique_product_id = original_product_id
-            # Check if there is already a matching product based
-            # on original_product_id
-
-            # Do the ingestion here...
-            data = {
-                'metadata': metadata,
-                'spatial_coverage': geometry,
-                'radiometric_resolution': radiometric_resolution,
-                'band_count': band_count,
-                'original_product_id': original_product_id,
-                'unique_product_id': unique_product_id,
-                'spatial_resolution_x': spatial_resolution_x,
-                'spatial_resolution_y': spatial_resolution_y,
-                'spatial_resolution': spatial_resolution,
-                'product_profile': product_profile,
-                'product_acquisition_start': start_date_time,
-                'product_date': center_date_time,
-                'solar_azimuth_angle': solar_azimuth_angle,
-                'projection': projection,
-                'quality': quality
-            }
-            log_message(data, 3)
-            # Check if it's already in catalogue:
-            try:
-                today = datetime.today()
-                time_stamp = today.strftime("%Y-%m-%d")
-                log_message('Time Stamp: %s' % time_stamp, 2)
-            except Exception as e:
-                print(e.message)
-
-            update_mode = True
-            try:
-                log_message('Trying to update')
-                # original_product_id is not necessarily unique
-                # so we use product_id
-                product = OpticalProduct.objects.get(
-                    original_product_id=original_product_id
-                ).getConcreteInstance()
-                log_message(('Already in catalogue: updating %s.'
-                             % original_product_id), 2)
-                new_record_flag = False
-                message = product.ingestion_log
-                message += '\n'
-                message += '%s : %s - updating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                product.__dict__.update(data)
-            except ObjectDoesNotExist:
-                log_message('Not in catalogue: creating.', 2)
-                update_mode = False
-                message = '%s : %s - creating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                try:
-                    product = OpticalProduct(**data)
-                    log_message('Product: %s' % product)
-
-                except Exception as e:
-                    log_message(e.message, 2)
-
-                new_record_flag = True
-            except Exception as e:
-                print(e.message)
-
-            log_message('Saving product and setting thumb', 2)
-            try:
-                product.save()
-                if update_mode:
-                    updated_record_count += 1
-                else:
-                    created_record_count += 1
-                if new_record_flag:
-                    log_message('Product %s imported.' % record_count, 2)
-                    pass
-                else:
-                    log_message('Product %s updated.' % updated_record_count, 2)
-                    pass
-            except Exception as e:
-                traceback.print_exc(file=sys.stdout)
-                raise CommandError('Cannot import: %s' % e)
-
-            if test_only_flag:
-                transaction.rollback()
-                log_message('Imported scene : %s' % product_folder, 1)
-                log_message('Testing only: transaction rollback.', 1)
-            else:
-                transaction.commit()
-                log_message('Imported scene : %s' % product_folder, 1)
-        except Exception as e:
-            log_message('Record import failed. AAAAAAARGH! : %s' %
-                        product_folder, 1)
-            failed_record_count += 1
-            if halt_on_error_flag:
-                print(e.message)
-                break
-            else:
-                continue
-
-    # To decide: should we remove ingested product folders?
-
-    print('===============================')
-    print('Products processed : %s ' % record_count)
-    print('Products updated : %s ' % updated_record_count)
-    print('Products imported : %s ' % created_record_count)
-    print('Products failed to import : %s ' % failed_record_count)
-    print('===============================')
+    return ingest_sources(
+        glob.glob(os.path.join(source_path, '*')),
+        parse_source,
+        resolve_record,
+        ingestor_version,
+        log_message,
+        test_only_flag=test_only_flag,
+        halt_on_error_flag=halt_on_error_flag,
+        checkpoint_path=get_checkpoint_path(source_path, resume_flag),
+        workers=workers)
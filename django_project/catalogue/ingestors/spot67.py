@@ -2,20 +2,13 @@ __author__ = 'rischan - <--rischan@kartoza.com-->'
 __date__ = '4/28/16'
 
 import os
-import sys
 import glob
-from cmath import log
 from datetime import datetime
-from xml.dom.minidom import parse
-import traceback
 import shutil
 
-from django.db import transaction
 from django.contrib.gis.geos import WKTReader
-from django.core.management.base import CommandError
-from django.core.exceptions import ObjectDoesNotExist
-from django.conf import settings
 
+from catalogue.ingestors.resolver import dictionary_resolver
 from dictionaries.models import (
     SpectralMode,
     SatelliteInstrument,
@@ -26,7 +19,25 @@ from dictionaries.models import (
     SatelliteInstrumentGroup,
     Quality
 )
-from catalogue.models import OpticalProduct
+from catalogue.ingestors.engine import (
+    ingest_sources,
+    get_checkpoint_path,
+    silent_log_message
+)
+from catalogue.ingestors.metadata import MetadataField, read_metadata
+
+# metadata elements read from a SPOT 6/7 DIMAP file
+SPOT67_FIELDS = {
+    'latitudes': MetadataField(
+        'Programming_Geo_Area/CORNER/LATITUDE', many=True),
+    'longitudes': MetadataField(
+        'Programming_Geo_Area/CORNER/LONGITUDE', many=True),
+    'start': MetadataField('UTC_Acquisition_Range/START'),
+    'production_date': MetadataField('Production/DATASET_PRODUCTION_DATE'),
+    'orbit_number': MetadataField('ORBIT_NUMBER'),
+    'dataset_name': MetadataField('DATASET_NAME'),
+    'mission_index': MetadataField('PLATFORM_SERIAL_NUMBER')
+}
 
 
 def parse_date_time(date_stamp):
@@ -62,28 +73,23 @@ def parse_date_time(date_stamp):
     return parsed_date_time
 
 
-def get_geometry(log_message, dom):
+def get_geometry(log_message, fields):
     """Extract the bounding box as a geometry from the xml file.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: DOM Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with SPOT67_FIELDS.
+    :type fields: dict
 
     :return: geoemtry
     """
-    geo_area = dom.getElementsByTagName('Programming_Geo_Area')[0]
-    points = geo_area.getElementsByTagName('CORNER')
     polygon = 'POLYGON(('
     is_first = True
     first_longitude = None
     first_latitude = None
-    for point in points:
-        latitude = point.getElementsByTagName('LATITUDE')[0]
-        latitude = latitude.firstChild.nodeValue
-        longitude = point.getElementsByTagName('LONGITUDE')[0]
-        longitude = longitude.firstChild.nodeValue
+    for latitude, longitude in zip(
+            fields['latitudes'], fields['longitudes']):
         if not is_first:
             polygon += ','
         else:
@@ -101,29 +107,23 @@ def get_geometry(log_message, dom):
     return myGeometry
 
 
-def get_dates(log_message, dom):
+def get_dates(log_message, fields):
     """Get the start, mid scene and end dates.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param fields: Metadata values read with SPOT67_FIELDS.
+    :type fields: dict
 
     :return: A two-tuple of dates for the start, and mid scene
         respectively.
     :rtype: (datetime, datetime)
     """
-    start_date = dom.getElementsByTagName('UTC_Acquisition_Range')[0]
-    start_element = start_date.getElementsByTagName('START')[0]
-    start_date = start_element.firstChild.nodeValue
-    start_date = parse_date_time(start_date)
+    start_date = parse_date_time(fields['start'])
     log_message('Product Start Date: %s' % start_date, 2)
 
-    production_date = dom.getElementsByTagName('Production')[0]
-    product_date = production_date.getElementsByTagName('DATASET_PRODUCTION_DATE')[0]
-    center_date = product_date.firstChild.nodeValue
-    center_date = parse_date_time(center_date)
+    center_date = parse_date_time(fields['production_date'])
     log_message('Product Date: %s' % center_date, 2)
 
     return start_date, center_date
@@ -133,15 +133,12 @@ def get_band_count():
     return 5  # static value based on client information
 
 
-def get_orbit_number(dom):
-    value_orbit_number = dom.getElementsByTagName('ORBIT_NUMBER')[0]
-    orbit_number = value_orbit_number.firstChild.nodeValue
-    return orbit_number
+def get_orbit_number(fields):
+    return fields['orbit_number']
 
 
-def get_original_product_id(dom):
-    dataset_name = dom.getElementsByTagName('DATASET_NAME')[0]
-    product_name_full = dataset_name.firstChild.nodeValue
+def get_original_product_id(fields):
+    product_name_full = fields['dataset_name']
     tokens = product_name_full.split('_')
     # change according to Maite's explanation in kartoza/catalogue#496, constant always THUMBNAIL
     # if tokens[1] == "SPOT6":
@@ -162,14 +159,19 @@ def get_spatial_resolution_y():
     return 1.5
 
 
-def get_product_profile(log_message, dom):
+def get_mission_index(fields):
+    """Get the mission index of the scene e.g. 6 or 7."""
+    return fields['mission_index']
+
+
+def get_product_profile(log_message, mission_index_value):
     """Find the product_profile for this record.
 
     :param log_message: A log_message function used for user feedback.
     :type log_message: log_message
 
-    :param dom: Dom Document containing the bounds of the scene.
-    :type dom: DOM document.
+    :param mission_index_value: Mission index of the scene e.g. 6 or 7.
+    :type mission_index_value: str
 
     :return: A product profile for the given product.
     :rtype: OpticalProductProfile
@@ -177,11 +179,10 @@ def get_product_profile(log_message, dom):
     # We need type, sensor and mission so that we can look up the
     # OpticalProductProfile that applies to this product
     sensor_value = "NAOMI"
-    mission_index = dom.getElementsByTagName('PLATFORM_SERIAL_NUMBER')[0]
-    mission_index_value = mission_index.firstChild.nodeValue
 
     try:
-        instrument_type = InstrumentType.objects.get(
+        instrument_type = dictionary_resolver.get(
+            InstrumentType,
             operator_abbreviation=sensor_value)  # e.g. OLI_TIRS
     except Exception as e:
         # print e.message
@@ -194,38 +195,42 @@ def get_product_profile(log_message, dom):
         mission_value = 'S7'
     else:
         raise Exception('Unknown mission in SPOT')
-    satellite = Satellite.objects.get(abbreviation=mission_value)
+    satellite = dictionary_resolver.get(Satellite, abbreviation=mission_value)
 
     try:
-        satellite_instrument_group = SatelliteInstrumentGroup.objects.get(
+        satellite_instrument_group = dictionary_resolver.get(
+            SatelliteInstrumentGroup,
             satellite=satellite, instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument Group %s' %
                 satellite_instrument_group, 2)
     try:
-        satellite_instrument = SatelliteInstrument.objects.get(
+        satellite_instrument = dictionary_resolver.get(
+            SatelliteInstrument,
             satellite_instrument_group=satellite_instrument_group)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise e
     log_message('Satellite Instrument %s' % satellite_instrument, 2)
 
     try:
-        spectral_modes = SpectralMode.objects.filter(
+        spectral_modes = dictionary_resolver.filter(
+            SpectralMode,
             instrument_type=instrument_type)
     except Exception as e:
-        print(e.message)
+        print(e)
         raise
     log_message('Spectral Modes %s' % spectral_modes, 2)
 
     try:
-        product_profile = OpticalProductProfile.objects.get(
+        product_profile = dictionary_resolver.get(
+            OpticalProductProfile,
             satellite_instrument=satellite_instrument,
             spectral_mode__in=spectral_modes)
     except Exception as e:
-        print(e.message)
+        print(e)
         print('Searched for satellite instrument: %s and spectral modes %s' % (
             satellite_instrument, spectral_modes
         ))
@@ -242,7 +247,7 @@ def get_radiometric_resolution():
 
 def get_projection():
     # If projection not found default to WGS84
-    projection = Projection.objects.get(epsg_code=4326)
+    projection = dictionary_resolver.get(Projection, epsg_code=4326)
     return projection
 
 
@@ -252,10 +257,111 @@ def get_quality():
     :returns: A quality object fixed to 'unknown'.
     :rtype: Quality
     """
-    quality = Quality.objects.get(name='Unknown')
+    quality = dictionary_resolver.get(Quality, name='Unknown')
     return quality
 
 
+def parse_source(folder):
+    """Read the metadata of a SPOT 6/7 scene folder.
+
+    Runs in an ingest engine worker process, so no database access here.
+
+    :param folder: A SPOT 6/7 scene folder with one xml file.
+    :type folder: str
+
+    :returns: The plain values needed to create the product.
+    :rtype: dict
+    """
+    # Find the first and only xml file in the folder
+    xml_file = glob.glob(os.path.join(str(folder), '*.xml'))[0]
+    # Read the original text and the fields in one pass over the file
+    metadata, fields = read_metadata(xml_file, SPOT67_FIELDS)
+    start_date_time, center_date_time = get_dates(silent_log_message, fields)
+    return {
+        'folder': folder,
+        'metadata': metadata,
+        'geometry': get_geometry(silent_log_message, fields),
+        'start_date_time': start_date_time,
+        'center_date_time': center_date_time,
+        'original_product_id': get_original_product_id(fields),
+        'orbit_number': get_orbit_number(fields),
+        'mission_index': get_mission_index(fields)
+    }
+
+
+def resolve_record(log_message, record):
+    """Get the product field values of a parsed SPOT 6/7 scene.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :returns: OpticalProduct field values.
+    :rtype: dict
+    """
+    spatial_resolution_x = float(get_spatial_resolution_x())
+    spatial_resolution_y = float(get_spatial_resolution_y())
+    # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
+    spatial_resolution = (spatial_resolution_x + spatial_resolution_y) / 2
+    log_message('Spatial resolution: %s' % spatial_resolution, 2)
+    return {
+        'metadata': record['metadata'],
+        'spatial_coverage': record['geometry'],
+        'radiometric_resolution': get_radiometric_resolution(),
+        'band_count': get_band_count(),
+        'original_product_id': record['original_product_id'],
+        'unique_product_id': record['original_product_id'],
+        'spatial_resolution_x': spatial_resolution_x,
+        'spatial_resolution_y': spatial_resolution_y,
+        'spatial_resolution': spatial_resolution,
+        'product_profile': get_product_profile(
+            log_message, record['mission_index']),
+        'product_acquisition_start': record['start_date_time'],
+        'product_date': record['center_date_time'],
+        'orbit_number': record['orbit_number'],
+        'projection': get_projection(),
+        'quality': get_quality()
+    }
+
+
+def store_files(log_message, product, record, created):
+    """Copy the thumbnail of a new product into the thumbnail folder.
+
+    :param log_message: A log_message function used for user feedback.
+    :type log_message: log_message
+
+    :param product: The ingested product.
+    :type product: OpticalProduct
+
+    :param record: A record returned by parse_source.
+    :type record: dict
+
+    :param created: Whether the product was created by this run.
+    :type created: bool
+
+    :returns: The path of the stored thumbnail, None for existing products.
+    :rtype: str
+    """
+    if not created:
+        return None
+    # Store thumbnail where the product looks for it
+    thumbnail_file = product.thumbnailFile()
+    try:
+        os.makedirs(os.path.dirname(thumbnail_file))
+    except OSError:
+        # TODO: check for creation failure rather than
+        # attempt to  recreate an existing dir
+        pass
+
+    shutil.copyfile(
+        os.path.join(record['folder'], '%s.JPG' % product.original_product_id),
+        thumbnail_file)
+    log_message(thumbnail_file, 2)
+    return thumbnail_file
+
+
 def ingest(
         test_only_flag=True,
         source_path=(
@@ -263,7 +369,9 @@ def ingest(
                 'SPOT/'),
         verbosity_level=2,
         halt_on_error_flag=True,
-        ignore_missing_thumbs=False):
+        ignore_missing_thumbs=False,
+        workers=None,
+        resume_flag=True):
     """
     Ingest a collection of SPOT metadata folders.
 
@@ -285,6 +393,14 @@ def ingest(
     :param ignore_missing_thumbs: Whether we should raise an error
         if we find we are missing a thumbnails. Default is False.
     :type ignore_missing_thumbs: bool
+
+    :param workers: Number of processes parsing the metadata, defaults to the
+        number of cpus.
+    :type workers: int
+
+    :param resume_flag: Whether to skip the folders ingested by an earlier,
+        interrupted run. Default is True.
+    :type resume_flag: bool
     """
 
     def log_message(message, level=1):
@@ -310,195 +426,16 @@ def ingest(
     # The sub-folder names should be e.g.
     # L5-_TM-_HRF_SAM-_0176_00_0078_00_920606_080254_L0Ra_UTM34S
     log_message('Scanning folders in %s' % source_path)
-    # Loop through each folder found
 
     ingestor_version = 'SPOT ingestor version 1.1'
-    record_count = 0
-    updated_record_count = 0
-    created_record_count = 0
-    failed_record_count = 0
-    log_message('Starting directory scan...')
-
-    for myFolder in glob.glob(os.path.join(source_path, '*')):
-        record_count += 1
-        try:
-            log_message('---------------')
-            # Get the folder name
-            product_folder = os.path.split(myFolder)[-1]
-            log_message(product_folder)
-
-            # Find the first and only xml file in the folder
-            search_path = os.path.join(str(myFolder), '*.xml')
-            log_message(search_path)
-            xml_file = glob.glob(search_path)[0]
-            log_message(xml_file)
-
-            # Create a DOM document from the file
-            dom = parse(xml_file)
-            #
-            # First grab all the generic properties that any spot will have...
-            geometry = get_geometry(log_message, dom)
-            start_date_time, center_date_time = get_dates(
-                log_message, dom)
-            # projection for GenericProduct
-            projection = get_projection()
-            original_product_id = get_original_product_id(dom)
-            # Band count for GenericImageryProduct
-            band_count = get_band_count()
-            orbit_number = get_orbit_number(dom)
-            # # Spatial resolution x for GenericImageryProduct
-            spatial_resolution_x = float(get_spatial_resolution_x())
-            # # Spatial resolution y for GenericImageryProduct
-            spatial_resolution_y = float(
-                get_spatial_resolution_y())
-            log_message('Spatial resolution y: %s' % spatial_resolution_y)
-            #
-            # # Spatial resolution for GenericImageryProduct calculated as (x+y)/2
-            spatial_resolution = (spatial_resolution_x + spatial_resolution_y) / 2
-            log_message('Spatial resolution: %s' % spatial_resolution)
-            radiometric_resolution = get_radiometric_resolution()
-            log_message('Radiometric resolution: %s' % radiometric_resolution)
-            quality = get_quality()
-            # ProductProfile for OpticalProduct
-            product_profile = get_product_profile(log_message, dom)
-            # Get the original text file metadata
-            metadata_file = open(xml_file, 'rt')
-            metadata = metadata_file.readlines()
-            metadata_file.close()
-            log_message('Metadata retrieved')
-
-            unique_product_id = original_product_id
-            # Check if there is already a matching product based
-            # on original_product_id
-
-            # Do the ingestion here...
-            data = {
-                'metadata': metadata,
-                'spatial_coverage': geometry,
-                'radiometric_resolution': radiometric_resolution,
-                'band_count': band_count,
-                'original_product_id': original_product_id,
-                'unique_product_id': unique_product_id,
-                'spatial_resolution_x': spatial_resolution_x,
-                'spatial_resolution_y': spatial_resolution_y,
-                'spatial_resolution': spatial_resolution,
-                'product_profile': product_profile,
-                'product_acquisition_start': start_date_time,
-                'product_date': center_date_time,
-                'orbit_number': orbit_number,
-                'projection': projection,
-                'quality': quality
-            }
-            log_message(data)
-            # Check if it's already in catalogue:
-            try:
-                today = datetime.today()
-                time_stamp = today.strftime("%Y-%m-%d")
-                log_message('Time Stamp: %s' % time_stamp, 2)
-            except Exception as e:
-                print(e.message)
-
-            update_mode = True
-            try:
-                log_message('Trying to update')
-                # original_product_id is not necessarily unique
-                # so we use product_id
-                product = OpticalProduct.objects.get(
-                    original_product_id=original_product_id
-                ).getConcreteInstance()
-                log_message(('Already in catalogue: updating %s.'
-                             % original_product_id), 2)
-                new_record_flag = False
-                message = product.ingestion_log
-                message += '\n'
-                message += '%s : %s - updating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                product.__dict__.update(data)
-            except ObjectDoesNotExist:
-                log_message('Not in catalogue: creating.')
-                update_mode = False
-                message = '%s : %s - creating record' % (
-                    time_stamp, ingestor_version)
-                data['ingestion_log'] = message
-                try:
-                    product = OpticalProduct(**data)
-                    log_message('Product: %s' % product)
-
-                except Exception as e:
-                    log_message(e.message)
-
-                new_record_flag = True
-            except Exception as e:
-                print(e.message)
-
-            log_message('Saving product and setting thumb')
-            try:
-                product.save()
-                if update_mode:
-                    updated_record_count += 1
-                else:
-                    created_record_count += 1
-
-                    if test_only_flag:
-                        log_message('Testing: image not saved.')
-                        pass
-                    else:
-                        # Store thumbnail
-                        thumbs_folder = os.path.join(
-                            settings.THUMBS_ROOT,
-                            product.thumbnailDirectory())
-                        try:
-                            os.makedirs(thumbs_folder)
-                        except OSError:
-                            # TODO: check for creation failure rather than
-                            # attempt to  recreate an existing dir
-                            pass
-
-                        jpeg_path = os.path.join(str(myFolder))
-                        jpeg_path = jpeg_path.replace(".XML", "-THUMB.JPG")
-
-                        if jpeg_path:
-                            new_name = '%s.JPG' % product.original_product_id
-                            shutil.copyfile(
-                                os.path.join(jpeg_path, new_name),
-                                os.path.join(thumbs_folder, new_name))
-                            print(new_name)
-                        else:
-                            raise Exception('Missing thumbnail in %s' % jpeg_path)
-
-                if new_record_flag:
-                    log_message('Product %s imported.' % record_count)
-                    pass
-                else:
-                    log_message('Product %s updated.' % updated_record_count)
-                    pass
-            except Exception as e:
-                traceback.print_exc(file=sys.stdout)
-                raise CommandError('Cannot import: %s' % e)
-
-            if test_only_flag:
-                transaction.rollback()
-                log_message('Imported scene : %s' % product_folder)
-                log_message('Testing only: transaction rollback.')
-            else:
-                transaction.commit()
-                log_message('Imported scene : %s' % product_folder)
-        except Exception as e:
-            log_message('Record import failed. AAAAAAARGH! : %s' %
-                        product_folder, 1)
-            failed_record_count += 1
-            if halt_on_error_flag:
-                print(e.message)
-                break
-            else:
-                continue
-
-    # To decide: should we remove ingested product folders?
-
-    print('===============================')
-    print('Products processed : %s ' % record_count)
-    print('Products updated : %s ' % updated_record_count)
-    print('Products imported : %s ' % created_record_count)
-    print('Products failed to import : %s ' % failed_record_count)
-    print('===============================')
+    return ingest_sources(
+        glob.glob(os.path.join(source_path, '*')),
+        parse_source,
+        resolve_record,
+        ingestor_version,
+        log_message,
+        test_only_flag=test_only_flag,
+        halt_on_error_flag=halt_on_error_flag,
+        store_files=store_files,
+        checkpoint_path=get_checkpoint_path(source_path, resume_flag),
+        workers=workers)
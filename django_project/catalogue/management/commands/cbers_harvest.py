@@ -48,6 +48,25 @@ class Command(BaseCommand):
                 'Continue with importing records even if they miss their'
                 'thumbnails.'),
             default=False)
+        parser.add_argument(
+            '--workers',
+            '-w',
+            dest='workers',
+            action='store',
+            type=int,
+            help=(
+                'Number of processes parsing the metadata, defaults to the '
+                'number of cpus.'),
+            default=None)
+        parser.add_argument(
+            '--restart',
+            '-r',
+            dest='restart_flag',
+            action='store_true',
+            help=(
+                'Ignore the checkpoint of an interrupted run and import all '
+                'records again.'),
+            default=False)
 
     # noinspection PyDeprecation
     @staticmethod
@@ -73,5 +92,7 @@ class Command(BaseCommand):
             test_only_flag=test_only,
             verbosity_level=verbose,
             halt_on_error_flag=halt_on_error,
-            ignore_missing_thumbs=ignore_missing_thumbs
+            ignore_missing_thumbs=ignore_missing_thumbs,
+            workers=options.get('workers'),
+            resume_flag=not options.get('restart_flag')
         )
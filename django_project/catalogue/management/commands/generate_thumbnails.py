@@ -0,0 +1,98 @@
+"""
+SANSA-EO Catalogue - Thumbnail derivatives backfill - management command.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without express permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalogue.models import OpticalProduct
+from catalogue.thumbnails import (
+    pregenerate_thumbnails,
+    prune_derivatives,
+    source_fingerprint
+)
+
+
+class Command(BaseCommand):
+    """
+    Tool for rendering the small, medium, large and raw thumbnail
+    derivatives of all products in the archive.
+    """
+
+    help = 'Pregenerates thumbnail derivatives for all optical products'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            '-w',
+            dest='workers',
+            type=int,
+            help='Number of worker processes, defaults to the cpu count.',
+            default=None)
+        parser.add_argument(
+            '--chunk_size',
+            '-c',
+            dest='chunk_size',
+            type=int,
+            help='Number of products handed to the workers at once.',
+            default=10000)
+        parser.add_argument(
+            '--prune',
+            '-p',
+            dest='prune',
+            action='store_true',
+            help=(
+                'Remove the derivatives of thumbnails which changed or no '
+                'longer belong to a product.'),
+            default=False)
+
+    def _chunks(self, theChunkSize):
+        """Yield lists of source thumbnail paths."""
+        myProducts = OpticalProduct.objects.select_related(
+            'product_profile__satellite_instrument__satellite_instrument_group'
+            '__satellite'
+        ).defer('metadata', 'ingestion_log').order_by('pk')
+        myChunk = []
+        for myProduct in myProducts.iterator():
+            myChunk.append(myProduct.thumbnailFile())
+            if len(myChunk) >= theChunkSize:
+                yield myChunk
+                myChunk = []
+        if myChunk:
+            yield myChunk
+
+    def handle(self, *args, **options):
+        """ command execution """
+        verbose = int(options.get('verbosity'))
+        myPruneFlag = options.get('prune')
+        myStarted = time.time()
+        myFingerprints = set()
+        myRendered = 0
+        myProcessed = 0
+        for myChunk in self._chunks(options.get('chunk_size')):
+            myRendered += pregenerate_thumbnails(
+                myChunk, options.get('workers'))
+            myProcessed += len(myChunk)
+            if myPruneFlag:
+                for mySourceFile in myChunk:
+                    try:
+                        myFingerprints.add(source_fingerprint(mySourceFile))
+                    except OSError:
+                        continue
+            if verbose >= 2:
+                self.stdout.write('Products processed : %s' % myProcessed)
+        self.stdout.write('Products processed : %s' % myProcessed)
+        self.stdout.write('Thumbnails rendered : %s' % myRendered)
+        if myPruneFlag:
+            self.stdout.write('Thumbnails pruned : %s' % prune_derivatives(
+                myFingerprints, myStarted))
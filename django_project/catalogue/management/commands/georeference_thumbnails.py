@@ -0,0 +1,78 @@
+"""
+SANSA-EO Catalogue - Thumbnail georeferencing backfill - management command.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without express permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+from django.core.management.base import BaseCommand
+
+from catalogue.georeference import pregeoreference_thumbnails
+from catalogue.models import OpticalProduct
+
+
+class Command(BaseCommand):
+    """
+    Tool for georeferencing the thumbnails of all products in the archive,
+    so the kmz and metadata downloads find them georeferenced already.
+    """
+
+    help = 'Georeferences the thumbnails of all optical products'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            '-w',
+            dest='workers',
+            type=int,
+            help='Number of worker processes, defaults to the cpu count.',
+            default=None)
+        parser.add_argument(
+            '--chunk_size',
+            '-c',
+            dest='chunk_size',
+            type=int,
+            help='Number of products handed to the workers at once.',
+            default=1000)
+        parser.add_argument(
+            '--force',
+            '-f',
+            dest='force',
+            action='store_true',
+            help='Georeference thumbnails which are georeferenced already.',
+            default=False)
+
+    def _chunks(self, theChunkSize):
+        """Yield lists of products."""
+        myProducts = OpticalProduct.objects.select_related(
+            'product_profile__satellite_instrument__satellite_instrument_group'
+            '__satellite'
+        ).defer('metadata', 'ingestion_log').order_by('pk')
+        myChunk = []
+        for myProduct in myProducts.iterator():
+            myChunk.append(myProduct)
+            if len(myChunk) >= theChunkSize:
+                yield myChunk
+                myChunk = []
+        if myChunk:
+            yield myChunk
+
+    def handle(self, *args, **options):
+        """ command execution """
+        verbose = int(options.get('verbosity'))
+        myGeoreferenced = 0
+        myProcessed = 0
+        for myChunk in self._chunks(options.get('chunk_size')):
+            myGeoreferenced += pregeoreference_thumbnails(
+                myChunk, options.get('force'), options.get('workers'))
+            myProcessed += len(myChunk)
+            if verbose >= 2:
+                self.stdout.write('Products processed : %s' % myProcessed)
+        self.stdout.write('Products processed : %s' % myProcessed)
+        self.stdout.write('Thumbnails georeferenced : %s' % myGeoreferenced)
@@ -71,6 +71,27 @@ class Command(BaseCommand):
             dest='start_from',
             action='store',
             help='Start from a specific original ID')
+        parser.add_argument(
+            '--index',
+            '-i',
+            dest='index_flag',
+            action='store_true',
+            help=(
+                'Ingest in chunked transactions, reading only the features'
+                ' in the area of interest and resuming killed runs.'),
+            default=False)
+        parser.add_argument(
+            '--start-fid',
+            dest='start_fid',
+            action='store',
+            type=int,
+            help='With --index, start from a specific feature id.')
+        parser.add_argument(
+            '--restart',
+            dest='resume_flag',
+            action='store_false',
+            help='With --index, ignore the checkpoint of earlier runs.',
+            default=True)
 
     # noinspection PyDeprecation
     @staticmethod
@@ -98,6 +119,17 @@ class Command(BaseCommand):
             options.get('halt_on_error_flag'))
         start_from = options.get('start_from')
 
+        if options.get('index_flag'):
+            spot.ingest_index(
+                shapefile=shapefile,
+                area_of_interest=area,
+                test_only_flag=test_only_flag,
+                verbosity_level=verbose,
+                halt_on_error_flag=halt_on_error,
+                start_fid=options.get('start_fid'),
+                resume_flag=options.get('resume_flag'))
+            return
+
         spot.ingest(
             shapefile=shapefile,
             download_thumbs_flag=download_thumbs_flag,
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:05
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0002_allusersmessage_contact_continuousproduct_genericimageryproduct_genericproduct_genericsensorproduct_'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorldBorderPart',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometry', django.contrib.gis.db.models.fields.GeometryField(srid=4326)),
+                ('border', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='catalogue.WorldBorders')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='visit',
+            name='report_counted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(report_counted=False), fields=['report_counted'], name='visit_report_pending'),
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO catalogue_worldborderpart (border_id, geometry)
+            SELECT id, ST_Subdivide(geometry, 256)
+            FROM catalogue_worldborders;
+            """,
+            migrations.RunSQL.noop),
+    ]
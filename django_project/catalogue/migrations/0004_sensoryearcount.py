@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dictionaries', '0002_auto_20230606_1250'),
+        ('catalogue', '0003_worldborderpart_visit_report_counted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorYearCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('satellite_instrument_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='year_counts', to='dictionaries.SatelliteInstrumentGroup')),
+            ],
+            options={
+                'unique_together': {('satellite_instrument_group', 'year')},
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO catalogue_sensoryearcount (
+                satellite_instrument_group_id, year, count)
+            SELECT si.satellite_instrument_group_id,
+                extract(YEAR FROM gp.product_date)::int, count(*)
+            FROM catalogue_opticalproduct op
+            INNER JOIN catalogue_genericproduct gp ON
+                gp.id = op.genericsensorproduct_ptr_id
+            INNER JOIN dictionaries_opticalproductprofile opp ON
+                opp.id = op.product_profile_id
+            INNER JOIN dictionaries_satelliteinstrument si ON
+                si.id = opp.satellite_instrument_id
+            WHERE gp.product_date IS NOT NULL
+            GROUP BY 1, 2;
+            """,
+            migrations.RunSQL.noop),
+    ]
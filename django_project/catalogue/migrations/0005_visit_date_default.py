@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0004_sensoryearcount'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visit',
+            name='visit_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='DateAdded'),
+        ),
+    ]
@@ -2,3 +2,6 @@ from .products import *
 from .others import *
 from .signals import *
 from .website import *
+
+# connect the sensor year count signals
+from catalogue import sensorcounts  # noqa
@@ -12,7 +12,6 @@ Contact : lkleyn@sansa.org.za
    of Linfiniti Consulting CC.
 
 """
-from catalogue.utils import validate_params
 
 __author__ = 'tim@linfiniti.com'
 __version__ = '0.1'
@@ -20,81 +19,17 @@ __date__ = '09/08/2012'
 __copyright__ = 'South African National Space Agency'
 
 from django.contrib.gis.db import models
+from django.db import connection
+from django.utils import timezone
 # for user id foreign keys
 from django.contrib.auth.models import User
 
 from offline_messages.models import OfflineMessage
 from offline_messages.utils import create_offline_message, constants
 
-from catalogue.dbhelpers import executeRAWSQL
-
 
 ###############################################################################
 
-class VisitHelpersManager(models.Manager):
-    """
-    Visit model helper methods
-    """
-
-    def country_stats(self, **kwargs):
-        """
-        Count visits per country
-
-        NOTE: We need to use executeRAWSQL as manager.raw method requires
-        PrimaryKey to be returned which is then used to map objects back to the
-        model
-
-        sort_col and sort_order used to allow for sorting of data in rendered
-        table in view.
-
-        :param kwargs: Includes sort_col and sort_order
-        """
-        sort_col = kwargs.get('sort_col', None)
-        sort_order = kwargs.get('sort_order', None)
-        valid_sort_col, valid_sort_order = validate_params(
-            sort_col, sort_order,
-            'count', 'DESC'
-        )
-        results = executeRAWSQL(
-            """
-            SELECT LOWER(country) as country,
-            COUNT(*) AS count
-            FROM catalogue_visit WHERE country != 'South Africa'
-            GROUP BY LOWER(country)
-            ORDER BY %s %s;
-            """ % (valid_sort_col, valid_sort_order)
-        )
-        return results
-
-    def monthly_report(self, the_date, **kwargs):
-        """
-        Count visits per country for each month
-
-        sort_col and sort_order used to allow for sorting of data in rendered
-        table in view.
-        :param kwargs: Contains sort_col and sort_order for table rendering
-        :param the_date: The requested date for the report
-        """
-        sort_col = kwargs.get('sort_col', None)
-        sort_order = kwargs.get('sort_order', None)
-        valid_sort_col, valid_sort_order = validate_params(
-            sort_col, sort_order,
-            'count', 'DESC'
-        )
-        raw_str = """SELECT LOWER(country) as country, count(*) as count,
-            DATE_TRUNC('month', visit_date) as month
-            FROM catalogue_visit WHERE (country != 'South Africa'
-            AND visit_date BETWEEN to_date({{date}},'MM-YYYY')
-                AND to_date({{date}},'MM-YYYY')+ interval '1 month')
-            GROUP BY LOWER(country),DATE_TRUNC('month',visit_date)
-            ORDER BY %s %s;""" % (valid_sort_col, valid_sort_order)
-        raw_sql = raw_str.replace('{{date}}', '%(date)s')
-        results = executeRAWSQL(raw_sql, {
-            'date': the_date.strftime('%m-%Y'),
-        })
-        return results
-
-
 class Visit(models.Model):
     """
     Each time a visitor to the site arrives to the front page we will log
@@ -105,23 +40,27 @@ class Visit(models.Model):
     country = models.CharField('Country', max_length=255)
     ip_address = models.GenericIPAddressField('IP Address')
     ip_position = models.PointField('IP Lat/Long', srid=4326)
-    visit_date = models.DateTimeField(
-        'DateAdded', auto_now=True, auto_now_add=False
-    )
+    visit_date = models.DateTimeField('DateAdded', default=timezone.now)
     user = models.ForeignKey(
         User,
         null=True,
         blank=True,
         on_delete=models.CASCADE
     )
+    # whether the visit was added to the report rollups
+    report_counted = models.BooleanField(default=False, editable=False)
     objects = models.Manager()
-    helpers = VisitHelpersManager()
 
     class Meta:
         app_label = 'catalogue'
         verbose_name = 'Visit'
         verbose_name_plural = 'Visits'
         ordering = ('visit_date',)
+        indexes = [
+            models.Index(
+                fields=['report_counted'], name='visit_report_pending',
+                condition=models.Q(report_counted=False))
+        ]
 
 
 class VisitorReport(models.Model):
@@ -161,6 +100,60 @@ class WorldBorders(models.Model):
         app_label = 'catalogue'
 
 
+class WorldBorderPart(models.Model):
+    """
+    A border split into small polygons by ST_Subdivide
+
+    Country lookups intersect points and areas with the parts, which only
+    have a few hundred vertices each and are spatially indexed, rather than
+    with the full resolution border.
+    """
+    border = models.ForeignKey(
+        WorldBorders,
+        related_name='parts',
+        on_delete=models.CASCADE
+    )
+    geometry = models.GeometryField(srid=4326)
+
+    objects = models.Manager()
+
+    class Meta:
+        app_label = 'catalogue'
+
+
+# maximum number of vertices of a border part
+WORLD_BORDER_PART_VERTICES = 256
+
+SUBDIVIDE_WORLD_BORDERS_SQL = """
+DELETE FROM catalogue_worldborderpart WHERE border_id = ANY(%(ids)s);
+INSERT INTO catalogue_worldborderpart (border_id, geometry)
+SELECT id, ST_Subdivide(geometry, %(vertices)s)
+FROM catalogue_worldborders WHERE id = ANY(%(ids)s);
+"""
+
+
+def subdivide_world_borders(border_ids=None):
+    """
+    (Re)build the parts of world borders
+
+    :param border_ids: Ids of the borders to subdivide, None for all of them
+    """
+    if border_ids is None:
+        border_ids = WorldBorders.objects.values_list('id', flat=True)
+    with connection.cursor() as cursor:
+        cursor.execute(SUBDIVIDE_WORLD_BORDERS_SQL, {
+            'ids': list(border_ids),
+            'vertices': WORLD_BORDER_PART_VERTICES
+        })
+
+
+def update_world_border_parts(sender, instance, **kwargs):
+    """
+    Subdivide a saved border, the world_borders loader saves one at a time
+    """
+    subdivide_world_borders([instance.pk])
+
+
 world_borders_mapping = {
     'iso2': 'ISO2',
     'iso3': 'ISO3',
@@ -169,6 +162,28 @@ world_borders_mapping = {
 }
 
 
+class SensorYearCount(models.Model):
+    """
+    Number of optical products of a sensor with a product date in a year
+
+    Maintained by catalogue.sensorcounts when products are written, it backs
+    the data summary table and the yearly product counts of the sensors.
+    """
+    satellite_instrument_group = models.ForeignKey(
+        'dictionaries.SatelliteInstrumentGroup',
+        related_name='year_counts',
+        on_delete=models.CASCADE
+    )
+    year = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    objects = models.Manager()
+
+    class Meta:
+        app_label = 'catalogue'
+        unique_together = ('satellite_instrument_group', 'year')
+
+
 class AllUsersMessage(models.Model):
     """A simple model for creating messages to broadcase to all users."""
     message = models.TextField()
@@ -188,3 +203,7 @@ class AllUsersMessage(models.Model):
                 create_offline_message(
                     myUser, self.message, level=constants.INFO)
         super(AllUsersMessage, self).save(*args, **kwargs)
+
+
+models.signals.post_save.connect(
+    update_world_border_parts, sender=WorldBorders)
@@ -30,10 +30,12 @@ from django.template.loader import render_to_string
 # for translation
 from django.core.exceptions import ObjectDoesNotExist
 # PIL and os needed for making small thumbs
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image, ImageFilter
 
 from dictionaries.models import ProcessingLevel
 
+from catalogue.georeference import georeference_thumbnail
+from catalogue.thumbnails import get_thumbnail
 from catalogue.utmzonecalc import utmZoneOverlap
 from catalogue.dims_lib import dimsWriter
 
@@ -164,6 +166,33 @@ def sortCandidates(theCandidates, theExtents, theCentroid):
 #####################################################3
 
 
+def formatProductName(theSatellite, theInstrumentType, thePath, theRow,
+                      theSpectralMode):
+    """
+    Return the name of a product from its dictionary abbreviations
+
+    Args:
+        theSatellite - abbreviation of the satellite
+        theInstrumentType - abbreviation of the instrument type
+        thePath - path of the product or None
+        theRow - row of the product or None
+        theSpectralMode - abbreviation of the spectral mode
+    Returns:
+        str - e.g. 'L5 TM 170 078 MS', unknown path and row are 'UNK'
+    """
+    if thePath and theRow:
+        format_string = '{0} {1} {2:03d} {3:03d} {4}'
+    elif thePath and theRow is None:
+        format_string = '{0} {1} {2:03d} UNK {4}'
+    elif thePath is None and theRow:
+        format_string = '{0} {1} UNK {3:03d} {4}'
+    else:
+        format_string = '{0} {1} UNK UNK {4}'
+
+    return format_string.format(
+        theSatellite, theInstrumentType, thePath, theRow, theSpectralMode)
+
+
 def runconcrete(func):
     """
     This decorator calls the method in the concrete subclass
@@ -299,125 +328,29 @@ class GenericProduct(models.Model):
         """
         pass
 
+    def thumbnailFile(self):
+        """
+        Returns the full path of the source thumb for this product
+        """
+        return os.path.join(
+            settings.THUMBS_ROOT, self.thumbnailDirectory(),
+            self.product_id + '.jpg')
+
     def thumbnail(self, theSize):
         """
         Return a thumbnail for this product of size "small" - 16x16, "medium" -
         200x200 or "large" - 400x400
 
-        If a cached copy of the resampled thumb exists, that will be returned
-        directly
+        The scaled thumb is served from the thumbnail derivative cache, see
+        catalogue.thumbnails, and rendered there if it was not pregenerated
 
         @param a string "small","medium" or "large" - defaults to small
 
         @return a PIL image object.
         """
-        if theSize not in ['medium', 'large', 'raw']:
-            theSize = 'small'
-
-        mySize = 16
-        if theSize == 'medium':
-            mySize = 200
-        elif theSize == 'large':
-            mySize = 400
-
         logger.info('showThumb : id ' + self.product_id)
-        myImageFile = os.path.join(
-            self.thumbnailDirectory(), self.product_id + '.jpg')
-        myFileName = str(settings.THUMBS_ROOT) + '/' + myImageFile
-
-        myThumbDir = os.path.join(
-            settings.THUMBS_ROOT, self.thumbnailDirectory())
-        # Paths for cache of scaled down thumbs (to reduce processing load)
-        myCacheThumbDir = os.path.join(
-            settings.THUMBS_ROOT, 'cache', theSize, self.thumbnailDirectory())
-        myCacheImage = os.path.join(myCacheThumbDir, self.product_id + '.jpg')
-        #
-        # Check if there is a scaled down version already cached and just
-        # return that if there is
-        #
-        if os.path.isfile(myCacheImage):
-            myImage = Image.open(myCacheImage)
-            return (myImage)
-
-        #
-        # Cached minified thumb not available so lets make it!
-        #
-
-        # Hack to automatically fetch spot or other non local thumbs from their
-        # catalogue and store them locally
-        # if self.remote_thumbnail_url and not os.path.exists(myFileName):
-        #     if not os.path.isdir(myThumbDir):
-        #         logger.debug('Creating dir: %s' % myThumbDir)
-        #         try:
-        #             os.makedirs(myThumbDir)
-        #         except OSError:
-        #             logger.debug('Failed to make output directory...quitting')
-        #             return 'Failed to make output dir.'
-        #     logger.debug('Fetching image: %s' % self.remote_thumbnail_url)
-        #     myOpener = urllib2.build_opener()
-        #     myImagePage = myOpener.open(self.remote_thumbnail_url)
-        #     myImage = myImagePage.read()
-        #     logger.debug('Image fetched, saving as %s' % myImageFile)
-        #     myWriter = open(os.path.join(
-        #         settings.THUMBS_ROOT, myImageFile), 'wb')
-        #     myWriter.write(myImage)
-        #     myWriter.close()
-        #     self.remote_thumbnail_url = ""
-        #     self.save()
-
-        # Specify background colour, should be the same as div background
-        myBackgroundColour = (255, 255, 255)
-        myAngle = 0
-        myShadowFlag = False
-        # logger.info('Creating thumbnail of : ' + myFileName)
-        # logger.info('Thumbnail path:   ' + str(settings.THUMBS_ROOT))
-
-        if not os.path.isfile(myFileName):
-            # file does not exist so show an error icon
-            # return HttpResponse("%s not found" % myFileName)
-            myFileName = os.path.join(
-                settings.ABS_PATH('core', 'base_static'), 'images',
-                'block_16.png')
-            myImage = Image.open(myFileName)
-            return (myImage)
-
-        try:
-            myImage = Image.open(myFileName)
-        except:
-            # file is not valid for some reason so show an error icon
-            myFileName = os.path.join(
-                settings.ABS_PATH('core', 'base_static'), 'images',
-                'block_16.png')
-            myImage = Image.open(myFileName)
-            return (myImage)
-
-        if len(myImage.getbands()) < 3:
-            myImage = ImageOps.expand(myImage, border=5, fill=(255))
-        else:
-            myImage = ImageOps.expand(myImage, border=5, fill=(255, 255, 255))
-        myBackground = None
-        if myShadowFlag:
-            myImage = self.dropShadow(
-                myImage.convert('RGBA')).rotate(myAngle, expand=1)
-            myBackground = Image.new('RGBA', myImage.size, myBackgroundColour)
-            myBackground.paste(myImage, (0, 0), myImage)
-        else:
-            myBackground = Image.new('RGBA', myImage.size, myBackgroundColour)
-            myBackground.paste(myImage, (0, 0))
-        if theSize != 'raw':
-            myBackground.thumbnail((mySize, mySize), Image.ANTIALIAS)
-
-        # Now cache the scaled thumb for faster access next time...
-        if not os.path.isdir(myCacheThumbDir):
-            logger.debug('Creating dir: %s' % myCacheThumbDir)
-            try:
-                os.makedirs(myCacheThumbDir)
-            except OSError:
-                logger.debug('Failed to make output directory...quitting')
-                return 'Failed to make output dir'
-        logger.debug('Caching image : %s' % myCacheImage)
-        myBackground.save(myCacheImage)
-        return (myBackground)
+        myImageFile, _, _ = get_thumbnail(self.thumbnailFile(), theSize)
+        return Image.open(myImageFile)
 
     def dropShadow(
             theImage,
@@ -458,46 +391,34 @@ class GenericProduct(models.Model):
 
         return myBackground
 
-    def georeferencedThumbnail(self, force_flag=False):
+    def georeferencedThumbnailJob(self, force_flag=False):
         """
-        Return the full path to the georeferenced thumb. Will actually do the
-        georeferencing of the thumb if needed.
-
-        return thumb full path, e.g.
-        myJpg = product.georeferencing()
+        Return the arguments for georeference_thumbnail or None if there is
+        no thumbnail or it is already georeferenced.
 
-        To get the world file, simply add a .wld extention to the return var
-        We dont return it explicitly as we can only return a single param
-        if we want to use this method in template.
-        Be careful of using the force flag - some of the thumbs (e.g. newer
-        imports from acs) are already georeferenced natively and referencing
-        them again will give them an additional rotation.
+        Only this part needs the database, the georeferencing itself can run
+        in a worker process.
         """
         input_image_file = os.path.join(
             settings.THUMBS_ROOT, self.thumbnailDirectory(),
             self.product_id + '.jpg')
-        try:
-            image = Image.open(input_image_file)
-            # We need to know the pixel dimensions of the segment so that we
-            # can create GCP's
-        except:
-            logger.info('File not found %s' % input_image_file)
-            return 'no file'
-        tmp_tif_file = os.path.join('/tmp/', self.product_id + '.tif')
-        tmp_tif_referenced = os.path.join(
-            '/tmp/', self.product_id + 'reffed.tif')
         jpg_file = os.path.join(
             settings.THUMBS_ROOT, self.thumbnailDirectory(),
             self.product_id + '-reffed.jpg')
-
-        log_file = open(os.path.join(
-            settings.THUMBS_ROOT, self.thumbnailDirectory(),
-            self.product_id + '-reffed.log'), 'w')
         if os.path.exists(jpg_file) and not force_flag:
-            return jpg_file
-            # Get the minima, maxima - used to test if we are on the edge
+            return None
+        if not os.path.isfile(input_image_file):
+            logger.info('File not found %s' % input_image_file)
+            return None
+        return (input_image_file, jpg_file, self.thumbnailCorners())
+
+    def thumbnailCorners(self):
+        """
+        Return the top left, top right, bottom right and bottom left
+        coordinates of the product footprint.
+        """
+        # Get the minima, maxima - used to test if we are on the edge
         extents = self.spatial_coverage.extent
-        # print "Envelope: %s %s" % (len(extents), str(extents))
         # There should only be 4 vertices touching the edges of the
         # bounding box of the shape. If we assume that the top right
         # corner of the poly is on the right edge of the bbox, the
@@ -509,22 +430,11 @@ class GenericProduct(models.Model):
         # Note the above logic makes some assumptions about the oreintation of
         # the swath which may not hold true for every sensor.
         #
-        print(extents)
-        image_x_dim = image.size[0]
-        image_y_dim = image.size[1]
-        candidates = []
         # should only be a single arc in our case!
-        coverage_coords = self.spatial_coverage.coords
-        arc = coverage_coords[0]  # first arc
-        print(coverage_coords)
-        try:
-            for coord in arc[:-1]:
-                if coordIsOnBounds(coord, extents):
-                    candidates.append(coord)
-        except:
-            raise
-
-        print("Candidates on bounds intersection: %s %s " % (
+        arc = self.spatial_coverage.coords[0]  # first arc
+        candidates = [
+            coord for coord in arc[:-1] if coordIsOnBounds(coord, extents)]
+        logger.debug('Candidates on bounds intersection: %s %s' % (
             len(candidates), str(candidates)))
 
         # If the image footprint is not truly rectangular we wont find 4
@@ -534,56 +444,38 @@ class GenericProduct(models.Model):
         if len(candidates) < 4:
             candidates = list(arc[1:])  # convert from tuple to list
 
-        print("Candidates Before: %s %s " % (
-            len(candidates), str(candidates)))
-        centroid = self.spatial_coverage.centroid
+        candidates = sortCandidates(
+            candidates, extents, self.spatial_coverage.centroid)
+        return tuple(tuple(coord) for coord in candidates[:4])
+
+    def georeferencedThumbnail(self, force_flag=False):
+        """
+        Return the full path to the georeferenced thumb. Will actually do the
+        georeferencing of the thumb if needed.
+
+        return thumb full path, e.g.
+        myJpg = product.georeferencing()
+
+        To get the world file, simply add a .wld extention to the return var
+        We dont return it explicitly as we can only return a single param
+        if we want to use this method in template.
+        Be careful of using the force flag - some of the thumbs (e.g. newer
+        imports from acs) are already georeferenced natively and referencing
+        them again will give them an additional rotation.
+        """
+        jpg_file = os.path.join(
+            settings.THUMBS_ROOT, self.thumbnailDirectory(),
+            self.product_id + '-reffed.jpg')
+        job = self.georeferencedThumbnailJob(force_flag)
+        if job is None:
+            if os.path.exists(jpg_file):
+                return jpg_file
+            return 'no file'
         try:
-            candidates = sortCandidates(candidates, extents, centroid)
-        except:
-            raise
-            # print "Candidates After: %s %s " % (
-        #    len(candidates), str(candidates))
-        tl = candidates[0]
-        tr = candidates[1]
-        br = candidates[2]
-        bl = candidates[3]
-
-        string = (
-                'gdal_translate -a_srs "EPSG:4326" -gcp 0 0 %s %s -gcp %s 0 %s %s '
-                '-gcp %s %s %s %s -gcp 0 %s %s %s -of GTIFF -co COMPRESS=DEFLATE '
-                '-co TILED=YES %s %s' % (
-                    tl[0], tl[1],
-                    image_x_dim, tr[0], tr[1],
-                    image_x_dim, image_y_dim, br[0], br[1],
-                    image_y_dim, bl[0], bl[1],
-                    input_image_file,
-                    tmp_tif_file))
-        os.system(string)
-        log_file.write(string + "\n")
-        # now gdalwarp the file onto itself so that the gcps are used to
-        # georeference the file
-        string = 'gdalwarp %s %s' % (tmp_tif_file, tmp_tif_referenced)
-        log_file.write(string + "\n")
-        os.system(string)
-        # TODO : nicer way to call gdal e.g.
-        # subprocess.check_call(["gdal_translate", "-q", "-co", "worldfile=on",
-        #                       "-of", "JPEG", downloaded_thumb, jpeg_thumb])
-        # Now convert the tif to a jpg
-        string = 'gdal_translate -of JPEG -co WORLDFILE=YES %s %s' % (
-            tmp_tif_referenced, jpg_file)
-        log_file.write(string + "\n")
-        os.system(string)
-        log_file.close()
-        # Clean away the tiff and copy the referenced jpg over to the thumb dir
-        os.remove(tmp_tif_file)
-        os.remove(tmp_tif_referenced)
-        # print "Image X size: %s" % image_x_dim
-        # print "Image Y size: %s" % image_y_dim
-        # print "Top left X: %s, Y:%s" %(tl[0],tl[1])
-        # print "Top right X: %s, Y:%s" %(tr[0],tr[1])
-        # print "Bottom left X: %s, Y:%s" %(bl[0],bl[1])
-        # print "Bottom right X: %s, Y:%s" %(br[0],br[1])
-        return jpg_file
+            return georeference_thumbnail(*job)
+        except RuntimeError as e:
+            logger.error('Failed to georeference %s: %s' % (job[0], e))
+            return 'no file'
 
     @runconcrete
     def productDirectory(self):
@@ -652,8 +544,7 @@ class GenericProduct(models.Model):
 
     def get_concrete_product(self):
         """
-        Downcast a product to its subtype using technique described here:
-        http://docs.djangoproject.com/en/dev/topics/db/models/#id7
+        Downcast a product to its subtype, see resolveConcreteProducts
 
         @return Object, String :
 
@@ -664,34 +555,15 @@ class GenericProduct(models.Model):
             String : e.g. "Optical", "Radar" etc representing what type of
                 object was found.
         """
-        try:
-            return (
-                self.genericimageryproduct.genericsensorproduct.opticalproduct,
-                "Optical")
-        except:
-            pass
-        try:
-            return (
-                self.genericimageryproduct.genericsensorproduct.radarproduct,
-                "Radar")
-        except:
-            pass
-        try:
-            return (self.genericimageryproduct, "Imagery")
-        except:
-            pass
-        try:
-            return (self.geospatialproduct.ordinalproduct, "Ordinal")
-        except:
-            pass
-        try:
-            return (self.geospatialproduct.continuousproduct, "Continuous")
-        except:
-            pass
-
-        # ABP: raise exception instead of returning None, "Error - product not
-        # found"
-        raise ObjectDoesNotExist()
+        # the concrete product is remembered by resolveConcreteProducts
+        if CONCRETE_PRODUCT_MEMO not in self.__dict__:
+            resolveConcreteProducts([self])
+        myConcreteProduct = self.__dict__.get(CONCRETE_PRODUCT_MEMO)
+        if myConcreteProduct is None:
+            # ABP: raise exception instead of returning None, "Error - product
+            # not found"
+            raise ObjectDoesNotExist()
+        return myConcreteProduct
 
     def getConcreteInstance(self):
         """
@@ -1190,16 +1062,7 @@ class OpticalProduct(GenericSensorProduct):
         """
         Returns product name as specified
         """
-        if self.path and self.row:
-            format_string = '{0} {1} {2:03d} {3:03d} {4}'
-        elif self.path and self.row is None:
-            format_string = '{0} {1} {2:03d} UNK {4}'
-        elif self.path is None and self.row:
-            format_string = '{0} {1} UNK {3:03d} {4}'
-        else:
-            format_string = '{0} {1} UNK UNK {4}'
-
-        return format_string.format(
+        return formatProductName(
             (
                 self.product_profile.satellite_instrument
                     .satellite_instrument_group.satellite.abbreviation
@@ -1459,3 +1322,75 @@ class ContinuousProduct(GenericProduct):
         return render_to_string(
             'productTypes/continuousProduct.html', {
                 'myObject': self, 'imageIsLocalFlag': theImageIsLocal})
+
+
+###############################################################################
+
+# instance attribute holding the (concrete product, type name) of a product
+CONCRETE_PRODUCT_MEMO = '_concrete_product'
+
+# concrete product classes in the order products are downcast to them
+CONCRETE_PRODUCT_TYPES = (
+    (OpticalProduct, 'Optical'),
+    (RadarProduct, 'Radar'),
+    (GenericImageryProduct, 'Imagery'),
+    (OrdinalProduct, 'Ordinal'),
+    (ContinuousProduct, 'Continuous')
+)
+
+# product classes without subclasses, instances of them are concrete
+LEAF_PRODUCT_TYPES = {
+    OpticalProduct: 'Optical',
+    RadarProduct: 'Radar',
+    OrdinalProduct: 'Ordinal',
+    ContinuousProduct: 'Continuous'
+}
+
+
+def resolveConcreteProducts(theProducts):
+    """
+    Downcast many products with one query per concrete product table
+
+    Each product remembers its concrete instance, so get_concrete_product
+    and getConcreteInstance calls on it need no further queries.
+
+    Args:
+        theProducts - iterable of GenericProduct (or subclass) instances
+    Returns:
+        list - the concrete instance of each product, None for products
+            which could not be downcast
+    Exceptions:
+        None
+    """
+    myProducts = list(theProducts)
+    myPending = {}
+    for myProduct in myProducts:
+        if CONCRETE_PRODUCT_MEMO in myProduct.__dict__:
+            continue
+        myType = LEAF_PRODUCT_TYPES.get(type(myProduct))
+        if myType is not None:
+            setattr(myProduct, CONCRETE_PRODUCT_MEMO, (myProduct, myType))
+        elif myProduct.pk is not None:
+            myPending.setdefault(myProduct.pk, []).append(myProduct)
+
+    for myClass, myType in CONCRETE_PRODUCT_TYPES:
+        if not myPending:
+            break
+        for myPk, myConcreteProduct in myClass.objects.in_bulk(
+                list(myPending)).items():
+            setattr(
+                myConcreteProduct, CONCRETE_PRODUCT_MEMO,
+                (myConcreteProduct, myType))
+            for myProduct in myPending.pop(myPk):
+                setattr(
+                    myProduct, CONCRETE_PRODUCT_MEMO,
+                    (myConcreteProduct, myType))
+    # remember products without concrete instance too
+    for myUnresolved in myPending.values():
+        for myProduct in myUnresolved:
+            setattr(myProduct, CONCRETE_PRODUCT_MEMO, None)
+    myConcreteProducts = []
+    for myProduct in myProducts:
+        myMemo = myProduct.__dict__.get(CONCRETE_PRODUCT_MEMO)
+        myConcreteProducts.append(myMemo[0] if myMemo else None)
+    return myConcreteProducts
@@ -22,6 +22,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 from django.contrib.gis.db import models
+from django.dispatch import Signal
 
 from catalogue.models.products import (
     OpticalProduct,
@@ -29,6 +30,10 @@ from catalogue.models.products import (
     GenericImageryProduct,
 )
 
+# sent after products were saved with bulk_create or bulk_update, which do
+# not send pre_save or post_save
+products_bulk_saved = Signal(providing_args=['product_ids'])
+
 
 def setGenericProductDate(sender, instance, **kwargs):
     """
@@ -0,0 +1,178 @@
+"""
+SANSA-EO Catalogue - Yearly product counts per sensor
+
+The counts in SensorYearCount are adjusted whenever optical products are
+written: saved and deleted products through signals and products written
+with bulk_update by the ingest engine, in the transaction which writes them.
+rebuild_sensor_year_counts recounts all products, e.g. after products were
+moved to another sensor in the dictionaries.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from collections import Counter
+
+from django.contrib.gis.db import models
+from django.db import connection, transaction
+from django.db.models import Max, Min, Sum
+
+from catalogue.ingestors.resolver import dictionary_resolver
+from catalogue.models import OpticalProduct
+from dictionaries.models import (
+    OpticalProductProfile,
+    SatelliteInstrument,
+    SatelliteInstrumentGroup
+)
+
+UPDATE_SENSOR_YEAR_COUNTS_SQL = """
+INSERT INTO catalogue_sensoryearcount (satellite_instrument_group_id, year,
+    count)
+SELECT * FROM unnest(%(groups)s::integer[], %(years)s::integer[],
+    %(counts)s::integer[])
+ON CONFLICT (satellite_instrument_group_id, year) DO UPDATE
+SET count = catalogue_sensoryearcount.count + EXCLUDED.count;
+"""
+
+REBUILD_SENSOR_YEAR_COUNTS_SQL = """
+DELETE FROM catalogue_sensoryearcount;
+INSERT INTO catalogue_sensoryearcount (satellite_instrument_group_id, year,
+    count)
+SELECT si.satellite_instrument_group_id,
+    extract(YEAR FROM gp.product_date)::int, count(*)
+FROM catalogue_opticalproduct op
+INNER JOIN catalogue_genericproduct gp ON
+    gp.id = op.genericsensorproduct_ptr_id
+INNER JOIN dictionaries_opticalproductprofile opp ON
+    opp.id = op.product_profile_id
+INNER JOIN dictionaries_satelliteinstrument si ON
+    si.id = opp.satellite_instrument_id
+WHERE gp.product_date IS NOT NULL
+GROUP BY 1, 2;
+"""
+
+
+def sensor_year_key(product_profile_id, product_date):
+    """Return the (sensor id, year) a product is counted in.
+
+    :param product_profile_id: Id of the OpticalProductProfile of the product.
+    :param product_date: The product date.
+    :returns: (SatelliteInstrumentGroup id, year), None when the product has
+        no profile or date.
+    """
+    if product_profile_id is None or product_date is None:
+        return None
+    try:
+        profile = dictionary_resolver.get(
+            OpticalProductProfile, id=product_profile_id)
+    except OpticalProductProfile.DoesNotExist:
+        # the profile is newer than the cached dictionaries of this process
+        dictionary_resolver.invalidate()
+        profile = dictionary_resolver.get(
+            OpticalProductProfile, id=product_profile_id)
+    instrument = dictionary_resolver.get(
+        SatelliteInstrument, id=profile.satellite_instrument_id)
+    return instrument.satellite_instrument_group_id, product_date.year
+
+
+def update_sensor_year_counts(deltas):
+    """Add count changes to the yearly product counts in one statement.
+
+    :param deltas: Count change by (sensor id, year).
+    :type deltas: Counter
+    """
+    deltas = sorted(
+        (key, delta) for key, delta in deltas.items()
+        if key is not None and delta)
+    if not deltas:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(UPDATE_SENSOR_YEAR_COUNTS_SQL, {
+            'groups': [key[0] for key, _ in deltas],
+            'years': [key[1] for key, _ in deltas],
+            'counts': [delta for _, delta in deltas]
+        })
+
+
+def rebuild_sensor_year_counts():
+    """Recount the yearly product counts of all sensors."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(REBUILD_SENSOR_YEAR_COUNTS_SQL)
+
+
+def sensor_summaries():
+    """Return the product count and year range of the sensors with products.
+
+    :returns: A dict per sensor, ordered by satellite name, with the keys
+        used by the data summary table.
+    :rtype: list
+    """
+    sensors = SatelliteInstrumentGroup.objects.filter(
+        year_counts__count__gt=0
+    ).annotate(
+        id__count=Sum('year_counts__count'),
+        min_year=Min('year_counts__year'),
+        max_year=Max('year_counts__year')
+    ).select_related('satellite', 'instrument_type').order_by(
+        'satellite__name')
+    return [{
+        'satellite_name': sensor.satellite.name,
+        'instrument_type': sensor.instrument_type.name,
+        'satellite_abbr': str(sensor.satellite.abbreviation),
+        'instrument_abbr': str(sensor.instrument_type.abbreviation),
+        'satellite_operator_abbr': str(
+            sensor.satellite.operator_abbreviation),
+        'instrument_operator_abbr': str(
+            sensor.instrument_type.operator_abbreviation),
+        'id__count': sensor.id__count,
+        'min_year': sensor.min_year,
+        'max_year': sensor.max_year
+    } for sensor in sensors]
+
+
+def remember_sensor_year_key(sender, instance, **kwargs):
+    """Remember the counted key of a product before it is saved."""
+    instance._sensor_year_key = None
+    if instance.pk is None:
+        return
+    saved = OpticalProduct.objects.filter(pk=instance.pk).values_list(
+        'product_profile_id', 'product_date').first()
+    if saved is not None:
+        instance._sensor_year_key = sensor_year_key(*saved)
+
+
+def count_saved_product(sender, instance, **kwargs):
+    """Move a saved product to the count of its sensor and year."""
+    old_key = getattr(instance, '_sensor_year_key', None)
+    new_key = sensor_year_key(
+        instance.product_profile_id, instance.product_date)
+    if old_key != new_key:
+        update_sensor_year_counts(Counter({old_key: -1, new_key: 1}))
+
+
+def count_deleted_product(sender, instance, **kwargs):
+    """Remove a deleted product from the count of its sensor and year."""
+    update_sensor_year_counts(Counter({
+        sensor_year_key(
+            instance.product_profile_id, instance.product_date): -1}))
+
+
+models.signals.pre_save.connect(
+    remember_sensor_year_key, sender=OpticalProduct)
+models.signals.post_save.connect(
+    count_saved_product, sender=OpticalProduct)
+models.signals.post_delete.connect(
+    count_deleted_product, sender=OpticalProduct)
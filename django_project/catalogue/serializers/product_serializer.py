@@ -1,5 +1,14 @@
+from django.db.models import F
 from rest_framework import serializers
 from catalogue.models import OpticalProduct
+from catalogue.models.products import formatProductName
+
+_SIG = 'product_profile__satellite_instrument__satellite_instrument_group'
+
+# columns loaded for the search results grid
+SEARCH_RESULT_COLUMNS = (
+    'id', 'original_product_id', 'product_date', 'cloud_cover',
+    'spatial_coverage', 'path', 'row')
 
 
 class OpticalProductSerializer(serializers.ModelSerializer):
@@ -28,3 +37,42 @@ class OpticalProductSerializer(serializers.ModelSerializer):
         else:
             return expanded_fields
 
+
+def search_result_queryset():
+    """
+    Return the optical products queryset of the search results grid.
+
+    Only the grid columns are loaded, the metadata and ingestion_log are
+    skipped, and the dictionary abbreviations of the product name are
+    joined in the same query.
+    """
+    return OpticalProduct.objects.only(*SEARCH_RESULT_COLUMNS).annotate(
+        satellite_abbreviation=F(_SIG + '__satellite__abbreviation'),
+        instrument_type_abbreviation=F(
+            _SIG + '__instrument_type__abbreviation'),
+        spectral_mode_abbreviation=F(
+            'product_profile__spectral_mode__abbreviation'))
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """
+    Lean serializer for the rows of the search results grid.
+
+    Expects the products of search_result_queryset.
+    """
+    spatial_coverage = serializers.SerializerMethodField()
+    product_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OpticalProduct
+        fields = (
+            'id', 'original_product_id', 'product_name', 'product_date',
+            'cloud_cover', 'spatial_coverage')
+
+    def get_spatial_coverage(self, obj):
+        return obj.spatial_coverage.wkt
+
+    def get_product_name(self, obj):
+        return formatProductName(
+            obj.satellite_abbreviation, obj.instrument_type_abbreviation,
+            obj.path, obj.row, obj.spectral_mode_abbreviation)
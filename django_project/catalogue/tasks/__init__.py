@@ -3,3 +3,7 @@ __date__ = '4/27/16'
 
 from .exchange_update import exchange_update
 from .data_summary_table import data_summary_table
+from .order_notification import order_notification
+from .record_visits import record_visits
+from .refresh_report_rollups import refresh_report_rollups
+from .reindex_dictionary_products import reindex_dictionary_products
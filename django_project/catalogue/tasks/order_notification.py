@@ -0,0 +1,53 @@
+__author__ = 'rischan - <--rischan@kartoza.com-->'
+__date__ = '18/10/2026'
+
+import smtplib
+import socket
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.contrib.auth.models import User
+from django.core import mail
+
+from catalogue.views.helpers import order_notification_messages
+from orders.models import Order
+
+logger = get_task_logger(__name__)
+
+# Order notices are rendered and sent in the background, see
+# catalogue.views.helpers.notify_sales_staff. All notices of an order go
+# through one SMTP connection. When the mail server fails the notices which
+# were not sent yet are retried.
+
+
+@shared_task(
+    name='tasks.order_notification', bind=True, max_retries=5,
+    default_retry_delay=60)
+def order_notification(self, user_id, order_id, addresses=None):
+    try:
+        user = User.objects.get(pk=user_id)
+        messages = order_notification_messages(user, order_id, addresses)
+    except (User.DoesNotExist, Order.DoesNotExist):
+        # the order or its user was deleted before the task ran
+        logger.warning(
+            'No notice sent, order %s of user %s does not exist' % (
+                order_id, user_id))
+        return
+    if not messages:
+        return
+    sent = set()
+    connection = mail.get_connection()
+    try:
+        connection.open()
+        for address, message in messages:
+            message.connection = connection
+            logger.info('Sending notice to : %s' % address)
+            message.send()
+            sent.add(address)
+    except (smtplib.SMTPException, socket.error) as e:
+        remaining = [
+            address for address, _ in messages if address not in sent]
+        logger.info('Sending notices failed, retrying: %s' % remaining)
+        raise self.retry(exc=e, args=(user_id, order_id, remaining))
+    finally:
+        connection.close()
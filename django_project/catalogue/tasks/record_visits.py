@@ -0,0 +1,28 @@
+__author__ = 'rischan - <--rischan@kartoza.com-->'
+__date__ = '18/10/2026'
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.contrib.gis.geos import Point
+from django.utils.dateparse import parse_datetime
+
+from catalogue.models import Visit
+
+logger = get_task_logger(__name__)
+
+# Visits are buffered by the web processes, see catalogue.visits, and
+# written here in batches with the time of each visit.
+
+
+@shared_task(name='tasks.record_visits')
+def record_visits(visits):
+    Visit.objects.bulk_create([
+        Visit(
+            city=visit['city'],
+            country=visit['country'],
+            ip_position=Point(visit['longitude'], visit['latitude']),
+            ip_address=visit['ip_address'],
+            user_id=visit['user_id'],
+            visit_date=parse_datetime(visit['visit_date']))
+        for visit in visits])
+    logger.info('Recorded %s visits' % len(visits))
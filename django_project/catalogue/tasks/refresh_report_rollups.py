@@ -0,0 +1,17 @@
+__author__ = 'rischan - <--rischan@kartoza.com-->'
+__date__ = '18/10/2026'
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from reports.rollups import refresh_report_rollups as refresh_rollups
+
+logger = get_task_logger(__name__)
+
+# The reports refresh the rollups before reading them too, running this
+# regularly keeps the number of rows they have to count small.
+
+
+@shared_task(name='tasks.refresh_report_rollups')
+def refresh_report_rollups():
+    logger.info('Updated %s report counts' % refresh_rollups())
@@ -0,0 +1,21 @@
+__author__ = 'rischan - <--rischan@kartoza.com-->'
+__date__ = '18/10/2026'
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.apps import apps
+
+from search.index import reindex_dictionary
+
+logger = get_task_logger(__name__)
+
+# Queued by search.index when a dictionary row referenced by products is
+# changed, so the admin request does not wait for the products to be
+# reindexed.
+
+
+@shared_task(name='tasks.reindex_dictionary_products')
+def reindex_dictionary_products(model_label, pk):
+    dictionary = apps.get_model(model_label)
+    logger.info('Reindexed %s products of %s %s' % (
+        reindex_dictionary(dictionary, pk), model_label, pk))
@@ -19,7 +19,9 @@ __date__ = '3/09/2013'
 __copyright__ = 'South African National Space Agency'
 
 import os
-from django.test import TestCase
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
 import unittest
 
 from django.core.management import call_command
@@ -52,6 +54,15 @@ class DIMSIIFIngestorTest(TestCase):
         """
         Sets up before each test
         """
+        # the engine writes its checkpoint next to the sources
+        self.mDirectory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.mDirectory)
+        self.mSourcePath = os.path.join(self.mDirectory, 'DIMS')
+        shutil.copytree(DATA_DIR_PATH, self.mSourcePath)
+        mySettings = override_settings(
+            THUMBS_ROOT=os.path.join(self.mDirectory, 'thumbs'))
+        mySettings.enable()
+        self.addCleanup(mySettings.disable)
         QualityF.create(name='Unknown')
         ProjectionF.create(epsg_code=32734)
         ProjectionF.create(epsg_code=4326)
@@ -263,18 +274,28 @@ class DIMSIIFIngestorTest(TestCase):
         """Test that we can ingest spot using the management command"""
         call_command('dims_iif_harvest',
                      verbosity=2,
-                     source_dir=DATA_DIR_PATH,
-                     theHaltOnErrorFlag=False)
+                     source_dir=self.mSourcePath,
+                     halt_on_error_flag=False)
+
+    def test_test_only_import(self):
+        """Test that a test only run rolls back everything it wrote"""
+        myStatistics = dims_iif.ingest(
+            source_path=self.mSourcePath,
+            verbosity_level=2,
+            halt_on_error_flag=False)
+
+        self.assertGreater(myStatistics.counts['imported'], 0)
+        self.assertFalse(GenericProduct.objects.exists())
 
-    # noinspection PyMethodMayBeStatic
     def test_direct_import(self):
         """Test that we can ingest DIMS IIF using the ingestor function"""
 
         #
         # Test with a full load of data
         #
-        dims_iif.ingest(
-            source_path=DATA_DIR_PATH,
+        myStatistics = dims_iif.ingest(
+            test_only_flag=False,
+            source_path=self.mSourcePath,
             verbosity_level=2,
             halt_on_error_flag=False)
         products = GenericProduct.objects.filter(
@@ -290,20 +311,29 @@ class DIMSIIFIngestorTest(TestCase):
             existing_product_id,
             formatted_list)
         assert existing_product_id in product_list, message
+        self.assertEqual(
+            myStatistics.counts['imported'], GenericProduct.objects.count())
 
-        # Re-ingest and make sure that overridden owner sticks
-        # Above ran in test mode so image was
+        product = GenericProduct.objects.get(
+            original_product_id=existing_product_id)
+        self.assertTrue(os.path.isfile(product.thumbnailFile()))
 
-        dims_iif.ingest(
-            source_path=DATA_DIR_PATH,
+        # Re-ingest without resuming so every scene is updated in place
+        myCount = GenericProduct.objects.count()
+        myStatistics = dims_iif.ingest(
+            test_only_flag=False,
+            source_path=self.mSourcePath,
             verbosity_level=2,
-            halt_on_error_flag=False)
+            halt_on_error_flag=False,
+            resume_flag=False)
 
+        self.assertEqual(myStatistics.counts['imported'], 0)
+        self.assertEqual(myStatistics.counts['updated'], myCount)
+        self.assertEqual(GenericProduct.objects.count(), myCount)
         product = GenericProduct.objects.get(
             original_product_id=existing_product_id)
 
         assert 'updating' in product.ingestion_log
 
-
 if __name__ == '__main__':
     unittest.main()
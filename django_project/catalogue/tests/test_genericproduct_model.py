@@ -21,7 +21,14 @@ from datetime import datetime
 
 from django.test import TestCase
 
-from .model_factories import GenericProductF
+from catalogue.models import GenericProduct, resolveConcreteProducts
+
+from .model_factories import (
+    GenericProductF,
+    OpticalProductF,
+    RadarProductF,
+    OrdinalProductF
+)
 
 
 class TestGenericProductCRUD(TestCase):
@@ -198,3 +205,32 @@ class TestGenericProductCRUD(TestCase):
 
         myRes = myModel.getUTMZones()
         self.assertEqual(myRes, [('32734', 'UTM34S')])
+
+    def test_genericproduct_resolveConcreteProducts(self):
+        """
+        Tests products are downcast with one query per concrete table
+        """
+        myOptical = OpticalProductF.create()
+        myRadar = RadarProductF.create()
+        myOrdinal = OrdinalProductF.create()
+        myGeneric = GenericProductF.create()
+        myProducts = list(GenericProduct.objects.filter(pk__in=[
+            myOptical.pk, myRadar.pk, myOrdinal.pk, myGeneric.pk]).order_by(
+            'pk'))
+
+        # optical, radar, imagery, ordinal and continuous tables
+        with self.assertNumQueries(5):
+            myConcreteProducts = resolveConcreteProducts(myProducts)
+
+        self.assertEqual(
+            [type(myProduct).__name__ if myProduct else None
+             for myProduct in myConcreteProducts],
+            ['OpticalProduct', 'RadarProduct', 'OrdinalProduct', None])
+
+        # the concrete products are remembered
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                myProducts[0].get_concrete_product()[1], 'Optical')
+            self.assertEqual(
+                myProducts[1].getConcreteInstance().pk, myRadar.pk)
+            self.assertEqual(myOptical.get_concrete_product()[1], 'Optical')
@@ -0,0 +1,114 @@
+"""
+SANSA-EO Catalogue - georeference_module - tests in process georeferencing
+    of thumbnails
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from PIL import Image
+
+from catalogue import georeference
+from catalogue.georeference import (
+    georeference_thumbnail,
+    pregeoreference_thumbnails
+)
+
+
+class FakeProduct(object):
+    """
+    Product returning a fixed georeferencing job
+    """
+
+    def __init__(self, theJob):
+        self.pk = None
+        self.mJob = theJob
+
+    def georeferencedThumbnailJob(self, theForceFlag=False):
+        return self.mJob
+
+
+class georeference_Test(TestCase):
+    """
+    Tests georeference module
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mDirectory = tempfile.mkdtemp()
+        self.mSource = os.path.join(self.mDirectory, 'source.jpg')
+        self.mOutput = os.path.join(self.mDirectory, 'source-reffed.jpg')
+        Image.new('RGB', (400, 200), (10, 20, 30)).save(self.mSource)
+
+    def tearDown(self):
+        """
+        Clean up after each test
+        """
+        shutil.rmtree(self.mDirectory)
+
+    def test_georeference_thumbnail(self):
+        """
+        Tests a jpeg and a world file are written, nothing else
+        """
+        myCorners = ((20, -30), (22, -30), (22, -31), (20, -31))
+        myResult = georeference_thumbnail(
+            self.mSource, self.mOutput, myCorners)
+
+        self.assertEqual(myResult, self.mOutput)
+        self.assertTrue(os.path.isfile(self.mOutput))
+        myWorldFile = os.path.join(self.mDirectory, 'source-reffed.wld')
+        with open(myWorldFile) as myFile:
+            myPixelWidth = float(myFile.readline())
+        self.assertAlmostEqual(myPixelWidth, 2.0 / 400, places=4)
+
+    def test_georeference_thumbnail_without_bindings(self):
+        """
+        Tests failures without the GDAL bindings raise RuntimeError
+        """
+        myFlag = georeference.HAS_NATIVE_BINDINGS
+        self.addCleanup(setattr, georeference, 'HAS_NATIVE_BINDINGS', myFlag)
+        georeference.HAS_NATIVE_BINDINGS = False
+
+        myCorners = ((20, -30), (22, -30), (22, -31), (20, -31))
+        with self.assertRaises(RuntimeError):
+            georeference_thumbnail(
+                os.path.join(self.mDirectory, 'missing.jpg'), self.mOutput,
+                myCorners)
+
+    def test_pregeoreference_thumbnails(self):
+        """
+        Tests the thumbnails of a batch are georeferenced in a process pool
+        """
+        myCorners = ((20, -30), (22, -30), (22, -31), (20, -31))
+        myProducts = []
+        for myIndex in range(3):
+            myOutput = os.path.join(self.mDirectory, '%s.jpg' % myIndex)
+            myProducts.append(
+                FakeProduct((self.mSource, myOutput, myCorners)))
+        # a product without a thumbnail is skipped
+        myProducts.append(FakeProduct(None))
+
+        self.assertEqual(
+            pregeoreference_thumbnails(myProducts, theWorkers=2), 3)
+        for myIndex in range(3):
+            self.assertTrue(os.path.isfile(
+                os.path.join(self.mDirectory, '%s.wld' % myIndex)))
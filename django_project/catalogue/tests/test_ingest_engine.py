@@ -0,0 +1,172 @@
+"""
+SANSA-EO Catalogue - ingest_engine - tests chunked, resumable ingestion
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from django.test import TestCase, override_settings
+
+from catalogue.ingestors.cbers import store_files
+from catalogue.ingestors.engine import ingest_sources, silent_log_message
+from catalogue.models import OpticalProduct
+from catalogue.models.signals import products_bulk_saved
+from catalogue.tests.model_factories import OpticalProductF
+from catalogue.thumbnails import derivative_path, source_fingerprint
+
+SAMPLE_THUMBNAIL = os.path.join(
+    os.path.dirname(__file__), 'sample_files', 'sample_thumbnail.jpg')
+
+
+def parse_source(source):
+    """
+    Parse a fake source, the name is the original product id
+    """
+    return {
+        'original_product_id': os.path.basename(source),
+        'xml_file': source + '.XML'
+    }
+
+
+class ingestEngine_Test(TestCase):
+    """
+    Tests ingest engine
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mDirectory = tempfile.mkdtemp()
+        self.mCheckpoint = os.path.join(self.mDirectory, '.checkpoint')
+        self.mSources = [
+            os.path.join(self.mDirectory, 'EXISTING'),
+            os.path.join(self.mDirectory, 'NEW')]
+        self.mProduct = OpticalProductF.create(
+            original_product_id='EXISTING', ingestion_log='created')
+
+    def tearDown(self):
+        """
+        Clean up after each test
+        """
+        shutil.rmtree(self.mDirectory)
+
+    def resolve_record(self, log_message, record):
+        """
+        Resolve a fake record with the dictionaries of the existing product
+        """
+        return {
+            'original_product_id': record['original_product_id'],
+            'unique_product_id': record['original_product_id'],
+            'spatial_coverage': self.mProduct.spatial_coverage,
+            'product_profile': self.mProduct.product_profile,
+            'projection': self.mProduct.projection,
+            'quality': self.mProduct.quality,
+            'product_acquisition_start': datetime(2016, 1, 1, 10, 0),
+            'product_acquisition_end': None,
+            'cloud_cover': 5
+        }
+
+    def ingest(self, **kwargs):
+        return ingest_sources(
+            self.mSources, parse_source, self.resolve_record, 'test 1',
+            silent_log_message, test_only_flag=False,
+            checkpoint_path=self.mCheckpoint, workers=1, **kwargs)
+
+    def test_ingest_sources(self):
+        """
+        Tests products are created and updated
+        """
+        myStatistics = self.ingest()
+
+        self.assertEqual(myStatistics.counts['imported'], 1)
+        self.assertEqual(myStatistics.counts['updated'], 1)
+        myProduct = OpticalProduct.objects.get(original_product_id='EXISTING')
+        self.assertEqual(myProduct.cloud_cover, 5)
+        # pre_save logic is applied to bulk updated products too
+        self.assertEqual(myProduct.product_date, datetime(2016, 1, 1, 10, 0))
+        self.assertIn('updating record', myProduct.ingestion_log)
+        self.assertTrue(
+            OpticalProduct.objects.filter(original_product_id='NEW').exists())
+
+    def test_ingest_sources_duplicates(self):
+        """
+        Tests records of the same product in a chunk are written once
+        """
+        self.mSources.append(os.path.join(self.mDirectory, 'copy', 'NEW'))
+        myProductIds = []
+
+        def receiver(sender, product_ids, **kwargs):
+            myProductIds.extend(product_ids)
+        products_bulk_saved.connect(receiver, sender=OpticalProduct)
+        try:
+            myStatistics = self.ingest()
+        finally:
+            products_bulk_saved.disconnect(receiver, sender=OpticalProduct)
+
+        self.assertEqual(myStatistics.counts['imported'], 1)
+        self.assertEqual(myStatistics.counts['skipped'], 1)
+        self.assertEqual(
+            OpticalProduct.objects.filter(original_product_id='NEW').count(),
+            1)
+        # one signal is sent for the created and the updated product
+        self.assertEqual(sorted(myProductIds), sorted(
+            OpticalProduct.objects.values_list('pk', flat=True)))
+
+    def test_ingest_sources_resume(self):
+        """
+        Tests committed sources are skipped by the next run
+        """
+        self.ingest(chunk_size=1)
+        myStatistics = self.ingest()
+
+        self.assertEqual(myStatistics.counts['skipped'], 2)
+        self.assertEqual(myStatistics.counts['processed'], 0)
+
+    def test_ingest_sources_sensor_year_counts(self):
+        """
+        Tests the sensor year counts follow created and updated products
+        """
+        mySensor = (
+            self.mProduct.product_profile.satellite_instrument
+            .satellite_instrument_group)
+        self.assertEqual(
+            mySensor.products_per_year(), [{'count': 1, 'year': 2008}])
+
+        self.ingest()
+
+        self.assertEqual(
+            mySensor.products_per_year(), [{'count': 2, 'year': 2016}])
+
+    def test_ingest_sources_thumbnails(self):
+        """
+        Tests the thumbnails stored by an ingestor are found and rendered
+        """
+        for mySource in self.mSources:
+            shutil.copyfile(SAMPLE_THUMBNAIL, mySource + '-THUMB.JPG')
+        with override_settings(
+                THUMBS_ROOT=os.path.join(self.mDirectory, 'thumbs')):
+            self.ingest(store_files=store_files)
+
+            for myProduct in OpticalProduct.objects.all():
+                myThumbnail = myProduct.thumbnailFile()
+                self.assertTrue(os.path.isfile(myThumbnail))
+                self.assertTrue(os.path.isfile(derivative_path(
+                    source_fingerprint(myThumbnail), 'small')))
@@ -0,0 +1,62 @@
+"""
+SANSA-EO Catalogue - ingest_metadata - tests streaming metadata extraction
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import os
+
+from django.test import SimpleTestCase
+
+from catalogue.ingestors.dims_iif import DIMS_IIF_FIELDS
+from catalogue.ingestors.metadata import MetadataField, read_metadata
+
+DATA_FILE_PATH = os.path.join(
+    os.path.dirname(__file__),
+    'sample_files/DIMS/L8-_OLI_HRF_NORM_0157_00_0073_00_130611_064151_L0Ra'
+    '_UTM39S/L8-_OLI_HRF_NORM_0157_00_0073_00_130611_064151_L0Ra_UTM39S'
+    '_iif.xml')
+
+
+class ingestMetadata_Test(SimpleTestCase):
+    """
+    Tests metadata reader
+    """
+
+    def test_read_metadata(self):
+        """
+        Tests the text and the mapped fields are read in one pass
+        """
+        myMetadata, myFields = read_metadata(DATA_FILE_PATH, DIMS_IIF_FIELDS)
+
+        with open(DATA_FILE_PATH, 'rt') as myFile:
+            self.assertEqual(myMetadata, myFile.read())
+        self.assertEqual(myFields['product_name'], 'LO81570732013162JSA00')
+        self.assertEqual(myFields['resolution_x'], '30.0')
+        self.assertEqual(myFields['quantisation_max'], '65535')
+        self.assertEqual(myFields['mission'], 'LANDSAT8')
+        self.assertEqual(myFields['center_time'], '2013-06-11T06:41:51.000')
+        self.assertEqual(len(myFields['latitudes']), 5)
+        self.assertEqual(myFields['longitudes'][0], '49.54032')
+        self.assertIsNone(myFields['projection_code'])
+
+    def test_read_metadata_missing(self):
+        """
+        Tests a missing required field raises
+        """
+        self.assertRaises(
+            ValueError, read_metadata, DATA_FILE_PATH,
+            {'zone': MetadataField('ZONE')})
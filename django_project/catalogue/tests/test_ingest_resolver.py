@@ -0,0 +1,63 @@
+"""
+SANSA-EO Catalogue - ingest_resolver - tests in memory dictionary lookups
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.test import TestCase
+
+from catalogue.ingestors.resolver import DictionaryResolver
+from dictionaries.models import Projection
+from dictionaries.tests.model_factories import ProjectionF
+
+
+class ingestResolver_Test(TestCase):
+    """
+    Tests dictionary resolver
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mProjection = ProjectionF.create(name='UTM34S', epsg_code=32734)
+        self.mResolver = DictionaryResolver()
+        self.mResolver.preload()
+
+    def test_get(self):
+        """
+        Tests lookups are answered from memory, with values coerced
+        """
+        with self.assertNumQueries(0):
+            myProjection = self.mResolver.get(Projection, epsg_code='32734')
+            self.assertEqual(myProjection, self.mProjection)
+            self.assertEqual(
+                self.mResolver.filter(
+                    Projection, name__in=['UTM34S', 'UTM35S']),
+                [self.mProjection])
+            self.assertRaises(
+                Projection.DoesNotExist, self.mResolver.get, Projection,
+                epsg_code=1)
+
+    def test_invalidate(self):
+        """
+        Tests an invalidated table is loaded again
+        """
+        self.mResolver.invalidate(Projection)
+        myProjection = ProjectionF.create(name='UTM35S', epsg_code=32735)
+
+        self.assertEqual(
+            self.mResolver.get(Projection, epsg_code=32735), myProjection)
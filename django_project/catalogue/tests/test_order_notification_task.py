@@ -0,0 +1,85 @@
+"""
+SANSA-EO Catalogue - order_notification_task - tests background order
+    notices
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import os
+
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from catalogue.tasks import order_notification
+from catalogue.views.helpers import order_notification_messages
+from core.model_factories import UserF
+from orders.tests.model_factories import OrderF
+
+STATIC_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'core', 'base_static'))
+
+
+@override_settings(
+    STATIC_ROOT=STATIC_ROOT, EMAIL_CUSTOMER_SUPPORT='support@example.com')
+class orderNotificationTask_Test(TestCase):
+    """
+    Tests order notification task
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mUser = UserF.create(email='customer@example.com')
+        self.mOrder = OrderF.create(user=self.mUser)
+
+    def test_order_notification_messages(self):
+        """
+        Tests a notice is rendered per recipient with the order summary
+        """
+        myMessages = order_notification_messages(self.mUser, self.mOrder.id)
+
+        self.assertEqual(
+            [myAddress for myAddress, _ in myMessages],
+            ['customer@example.com', 'support@example.com'])
+        for _, myMessage in myMessages:
+            self.assertIn(
+                'order-summary.pdf',
+                [myAttachment[0] for myAttachment in (
+                    myMessage.related_attachments)])
+
+        # only the notices of the requested addresses
+        myMessages = order_notification_messages(
+            self.mUser, self.mOrder.id, ['support@example.com'])
+        self.assertEqual(len(myMessages), 1)
+
+    def test_order_notification(self):
+        """
+        Tests the notices are sent
+        """
+        order_notification.apply(args=(self.mUser.pk, self.mOrder.id))
+
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_order_notification_missing_order(self):
+        """
+        Tests no notice is sent for an order deleted before the task ran
+        """
+        myOrderId = self.mOrder.id
+        self.mOrder.delete()
+        order_notification.apply(args=(self.mUser.pk, myOrderId))
+
+        self.assertEqual(len(mail.outbox), 0)
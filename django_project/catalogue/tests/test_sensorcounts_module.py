@@ -0,0 +1,89 @@
+"""
+SANSA-EO Catalogue - sensorcounts_module - tests the yearly product counts
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from datetime import datetime
+
+from django.test import TestCase
+
+from catalogue.models import SensorYearCount
+from catalogue.sensorcounts import (
+    rebuild_sensor_year_counts,
+    sensor_summaries
+)
+from catalogue.tests.model_factories import OpticalProductF
+
+
+class sensorCounts_Test(TestCase):
+    """
+    Tests sensorcounts module
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mProduct = OpticalProductF.create()
+        OpticalProductF.create(
+            product_profile=self.mProduct.product_profile,
+            product_acquisition_start=datetime(2010, 5, 1, 12, 0),
+            product_acquisition_end=None)
+        self.mSensor = (
+            self.mProduct.product_profile.satellite_instrument
+            .satellite_instrument_group)
+
+    def test_savedProducts(self):
+        """
+        Tests saved and deleted products are counted
+        """
+        self.assertEqual(self.mSensor.products_per_year(), [
+            {'count': 1, 'year': 2008}, {'count': 1, 'year': 2010}])
+
+        self.mProduct.product_acquisition_start = datetime(2010, 1, 1, 12, 0)
+        self.mProduct.product_acquisition_end = None
+        self.mProduct.save()
+        self.assertEqual(
+            self.mSensor.products_per_year(), [{'count': 2, 'year': 2010}])
+
+        self.mProduct.delete()
+        self.assertEqual(
+            self.mSensor.products_per_year(), [{'count': 1, 'year': 2010}])
+        self.assertEqual(self.mSensor.min_year(), 2010)
+        self.assertEqual(self.mSensor.max_year(), 2010)
+
+    def test_rebuild(self):
+        """
+        Tests a rebuild recounts the products
+        """
+        SensorYearCount.objects.all().delete()
+        rebuild_sensor_year_counts()
+        self.assertEqual(self.mSensor.products_per_year(), [
+            {'count': 1, 'year': 2008}, {'count': 1, 'year': 2010}])
+
+    def test_sensorSummaries(self):
+        """
+        Tests the data summary rows of the sensors
+        """
+        mySummaries = sensor_summaries()
+
+        self.assertEqual(len(mySummaries), 1)
+        self.assertEqual(mySummaries[0]['id__count'], 2)
+        self.assertEqual(mySummaries[0]['min_year'], 2008)
+        self.assertEqual(mySummaries[0]['max_year'], 2010)
+        self.assertEqual(
+            mySummaries[0]['satellite_name'], self.mSensor.satellite.name)
@@ -19,7 +19,10 @@ __date__ = '12/07/2012'
 __copyright__ = 'South African National Space Agency'
 
 
+import glob
 import os
+import shutil
+import tempfile
 from django.test import TestCase
 import unittest
 # import factory
@@ -469,6 +472,77 @@ class SpotIngestorTest(TestCase):
         new_product_count = GenericProduct.objects.count()
         self.assertEqual(product_count + 1, new_product_count)
 
+    def test_index_ingest(self):
+        """Test that the chunked index ingest filters and resumes"""
+        area = (
+            'POLYGON('
+            '(16.206099 -5.592359,'
+            '16.206099 -6.359587,'
+            '17.293880 -6.359587,'
+            '17.293880 -5.592359,'
+            '16.206099 -5.592359))')
+        # work on a copy so the checkpoint is not written to the samples
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        for path in glob.glob(os.path.splitext(SHAPEFILE_NAME)[0] + '.*'):
+            shutil.copy(path, temp_dir)
+        shapefile = os.path.join(
+            temp_dir, os.path.basename(SHAPEFILE_NAME))
+
+        product_count = GenericProduct.objects.count()
+        statistics = spot.ingest_index(
+            shapefile=shapefile,
+            area_of_interest=area,
+            test_only_flag=False,
+            verbosity_level=0)
+        self.assertEqual(statistics.counts['imported'], 1)
+        self.assertEqual(
+            GenericProduct.objects.count(), product_count + 1)
+        checkpoint_path = spot.get_fid_checkpoint_path(shapefile)
+        next_fid = spot.read_fid_checkpoint(checkpoint_path)
+        self.assertTrue(next_fid > 0)
+
+        # a second run resumes after the ingested features
+        statistics = spot.ingest_index(
+            shapefile=shapefile,
+            area_of_interest=area,
+            test_only_flag=False,
+            verbosity_level=0)
+        self.assertEqual(statistics.counts['processed'], 0)
+
+        # a restarted run updates the product
+        statistics = spot.ingest_index(
+            shapefile=shapefile,
+            area_of_interest=area,
+            test_only_flag=False,
+            verbosity_level=0,
+            resume_flag=False)
+        self.assertEqual(statistics.counts['updated'], 1)
+        self.assertEqual(
+            GenericProduct.objects.count(), product_count + 1)
+
+    def test_fetch_index_features_start_fid(self):
+        """Test that the features before start_fid are filtered out"""
+        area = spot.get_area_of_interest(
+            'POLYGON('
+            '(16.206099 -5.592359,'
+            '16.206099 -6.359587,'
+            '17.293880 -6.359587,'
+            '17.293880 -5.592359,'
+            '16.206099 -5.592359))')
+        fids = [
+            feature.fid for feature in spot.fetch_index_features(
+                SHAPEFILE_NAME, area)]
+        self.assertTrue(fids)
+        self.assertEqual(
+            [feature.fid for feature in spot.fetch_index_features(
+                SHAPEFILE_NAME, area, fids[-1])],
+            fids[-1:])
+        self.assertEqual(
+            list(spot.fetch_index_features(
+                SHAPEFILE_NAME, area, fids[-1] + 1)),
+            [])
+
 
 if __name__ == '__main__':
     unittest.main()
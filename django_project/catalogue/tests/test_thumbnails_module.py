@@ -0,0 +1,109 @@
+"""
+SANSA-EO Catalogue - thumbnails_module - tests rendering and caching of
+    thumbnail derivatives
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from PIL import Image
+
+from catalogue.thumbnails import (
+    MISSING_THUMBNAIL,
+    get_thumbnail,
+    prune_derivatives,
+    render_derivatives,
+    source_fingerprint,
+)
+
+
+class thumbnails_Test(TestCase):
+    """
+    Tests thumbnails module
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mThumbsRoot = tempfile.mkdtemp()
+        self.mSource = os.path.join(self.mThumbsRoot, 'source.jpg')
+        Image.new('RGB', (800, 600), (10, 20, 30)).save(self.mSource)
+
+    def tearDown(self):
+        """
+        Clean up after each test
+        """
+        shutil.rmtree(self.mThumbsRoot)
+
+    def test_render_derivatives(self):
+        """
+        Tests derivatives are rendered once for every size
+        """
+        with override_settings(THUMBS_ROOT=self.mThumbsRoot):
+            self.assertEqual(render_derivatives(self.mSource), 4)
+            self.assertEqual(render_derivatives(self.mSource), 0)
+
+            myPath, _, _ = get_thumbnail(self.mSource, 'medium')
+            self.assertEqual(Image.open(myPath).size[0], 200)
+            self.assertTrue(Image.open(myPath).size[1] < 200)
+
+    def test_get_thumbnail_fingerprint(self):
+        """
+        Tests a changed source yields a new derivative
+        """
+        with override_settings(THUMBS_ROOT=self.mThumbsRoot):
+            myPath, myFingerprint, _ = get_thumbnail(self.mSource, 'small')
+
+            Image.new('RGB', (300, 300)).save(self.mSource)
+            os.utime(self.mSource, (0, 0))
+            myNewPath, myNewFingerprint, _ = get_thumbnail(
+                self.mSource, 'small')
+
+            self.assertNotEqual(myPath, myNewPath)
+            self.assertNotEqual(myFingerprint, myNewFingerprint)
+
+    def test_get_thumbnail_missing(self):
+        """
+        Tests the error icon is returned for missing thumbnails
+        """
+        with override_settings(THUMBS_ROOT=self.mThumbsRoot):
+            myPath, _, _ = get_thumbnail(
+                os.path.join(self.mThumbsRoot, 'missing.jpg'), 'large')
+            self.assertEqual(myPath, MISSING_THUMBNAIL)
+
+    def test_prune_derivatives(self):
+        """
+        Tests only the derivatives of stale fingerprints are removed
+        """
+        with override_settings(THUMBS_ROOT=self.mThumbsRoot):
+            render_derivatives(self.mSource)
+            myPath, _, _ = get_thumbnail(self.mSource, 'small')
+            # the source is copied again, its old derivatives are stale
+            os.utime(self.mSource, (0, 0))
+            render_derivatives(self.mSource)
+            myNewPath, _, _ = get_thumbnail(self.mSource, 'small')
+
+            self.assertEqual(prune_derivatives(
+                set([source_fingerprint(self.mSource)]),
+                os.path.getmtime(myNewPath) + 1), 4)
+            self.assertFalse(os.path.exists(myPath))
+            self.assertTrue(os.path.exists(myNewPath))
@@ -20,7 +20,15 @@ __copyright__ = 'South African National Space Agency'
 
 from django.test import TestCase
 
-from catalogue.utmzonecalc import utmZoneFromLatLon, utmZoneOverlap
+from catalogue.models import GenericProduct
+from catalogue.tests.model_factories import GenericProductF
+from catalogue.utmzonecalc import (
+    utmZoneFromLatLon,
+    utmZoneOverlap,
+    utmZonesForExtents,
+    UTMZoneSrid,
+    UTMZoneSrids
+)
 
 
 class utmZoneFromLatLon_Test(TestCase):
@@ -86,3 +94,45 @@ class utmZoneOverlap_Test(TestCase):
             myExpRes = myExpectedResults[idx]
 
             self.assertEqual(myRes, myExpRes)
+
+
+class utmZonesForExtents_Test(TestCase):
+    """
+    Tests utmzonecalc module, utmZonesForExtents function
+    """
+
+    def test_utmZonesForExtents(self):
+        """
+        Tests zones of extents crossing the antimeridian and the equator
+        """
+        myTestValues = [
+            (-34, -64, -30, -62), (179, -10, -179, -5), (-179, -10, 179, -5),
+            (20, -2, 21, 3), (174, 10, 180, 11)]
+        myExpectedResults = [
+            [('32725', 'UTM25S'), ('32726', 'UTM26S')],
+            [('32701', 'UTM01S'), ('32760', 'UTM60S')],
+            [('32701', 'UTM01S'), ('32760', 'UTM60S')],
+            [('32634', 'UTM34N'), ('32734', 'UTM34S')],
+            [('32660', 'UTM60N')]
+        ]
+
+        self.assertEqual(
+            utmZonesForExtents(myTestValues), myExpectedResults)
+
+    def test_utmZoneSrids(self):
+        """
+        Tests the SQL zones match the python zones
+        """
+        myProduct = GenericProductF.create(**{
+            'spatial_coverage': (
+                'POLYGON ((-1 -2, 2 -2, 2 1, -1 1, -1 -2))')
+        })
+        myProduct = GenericProduct.objects.annotate(
+            mySrid=UTMZoneSrid('spatial_coverage'),
+            mySrids=UTMZoneSrids('spatial_coverage')).get(pk=myProduct.pk)
+
+        self.assertEqual(myProduct.mySrid, 32731)
+        self.assertEqual(
+            myProduct.mySrids,
+            [int(myCode) for myCode, _ in myProduct.getUTMZones()])
+        self.assertEqual(myProduct.mySrids, [32630, 32631, 32730, 32731])
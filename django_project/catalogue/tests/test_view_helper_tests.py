@@ -19,8 +19,16 @@ __copyright__ = 'South African National Space Agency'
 
 import os
 import zipfile
-from django.test import TestCase
-from catalogue.views.helpers import writeThumbToZip
+from io import BytesIO
+from django.test import TestCase, override_settings
+from catalogue.views.helpers import (
+    writeThumbToZip,
+    streamZip,
+    streamSearchRecordsKml,
+    searchRecordsZipEntries
+)
+from catalogue.tests.model_factories import OpticalProductF
+from search.models import SearchRecord
 
 
 class ViewHelperTests(TestCase):
@@ -41,3 +49,49 @@ class ViewHelperTests(TestCase):
         myMessage = 'Could not write thumb and wld into zip'
         myOutputName = 'test123'
         assert writeThumbToZip(myPath, myOutputName, myZip), myMessage
+
+    def testStreamZip(self):
+        """Test that a streamed zip can be read back."""
+        myEntries = [('a.xml', '<a/>'), ('b.jpg', b'\xff\xd8' * 1000)]
+        myChunks = list(streamZip(iter(myEntries)))
+        myZip = zipfile.ZipFile(BytesIO(b''.join(myChunks)))
+        assert myZip.testzip() is None
+        assert myZip.read('a.xml') == b'<a/>'
+        assert myZip.read('b.jpg') == b'\xff\xd8' * 1000
+
+    def testStreamZipPieces(self):
+        """Test that an entry can be streamed in pieces."""
+        myPieces = (('<a>%s</a>' % myIndex) for myIndex in range(1000))
+        myChunks = list(streamZip(iter([('a.kml', myPieces)])))
+        myZip = zipfile.ZipFile(BytesIO(b''.join(myChunks)))
+        assert myZip.testzip() is None
+        assert myZip.read('a.kml') == ''.join(
+            '<a>%s</a>' % myIndex for myIndex in range(1000)).encode('utf-8')
+
+    @override_settings(METADATA_ARCHIVE_WORKERS=2)
+    def testSearchRecordsZipEntries(self):
+        """Test that pooled zip entries keep the order of the records."""
+        myRecords = [
+            SearchRecord(product=OpticalProductF.create()) for _ in range(7)]
+        myEntries = list(searchRecordsZipEntries(
+            myRecords, lambda theRecord: [
+                ('%s.xml' % theRecord.product.id, '<a/>'),
+                ('%s.jpg' % theRecord.product.id, b'')]))
+        assert [myName for myName, _ in myEntries] == [
+            myName for myRecord in myRecords
+            for myName in ('%s.xml' % myRecord.product.id,
+                           '%s.jpg' % myRecord.product.id)]
+
+    def testStreamSearchRecordsKml(self):
+        """Test that search records are streamed into the kml document."""
+        myRecords = [
+            SearchRecord(product=OpticalProductF.create()) for _ in range(2)]
+        myDocument = ''.join(streamSearchRecordsKml(
+            'kml/searchRecords.kml', {
+                'mySearchRecords': myRecords,
+                'external_site_url': 'localhost',
+                'myThumbsFlag': True}))
+        assert '<!--records:' not in myDocument
+        assert myDocument.count('<Placemark>') == 2
+        assert myDocument.count('<GroundOverlay>') == 2
+        assert myDocument.rstrip().endswith('</kml>')
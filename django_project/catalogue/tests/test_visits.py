@@ -0,0 +1,69 @@
+"""
+SANSA-EO Catalogue - visits - tests buffered visit logging
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.model_factories import UserF
+from catalogue.models import Visit
+from catalogue.visits import VisitBuffer
+
+
+@override_settings(VISIT_BUFFER_SIZE=2, VISIT_BUFFER_SECONDS=3600)
+class visitBuffer_Test(TestCase):
+    """
+    Tests visit buffer
+    """
+
+    def test_add(self):
+        """
+        Tests visits are written once the buffer is full
+        """
+        myUser = UserF.create()
+        myBuffer = VisitBuffer()
+
+        myBuffer.add('Pretoria', 'South Africa', 28.2, -25.7, '10.0.0.1')
+        self.assertEqual(Visit.objects.count(), 0)
+
+        myBuffer.add(
+            'Unknown', 'Kenya', 36.8, -1.3, '10.0.0.2', myUser.pk)
+        self.assertEqual(Visit.objects.count(), 2)
+        myVisit = Visit.objects.get(ip_address='10.0.0.2')
+        self.assertEqual(myVisit.user, myUser)
+        self.assertEqual(myVisit.country, 'Kenya')
+        self.assertAlmostEqual(myVisit.ip_position.x, 36.8)
+
+    def test_flush(self):
+        """
+        Tests buffered visits are written by flush
+        """
+        myBuffer = VisitBuffer()
+        myAdded = timezone.now()
+        myBuffer.add('Pretoria', 'South Africa', 28.2, -25.7, '10.0.0.1')
+        myFlushed = timezone.now()
+
+        myBuffer.flush()
+
+        self.assertEqual(Visit.objects.count(), 1)
+        # the visit keeps the time it was added, not the flush time
+        myVisit = Visit.objects.get()
+        self.assertTrue(myAdded <= myVisit.visit_date <= myFlushed)
+        # nothing is left to write
+        myBuffer.flush()
+        self.assertEqual(Visit.objects.count(), 1)
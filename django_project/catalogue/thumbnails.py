@@ -0,0 +1,222 @@
+"""
+SANSA-EO Catalogue - Thumbnail derivatives
+
+Scaled down thumbnails are rendered once per source thumbnail and size and
+stored in a cache addressed by a fingerprint of the source file, so a changed
+source thumbnail always yields a new derivative and the fingerprint can be
+used as an HTTP ETag. The cache is stat keyed rather than content addressed:
+the fingerprint covers the path, size and modification time of the source,
+so touching or copying a source again also gives it a new fingerprint. The
+derivatives left behind are removed by prune_derivatives, see the
+generate_thumbnails --prune management command.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# maximum width and height of the derivatives, raw is only framed
+THUMBNAIL_SIZES = {
+    'small': 16,
+    'medium': 200,
+    'large': 400,
+    'raw': None
+}
+
+# image shown when a product has no (valid) thumbnail
+MISSING_THUMBNAIL = os.path.join(
+    settings.ABS_PATH('core', 'base_static'), 'images', 'block_16.png')
+
+# Specify background colour, should be the same as div background
+BACKGROUND_COLOUR = (255, 255, 255)
+
+
+def normalise_size(theSize):
+    """
+    Return a known thumbnail size name, defaults to small
+    """
+    if theSize not in THUMBNAIL_SIZES:
+        return 'small'
+    return theSize
+
+
+def source_fingerprint(theSourceFile):
+    """
+    Return the fingerprint of a source thumbnail
+
+    The fingerprint is derived from the file path, size and modification time
+    so it can be computed with a single stat call. It is stat keyed, a source
+    with the same content and a new modification time gets a new fingerprint.
+
+    Raises OSError if the source does not exist
+    """
+    myStat = os.stat(theSourceFile)
+    return hashlib.sha1(('%s:%s:%s' % (
+        os.path.abspath(theSourceFile), myStat.st_size, myStat.st_mtime_ns)
+    ).encode()).hexdigest()
+
+
+def derivatives_root():
+    """
+    Return the folder of the cached derivatives
+    """
+    return os.path.join(settings.THUMBS_ROOT, 'cache', 'derivatives')
+
+
+def derivative_path(theFingerprint, theSize):
+    """
+    Return the path of a cached derivative
+    """
+    return os.path.join(
+        derivatives_root(), theSize, theFingerprint[:2],
+        theFingerprint + '.png')
+
+
+def render_thumbnail(theSourceFile, theSize):
+    """
+    Render a framed and scaled down copy of a source thumbnail
+
+    @return a PIL image object.
+    """
+    myImage = Image.open(theSourceFile)
+    if len(myImage.getbands()) < 3:
+        myImage = ImageOps.expand(myImage, border=5, fill=(255))
+    else:
+        myImage = ImageOps.expand(myImage, border=5, fill=(255, 255, 255))
+    myBackground = Image.new('RGBA', myImage.size, BACKGROUND_COLOUR)
+    myBackground.paste(myImage, (0, 0))
+    mySize = THUMBNAIL_SIZES[normalise_size(theSize)]
+    if mySize:
+        myBackground.thumbnail((mySize, mySize), Image.LANCZOS)
+    return myBackground
+
+
+def render_derivatives(theSourceFile, theSizes=tuple(THUMBNAIL_SIZES)):
+    """
+    Render and store the missing derivatives of a source thumbnail
+
+    Does not touch the database so it can run in a worker process.
+
+    @return number of rendered derivatives
+    """
+    try:
+        myFingerprint = source_fingerprint(theSourceFile)
+    except OSError:
+        logger.info('Thumbnail not found %s', theSourceFile)
+        return 0
+
+    myCount = 0
+    for mySize in theSizes:
+        myPath = derivative_path(myFingerprint, mySize)
+        if os.path.isfile(myPath):
+            continue
+        os.makedirs(os.path.dirname(myPath), exist_ok=True)
+        # write to a temporary file first, concurrent renderers of the same
+        # derivative must never serve a partially written file
+        myTmpPath = '%s.%s.tmp' % (myPath, os.getpid())
+        render_thumbnail(theSourceFile, mySize).save(myTmpPath, 'PNG')
+        os.replace(myTmpPath, myPath)
+        myCount += 1
+    return myCount
+
+
+def get_thumbnail(theSourceFile, theSize):
+    """
+    Return the derivative of a source thumbnail, rendering it if needed
+
+    @return a tuple of (file path, fingerprint, modification time) where the
+        fingerprint identifies the derivative content
+    """
+    theSize = normalise_size(theSize)
+    try:
+        myFingerprint = source_fingerprint(theSourceFile)
+        myPath = derivative_path(myFingerprint, theSize)
+        if not os.path.isfile(myPath):
+            render_derivatives(theSourceFile, [theSize])
+    except (IOError, OSError):
+        # file does not exist or is not valid so show an error icon
+        myPath = MISSING_THUMBNAIL
+        myFingerprint = source_fingerprint(myPath)
+    return (
+        myPath, '%s-%s' % (myFingerprint, theSize),
+        os.path.getmtime(myPath))
+
+
+def _render_derivatives_safe(theSourceFile):
+    """
+    Worker wrapper which logs instead of failing the whole batch
+    """
+    try:
+        return render_derivatives(theSourceFile)
+    except Exception as e:
+        logger.error('Failed to render thumbnails of %s: %s', theSourceFile, e)
+        return 0
+
+
+def pregenerate_thumbnails(theSourceFiles, theWorkers=None):
+    """
+    Render all derivatives of source thumbnails in a pool of processes
+
+    Args:
+        theSourceFiles - iterable of source thumbnail paths
+        theWorkers - number of worker processes, defaults to the cpu count
+    Returns:
+        int - number of rendered derivatives
+    Exceptions:
+        None
+    """
+    with ProcessPoolExecutor(max_workers=theWorkers) as myExecutor:
+        return sum(myExecutor.map(
+            _render_derivatives_safe, theSourceFiles, chunksize=64))
+
+
+def prune_derivatives(theFingerprints, theBefore):
+    """
+    Remove the cached derivatives of sources which changed or are gone
+
+    Args:
+        theFingerprints - set of the fingerprints of the current sources
+        theBefore - timestamp, only derivatives modified earlier are removed
+            so derivatives rendered while the fingerprints were collected
+            are kept
+    Returns:
+        int - number of removed derivatives
+    Exceptions:
+        None
+    """
+    myCount = 0
+    for myFolder, _, myFiles in os.walk(derivatives_root()):
+        for myFile in myFiles:
+            myFingerprint, myExtension = os.path.splitext(myFile)
+            if myExtension != '.png' or myFingerprint in theFingerprints:
+                continue
+            myPath = os.path.join(myFolder, myFile)
+            try:
+                if os.path.getmtime(myPath) < theBefore:
+                    os.remove(myPath)
+                    myCount += 1
+            except OSError:
+                # removed by a concurrent run
+                continue
+    return myCount
@@ -17,9 +17,33 @@ __version__ = '0.1'
 __date__ = '01/01/2011'
 __copyright__ = 'South African National Space Agency'
 
-#calcualte center meridians of utmzones for the world
-#we use list.index(center_meridian)+1 as UTM zone number
-UTMZONES = [x * 6 + 3 for x in range(-30, 30)]
+import math
+
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Func, IntegerField
+
+# EPSG code prefixes of the northern and southern hemisphere UTM zones
+NORTH_PREFIX = '326'
+SOUTH_PREFIX = '327'
+
+# SQL of the UTM zone number at a longitude, the same as utmZoneNumber
+UTM_ZONE_NUMBER_SQL = (
+    'mod(LEAST(floor(({lon} + 180) / 6)::integer, 59), 60) + 1')
+
+# SQL of the EPSG code of the UTM zone at a point, the same as
+# utmZoneFromLatLon
+UTM_ZONE_SRID_SQL = (
+    '(CASE WHEN ST_Y({point}) > 0 THEN 32600 ELSE 32700 END + ' +
+    UTM_ZONE_NUMBER_SQL.format(lon='ST_X({point})') + ')')
+
+
+def utmZoneNumber(theLon):
+    """
+    Returns the UTM zone number (1 - 60) at a longitude
+
+    Longitudes east of the antimeridian wrap around, 180 is in zone 60.
+    """
+    return min(int(math.floor((theLon + 180) / 6.0)), 59) % 60 + 1
 
 
 def utmZoneFromLatLon(theLon, theLat):
@@ -31,20 +55,82 @@ def utmZoneFromLatLon(theLon, theLat):
     if theLat <= -90 or theLat >= 90:
         raise ValueError('Latitude value error: %d' % theLat)
 
-    #look up zone using simple calculation, add 1 because lists are 0 based
-    myZone = UTMZONES.index(int(theLon / 6) * 6 + 3) + 1
+    myZone = utmZoneNumber(theLon)
 
     if theLat > 0:
         myHemisphere = 'N'
-        myPrefix = '326'
+        myPrefix = NORTH_PREFIX
     else:
         myHemisphere = 'S'
-        myPrefix = '327'
+        myPrefix = SOUTH_PREFIX
     mySuffix = '%02d' % myZone
 
     return (myPrefix + mySuffix, 'UTM' + mySuffix + myHemisphere)
 
 
+def _utmZoneRange(west, south, east, north):
+    """
+    Returns a hashable description of the UTM zones an extent overlaps
+
+    The extent wraps around the antimeridian when it is wider than 180
+    degrees, i.e. a footprint from 179 to -179 spans zones 60 and 1 rather
+    than all the zones between them. Scenes are never that wide.
+    """
+    if west > east:
+        west, east = east, west
+    myWestZone = utmZoneNumber(west)
+    myEastZone = utmZoneNumber(east)
+    myWrapFlag = east - west > 180
+    return (myWestZone, myEastZone, myWrapFlag, north > 0, south <= 0)
+
+
+def _utmZones(theWestZone, theEastZone, theWrapFlag, theNorthFlag,
+              theSouthFlag):
+    """
+    Returns the (EPSG code, name) pairs of a zone range, ordered by code
+    """
+    if theWrapFlag:
+        myZones = set(range(theEastZone, 61)) | set(
+            range(1, theWestZone + 1))
+    else:
+        myZones = set(range(theWestZone, theEastZone + 1))
+    myHemispheres = []
+    if theNorthFlag:
+        myHemispheres.append((NORTH_PREFIX, 'N'))
+    if theSouthFlag:
+        myHemispheres.append((SOUTH_PREFIX, 'S'))
+    return [(
+        myPrefix + '%02d' % zone,
+        'UTM' + '%02d' % zone + myHemisphere
+    )
+        for myPrefix, myHemisphere in myHemispheres
+        for zone in sorted(myZones)
+    ]
+
+
+def utmZonesForExtents(theExtents):
+    """
+    Returns the overlapping UTM zones of many extents
+
+    Args:
+        theExtents - iterable of (west, south, east, north) tuples, e.g. the
+            extents of product footprints
+    Returns:
+        list - a list of (EPSG code, name) pairs per extent, a footprint
+            spanning the equator gets the zones of both hemispheres
+    Exceptions:
+        None
+    """
+    myZoneLists = {}
+    myResults = []
+    for myExtent in theExtents:
+        myRange = _utmZoneRange(*myExtent)
+        if myRange not in myZoneLists:
+            myZoneLists[myRange] = _utmZones(*myRange)
+        myResults.append(list(myZoneLists[myRange]))
+    return myResults
+
+
 def utmZoneOverlap(west, south, east, north):
     """
     calculates overlapping UTMZones for a product
@@ -52,44 +138,44 @@ def utmZoneOverlap(west, south, east, north):
     if a product spans several UTMZones then we need to calcualte an zone
     intersection set
     """
+    return utmZonesForExtents([(west, south, east, north)])[0]
 
-    def overlapOnEdge(zoneIndex):
-        """
-        Account for zones on the edges
-        """
 
-        if zoneIndex > 60:
-            zoneIndex -= 60
-        if zoneIndex < 1:
-            zoneIndex += 60
-
-        return zoneIndex
-
-    lowerLeftZone = UTMZONES.index(int(west / 6) * 6 + 3) + 1
-    upperRightZone = UTMZONES.index(int(east / 6) * 6 + 3) + 1
-
-    overlap = upperRightZone - lowerLeftZone
+class UTMZoneSrid(Func):
+    """
+    EPSG code of the UTM zone at the centroid of a geometry
 
-    llZones = set()
-    urZones = set()
-    for buf in range(-overlap, overlap + 1):
-        llTmp = overlapOnEdge(lowerLeftZone + buf)
-        urTmp = overlapOnEdge(upperRightZone + buf)
-        llZones.update([llTmp])
-        urZones.update([urTmp])
+    Usable in annotations, e.g.
+    annotate(srid=UTMZoneSrid('spatial_coverage'))
+    """
+    template = '(SELECT %s FROM ST_Centroid(%%(expressions)s) AS centroid)' % (
+        UTM_ZONE_SRID_SQL.format(point='centroid'))
+    output_field = IntegerField()
 
-    overlapingZones = llZones & urZones
 
-    if south > 0:
-        myHemisphere = 'N'
-        myPrefix = '326'
-    else:
-        myHemisphere = 'S'
-        myPrefix = '327'
+class UTMZoneSrids(Func):
+    """
+    EPSG codes of the UTM zones overlapped by a geometry, like utmZoneOverlap
 
-    return [(
-        myPrefix + '%02d' % zone,
-        'UTM' + '%02d' % zone + myHemisphere
-    )
-        for zone in overlapingZones
-    ]
+    Usable in annotations, e.g.
+    annotate(srids=UTMZoneSrids('spatial_coverage'))
+    """
+    template = (
+        '(SELECT ARRAY('
+        'SELECT hemisphere + zone '
+        'FROM generate_series(1, 60) AS zone, '
+        'unnest(ARRAY[32600, 32700]) AS hemisphere '
+        'WHERE CASE WHEN zones.wrap '
+        'THEN zone >= zones.east OR zone <= zones.west '
+        'ELSE zone BETWEEN zones.west AND zones.east END '
+        'AND (hemisphere = 32600 AND zones.north '
+        'OR hemisphere = 32700 AND zones.south) '
+        'ORDER BY 1) '
+        'FROM (SELECT %s AS west, %s AS east, '
+        'ST_XMax(extent) - ST_XMin(extent) > 180 AS wrap, '
+        'ST_YMax(extent) > 0 AS north, ST_YMin(extent) <= 0 AS south '
+        'FROM (SELECT (%%(expressions)s)::box2d AS extent) AS extents'
+        ') AS zones)') % (
+        UTM_ZONE_NUMBER_SQL.format(lon='ST_XMin(extent)'),
+        UTM_ZONE_NUMBER_SQL.format(lon='ST_XMax(extent)'))
+    output_field = ArrayField(IntegerField())
@@ -18,10 +18,13 @@ __date__ = '17/08/2012'
 __copyright__ = 'South African National Space Agency'
 
 
-from django.contrib.gis.geoip2 import GeoIP2
-from django.conf import settings
 import re  # regex support
+import threading
 import urllib.request
+from functools import lru_cache
+
+from django.contrib.gis.geoip2 import GeoIP2
+from django.conf import settings
 
 # python logging support to django logging middleware
 import logging
@@ -29,6 +32,61 @@ import traceback
 
 logger = logging.getLogger(__name__)
 
+# number of IP address locations kept by each process
+GEOIP_CACHE_SIZE = 4096
+
+# addresses of requests from this host or from a proxy in front of it
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+_geoIpLock = threading.Lock()
+_geoIpReader = None
+
+
+def geoIpReader():
+    """
+    Return the GeoIP2 reader of this process, the databases are opened and
+    memory mapped once
+    """
+    global _geoIpReader
+    if _geoIpReader is None:
+        with _geoIpLock:
+            if _geoIpReader is None:
+                _geoIpReader = GeoIP2(cache=GeoIP2.MODE_MMAP)
+    return _geoIpReader
+
+
+@lru_cache(maxsize=GEOIP_CACHE_SIZE)
+def cityForIp(theIp):
+    """
+    Return the GeoIP2 city record of an IP address, None if it is unknown
+
+    The records of recently seen addresses are cached, do not modify them.
+    """
+    try:
+        myLocation = geoIpReader().city(theIp)
+    except Exception:
+        logger.info(traceback.format_exc())
+        return None
+    if not myLocation:  # ip cannot be found
+        logger.info('IP could not be looked up :-(')
+        return None
+    return myLocation
+
+
+@lru_cache(maxsize=1)
+def publicIp():
+    """
+    Return the public IP address of this host, looked up once per process
+    """
+    try:
+        checkip = urllib.request.urlopen(
+            'http://checkip.dyndns.org/', timeout=5).read().decode('utf-8')
+        matcher = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
+        return matcher.search(checkip).group()
+    except Exception:
+        logger.info(traceback.format_exc())
+        return ''
+
 
 class GeoIpUtils:
     """A class for resolving lat/long from and IP address"""
@@ -43,31 +101,23 @@ class GeoIpUtils:
     def getMyIp(self, request):
         """
         Fetch an IP when request.META returns localhost
+
+        The client address set by a proxy on this host is used if there is
+        one, otherwise the public address of this host.
         """
-        remote_ip = request.META['REMOTE_ADDR']
-        if remote_ip == '127.0.0.1':
-            checkip = urllib.request.urlopen('http://checkip.dyndns.org/').read()
-            matcher = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
-            try:
-                remote_ip = matcher.search(checkip).group()
-            except:
-                remote_ip = ''
-        logger.error('Remote ip is: ' + remote_ip)
+        remote_ip = request.META.get('REMOTE_ADDR', '')
+        if remote_ip in LOCAL_ADDRESSES:
+            remote_ip = request.META.get(
+                'HTTP_X_FORWARDED_FOR', '').split(',')[0].strip()
+            if not remote_ip:
+                remote_ip = publicIp()
+        logger.debug('Remote ip is: ' + remote_ip)
         return remote_ip
 
     def getMyLatLong(self, request):
         if settings.USE_GEOIP:
-            g = GeoIP2()
-            remote_ip = self.getMyIp(request)
-            try:
-                remote_location = g.city(remote_ip)
-                if remote_location:
-                    logger.info(remote_location)
-                    return remote_location
-                else:  # ip cannot be found
-                    logger.info('IP could not be looked up :-(')
-                    return None
-            except Exception:
-                logger.info(traceback.format_exc())
-                return None
+            remote_location = cityForIp(self.getMyIp(request))
+            if remote_location:
+                logger.info(remote_location)
+            return remote_location
         return None
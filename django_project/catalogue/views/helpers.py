@@ -19,8 +19,12 @@ __copyright__ = 'South African National Space Agency'
 
 # for kmz
 import zipfile
-from io import BytesIO
 import os.path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain, islice
+from threading import Barrier
 import re
 from email.mime.base import MIMEBase
 
@@ -29,15 +33,15 @@ import logging
 from django.core.files.storage import FileSystemStorage
 from django.template import RequestContext
 # for rendering template to email
-from django.template.loader import render_to_string
-# for sending email
-from django.core import mail
+from django.template.loader import render_to_string, get_template
 from django.conf import settings
+from django.db import connections, transaction
 from django.core.mail import EmailMultiAlternatives, SafeMIMEMultipart
 
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render_to_response, get_object_or_404
-from django.http import HttpResponseRedirect, HttpResponse
+from django.shortcuts import render_to_response
+from django.http import (
+    HttpResponseRedirect, HttpResponse, StreamingHttpResponse)
 
 from orders.models import (
     Order,
@@ -46,6 +50,7 @@ from orders.models import (
 )
 
 from search.models import SearchRecord
+from catalogue.georeference import georeference_thumbnails
 from weasyprint import HTML
 
 # Read default notification recipients from settings
@@ -246,59 +251,59 @@ def duplicate(obj, value=None, field=None, duplicate_order=None):
 ###########################################################
 
 
-def notify_sales_staff(theUser, theOrderId, theContext=None):
+def notify_sales_staff(theUser, theOrderId):
     """
     A helper method to notify sales staff who are subscribed to a sensor
-    Example usage from the console / doctest:
+
+    The notices are rendered and sent by the order_notification celery task
+    once the current transaction is committed, so placing or updating an
+    order does not wait for the PDF and the mail server.
 
     Args:
         theUser obj - Required. Django user object
         theOrderId int - Required. ID of the Order which has changed
-        theContext obj - Optional. Useful when we need to pass RequestContext
-            to the render_to_string (see Note)
-
-    Note:
-        RequestContext is important when executing unittests using test.client
-        because of the way test.client generates response context object.
-        Response context is a list of context objects, one for each used
-        template, and if during rendering of a template context object is None,
-        values of response context object are going to be empty. For example
-        myResp.context['myObjects'] = [], but in reality it should have values
     """
 
     if not settings.EMAIL_NOTIFICATIONS_ENABLED:
         logger.info('Email sending disabled, set EMAIL_NOTIFICATIONS_ENABLED '
                     'in settings')
         return
-    order = get_object_or_404(Order, id=theOrderId)
+    # the task module imports this module
+    from catalogue.tasks import order_notification
+    myUserId = theUser.pk
+    transaction.on_commit(
+        lambda: order_notification.delay(myUserId, theOrderId))
+
+
+def order_notification_messages(theUser, theOrderId, theAddresses=None):
+    """
+    Render the notices of an order for the user and the subscribed staff
+
+    The order summary PDF is rendered once and attached to every notice.
+
+    Args:
+        theUser obj - Required. Django user object
+        theOrderId int - Required. ID of the Order which has changed
+        theAddresses list - Optional. Only render the notices of these
+            recipient addresses, e.g. the ones a failed run did not send
+    Returns:
+        list - (address, EmailMultiRelated) tuples, one per recipient
+    Exceptions:
+        Order.DoesNotExist - there is no order with theOrderId
+    """
+    order = Order.objects.get(id=theOrderId)
     records = SearchRecord.objects.filter(user=theUser,
                                           order=order).select_related()
+    # downcast the products of all records at once
+    SearchRecord.prefetchConcreteProducts(records)
     history = OrderStatusHistory.objects.filter(order=order)
-    dictionary = {
-        'myOrder': order,
-        'myRecords': records,
-        'myHistory': history
-    }
-    html_template = 'pdf/order-summary.html'
-    html_string = render_to_string(html_template, dictionary)
-    html_object = HTML(
-        string=html_string,
-    )
-    html_object.write_pdf(target='/tmp/order-summary.pdf')
-    email_subject = ('SANSA Order ' + str(order.id) + ' status update (' +
-                     order.order_status.name + ')')
-
-    # Get a list of staff user's email addresses
-    # we will use mass_mail to prevent users seeing who other recipients are
-    messages = []
 
     recipients = set()
     recipients.update([theUser])
     logger.info('User recipient added: %s' % str(recipients))
     # get the list of recipients
-    for product in [s.product for s in records]:
-        recipients.update(
-            OrderNotificationRecipients.get_users_for_product(product))
+    recipients.update(OrderNotificationRecipients.get_users_for_products(
+        [s.product for s in records]))
 
     # Add default recipients
     if not recipients and CATALOGUE_DEFAULT_NOTIFICATION_RECIPIENTS:
@@ -308,50 +313,54 @@ def notify_sales_staff(theUser, theOrderId, theContext=None):
 
     recipients.add(settings.EMAIL_CUSTOMER_SUPPORT)
 
+    # one notice per address
+    addressed = {}
     for recipient in recipients:
+        address = recipient.email if hasattr(recipient, 'email') else recipient
+        if theAddresses is None or address in theAddresses:
+            addressed.setdefault(address, recipient)
+    if not addressed:
+        return []
+
+    html_string = render_to_string('pdf/order-summary.html', {
+        'myOrder': order,
+        'myRecords': records,
+        'myHistory': history
+    })
+    pdf = HTML(string=html_string).write_pdf()
+    with open(os.path.join(
+            settings.STATIC_ROOT, 'images', 'sac_header_email.jpg'),
+            'rb') as header_file:
+        header_image = header_file.read()
+    email_subject = ('SANSA Order ' + str(order.id) + ' status update (' +
+                     order.order_status.name + ')')
+
+    messages = []
+    for address, recipient in sorted(addressed.items()):
+        context = {
+            'myOrder': order,
+            'myRecords': records,
+            'myHistory': history,
+            'myRecipient': recipient,
+            'domain': settings.DOMAIN
+        }
         # txt email template
-        email_message_txt = render_to_string(
-            'mail/order.txt', {
-                'myOrder': order,
-                'myRecords': records,
-                'myHistory': history,
-                'myRecipient': recipient,
-                'domain': settings.DOMAIN
-            }, theContext)
+        email_message_txt = render_to_string('mail/order.txt', context)
         # html email template
-        email_message_html = render_to_string(
-            'mail/order.html', {
-                'myOrder': order,
-                'myRecords': records,
-                'myHistory': history,
-                'myRecipient': recipient,
-                'domain': settings.DOMAIN
-            }, theContext)
-        address = recipient.email if hasattr(recipient, 'email') else recipient
+        email_message_html = render_to_string('mail/order.html', context)
         msg = EmailMultiRelated(
             email_subject,
             email_message_txt,
             'dontreply@' + settings.DOMAIN, [address])
-        logger.info('Sending notice to : %s' % address)
 
         # attach alternative payload - html
         msg.attach_alternative(email_message_html, 'text/html')
         # add required images, as inline attachments,
         # accessed by 'name' in templates
-        msg.attach_related_file(
-            os.path.join(
-                settings.STATIC_ROOT, 'images', 'sac_header_email.jpg'))
-        # get the filename of a PDF, ideally we should reuse theOrderPDF object
-
-        msg.attach_related_file('/tmp/order-summary.pdf')
-        # add message
-        messages.append(msg)
-
-    logger.info('Sending messages: \n%s' % messages)
-    # initiate email connection, and send messages in bulk
-    email = mail.get_connection()
-    email.send_messages(messages)
-    return
+        msg.attach_related('sac_header_email.jpg', header_image)
+        msg.attach_related('order-summary.pdf', pdf)
+        messages.append((address, msg))
+    return messages
 
 
 """Layer definitions for use in conjunction with open layers"""
@@ -703,44 +712,72 @@ def standardLayersWithCart(request):
     return myLayersList, myLayerDefinitions, myActiveBaseMap
 
 
-def writeThumbToZip(theImagePath, theProductId, theZip):
-    """Write a thumb and its world file into a zip file.
+def thumbZipEntries(theImagePath, theProductId):
+    """Read a thumb and its world file as zip archive entries.
 
     Args:
-        theImagePath: str required - path to the image file to write. For the
+        theImagePath: str required - path to the image file to read. For the
             world file its extension will be replaced with .wld.
         theProductId: str required - product id used as the output file name
             in the zip file.
-        theZip: ZipFile required - handle to a ZipFile instance in which the
-            images will be written.
 
     Returns:
-        bool: True on success, False on failure
+        list: (name, data) tuples of the files found, the thumb first
 
     Raises:
         Exceptions and issues are logged but not raised.
     """
-
+    myEntries = []
     myWLDFile = '%s.wld' % os.path.splitext(theImagePath)[0]
     try:
         if os.path.isfile(theImagePath):
             with open(theImagePath, 'rb') as myFile:
-                theZip.writestr('%s.jpg' % theProductId,
-                                myFile.read())
+                myEntries.append(('%s.jpg' % theProductId, myFile.read()))
                 logger.debug('Adding thumbnail image to archive.')
         else:
             raise Exception('Thumbnail image not found: %s' % theImagePath)
         if os.path.isfile(myWLDFile):
             with open(myWLDFile, 'rb') as myFile:
-                theZip.writestr('%s.wld' % theProductId,
-                                myFile.read())
+                myEntries.append(('%s.wld' % theProductId, myFile.read()))
                 logger.debug('Adding worldfile to archive.')
         else:
             raise Exception('World file not found: %s' % myWLDFile)
     except:
         logger.exception('Error writing thumb to zip')
-        return False
-    return True
+    return myEntries
+
+
+def writeThumbToZip(theImagePath, theProductId, theZip):
+    """Write a thumb and its world file into a zip file.
+
+    Args:
+        theImagePath: str required - path to the image file to write. For the
+            world file its extension will be replaced with .wld.
+        theProductId: str required - product id used as the output file name
+            in the zip file.
+        theZip: ZipFile required - handle to a ZipFile instance in which the
+            images will be written.
+
+    Returns:
+        bool: True on success, False on failure
+
+    Raises:
+        Exceptions and issues are logged but not raised.
+    """
+    myEntries = thumbZipEntries(theImagePath, theProductId)
+    for myName, myData in myEntries:
+        theZip.writestr(myName, myData)
+    return len(myEntries) == 2
+
+
+def searchRecordThumbEntries(theSearchRecord):
+    """Read the georeferenced thumb of a search record as zip entries.
+    @parameter theSearchRecord - a searchrecord instance
+    """
+    # Try to add thumbnail + wld file, we assume that jpg and wld
+    # file have same name
+    myImageFile = theSearchRecord.product.georeferencedThumbnail()
+    return thumbZipEntries(myImageFile, theSearchRecord.product.product_id)
 
 
 def writeSearchRecordThumbToZip(theSearchRecord, theZip):
@@ -748,19 +785,207 @@ def writeSearchRecordThumbToZip(theSearchRecord, theZip):
     @parameter myRecord - a searchrecord instance
     @parameter theZip - a zip file handle ready to write stuff to
     """
-    # Try to add thumbnail + wld file, we assume that jpg and wld
-    # file have same name
+    myEntries = searchRecordThumbEntries(theSearchRecord)
+    for myName, myData in myEntries:
+        theZip.writestr(myName, myData)
+    return len(myEntries) == 2
 
-    myImageFile = theSearchRecord.product.georeferencedThumbnail()
-    return writeThumbToZip(myImageFile,
-                           theSearchRecord.product.product_id,
-                           theZip)
+
+def georeferenceSearchRecordThumbs(theSearchRecords):
+    """Georeference the thumbnails of search records in one batch.
+
+    Thumbnails which are already georeferenced are skipped, the rest are
+    processed up front so that writeSearchRecordThumbToZip only needs to
+    copy the files.
+    @parameter theSearchRecords - a list of searchrecord instances
+    """
+    georeference_thumbnails(
+        [myRecord.product for myRecord in theSearchRecords])
+
+
+# number of search records georeferenced and archived per batch
+ARCHIVE_CHUNK_SIZE = 50
+
+
+class ZipStreamBuffer(object):
+    """Write only file like object collecting the output of a ZipFile.
+
+    It can not seek, so ZipFile writes data descriptors after each entry
+    instead of going back to patch the local headers, and the bytes written
+    so far can be handed to the client and dropped with drain().
+    """
+
+    def __init__(self):
+        self.mChunks = []
+        self.mPosition = 0
+
+    def write(self, theData):
+        self.mChunks.append(bytes(theData))
+        self.mPosition += len(theData)
+        return len(theData)
+
+    def tell(self):
+        return self.mPosition
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        myData = b''.join(self.mChunks)
+        self.mChunks = []
+        return myData
+
+
+def _closeWorkerConnections(theBarrier):
+    """Close the database connections of the calling worker thread.
+
+    Every call waits on theBarrier until all workers got one, so submitting
+    as many calls as the pool has workers runs it once in each thread.
+    """
+    connections.close_all()
+    theBarrier.wait()
+
+
+@contextmanager
+def _archivePool(theWorkers):
+    """Yield a thread pool of theWorkers threads shared by all the chunks of
+    an archive, or None when theWorkers is 0. The database connections
+    opened by each worker are closed once when the archive is done."""
+    if not theWorkers:
+        yield None
+        return
+    myExecutor = ThreadPoolExecutor(max_workers=theWorkers)
+    try:
+        yield myExecutor
+    finally:
+        myBarrier = Barrier(theWorkers)
+        for _ in range(theWorkers):
+            myExecutor.submit(_closeWorkerConnections, myBarrier)
+        myExecutor.shutdown(wait=True)
+
+
+def _boundedMap(theFunction, theItems, theExecutor, theWorkers):
+    """Map theFunction over theItems, computing at most twice theWorkers
+    results ahead of the consumer in theExecutor. Results keep the order of
+    theItems. Items are mapped serially when theExecutor is None."""
+    if theExecutor is None:
+        for myItem in theItems:
+            yield theFunction(myItem)
+        return
+    myPending = deque()
+    for myItem in theItems:
+        myPending.append(theExecutor.submit(theFunction, myItem))
+        if len(myPending) >= 2 * theWorkers:
+            yield myPending.popleft().result()
+    while myPending:
+        yield myPending.popleft().result()
+
+
+def searchRecordsZipEntries(theSearchRecords, theRecordEntries):
+    """Yield the zip entries of search records, chunk by chunk.
+
+    The thumbnails of each chunk are georeferenced in one batch before
+    theRecordEntries is called for the records of the chunk.
+    @parameter theSearchRecords - iterable of searchrecord instances
+    @parameter theRecordEntries - callable returning a list of (name, data)
+        tuples for a search record
+    """
+    myWorkers = getattr(settings, 'METADATA_ARCHIVE_WORKERS', 0)
+    myRecords = iter(theSearchRecords)
+    with _archivePool(myWorkers) as myExecutor:
+        while True:
+            myChunk = list(islice(myRecords, ARCHIVE_CHUNK_SIZE))
+            if not myChunk:
+                return
+            SearchRecord.prefetchConcreteProducts(myChunk)
+            georeferenceSearchRecordThumbs(myChunk)
+            for myEntries in _boundedMap(
+                    theRecordEntries, myChunk, myExecutor, myWorkers):
+                for myEntry in myEntries:
+                    yield myEntry
+
+
+def streamZip(theEntries):
+    """Yield a deflated zip archive of theEntries piece by piece.
+
+    Only the entries of one record are held in memory at a time, which
+    makes the output suitable for a StreamingHttpResponse.
+    @parameter theEntries - iterable of (name, data) tuples, data is a str,
+        bytes or an iterable of str or bytes pieces which are compressed as
+        they are produced, e.g. a streamed kml document or a file read in
+        blocks
+    """
+    myBuffer = ZipStreamBuffer()
+    with zipfile.ZipFile(myBuffer, 'w', zipfile.ZIP_DEFLATED) as myZip:
+        for myName, myData in theEntries:
+            if isinstance(myData, (str, bytes)):
+                myZip.writestr(myName, myData)
+            else:
+                with myZip.open(myName, 'w') as myFile:
+                    for myPiece in myData:
+                        if isinstance(myPiece, str):
+                            myPiece = myPiece.encode('utf-8')
+                        myFile.write(myPiece)
+                        myChunk = myBuffer.drain()
+                        if myChunk:
+                            yield myChunk
+            myChunk = myBuffer.drain()
+            if myChunk:
+                yield myChunk
+    # central directory
+    yield myBuffer.drain()
+
+
+def streamingZipResponse(theEntries, theContentType, theFileName):
+    """Return a StreamingHttpResponse with a zip archive of theEntries."""
+    response = StreamingHttpResponse(
+        streamZip(theEntries), content_type=theContentType)
+    response['Content-Disposition'] = 'attachment; filename=%s' % theFileName
+    return response
+
+
+# per record templates replacing the records markers of kml templates
+KML_RECORD_TEMPLATES = {
+    'footprints': 'kml/footprint.kml',
+    'overlays': 'kml/overlay.kml'
+}
+KML_RECORDS_MARKER = re.compile(r'<!--records:(\w+)-->')
+
+
+def streamSearchRecordsKml(template, context):
+    """Yield a kml document of search records piece by piece.
+
+    The template is rendered once, each records marker in it is replaced by
+    the rendering of its record template for every search record, so the
+    records are never rendered into one string.
+    @parameter context - template context, the search records are
+        context['mySearchRecords'] and are available as item in the record
+        templates
+    """
+    myPieces = KML_RECORDS_MARKER.split(render_to_string(template, context))
+    yield myPieces[0]
+    for myName, myText in zip(myPieces[1::2], myPieces[2::2]):
+        myTemplate = get_template(KML_RECORD_TEMPLATES[myName])
+        for myRecord in context['mySearchRecords']:
+            yield myTemplate.render(dict(context, item=myRecord))
+        yield myText
+
+
+def _kmlDocument(template, context):
+    """Return a kml document, streamed when it lists search records."""
+    if 'mySearchRecords' in context:
+        return streamSearchRecordsKml(template, context)
+    return render_to_string(template, context)
 
 
 # render_to_kml helpers
 def render_to_kml(template, context, filename):
 
-    response = HttpResponse(render_to_string(template, context))
+    myDocument = _kmlDocument(template, context)
+    if isinstance(myDocument, str):
+        response = HttpResponse(myDocument)
+    else:
+        response = StreamingHttpResponse(myDocument)
     response['Content-Type'] = 'application/vnd.google-earth.kml+xml'
     response['Content-Disposition'] = 'attachment; filename=%s.kml' % filename
     return response
@@ -771,73 +996,54 @@ def render_to_kmz(template, context, filename):
     thumbnails will be bundled into the kmz archive."""
     # try to get MAX_METADATA_RECORDS from settings, default to 500
     myMaxMetadataRecords = getattr(settings, 'MAX_METADATA_RECORDS', 500)
-    logging.error('testtt', context)
-    myKml = render_to_string(template, context)
-    myZipData = BytesIO()
-    myZip = zipfile.ZipFile(myZipData, 'w', zipfile.ZIP_DEFLATED)
-    myZip.writestr('%s.kml' % filename, myKml)
+    myEntries = [('%s.kml' % filename, _kmlDocument(template, context))]
     if 'mySearchRecords' in context:
-        for myRecord in context['mySearchRecords'][:myMaxMetadataRecords]:
-            writeSearchRecordThumbToZip(myRecord, myZip)
-    myZip.close()
-    response = HttpResponse()
-    response.content = myZipData.getvalue()
-    response['Content-Type'] = 'application/vnd.google-earth.kmz'
-    response['Content-Disposition'] = 'attachment; filename=%s.kmz' % filename
-    response['Content-Length'] = str(len(response.content))
-    return response
+        myEntries = chain(myEntries, searchRecordsZipEntries(
+            context['mySearchRecords'][:myMaxMetadataRecords],
+            searchRecordThumbEntries))
+    return streamingZipResponse(
+        myEntries, 'application/vnd.google-earth.kmz', '%s.kmz' % filename)
 
 
-def downloadISOMetadata(theSearchRecords, theName):
-    """ returns ZIPed XML metadata files for each product """
-    response = HttpResponse()
-    myZipData = BytesIO()
-    myZip = zipfile.ZipFile(myZipData, 'w', zipfile.ZIP_DEFLATED)
+def _isoMetadataEntries(theSearchRecord):
+    """Zip entries of the ISO metadata and thumb of a search record."""
+    myMetadata = theSearchRecord.product.getXML()
+    logger.info('Adding product XML to ISO Metadata archive.')
+    return [('%s.xml' % theSearchRecord.product.product_id, myMetadata)] + (
+        searchRecordThumbEntries(theSearchRecord))
+
+
+def _htmlMetadataEntries(theSearchRecord):
+    """Zip entries of the html metadata and thumb of a search record."""
+    # used to tell html renderer not to prepend server path
+    myThumbIsLocalFlag = True
+    myMetadata = theSearchRecord.product.getConcreteInstance().toHtml(
+        myThumbIsLocalFlag)
+    logger.info('Adding product HTML to HTML Metadata archive.')
+    return [('%s.html' % theSearchRecord.product.product_id, myMetadata)] + (
+        searchRecordThumbEntries(theSearchRecord))
+
+
+def _metadataZipResponse(theSearchRecords, theName, theRecordEntries):
+    """Stream a zip archive with metadata files for each product."""
     # try to get MAX_METADATA_RECORDS from settings, default to 500
     myMaxMetadataRecords = getattr(settings, 'MAX_METADATA_RECORDS', 500)
-    for mySearchRecord in theSearchRecords[:myMaxMetadataRecords]:
-        myMetadata = mySearchRecord.product.getXML()
-        logger.info('Adding product XML to ISO Metadata archive.')
-        myZip.writestr('%s.xml' % mySearchRecord.product.product_id,
-                       myMetadata)
-        writeSearchRecordThumbToZip(mySearchRecord, myZip)
-
-    myZip.close()
-    response.content = myZipData.getvalue()
-    myZipData.close()
     # get ORGANISATION_ACRONYM from settings, default to 'SANSA'
     myOrganisationAcronym = getattr(settings, 'ORGANISATION_ACRONYM', 'SANSA')
     filename = '%s-%s-Metadata.zip' % (myOrganisationAcronym, theName)
-    response['Content-Type'] = 'application/zip'
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
-    response['Content-Length'] = str(len(response.content))
-    return response
+    return streamingZipResponse(
+        searchRecordsZipEntries(
+            theSearchRecords[:myMaxMetadataRecords], theRecordEntries),
+        'application/zip', filename)
+
+
+def downloadISOMetadata(theSearchRecords, theName):
+    """ returns ZIPed XML metadata files for each product """
+    return _metadataZipResponse(
+        theSearchRecords, theName, _isoMetadataEntries)
 
 
 def downloadHtmlMetadata(theSearchRecords, theName):
     """ returns ZIPed html metadata files for each product """
-    response = HttpResponse()
-    myZipData = BytesIO()
-    myZip = zipfile.ZipFile(myZipData, 'w', zipfile.ZIP_DEFLATED)
-    # try to get MAX_METADATA_RECORDS from settings, default to 500
-    myMaxMetadataRecords = getattr(settings, 'MAX_METADATA_RECORDS', 500)
-    # used to tell html renderer not to prepend server path
-    myThumbIsLocalFlag = True
-    for mySearchRecord in theSearchRecords[:myMaxMetadataRecords]:
-        myMetadata = mySearchRecord.product.getConcreteInstance().toHtml(
-            myThumbIsLocalFlag)
-        logger.info('Adding product HTML to HTML Metadata archive.')
-        myZip.writestr('%s.html' % mySearchRecord.product.product_id,
-                       myMetadata)
-        writeSearchRecordThumbToZip(mySearchRecord, myZip)
-
-    myZip.close()
-    response.content = myZipData.getvalue()
-    myZipData.close()
-    # get ORGANISATION_ACRONYM from settings, default to 'SANSA'
-    myOrganisationAcronym = getattr(settings, 'ORGANISATION_ACRONYM', 'SANSA')
-    filename = '%s-%s-Metadata.zip' % (myOrganisationAcronym, theName)
-    response['Content-Type'] = 'application/zip'
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
-    response['Content-Length'] = str(len(response.content))
-    return response
+    return _metadataZipResponse(
+        theSearchRecords, theName, _htmlMetadataEntries)
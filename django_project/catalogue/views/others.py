@@ -34,7 +34,9 @@ from django.contrib.gis.db.models.functions import AsKML
 from django.contrib.gis.gdal import OGRGeometry
 from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, HttpResponse, FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
@@ -49,13 +51,15 @@ from catalogue.models.website import Contact, Slider
 from catalogue.forms import (
     ClipForm)
 from catalogue.render_decorator import RenderWithContext
+from catalogue.thumbnails import get_thumbnail
+from catalogue.visits import visit_buffer
 
 # SHP and KML readers
 from catalogue.featureReaders import (
     get_geometry_from_uploaded_file, )
 
 # View Helper classes
-from catalogue.views.geoiputils import GeoIpUtils
+from catalogue.views.geoiputils import GeoIpUtils, cityForIp
 from catalogue.views.helpers import (
     WEB_LAYERS,
     standardLayers,
@@ -70,6 +74,9 @@ from search.models import (
 
 logger = logging.getLogger(__name__)
 
+# thumbnails are content addressed, browsers may keep them for a day
+THUMBNAIL_MAX_AGE = 86400
+
 
 #### VIEW FUNCTIONS ####
 
@@ -79,49 +86,30 @@ def log_visit(request):
     Silently log a visit and return an empty string. The best way to use this
     method is by adding it as a fake css reference at the top of your template
     e.g.: <link rel="stylesheet" href="/visit" type="text/css">
+
+    The visit is buffered and written in a batch, see catalogue.visits.
     """
     try:
         if settings.USE_GEOIP:
-            myGeoIpUtils = GeoIpUtils()
-            myIp = myGeoIpUtils.getMyIp(request)
+            myIp = GeoIpUtils().getMyIp(request)
 
             if not myIp:
                 # logger.error("GEOIP capture failed to retrieve valid IP address.")
                 return HttpResponse('/** No valid IP address */', content_type='text/css')
 
-            myLatLong = myGeoIpUtils.getMyLatLong(request)
-            myVisit = Visit()
-
-            # Handle missing city
-            myVisit.city = myLatLong.get('city', 'Unknown')
-
-            # Try to assign geo location details
-            try:
-                myVisit.country = myLatLong['country_name']
-                myVisit.ip_position = Point(
-                    myLatLong['longitude'], myLatLong['latitude']
-                )
-                myVisit.ip_address = myIp
-
-                if request.user.is_authenticated:
-                    myVisit.user = request.user
+            myLatLong = cityForIp(myIp)
+            if not myLatLong or myLatLong.get('latitude') is None:
+                return HttpResponse('/** IP could not be located */', content_type='text/css')
 
-                myVisit.save()
-
-            except Exception as e:
-                logger.error(f"Error saving visit: {e}")
-                return HttpResponse('/** Error saving visit */', content_type='text/css')
-
-            # Store user IP lat/lon in their profile if authenticated
-            try:
-                if request.user.is_authenticated:
-                    myProfile = request.user.profile  # Use the correct way to access profile
-                    myProfile.latitude = str(myLatLong['latitude'])
-                    myProfile.longitude = str(myLatLong['longitude'])
-                    myProfile.save()
-            except Exception as e:
-                logger.warning(f"User has no profile: {e}")
-                return HttpResponse('/** No Profile */', content_type='text/css')
+            myUserId = None
+            if request.user.is_authenticated:
+                myUserId = request.user.pk
+            visit_buffer.add(
+                # Handle missing city and country
+                myLatLong.get('city') or 'Unknown',
+                myLatLong.get('country_name') or 'Unknown',
+                myLatLong['longitude'], myLatLong['latitude'], myIp,
+                myUserId)
 
         else:
             logger.info('GEOIP capture disabled in settings')
@@ -450,16 +438,24 @@ def show_thumb(request, theId, theSize):
     """
     Show a scene thumbnail details,
     returning the result as a scaled down image.
+
+    Thumbnails are served from the derivative cache and support conditional
+    GET, unchanged thumbnails are answered with 304 Not Modified.
     """
     logger.info('showThumb : id ' + theId)
     myProduct = get_object_or_404(GenericProduct, id=theId)
-    myImage = myProduct.thumbnail(theSize)
-    if isinstance(myImage, str):
-        return HttpResponse('Thumbnail for %s could not be found' % theId)
-    else:
-        myResponse = HttpResponse(content_type='image/png')
-        myImage.save(myResponse, 'PNG')
-        return myResponse
+    myImageFile, myFingerprint, myModified = get_thumbnail(
+        myProduct.thumbnailFile(), theSize)
+    myETag = quote_etag(myFingerprint)
+    myResponse = get_conditional_response(
+        request, etag=myETag, last_modified=int(myModified))
+    if myResponse is None:
+        myResponse = FileResponse(
+            open(myImageFile, 'rb'), content_type='image/png')
+    myResponse['ETag'] = myETag
+    myResponse['Last-Modified'] = http_date(myModified)
+    patch_cache_control(myResponse, max_age=THUMBNAIL_MAX_AGE)
+    return myResponse
 
 
 # @login_required
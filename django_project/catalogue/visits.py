@@ -0,0 +1,108 @@
+"""
+SANSA-EO Catalogue - Buffered visit logging
+
+The visit beacon (see catalogue.views.others.log_visit) is requested for
+every page a user opens. Rather than inserting a Visit row per request, the
+visits are collected in a buffer of each process and handed to the
+record_visits celery task in batches, which writes them with one insert.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class VisitBuffer(object):
+    """
+    Visits waiting to be written, flushed by size or age
+
+    The buffer is only checked when a visit is added, visits left in it
+    are flushed when the process exits.
+    """
+
+    def __init__(self):
+        self.mLock = threading.Lock()
+        self.mVisits = []
+        self.mStarted = None
+
+    def add(self, theCity, theCountry, theLongitude, theLatitude, theIp,
+            theUserId=None):
+        """
+        Add a visit, flushing the buffer if it is full or old enough
+
+        Args:
+            theCity - name of the city of the visitor
+            theCountry - name of the country of the visitor
+            theLongitude - longitude of the visitor IP address
+            theLatitude - latitude of the visitor IP address
+            theIp - IP address of the visitor
+            theUserId - id of the logged in user, None for anonymous users
+        Returns:
+            None
+        Exceptions:
+            None
+        """
+        myVisits = None
+        with self.mLock:
+            if not self.mVisits:
+                self.mStarted = time.time()
+            self.mVisits.append({
+                'city': theCity,
+                'country': theCountry,
+                'longitude': theLongitude,
+                'latitude': theLatitude,
+                'ip_address': theIp,
+                'user_id': theUserId,
+                # the batch can be written long after the visit
+                'visit_date': timezone.now().isoformat()
+            })
+            if (len(self.mVisits) >= settings.VISIT_BUFFER_SIZE or
+                    time.time() - self.mStarted >=
+                    settings.VISIT_BUFFER_SECONDS):
+                myVisits, self.mVisits = self.mVisits, []
+        if myVisits:
+            self._send(myVisits)
+
+    def flush(self):
+        """
+        Send all buffered visits to the record_visits task
+        """
+        with self.mLock:
+            myVisits, self.mVisits = self.mVisits, []
+        if myVisits:
+            self._send(myVisits)
+
+    def _send(self, theVisits):
+        # imported here as the tasks import the views
+        from catalogue.tasks import record_visits
+        try:
+            record_visits.delay(theVisits)
+        except Exception:
+            # visits are statistics, losing a batch must not fail a page
+            logger.exception('Could not record %s visits', len(theVisits))
+
+
+# buffer shared by the requests of this process
+visit_buffer = VisitBuffer()
+atexit.register(visit_buffer.flush)
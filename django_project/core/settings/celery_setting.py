@@ -9,10 +9,15 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'tasks.exchange_update',
         'schedule': crontab(minute=0, hour=0),
     },
+    # weekly on sunday
     'data-summary-table': {
         'task': 'tasks.data_summary_table',
-        'schedule': crontab(minute=0, hour=0),
-        'args': ('/home/web/static/',),
+        'schedule': crontab(minute=0, hour=0, day_of_week=0),
+    },
+    # hourly
+    'refresh-report-rollups': {
+        'task': 'tasks.refresh_report_rollups',
+        'schedule': crontab(minute=30),
     },
 }
 
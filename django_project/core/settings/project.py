@@ -56,6 +56,11 @@ GEOIP_PATH = ABS_PATH('core', 'geoip_data')
 GEOIP_COUNTRY = 'GeoLite2-Country.mmdb'
 GEOIP_CITY = 'GeoLite2-City.mmdb'
 
+# Visits are written in batches, when this many visits were logged by a
+# process or when its oldest unwritten visit is this many seconds old
+VISIT_BUFFER_SIZE = 50
+VISIT_BUFFER_SECONDS = 60
+
 # this is the public domain name or IP address of this django instance.
 # get ip address logic provided in utils.py
 # HOST = get_ip_address('eth1')
@@ -91,9 +96,32 @@ CATALOGUE_ISO_METADATA_XML_TEMPLATE = abspath(join('..', (
 # limit the number of returned metadata records
 MAX_METADATA_RECORDS = 500
 
+# number of threads producing the entries of metadata and kmz archives, the
+# archives are streamed so 0 (serial) keeps the memory use lowest
+METADATA_ARCHIVE_WORKERS = 0
+
 # number of search results per page
 RESULTS_NUMBER = 50
 
+# run searches against the flat product search index, make sure the index is
+# populated first with the rebuild_search_index management command
+SEARCH_USE_PRODUCT_INDEX = False
+
+# areas of interest with more vertices than this are simplified within the
+# tolerance (in degrees, about 100 m) and split into parts of at most this
+# many vertices before they are used to filter search results
+SEARCH_AOI_MAX_VERTICES = 256
+SEARCH_AOI_TOLERANCE = 0.001
+
+# seconds the processing costs and exchange rates used to price search
+# records are cached, every process reloads them earlier when a cost or rate
+# is saved, orders are always priced with the current costs and rates
+PRICE_MATRIX_CACHE_TIMEOUT = 3600
+
+# seconds the product coverage of an order is cached, it is recomputed
+# earlier when the products of the order change
+ORDER_COVERAGE_CACHE_TIMEOUT = 86400
+
 # For ingesting MISR data
 MISR_ROOT = ''
 
@@ -52,3 +52,6 @@ WEBODT_CONVERTER = 'webodt.converters.abiword.AbiwordODFConverter'
 
 # don't use GEOIP for tests
 USE_GEOIP = False
+
+# run celery tasks, e.g. order notifications, inline
+CELERY_ALWAYS_EAGER = True
@@ -20,40 +20,54 @@ __copyright__ = 'South African National Space Agency'
 from django.db.models.query import QuerySet
 
 from django.contrib.gis.db import models
-from catalogue.dbhelpers import executeRAWSQL
 from exchange.models import Currency
 
 
+def _related_values(theValues):
+    """
+    Return a value usable in an __in lookup
+
+    Accepts either a related manager (e.g. Search.satellite) or an already
+    resolved iterable of primary keys, so callers holding prefetched criteria
+    do not trigger another query.
+    """
+    if hasattr(theValues, 'all'):
+        return theValues.all()
+    return theValues
+
+
 class OpticalProductProfileQuerySet(QuerySet):
     """
     Optical Product Profile extended query manager
 
     for_instrumenttypes - filters product profile by instrument types
 
+    All for_* filters accept a related manager, a queryset or a list of pks.
+
     """
 
     def for_licence_type(self, theLicenceType):
         return self.filter(
             satellite_instrument__satellite_instrument_group__satellite__license_type__in=
-            theLicenceType.all())
+            _related_values(theLicenceType))
 
     def for_collection(self, theCollection):
         return self.filter(
             satellite_instrument__satellite_instrument_group__satellite__collection__in=
-            theCollection.all()
+            _related_values(theCollection)
         )
 
     def for_instrumenttypes(self, theInstrumentTypes):
         return self.filter(
-            satellite_instrument__satellite_instrument_group__instrument_type__in=theInstrumentTypes.all())
+            satellite_instrument__satellite_instrument_group__instrument_type__in=_related_values(theInstrumentTypes))
 
     def for_satellite(self, theSatellite):
         return self.filter(
-            satellite_instrument__satellite_instrument_group__satellite__in=theSatellite.all())
+            satellite_instrument__satellite_instrument_group__satellite__in=_related_values(theSatellite))
 
     def for_spectralgroup(self, theSpectralgroup):
         return self.filter(
-            spectral_mode__spectralgroup__in=theSpectralgroup.all())
+            spectral_mode__spectralgroup__in=_related_values(theSpectralgroup))
 
     def only_searchable(self):
         return self.filter(
@@ -659,21 +673,13 @@ class SatelliteInstrumentGroup(models.Model):
         return self.products_per_year()[-1]['year']
 
     def products_per_year(self):
-        myStats = executeRAWSQL("""
-SELECT count(*) as count, extract(YEAR from gp.product_date)::int as year
-FROM
-  catalogue_genericproduct gp, catalogue_genericimageryproduct gip,
-  catalogue_genericsensorproduct gsp, catalogue_opticalproduct op,
-  dictionaries_opticalproductprofile opp, dictionaries_satelliteinstrument si
-WHERE
-  gip.genericproduct_ptr_id = gp.id AND
-  gsp.genericimageryproduct_ptr_id = gip.genericproduct_ptr_id AND
-  op.genericsensorproduct_ptr_id = gsp.genericimageryproduct_ptr_id AND
-  opp.id = op.product_profile_id AND opp.satellite_instrument_id = si.id
-  AND si.satellite_instrument_group_id=%(sensor_pk)s
-GROUP BY extract(YEAR from gp.product_date)
-ORDER BY year ASC;""", {'sensor_pk': self.pk})
-        return myStats
+        """Number of products per year, read from catalogue.SensorYearCount.
+
+        :returns: {'count': ..., 'year': ...} dicts ordered by year
+        :rtype: list
+        """
+        return list(self.year_counts.filter(count__gt=0).order_by(
+            'year').values('count', 'year'))
 
 
 class SatelliteInstrument(models.Model):
@@ -27,7 +27,10 @@ from django.contrib.contenttypes.models import ContentType
 # ABP: unused ? from catalogue.geoiputils import *
 from catalogue.nosubclassmanager import NoSubclassManager
 
-from catalogue.models.products import GenericSensorProduct
+from catalogue.models.products import (
+    GenericSensorProduct,
+    resolveConcreteProducts
+)
 
 
 ###############################################################################
@@ -158,6 +161,22 @@ class OrderQuerySet(QuerySet):
             models.Sum('searchrecord__rand_cost_per_scene')
         ).get('searchrecord__rand_cost_per_scene__sum')
 
+    def with_list_columns(self):
+        """
+        Annotate the orders with the columns of the order list
+
+        last_status_changed is the date the order got its current status and
+        total_value the sum of rand_cost_per_scene of its products, so the
+        list needs no queries per order
+        """
+        last_change = OrderStatusHistory.objects.filter(
+            order=models.OuterRef('pk'),
+            new_order_status=models.OuterRef('order_status')
+        ).order_by('-order_change_date').values('order_change_date')[:1]
+        return self.select_related('user', 'order_status').annotate(
+            last_status_changed=models.Subquery(last_change),
+            total_value=models.Sum('searchrecord__rand_cost_per_scene'))
+
 
 class Order(models.Model):
     """
@@ -247,7 +266,8 @@ class Order(models.Model):
     # orders that have no subclass instances (since
     # we want to be able to list product orders while excluding
     # their TaskingRequest subclasses
-    base_objects = NoSubclassManager()  # see catalogue/nosubclassmanager.py
+    base_objects = NoSubclassManager.from_queryset(
+        OrderQuerySet)()  # see catalogue/nosubclassmanager.py
 
     class Meta:
         verbose_name = 'Order'
@@ -262,25 +282,40 @@ class Order(models.Model):
         return "EO" + date + str(self.id)
 
     def get_recent_history_date(self):
-        current_status = OrderStatus.objects.get(name=self.order_status)
+        """
+        Date the order got its current status, None if it has no history
+
+        Uses the last_status_changed annotation of with_list_columns if set
+        """
+        if 'last_status_changed' in self.__dict__:
+            return self.last_status_changed
         recent_history = (
             OrderStatusHistory.objects.filter(order=self)
-                .filter(new_order_status=current_status)
-                .latest('order_change_date')
+                .filter(new_order_status_id=self.order_status_id)
+                .order_by('-order_change_date')
+                .values_list('order_change_date', flat=True)
+                .first()
         )
-        return recent_history.order_change_date
+        return recent_history
 
     def day_in_process(self):
-        if self.get_recent_history_date().date() == self.order_date.date():
+        recent_history_date = self.get_recent_history_date()
+        if recent_history_date is None:
+            return None
+        if recent_history_date.date() == self.order_date.date():
             return "less than one day"
         else:
-            return abs(self.get_recent_history_date().date() - self.order_date.date())
+            return abs(recent_history_date.date() - self.order_date.date())
 
     def value(self):
         """
         Total order vaule, a sum of total rand_cost_per_scene for all
         products per order
+
+        Uses the total_value annotation of with_list_columns if set
         """
+        if 'total_value' in self.__dict__:
+            return self.total_value
         return Order.objects.filter(pk=self.pk).sum_product_values()
 
     def cost(self):
@@ -394,28 +429,51 @@ class OrderNotificationRecipients(models.Model):
         Returns:
             listeners - users monitoring contenttypes and sensors
         Exceptions:
-            None
+            ObjectDoesNotExist - the product has no concrete instance
         """
         # Determines the product concrete class, should raise an error if does
         # not exists
-        instance = product.getConcreteInstance()
-        # Get class listeners
-        listeners = set([o.user for o in (
-            OrderNotificationRecipients.objects
-                .filter(
-                classes=ContentType.objects.get_for_model(instance.__class__))
-                .select_related()
-        )])
-        # Determines if is a sensor-based product and add sensor listeners
-        if isinstance(instance, GenericSensorProduct):
-            listeners.update([o.user for o in (
-                OrderNotificationRecipients.objects
-                    .filter(
-                    satellite_instrument_group=instance.product_profile
-                        .satellite_instrument.satellite_instrument_group)
-                    .select_related()
-            )])
-        return listeners
+        product.getConcreteInstance()
+        return OrderNotificationRecipients.get_users_for_products([product])
+
+    @staticmethod
+    def get_users_for_products(products):
+        """
+        Returns all users registered to the classes or sensors of products
+
+        Args:
+            products - list of product model instances (Required)
+        Returns:
+            listeners - users monitoring contenttypes and sensors, resolved
+                with one query per sensor product class and one for the
+                recipients
+        Exceptions:
+            None
+        """
+        instances = [
+            instance for instance in resolveConcreteProducts(products)
+            if instance is not None]
+        if not instances:
+            return set()
+        content_types = set(
+            ContentType.objects.get_for_model(instance.__class__)
+            for instance in instances)
+        # satellite instrument groups of sensor-based products, per class
+        sensor_product_ids = {}
+        for instance in instances:
+            if isinstance(instance, GenericSensorProduct):
+                sensor_product_ids.setdefault(
+                    instance.__class__, set()).add(instance.pk)
+        groups = set()
+        for sensor_class, ids in sensor_product_ids.items():
+            groups.update(sensor_class.objects.filter(pk__in=ids).values_list(
+                'product_profile__satellite_instrument'
+                '__satellite_instrument_group', flat=True))
+        listeners = OrderNotificationRecipients.objects.filter(
+            models.Q(classes__in=content_types) |
+            models.Q(satellite_instrument_group__in=groups)
+        ).select_related('user').distinct()
+        return set(listener.user for listener in listeners)
 
 
 class NonSearchRecord(models.Model):
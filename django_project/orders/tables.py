@@ -16,7 +16,7 @@ class OrderListTable(tables.Table):
     id = tables.Column()
     order_date = SANSADateColumn()
     user = tables.Column()
-    last_status_changed = tables.Column(accessor='get_recent_history_date',
+    last_status_changed = tables.Column(accessor='last_status_changed',
                                         orderable=False,)
     day_in_process = tables.Column(accessor='day_in_process',
                                    orderable=False,
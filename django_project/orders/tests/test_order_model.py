@@ -18,10 +18,13 @@ __date__ = '01/08/2013'
 __copyright__ = 'South African National Space Agency'
 
 import unittest
+from decimal import Decimal
+
 from django.test import TestCase
 from dictionaries.tests.model_factories import SubsidyTypeF
 from search.tests.model_factories import SearchRecordF
-from model_factories import OrderF
+from orders.models import Order
+from model_factories import OrderF, OrderStatusHistoryF
 from core.model_factories import CurrencyF
 
 
@@ -161,3 +164,42 @@ class TestOrderCRUD(TestCase):
         })
 
         self.assertEqual(order.cost(), 0)
+
+    def test_order_with_list_columns(self):
+        """
+        Tests Order list columns are annotated by one query
+        """
+        order = OrderF.create()
+        OrderStatusHistoryF.create(**{
+            'order': order,
+            'new_order_status': order.order_status
+        })
+        latest_change = OrderStatusHistoryF.create(**{
+            'order': order,
+            'new_order_status': order.order_status
+        })
+        # a change to another status is not the last status change
+        OrderStatusHistoryF.create(**{
+            'order': order
+        })
+        SearchRecordF.create(**{
+            'currency': CurrencyF.create(code='ZAR'),
+            'rand_cost_per_scene': 120.49,
+            'order': order
+        })
+        SearchRecordF.create(**{
+            'currency': CurrencyF.create(code='USD'),
+            'rand_cost_per_scene': 101.51,
+            'order': order
+        })
+
+        with self.assertNumQueries(1):
+            annotated = Order.objects.filter(
+                pk=order.pk).with_list_columns()[0]
+            self.assertEqual(
+                annotated.get_recent_history_date(),
+                latest_change.order_change_date)
+            self.assertEqual(annotated.value(), Decimal('222.00'))
+            self.assertEqual(annotated.day_in_process(), 'less than one day')
+        self.assertEqual(
+            order.get_recent_history_date(), latest_change.order_change_date)
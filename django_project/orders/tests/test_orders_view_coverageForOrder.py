@@ -0,0 +1,88 @@
+"""
+SANSA-EO Catalogue - orders_view_coverageForOrder - Orders views
+    unittests
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.model_factories import CurrencyF
+from search.models import SearchRecord
+from search.tests.model_factories import SearchRecordF
+from orders.views import coverage_for_order
+from .model_factories import OrderF
+
+
+class TestOrdersViewsCoverageForOrder(TestCase):
+    """
+    Tests orders.py coverage_for_order method
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        cache.clear()
+        self.order = OrderF.create()
+        self.currency = CurrencyF.create(code='ZAR')
+        # both records share the footprint of the product factory
+        for _ in range(2):
+            SearchRecordF.create(order=self.order, currency=self.currency)
+
+    def test_coverage_for_order(self):
+        """
+        Test coverage is the area of the union of the footprints
+        """
+        myCoverage = coverage_for_order(
+            self.order, SearchRecord.objects.filter(order=self.order))
+
+        self.assertEqual(
+            myCoverage['CentroidZone'], 'UTM34S (EPSG:32734)')
+        self.assertAlmostEqual(
+            myCoverage['ProductArea'], 79894321621, delta=79894321)
+        self.assertNotIn('IntersectedArea', myCoverage)
+
+    def test_coverage_for_order_aoi(self):
+        """
+        Test coverage intersected with an AOI
+        """
+        myAoi = Polygon.from_bbox((10, -40, 19, -20))
+        myAoi.srid = 4326
+        myCoverage = coverage_for_order(
+            self.order, SearchRecord.objects.filter(order=self.order), myAoi)
+
+        self.assertGreater(myCoverage['IntersectedArea'], 0)
+        self.assertLess(
+            myCoverage['IntersectedArea'], myCoverage['ProductArea'])
+
+    def test_coverage_for_order_cache(self):
+        """
+        Test coverage is cached until the records of the order change
+        """
+        myRecords = list(SearchRecord.objects.filter(order=self.order))
+        myCoverage = coverage_for_order(self.order, myRecords)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                coverage_for_order(self.order, myRecords), myCoverage)
+
+        myRecords.append(
+            SearchRecordF.create(order=self.order, currency=self.currency))
+        with self.assertNumQueries(1):
+            coverage_for_order(self.order, myRecords)
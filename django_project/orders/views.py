@@ -18,6 +18,7 @@ __copyright__ = 'South African National Space Agency'
 
 import logging
 import datetime
+import hashlib
 import traceback
 import json
 from decimal import Decimal
@@ -39,14 +40,11 @@ from django.shortcuts import get_object_or_404, render
 from django.contrib.admin.views.decorators import staff_member_required
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 # for aggregate queries
 from django.db.models import Count
 
-from django.contrib.gis.gdal import (
-    SpatialReference,
-    CoordTransform
-)
-
 import json as simplejson
 from exchange.models import Currency
 from exchange.conversion import convert_value
@@ -73,11 +71,14 @@ from catalogue.views.helpers import (
 )
 
 # SHP and KML readers
-from catalogue.utmzonecalc import utmZoneFromLatLon
+from catalogue.dbhelpers import executeRAWSQL
+from catalogue.models import GenericProduct
+from catalogue.utmzonecalc import UTM_ZONE_SRID_SQL, utmZoneFromLatLon
 from catalogue.profile_required_decorator import require_profile
 from catalogue.render_decorator import RenderWithContext
 
 from search.models import SearchRecord
+from search.pricing import prefetchPricingKeys
 from dictionaries.models import Projection, ProcessingLevel
 from django_tables2 import RequestConfig
 from orders.tables import OrderListTable
@@ -92,6 +93,29 @@ from orders.tables import OrderListTable
 logger = logging.getLogger(__name__)
 
 
+def order_list_table(request, records):
+    """
+    Prepare the orders of an order list page
+
+    The orders are annotated with the list columns. The PDF view gets an
+    iterator over all the orders instead of a table, as rendering all of
+    them as one page does not need pagination.
+
+    :param request: HttpRequest obj
+    :param records: Order queryset
+    :return: the table, None for the PDF view, and the orders
+    :rtype: tuple
+    """
+    records = records.with_list_columns()
+    if 'pdf' in request.GET:
+        return None, records.iterator()
+    table = OrderListTable(records)
+    RequestConfig(request, paginate={
+        'per_page': settings.PAGE_SIZE
+    }).configure(table)
+    return table, records
+
+
 @login_required
 @RenderWithContext('order-list-page.html', 'order-list.html')
 def my_orders(request):
@@ -106,25 +130,7 @@ def my_orders(request):
     """
     records = Order.objects.filter(
         user=request.user).order_by('-order_date')
-    if 'pdf' in request.GET:
-        # Django's pagination is only required for the PDF view as
-        # django-tables2 handles pagination for the table
-        table = None
-        page_size = records.count()
-        try:
-            page = int(request.GET.get('page', '1'))
-        except ValueError:
-            page = 1
-        paginator = Paginator(records, 1)
-        try:
-            records = paginator.page(page)
-        except (EmptyPage, InvalidPage):
-            records = paginator.page(paginator.num_pages)
-    else:
-        table = OrderListTable(records)
-        RequestConfig(request, paginate={
-            'per_page': settings.PAGE_SIZE
-        }).configure(table)
+    table, records = order_list_table(request, records)
     return ({
         'header': True,
         'myUrl': reverse('orders'),
@@ -164,25 +170,7 @@ def list_orders(request):
                 '-order_date')
         else:
             records = Order.base_objects.all().order_by('-order_date')
-    if 'pdf' in request.GET:
-        # Django's pagination is only required for the PDF view as
-        # django-tables2 handles pagination for the table
-        table = None
-        page_size = records.count()
-        try:
-            page = int(request.GET.get('page', '1'))
-        except ValueError:
-            page = 1
-        paginator = Paginator(records, page_size)
-        try:
-            records = paginator.page(page)
-        except (EmptyPage, InvalidPage):
-            records = paginator.page(paginator.num_pages)
-    else:
-        table = OrderListTable(records)
-        RequestConfig(request, paginate={
-            'per_page': settings.PAGE_SIZE
-        }).configure(table)
+    table, records = order_list_table(request, records)
     return ({
         'myUrl': reverse('list-orders'),
         'myCurrentMonth': datetime.date.today(),
@@ -338,6 +326,11 @@ def view_order(request, pk):
         raise Http404
     my_records = SearchRecord.objects.all().filter(order=my_order)
     if my_records.count() > 0:
+        # resolve the prices and products of all the records of the order
+        # at once
+        prefetchPricingKeys(my_records)
+        SearchRecord.prefetchConcreteProducts(my_records)
+        SearchRecord.prefetchUTMZones(my_records)
         my_history = OrderStatusHistory.objects.all().filter(order=my_order)
         my_status_form = OrderStatusHistoryForm()
         if request.method == 'POST':
@@ -464,7 +457,48 @@ def view_order(request, pk):
                 )
 
 
-def coverage_for_order(order, search_records):
+# union of the footprints of the products of an order, its centroid and its
+# area (and the area of its intersection with an AOI) in the UTM zone of the
+# centroid, computed in a single query. The zone matches utmZoneFromLatLon.
+ORDER_COVERAGE_SQL = """
+    WITH coverage AS (
+        SELECT ST_Union(product.spatial_coverage) AS geometry
+        FROM {record_table} AS record
+        JOIN {product_table} AS product ON product.id = record.product_id
+        WHERE record.order_id = %(order_id)s
+    ), centred AS (
+        SELECT geometry, ST_Centroid(geometry) AS centroid,
+            ST_Intersection(
+                geometry, ST_GeomFromEWKT(%(aoi)s)) AS intersection
+        FROM coverage
+        WHERE geometry IS NOT NULL
+    ), zoned AS (
+        SELECT geometry, centroid, intersection,
+            {zone_srid} AS srid
+        FROM centred
+    )
+    SELECT ST_X(centroid) AS x, ST_Y(centroid) AS y,
+        ST_Area(ST_Transform(geometry, srid)) AS product_area,
+        ST_Area(ST_Transform(intersection, srid)) AS intersected_area
+    FROM zoned
+"""
+
+
+def coverage_cache_key(order, search_records, aoi=None):
+    """Cache key of the coverage of an order.
+
+    The key changes with the products of the order, so adding or removing
+    records invalidates the cached coverage.
+    """
+    fingerprint = hashlib.md5(','.join(
+        str(product_id) for product_id in sorted(
+            record.product_id for record in search_records)).encode('utf-8'))
+    if aoi is not None:
+        fingerprint.update(aoi.ewkt.encode('utf-8'))
+    return 'orders.coverage.%s.%s' % (order.id, fingerprint.hexdigest())
+
+
+def coverage_for_order(order, search_records, aoi=None):
     """A small helper function to compute the coverage area. Logic is:
        - if AOI specified, the union of the products is clipped by the AOI
        - if no AOI is specified the area of the union of the products is
@@ -473,42 +507,39 @@ def coverage_for_order(order, search_records):
         ProductArea - total area of the union of all ordered products
         CentroidZone - UTM zone at cenroid of union of all ordered products
         IntersectedArea - area of union of all products intersected with AOI
+       The union, transformation and areas are computed by PostGIS and the
+       result is cached until the products of the order change.
        """
+    key = coverage_cache_key(order, search_records, aoi)
+    coverage = cache.get(key)
+    if coverage is not None:
+        return coverage
     coverage = {}
-    union = None
-    centroid = None
-    zones = []
     try:
-        for record in search_records:
-            geometry = record.product.spatial_coverage
-            if not union:
-                union = geometry
-            else:
-                # This can be done faster using cascaded union
-                # but needs geos 3.1
-                union = union.union(geometry)
-        if union:
-            centroid = union.centroid
-            zones = utmZoneFromLatLon(centroid.x, centroid.y)
-        if len(zones) > 0:
-            # use the first match
-            zone = zones[0]
-            logger.debug('Utm zones: %s' % zones)
-            logger.debug('Before geom xform to %s: %s' % (zone[0], union))
-            transform = CoordTransform(SpatialReference(4326),
-                                       SpatialReference(zone[0]))
-            union.transform(transform)
-            logger.debug('After geom xform: %s' % union)
-            coverage['ProductArea'] = int(union.area)
+        rows = executeRAWSQL(ORDER_COVERAGE_SQL.format(
+            record_table=SearchRecord._meta.db_table,
+            product_table=GenericProduct._meta.db_table,
+            zone_srid=UTM_ZONE_SRID_SQL.format(point='centroid')), {
+            'order_id': order.id,
+            'aoi': None if aoi is None else aoi.ewkt
+        })
+        if rows:
+            zone = utmZoneFromLatLon(rows[0]['x'], rows[0]['y'])
+            logger.debug('Utm zone: %s', zone)
+            coverage['ProductArea'] = int(rows[0]['product_area'])
             coverage['CentroidZone'] = (
                     '%s (EPSG:%s)' % (zone[1], zone[0]))
+            if aoi is not None:
+                coverage['IntersectedArea'] = int(
+                    rows[0]['intersected_area'] or 0)
         else:
             coverage['ProductArea'] = 'Error calculating area of products'
             coverage['CentroidZone'] = (
                 'Error calculating centroid of products')
     except Exception as e:
-        logger.info('Error calculating coverage for order %s' % e.message)
-        pass
+        logger.info('Error calculating coverage for order %s' % e)
+        return coverage
+    cache.set(key, coverage, settings.ORDER_COVERAGE_CACHE_TIMEOUT)
     return coverage
 
 
@@ -563,6 +594,11 @@ def add_order(request):
         else:
             logger.debug('Cart has records')
             logger.info('Cart contains : %i items', my_records.count())
+            # resolve the prices and products of all the records of the cart
+            # at once
+            prefetchPricingKeys(my_records)
+            SearchRecord.prefetchConcreteProducts(my_records)
+            SearchRecord.prefetchUTMZones(my_records)
     extra_options = {
         'myRecords': my_records,
     }
@@ -580,18 +616,19 @@ def add_order(request):
         if my_order_form.is_valid():
             logger.debug('Order valid')
 
-            order = my_order_form.save()
-            logger.debug('Order saved')
-
-            # update serachrecords
-
-            for myRecord in my_records:
-                myRecord.order = order
-                proj = Projection.objects.get(epsg_code=request.POST.get(str(myRecord.product.id) + '_projection'))
-                myRecord.projection = proj
-                proc = ProcessingLevel.objects.get(pk=request.POST.get(str(myRecord.product.id) + '_processing'))
-                myRecord.processing_level = proc
-                myRecord.save()
+            with transaction.atomic():
+                order = my_order_form.save()
+                logger.debug('Order saved')
+
+                # add the search records of the cart to the order
+                SearchRecord.placeOrder(
+                    order, my_records,
+                    dict((myRecord.product_id, request.POST.get(
+                        '%s_projection' % myRecord.product_id))
+                        for myRecord in my_records),
+                    dict((myRecord.product_id, request.POST.get(
+                        '%s_processing' % myRecord.product_id))
+                        for myRecord in my_records))
 
             notify_sales_staff(request.user, order.id)
             return HttpResponseRedirect(
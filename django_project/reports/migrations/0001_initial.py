@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('catalogue', '0003_worldborderpart_visit_report_counted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyVisitCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('country', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('month', 'country')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySearchCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('aoi', models.BooleanField(default=False)),
+                ('count', models.IntegerField(default=0)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogue.WorldBorders')),
+            ],
+            options={
+                'unique_together': {('month', 'country', 'aoi')},
+            },
+        ),
+    ]
@@ -1,3 +1,154 @@
+# coding=utf-8
+"""
+SANSA-EO Catalogue - Report application models
+
+The visitor and search reports read monthly per country counts from rollup
+tables, which reports.rollups keeps up to date.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
 from django.db import models
 
-# Create your models here.
+from catalogue.dbhelpers import executeRAWSQL
+from catalogue.utils import validate_params
+
+from .rollups import refresh_search_counts, refresh_visit_counts
+
+
+class MonthlyVisitCountManager(models.Manager):
+    """
+    Visit report helper methods
+    """
+
+    def country_stats(self, **kwargs):
+        """
+        Count visits per country
+
+        sort_col and sort_order used to allow for sorting of data in rendered
+        table in view.
+
+        :param kwargs: Includes sort_col and sort_order
+        """
+        refresh_visit_counts()
+        valid_sort_col, valid_sort_order = validate_params(
+            kwargs.get('sort_col', None), kwargs.get('sort_order', None),
+            'count', 'DESC'
+        )
+        return executeRAWSQL(
+            """
+            SELECT country, SUM(count) AS count
+            FROM reports_monthlyvisitcount WHERE country != 'south africa'
+            GROUP BY country
+            ORDER BY %s %s;
+            """ % (valid_sort_col, valid_sort_order)
+        )
+
+    def monthly_report(self, the_date, **kwargs):
+        """
+        Count visits per country for each month
+
+        sort_col and sort_order used to allow for sorting of data in rendered
+        table in view.
+        :param kwargs: Contains sort_col and sort_order for table rendering
+        :param the_date: The requested date for the report
+        """
+        refresh_visit_counts()
+        valid_sort_col, valid_sort_order = validate_params(
+            kwargs.get('sort_col', None), kwargs.get('sort_order', None),
+            'count', 'DESC'
+        )
+        return executeRAWSQL(
+            """
+            SELECT country, count, month
+            FROM reports_monthlyvisitcount
+            WHERE country != 'south africa' AND month = %%(month)s
+            ORDER BY %s %s;
+            """ % (valid_sort_col, valid_sort_order), {
+                'month': the_date.replace(day=1)
+            })
+
+
+class MonthlyVisitCount(models.Model):
+    """
+    Number of visits from a country in a month
+    """
+    month = models.DateField()
+    # lower case country name reported by GeoIP
+    country = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    objects = models.Manager()
+    helpers = MonthlyVisitCountManager()
+
+    class Meta:
+        unique_together = ('month', 'country')
+
+
+class MonthlySearchCountManager(models.Manager):
+    """
+    Search report helper methods
+    """
+
+    def monthly_report(self, date, aoi=False, **kwargs):
+        """
+        Count searches per country each month
+
+        :param date: The requested date for the report
+        :param aoi: Whether to count the countries intersecting the area of
+            interest of the searches rather than the countries of the user
+            ip positions
+        :param kwargs: Contains sort_col and sort_order for table rendering
+        """
+        refresh_search_counts()
+        valid_sort_col, valid_sort_order = validate_params(
+            kwargs.get('sort_col', None), kwargs.get('sort_order', None),
+            'count', 'DESC'
+        )
+        return executeRAWSQL(
+            """
+            SELECT b.name AS country, a.month, SUM(a.count) AS count
+            FROM reports_monthlysearchcount a
+            INNER JOIN catalogue_worldborders b ON b.id = a.country_id
+            WHERE a.month = %%(month)s AND a.aoi = %%(aoi)s
+            GROUP BY b.name, a.month
+            ORDER BY %s %s;
+            """ % (valid_sort_col, valid_sort_order), {
+                'month': date.replace(day=1),
+                'aoi': aoi
+            })
+
+
+class MonthlySearchCount(models.Model):
+    """
+    Number of searches from or of a country in a month
+    """
+    month = models.DateField()
+    country = models.ForeignKey(
+        'catalogue.WorldBorders',
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    # counts of the countries intersecting the search areas of interest
+    # rather than of the countries of the user ip positions
+    aoi = models.BooleanField(default=False)
+    count = models.IntegerField(default=0)
+
+    objects = models.Manager()
+    helpers = MonthlySearchCountManager()
+
+    class Meta:
+        unique_together = ('month', 'country', 'aoi')
@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+SANSA-EO Catalogue - Incremental refresh of the report rollups
+
+Visits and searches carry a report_counted flag with a partial index on the
+rows still to count. A refresh flags the pending rows and adds them to the
+monthly counts in one statement, so concurrent refreshes never count a row
+twice and rows committed late are picked up by the next refresh.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.db import connection
+
+REFRESH_VISIT_COUNTS_SQL = """
+WITH counted AS (
+    UPDATE catalogue_visit SET report_counted = TRUE
+    WHERE NOT report_counted
+    RETURNING visit_date, country)
+INSERT INTO reports_monthlyvisitcount (month, country, count)
+SELECT date_trunc('month', visit_date)::date, LOWER(country), COUNT(*)
+FROM counted
+GROUP BY 1, 2
+ON CONFLICT (month, country) DO UPDATE
+SET count = reports_monthlyvisitcount.count + EXCLUDED.count;
+"""
+
+REFRESH_SEARCH_COUNTS_SQL = """
+WITH counted AS (
+    UPDATE search_search SET report_counted = TRUE
+    WHERE NOT report_counted
+    RETURNING id, search_date, ip_country_id),
+stamps AS (
+    SELECT search_date, ip_country_id AS country_id, FALSE AS aoi
+    FROM counted WHERE ip_country_id IS NOT NULL
+    UNION ALL
+    SELECT a.search_date, b.worldborders_id, TRUE
+    FROM counted a INNER JOIN search_search_aoi_countries b ON
+        b.search_id = a.id)
+INSERT INTO reports_monthlysearchcount (month, country_id, aoi, count)
+SELECT date_trunc('month', search_date)::date, country_id, aoi, COUNT(*)
+FROM stamps
+GROUP BY 1, 2, 3
+ON CONFLICT (month, country_id, aoi) DO UPDATE
+SET count = reports_monthlysearchcount.count + EXCLUDED.count;
+"""
+
+
+def refresh_visit_counts():
+    """
+    Add the visits recorded since the last refresh to the monthly counts
+
+    :return: Number of changed monthly counts :rtype: int
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_VISIT_COUNTS_SQL)
+        return cursor.rowcount
+
+
+def refresh_search_counts():
+    """
+    Add the searches made since the last refresh to the monthly counts
+
+    :return: Number of changed monthly counts :rtype: int
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_SEARCH_COUNTS_SQL)
+        return cursor.rowcount
+
+
+def refresh_report_rollups():
+    """
+    Refresh the visit and search monthly counts
+    """
+    return refresh_visit_counts() + refresh_search_counts()
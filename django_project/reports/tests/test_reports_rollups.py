@@ -0,0 +1,142 @@
+"""
+SANSA-EO Catalogue - reports_rollups - Report rollup unittests
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import datetime
+from django.test import TestCase
+
+from catalogue.models import WorldBorderPart
+from catalogue.tests.model_factories import VisitF, WorldBordersF
+from search.tests.model_factories import SearchF
+from reports.models import MonthlySearchCount, MonthlyVisitCount
+from reports.rollups import refresh_report_rollups
+
+
+class TestReportRollups(TestCase):
+    """
+    Tests the country stamps and the monthly report rollups
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mEast = WorldBordersF.create(**{
+            'iso2': 'EA',
+            'iso3': 'EAS',
+            'name': 'East',
+            'geometry': 'MULTIPOLYGON(((0 -10, 10 -10, 10 10, 0 10, 0 -10)))'
+        })
+        self.mWest = WorldBordersF.create(**{
+            'iso2': 'WE',
+            'iso3': 'WES',
+            'name': 'West',
+            'geometry': (
+                'MULTIPOLYGON(((-10 -10, -1 -10, -1 10, -10 10, -10 -10)))')
+        })
+        self.mMonth = datetime.date.today().replace(day=1)
+
+    def test_worldBorderParts(self):
+        """
+        Test saved borders are subdivided
+        """
+        self.assertTrue(
+            WorldBorderPart.objects.filter(border=self.mEast).exists())
+        self.mEast.geometry = (
+            'MULTIPOLYGON(((20 -10, 30 -10, 30 10, 20 10, 20 -10)))')
+        self.mEast.save()
+        self.assertTrue(WorldBorderPart.objects.filter(
+            border=self.mEast, geometry__intersects='POINT(25 0)').exists())
+        self.assertFalse(WorldBorderPart.objects.filter(
+            border=self.mEast, geometry__intersects='POINT(5 0)').exists())
+
+    def test_searchCountryStamps(self):
+        """
+        Test searches are stamped with their countries when saved
+        """
+        mySearch = SearchF.create(**{
+            'ip_position': 'POINT(5 5)',
+            'geometry': 'POLYGON((-5 -5, 5 -5, 5 5, -5 5, -5 -5))'
+        })
+        self.assertEqual(mySearch.ip_country_id, self.mEast.pk)
+        self.assertEqual(
+            set(mySearch.aoi_countries.all()), set([self.mEast, self.mWest]))
+
+        mySearch.ip_position = 'POINT(50 50)'
+        mySearch.geometry = None
+        mySearch.save()
+        self.assertIsNone(mySearch.ip_country_id)
+        self.assertEqual(mySearch.aoi_countries.count(), 0)
+
+    def test_searchCounts(self):
+        """
+        Test searches are counted once per month and country
+        """
+        for myX in range(2):
+            SearchF.create(**{
+                'ip_position': 'POINT(5 5)',
+                'geometry': 'POLYGON((-5 -5, 5 -5, 5 5, -5 5, -5 -5))'
+            })
+        refresh_report_rollups()
+        refresh_report_rollups()
+        SearchF.create(**{
+            'ip_position': 'POINT(-5 5)',
+            'geometry': 'POLYGON((1 1, 5 1, 5 5, 1 5, 1 1))'
+        })
+
+        myScores = MonthlySearchCount.helpers.monthly_report(
+            self.mMonth, sort_col='country', sort_order='ASC')
+        self.assertEqual(
+            [(myScore['country'], myScore['count']) for myScore in myScores],
+            [('East', 2), ('West', 1)])
+        self.assertEqual(myScores[0]['month'], self.mMonth)
+
+        myScores = MonthlySearchCount.helpers.monthly_report(
+            self.mMonth, aoi=True, sort_col='country', sort_order='ASC')
+        self.assertEqual(
+            [(myScore['country'], myScore['count']) for myScore in myScores],
+            [('East', 3), ('West', 2)])
+
+        self.assertEqual(
+            MonthlySearchCount.helpers.monthly_report(
+                self.mMonth - datetime.timedelta(days=1)), [])
+
+    def test_visitCounts(self):
+        """
+        Test visits are counted per lower case country name
+        """
+        VisitF.create(**{'country': 'Germany'})
+        VisitF.create(**{'country': 'germany'})
+        refresh_report_rollups()
+        VisitF.create(**{'country': 'Germany'})
+        VisitF.create(**{'country': 'South Africa'})
+        VisitF.create(**{'country': 'Kenya'})
+
+        myScores = MonthlyVisitCount.helpers.country_stats()
+        self.assertEqual(
+            [(myScore['country'], myScore['count']) for myScore in myScores],
+            [('germany', 3), ('kenya', 1)])
+
+        myScores = MonthlyVisitCount.helpers.monthly_report(
+            self.mMonth, sort_col='country', sort_order='DESC')
+        self.assertEqual(
+            [(myScore['country'], myScore['count']) for myScore in myScores],
+            [('kenya', 1), ('germany', 3)])
+        self.assertEqual(
+            MonthlyVisitCount.objects.get(
+                month=self.mMonth, country='south africa').count, 1)
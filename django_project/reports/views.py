@@ -18,7 +18,6 @@ __version__ = '0.1'
 __date__ = '17/08/2012'
 __copyright__ = 'South African National Space Agency'
 
-import json
 # for error logging
 import traceback
 # for date handling
@@ -52,6 +51,7 @@ from catalogue.models import (
     OpticalProduct
 )
 from catalogue.render_decorator import RenderWithContext
+from catalogue.sensorcounts import sensor_summaries
 
 from search.models import (
     Search,
@@ -62,6 +62,7 @@ from dictionaries.models import (
     Band,
     ProcessingLevel
 )
+from reports.models import MonthlySearchCount, MonthlyVisitCount
 from reports.tables import (
     table_sort_settings,
     CountryTable,
@@ -107,7 +108,7 @@ def visitor_report(request):
     :return: visitorReport.html :rtype: HttpResponse
     """
     sort_col, sort_order, sort_link = table_sort_settings(request)
-    country_stats = Visit.helpers.country_stats(
+    country_stats = MonthlyVisitCount.helpers.country_stats(
         sort_col=sort_col or 'count',
         sort_order=sort_order or 'DESC'
     )
@@ -149,7 +150,7 @@ def visitor_monthly_report(request, year, month):
             logger.error('Date arguments cannot be parsed')
             logger.info(traceback.format_exc())
 
-    country_stats = Visit.helpers.monthly_report(
+    country_stats = MonthlyVisitCount.helpers.monthly_report(
         my_date,
         sort_col=sort_col,
         sort_order=sort_order
@@ -235,7 +236,8 @@ def search_history(request):
     :return: mySearches.html :rtype: HttpResponse
     """
     whole_search_history = Search.objects.filter(
-        user=request.user.id).filter(deleted=False).order_by('-search_date')
+        user=request.user.id).filter(deleted=False).order_by(
+        '-search_date').with_list_columns()
     table = SearchesTable(whole_search_history)
     RequestConfig(request, paginate={
         'per_page': settings.PAGE_SIZE
@@ -257,10 +259,9 @@ def recent_searches(request):
     :param request: HttpRequest dict
     :return: recentSearches.html :rtype: HttpResponse
     """
-    search_history_objs = (
-        Search.objects.filter(deleted=False).order_by('-search_date'))
-    if len(search_history_objs) > 50:
-        search_history_objs = search_history_objs[:50]
+    search_history_objs = list(
+        Search.objects.filter(deleted=False).order_by(
+            '-search_date').with_list_columns()[:50])
     table = SearchesTable(search_history_objs)
     table.orderable = False
     return ({
@@ -291,7 +292,7 @@ def search_monthly_report(request, year, month):
             date = None
             logger.error('Date arguments cannot be parsed')
             logger.info(traceback.format_exc())
-    country_stats = Search.helpers.monthly_report(
+    country_stats = MonthlySearchCount.helpers.monthly_report(
         date,
         sort_col=sort_col,
         sort_order=sort_order
@@ -334,8 +335,9 @@ def search_monthly_report_aoi(request, year, month):
             logger.error('Date arguments cannot be parsed')
             logger.info(traceback.format_exc())
 
-    country_stats = Search.helpers.monthly_report_aoi(
+    country_stats = MonthlySearchCount.helpers.monthly_report(
         date,
+        aoi=True,
         sort_col=sort_col,
         sort_order=sort_order
     )
@@ -361,19 +363,8 @@ def data_summary_table(request):
     Summary of available records
     :param request: HttpRequest dict
     """
-    total = 0
-
-    try:
-        # Open data summary json file, change this path
-        json_file = open('/home/web/static/output.json')
-        json_data = json.load(json_file)
-        json_file.close()
-    except IOError:
-        print('File not found')
-        json_data = []
-
-    for result in json_data:
-        total += result['id__count']
+    json_data = sensor_summaries()
+    total = sum(result['id__count'] for result in json_data)
     if 'pdf' in request.GET:
         # Django's pagination is only required for the PDF view as
         # django-tables2 handles pagination for the table
@@ -0,0 +1,96 @@
+"""
+SANSA-EO Catalogue - Preparation of search areas of interest
+
+An uploaded or digitised area of interest can be a coastline with tens of
+thousands of vertices, which makes every intersection test against a
+product footprint expensive. prepareAOI turns it into a valid multipolygon
+of small parts, simplified within SEARCH_AOI_TOLERANCE and buffered by the
+same distance so that it still covers the original area. Each part is tested
+separately, so the spatial index of the footprints is used per part.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.conf import settings
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
+from django.db import connection
+
+PREPARE_AOI_SQL = """
+SELECT ST_AsEWKB(ST_Multi(ST_Collect(part)))
+FROM ST_Subdivide(
+    ST_Buffer(
+        ST_SimplifyPreserveTopology(
+            ST_CollectionExtract(ST_MakeValid(ST_GeomFromEWKB(%(aoi)s)), 3),
+            %(tolerance)s),
+        %(tolerance)s, 'join=mitre'),
+    %(max_vertices)s) AS part;
+"""
+
+
+def prepareAOI(theGeometry):
+    """
+    Return the prepared form of an area of interest
+
+    Args:
+        theGeometry - Polygon in EPSG:4326, as a geometry or (e)wkt, or None
+    Returns:
+        MultiPolygon - the parts of the area, the area itself as the only
+            part when it is valid and has few vertices, None without an area
+    Exceptions:
+        None
+    """
+    if not theGeometry:
+        return None
+    if not isinstance(theGeometry, GEOSGeometry):
+        theGeometry = GEOSGeometry(theGeometry)
+    if theGeometry.srid is None:
+        theGeometry.srid = 4326
+    if (theGeometry.num_points <= settings.SEARCH_AOI_MAX_VERTICES and
+            theGeometry.valid):
+        myPrepared = MultiPolygon(theGeometry.clone())
+    else:
+        with connection.cursor() as myCursor:
+            myCursor.execute(PREPARE_AOI_SQL, {
+                'aoi': bytes(theGeometry.ewkb),
+                'tolerance': settings.SEARCH_AOI_TOLERANCE,
+                'max_vertices': settings.SEARCH_AOI_MAX_VERTICES
+            })
+            myWkb = myCursor.fetchone()[0]
+        if myWkb is None:
+            return None
+        myPrepared = GEOSGeometry(bytes(myWkb))
+    myPrepared.srid = theGeometry.srid
+    return myPrepared
+
+
+def searchAOI(theSearch):
+    """
+    Return the area of interest used to filter the results of a search
+
+    Searches saved before their area was prepared use the original area.
+    """
+    return theSearch.prepared_geometry or theSearch.geometry
+
+
+def aoiParts(theGeometry):
+    """
+    Return the polygons of an area of interest
+    """
+    if not theGeometry:
+        return []
+    if theGeometry.geom_type == 'MultiPolygon':
+        return list(theGeometry)
+    return [theGeometry]
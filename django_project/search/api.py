@@ -21,7 +21,6 @@ import logging
 
 from django.conf.urls import url
 from django.contrib.auth.models import User
-from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.http import HttpResponse
 from django.utils.decorators import method_decorator
@@ -39,12 +38,15 @@ from rest_framework.views import APIView
 from rest_framework import status
 from core.api_fields import ProductRelField
 
-from search.models import Search, SearchRecord
-from search.searcher import Searcher
+from search.models import SearchRecord
+from search.searcher import Searcher, get_search_with_criteria
 from search.serializers import SearchRecordSerializer
 
 from catalogue.models import OpticalProduct
-from catalogue.serializers.product_serializer import OpticalProductSerializer
+from catalogue.serializers.product_serializer import (
+    SearchResultSerializer,
+    search_result_queryset
+)
 
 from catalogue.limitoffset_pagination import LimitOffsetPagination
 
@@ -94,11 +96,12 @@ class SearchResultsResource(ModelResource):
 
     def obj_get_list(self, bundle, *args, **kwargs):
         # for the specific guid, retrieve the results
-        mySearch = get_object_or_404(Search, guid=kwargs.get('guid'))
-        mySearcher = Searcher(mySearch)
+        mySearch = get_search_with_criteria(kwargs.get('guid'))
+        # the record count is kept in sync by the result cache
+        mySearcher = Searcher(mySearch, theUpdateRecordCount=False)
 
         try:
-            objects = mySearcher.mQuerySet
+            objects = mySearcher.cachedResults()
             return self.authorized_read_list(objects, bundle)
         except ValueError:
             raise BadRequest(
@@ -185,16 +188,17 @@ class SearchRecordDetailsView(APIView):
 
 
 class SearchResultsResourceView(ListAPIView):
-    serializer_class = OpticalProductSerializer
+    serializer_class = SearchResultSerializer
     pagination_class = LimitOffsetPagination
 
     def get_queryset(self):
 
-        search = get_object_or_404(Search, guid=self.kwargs.get('guid'))
-        result = Searcher(search)
+        search = get_search_with_criteria(self.kwargs.get('guid'))
+        # the record count is kept in sync by the result cache
+        result = Searcher(search, theUpdateRecordCount=False)
 
         try:
-            query_list = result.mQuerySet
+            query_list = result.cachedResults(search_result_queryset())
             return query_list
 
         except OpticalProduct.DoesNotExist:
@@ -0,0 +1,131 @@
+"""
+SANSA-EO Catalogue - Search result cache
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import logging
+logger = logging.getLogger(__name__)
+
+from django.contrib.gis.db import models
+from django.db import connection
+
+from catalogue.models import OpticalProduct
+from catalogue.models.signals import products_bulk_saved
+
+from .models import SearchResultCache
+
+# search date ranges are compared with one hour of tolerance by the Searcher,
+# so a day of margin is kept here. Searches are matched with the prepared
+# area of interest the Searcher filters with, see search.aoi
+INVALIDATE_SQL = """
+DELETE FROM search_searchresultcache
+WHERE product_ids && %(ids)s::integer[]
+OR guid IN (
+    SELECT s.guid
+    FROM search_search s
+    INNER JOIN catalogue_genericproduct p ON p.id = ANY(%(ids)s::integer[])
+    WHERE s.guid IN (SELECT guid FROM search_searchresultcache)
+    AND (s.geometry IS NULL OR ST_Intersects(
+        COALESCE(s.prepared_geometry, s.geometry), p.spatial_coverage))
+    AND (NOT EXISTS (
+        SELECT 1 FROM search_searchdaterange r WHERE r.search_id = s.id)
+    OR EXISTS (
+        SELECT 1 FROM search_searchdaterange r WHERE r.search_id = s.id
+        AND r.start_date <= p.product_date::date
+        AND r.end_date >= p.product_date::date - 1)));
+"""
+
+
+class CachedSearchResults(object):
+    """
+    Sequence of search result products backed by a list of cached product ids
+
+    Supports count(), len() and slicing so it can be handed to the tastypie
+    and rest_framework paginators in place of a queryset. Only the rows of
+    the requested slice are fetched from the database.
+    """
+
+    def __init__(self, theProductIds, theQuerySet=None):
+        self.mProductIds = theProductIds
+        if theQuerySet is None:
+            theQuerySet = OpticalProduct.objects.all()
+        self.mQuerySet = theQuerySet
+
+    def count(self):
+        return len(self.mProductIds)
+
+    def __len__(self):
+        return len(self.mProductIds)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, theKey):
+        if isinstance(theKey, slice):
+            myIds = self.mProductIds[theKey]
+            myProducts = self.mQuerySet.in_bulk(myIds)
+            # keep the cached order, skip products deleted in the meantime
+            return [myProducts[myId] for myId in myIds if myId in myProducts]
+        return self.mQuerySet.get(pk=self.mProductIds[theKey])
+
+
+def invalidate_search_result_cache(theProductIds=None):
+    """
+    Remove cached results of searches that could be changed by products
+
+    An entry is removed when it holds one of the products, whose footprint
+    or date may have moved out of the result, or when one of the products
+    now matches the area of interest and date ranges of its search. Only the
+    searches with cached results are tested.
+
+    Args:
+        theProductIds - ids of saved products, if None all entries are removed
+    Returns:
+        None
+    Exceptions:
+        None
+    """
+    if theProductIds is None:
+        myCount, _ = SearchResultCache.objects.all().delete()
+    else:
+        myProductIds = sorted(set(theProductIds))
+        if not myProductIds:
+            return
+        with connection.cursor() as myCursor:
+            myCursor.execute(INVALIDATE_SQL, {'ids': myProductIds})
+            myCount = myCursor.rowcount
+    logger.debug('Search result cache entries removed: %s', myCount)
+
+
+def invalidate_for_product(sender, instance, **kwargs):
+    """
+    Remove cached search results which are affected by a saved product
+    """
+    invalidate_search_result_cache([instance.pk])
+
+
+def invalidate_for_bulk_saved_products(sender, product_ids, **kwargs):
+    """
+    Remove cached search results which are affected by bulk saved products
+    """
+    invalidate_search_result_cache(product_ids)
+
+
+models.signals.post_save.connect(
+    invalidate_for_product, sender=OpticalProduct)
+products_bulk_saved.connect(
+    invalidate_for_bulk_saved_products, sender=OpticalProduct)
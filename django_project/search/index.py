@@ -0,0 +1,215 @@
+"""
+SANSA-EO Catalogue - Flat product search index maintenance
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import logging
+logger = logging.getLogger(__name__)
+
+from django.conf import settings
+from django.contrib.gis.db import models
+from django.core.signals import setting_changed
+from django.db import transaction
+
+from catalogue.models import OpticalProduct
+from catalogue.models.signals import products_bulk_saved
+from dictionaries.models import (
+    OpticalProductProfile,
+    SatelliteInstrument,
+    SatelliteInstrumentGroup,
+    Satellite,
+    InstrumentType,
+    SpectralMode
+)
+
+from .models import ProductSearchIndex
+
+# number of products (re)indexed per transaction
+INDEX_CHUNK_SIZE = 5000
+
+_SIG = 'product_profile__satellite_instrument__satellite_instrument_group'
+
+# index attribute names and the OpticalProduct lookups they are copied from
+INDEX_FIELDS = {
+    'product_date': 'product_date',
+    'spatial_coverage': 'spatial_coverage',
+    'cloud_cover': 'cloud_cover',
+    'path': 'path',
+    'row': 'row',
+    'spatial_resolution': 'spatial_resolution',
+    'band_count': 'band_count',
+    'sensor_inclination_angle': 'sensor_inclination_angle',
+    'product_profile_id': 'product_profile',
+    'is_searchable': _SIG + '__instrument_type__is_searchable',
+    'collection_id': _SIG + '__satellite__collection',
+    'satellite_id': _SIG + '__satellite',
+    'instrument_type_id': _SIG + '__instrument_type',
+    'spectral_group_id': 'product_profile__spectral_mode__spectralgroup',
+    'license_type_id': _SIG + '__satellite__license_type'
+}
+
+# dictionaries which change the resolved ids of the products that use them
+DICTIONARY_PRODUCT_LOOKUPS = {
+    OpticalProductProfile: 'product_profile',
+    SatelliteInstrument: 'product_profile__satellite_instrument',
+    SatelliteInstrumentGroup: _SIG,
+    Satellite: _SIG + '__satellite',
+    InstrumentType: _SIG + '__instrument_type',
+    SpectralMode: 'product_profile__spectral_mode'
+}
+
+
+def _index_chunk(theProductIds):
+    """
+    Replace the index rows of a list of product ids
+    """
+    myRows = [
+        ProductSearchIndex(product_id=myProduct['pk'], **{
+            myField: myProduct[myLookup]
+            for myField, myLookup in INDEX_FIELDS.items()})
+        for myProduct in OpticalProduct.objects.filter(
+            pk__in=theProductIds).values('pk', *INDEX_FIELDS.values())
+    ]
+
+    with transaction.atomic():
+        ProductSearchIndex.objects.filter(
+            product_id__in=theProductIds).delete()
+        ProductSearchIndex.objects.bulk_create(myRows)
+    return len(myRows)
+
+
+def index_products(theProducts=None):
+    """
+    (Re)build the search index rows for optical products
+
+    The products are read in chunks of ids, each chunk is indexed in its own
+    transaction.
+
+    Args:
+        theProducts - OpticalProduct queryset, defaults to all products
+    Returns:
+        int - number of indexed products
+    Exceptions:
+        None
+    """
+    if theProducts is None:
+        theProducts = OpticalProduct.objects.all()
+    myProducts = theProducts.order_by('pk')
+    myCount = 0
+    myLastId = 0
+    while True:
+        myProductIds = list(myProducts.filter(
+            pk__gt=myLastId).values_list('pk', flat=True)[:INDEX_CHUNK_SIZE])
+        if not myProductIds:
+            break
+        myCount += _index_chunk(myProductIds)
+        myLastId = myProductIds[-1]
+        logger.debug('Products indexed: %s', myCount)
+    return myCount
+
+
+def reindex_dictionary(theDictionary, thePk):
+    """
+    Reindex the products referencing a dictionary row
+
+    Args:
+        theDictionary - one of the DICTIONARY_PRODUCT_LOOKUPS models
+        thePk - primary key of the dictionary row
+    Returns:
+        int - number of indexed products
+    Exceptions:
+        None
+    """
+    return index_products(OpticalProduct.objects.filter(
+        **{DICTIONARY_PRODUCT_LOOKUPS[theDictionary]: thePk}))
+
+
+def index_saved_product(sender, instance, **kwargs):
+    """
+    Keep the search index row of a saved product in sync
+    """
+    _index_chunk([instance.pk])
+
+
+def index_bulk_saved_products(sender, product_ids, **kwargs):
+    """
+    Keep the search index rows of bulk saved products in sync
+    """
+    index_products(OpticalProduct.objects.filter(pk__in=product_ids))
+
+
+def reindex_for_dictionary(sender, instance, created, **kwargs):
+    """
+    Queue the reindex of products referencing a changed dictionary row
+
+    A dictionary row can be referenced by millions of products, so they are
+    reindexed by a celery task once the change is committed.
+    """
+    if created:
+        # no product can reference a new dictionary row yet
+        return
+    # the task module imports this module
+    from catalogue.tasks import reindex_dictionary_products
+    myLabel = sender._meta.label
+    myPk = instance.pk
+    transaction.on_commit(
+        lambda: reindex_dictionary_products.delay(myLabel, myPk))
+
+
+def connect_index_signals():
+    """
+    Keep the search index in sync with saved products and dictionaries
+    """
+    models.signals.post_save.connect(
+        index_saved_product, sender=OpticalProduct)
+    products_bulk_saved.connect(
+        index_bulk_saved_products, sender=OpticalProduct)
+    for myDictionary in DICTIONARY_PRODUCT_LOOKUPS:
+        models.signals.post_save.connect(
+            reindex_for_dictionary, sender=myDictionary)
+
+
+def disconnect_index_signals():
+    """
+    Stop maintaining the search index, see connect_index_signals
+    """
+    models.signals.post_save.disconnect(
+        index_saved_product, sender=OpticalProduct)
+    products_bulk_saved.disconnect(
+        index_bulk_saved_products, sender=OpticalProduct)
+    for myDictionary in DICTIONARY_PRODUCT_LOOKUPS:
+        models.signals.post_save.disconnect(
+            reindex_for_dictionary, sender=myDictionary)
+
+
+def index_setting_changed(sender, setting, value, **kwargs):
+    """
+    Follow SEARCH_USE_PRODUCT_INDEX when it is changed, e.g. by tests
+    """
+    if setting != 'SEARCH_USE_PRODUCT_INDEX':
+        return
+    if value:
+        connect_index_signals()
+    else:
+        disconnect_index_signals()
+
+
+# the index is only maintained while searches use it, run the
+# rebuild_search_index command after enabling it
+if getattr(settings, 'SEARCH_USE_PRODUCT_INDEX', False):
+    connect_index_signals()
+setting_changed.connect(index_setting_changed)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from search.index import index_products
+
+__author__ = 'tim@linfiniti.com'
+__date__ = '18/10/2026'
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the flat product search index from all optical products'
+
+    def handle(self, *args, **options):
+        """Implementation for command
+
+        The index is rebuilt in chunks, each chunk in its own transaction, so
+        the search keeps working while the command runs.
+        """
+        myCount = index_products()
+        self.stdout.write('Products indexed : %s' % myCount)
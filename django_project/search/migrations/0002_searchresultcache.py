@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 09:12
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchResultCache',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('guid', models.CharField(max_length=40)),
+                ('criteria_hash', models.CharField(max_length=40)),
+                ('product_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None)),
+                ('date', models.DateTimeField(auto_now_add=True, help_text='When the results were cached', verbose_name='Date')),
+            ],
+            options={
+                'verbose_name': 'Search result cache',
+                'verbose_name_plural': 'Search result caches',
+                'unique_together': {('guid', 'criteria_hash')},
+            },
+        ),
+    ]
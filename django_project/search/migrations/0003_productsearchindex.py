@@ -0,0 +1,42 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:41
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0002_allusersmessage_contact_continuousproduct_genericimageryproduct_genericproduct_genericsensorproduct_'),
+        ('dictionaries', '0002_auto_20230606_1250'),
+        ('search', '0002_searchresultcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchIndex',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to='catalogue.OpticalProduct')),
+                ('product_date', models.DateTimeField(db_index=True)),
+                ('spatial_coverage', django.contrib.gis.db.models.fields.PolygonField(srid=4326)),
+                ('cloud_cover', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('path', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('row', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('spatial_resolution', models.FloatField(db_index=True)),
+                ('band_count', models.IntegerField(db_index=True)),
+                ('sensor_inclination_angle', models.FloatField(blank=True, db_index=True, null=True)),
+                ('is_searchable', models.BooleanField(db_index=True, default=True)),
+                ('collection', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dictionaries.Collection')),
+                ('instrument_type', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dictionaries.InstrumentType')),
+                ('license_type', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dictionaries.License')),
+                ('product_profile', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dictionaries.OpticalProductProfile')),
+                ('satellite', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dictionaries.Satellite')),
+                ('spectral_group', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dictionaries.SpectralGroup')),
+            ],
+            options={
+                'verbose_name': 'Product search index',
+                'verbose_name_plural': 'Product search index',
+            },
+        ),
+    ]
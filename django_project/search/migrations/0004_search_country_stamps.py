@@ -0,0 +1,47 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0003_worldborderpart_visit_report_counted'),
+        ('search', '0003_productsearchindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='search',
+            name='aoi_countries',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='_search_aoi_countries_+', to='catalogue.WorldBorders'),
+        ),
+        migrations.AddField(
+            model_name='search',
+            name='ip_country',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalogue.WorldBorders'),
+        ),
+        migrations.AddField(
+            model_name='search',
+            name='report_counted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='search',
+            index=models.Index(condition=models.Q(report_counted=False), fields=['report_counted'], name='search_report_pending'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE search_search SET ip_country_id = (
+                SELECT border_id FROM catalogue_worldborderpart
+                WHERE ST_Intersects(geometry, search_search.ip_position)
+                LIMIT 1)
+            WHERE ip_position IS NOT NULL;
+            INSERT INTO search_search_aoi_countries (search_id, worldborders_id)
+            SELECT DISTINCT s.id, p.border_id
+            FROM search_search s INNER JOIN catalogue_worldborderpart p ON
+                ST_Intersects(p.geometry, s.geometry);
+            """,
+            migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('search', '0004_search_country_stamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='search',
+            index=models.Index(fields=['user', '-search_date'], name='search_user_history'),
+        ),
+        migrations.AddIndex(
+            model_name='search',
+            index=models.Index(condition=models.Q(deleted=False), fields=['-search_date'], name='search_recent'),
+        ),
+    ]
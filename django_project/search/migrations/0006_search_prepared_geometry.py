@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-18 15:10
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0005_search_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='search',
+            name='prepared_geometry',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326),
+        ),
+        # same as search.aoi.prepareAOI with the default settings
+        migrations.RunSQL(
+            """
+            UPDATE search_search SET prepared_geometry = CASE
+                WHEN ST_NPoints(geometry) <= 256 AND ST_IsValid(geometry)
+                THEN ST_Multi(geometry)
+                ELSE (
+                    SELECT ST_Multi(ST_Collect(part))
+                    FROM ST_Subdivide(
+                        ST_Buffer(
+                            ST_SimplifyPreserveTopology(
+                                ST_CollectionExtract(
+                                    ST_MakeValid(geometry), 3),
+                                0.001),
+                            0.001, 'join=mitre'),
+                        256) AS part)
+                END
+            WHERE geometry IS NOT NULL;
+            """,
+            migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 16:40
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0006_search_prepared_geometry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchresultcache',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['product_ids'], name='searchresultcache_products'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0007_searchresultcache_products_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE search_price_matrix_version;',
+            'DROP SEQUENCE search_price_matrix_version;'),
+    ]
@@ -11,8 +11,11 @@ Contact : lkleyn@sansa.org.za
    of Linfiniti Consulting CC.
 
 """
-from catalogue.models import GenericProduct
-from catalogue.utils import validate_params
+from catalogue.models import (
+    GenericProduct,
+    WorldBorderPart,
+    resolveConcreteProducts
+)
 
 __author__ = 'tim@linfiniti.com'
 __version__ = '0.1'
@@ -26,19 +29,23 @@ from datetime import datetime
 
 from django.contrib.auth.models import User
 from django.contrib.gis.db import models
-from django.core.exceptions import ObjectDoesNotExist
-
-from exchange.conversion import convert_value
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import transaction
 
-from catalogue.dbhelpers import executeRAWSQL
+from catalogue.utmzonecalc import utmZonesForExtents
+from dictionaries.models import ProcessingLevel, Projection
 
-from dictionaries.models import (
-    SpectralModeProcessingCosts,
-    InstrumentTypeProcessingLevel
-)
 from exchange.models import Currency
 from orders.models import Order
 
+from .aoi import prepareAOI
+from .pricing import (
+    PriceMatrix,
+    availableProcessingLevels,
+    priceSearchRecords
+)
+
 
 class SearchRecord(models.Model):
     """
@@ -130,64 +137,21 @@ class SearchRecord(models.Model):
         json formatted available UTM zones for product
         used in order page for populating available product UTM zones
         """
-        return json.dumps(
-            [list(zone) for zone in self.product.getUTMZones()])
+        if hasattr(self, '_utm_zones'):
+            myZones = self._utm_zones
+        else:
+            myZones = self.product.getUTMZones()
+        return json.dumps([list(zone) for zone in myZones])
 
     def availableProcessingLevelsJSON(self):
         """
         json formated available processing levels for products
         user in order page for populating available product processing
         options
-        """
-        availableLevels = (
-            self.product.getConcreteInstance().availableProcessingLevels()
-        )
-        levels = list()
-        for lvl in availableLevels:
-            insTypeProcLevel = InstrumentTypeProcessingLevel.objects.filter(
-                processing_level=lvl,
-                instrument_type=(
-                    self.product.getConcreteInstance().product_profile
-                        .satellite_instrument.satellite_instrument_group
-                        .instrument_type
-                )
-            ).get()
-            try:
-                spectralModeProcCosts = SpectralModeProcessingCosts.objects.filter(
-                    spectral_mode=(
-                        self.product.getConcreteInstance().product_profile
-                            .spectral_mode
-                    ),
-                    instrument_type_processing_level=insTypeProcLevel
-                ).get()
-                rand_cost_per_scene = convert_value(
-                    spectralModeProcCosts.cost_per_scene,
-                    spectralModeProcCosts.get_currency().code, 'ZAR'
-                )
-            except ObjectDoesNotExist:
-                rand_cost_per_scene = 0
-            levels.append([lvl.id, lvl.name, int(rand_cost_per_scene)])
-        # add base level and cost
-        try:
-            instrumentType = self.product.getConcreteInstance().product_profile.satellite_instrument.satellite_instrument_group.instrument_type
-            baseinsTypeProcLevel = InstrumentTypeProcessingLevel.objects.filter(
-                processing_level=instrumentType.base_processing_level,
-                instrument_type=instrumentType).get()
-            basespectralModeProcCosts = SpectralModeProcessingCosts.objects.filter(
-                spectral_mode=(
-                    self.product.getConcreteInstance().product_profile
-                        .spectral_mode
-                ),
-                instrument_type_processing_level=baseinsTypeProcLevel
-            ).get()
-            rand_cost_per_scene = convert_value(
-                basespectralModeProcCosts.cost_per_scene,
-                basespectralModeProcCosts.get_currency().code, 'ZAR'
-            )
-        except ObjectDoesNotExist:
-            rand_cost_per_scene = 0
-        levels.append([14, 'Level 0 Raw instrument data', rand_cost_per_scene])
 
+        Call pricing.prefetchPricingKeys on the records of a cart or order
+        first to resolve their products in one query.
+        """
         def decimal_default(obj):
             """Cater for decimals as per
             http://stackoverflow.com/questions/16957275/
@@ -197,8 +161,8 @@ class SearchRecord(models.Model):
                 return float(obj)
             raise TypeError
 
-        return json.dumps([list(level) for level in levels],
-                          default=decimal_default)
+        return json.dumps(
+            availableProcessingLevels(self), default=decimal_default)
 
     def create(self, theUser, theProduct):
         """Python has no support for overloading constrctors"""
@@ -212,6 +176,120 @@ class SearchRecord(models.Model):
 
         return myRecord
 
+    @staticmethod
+    def prefetchConcreteProducts(theRecords):
+        """
+        Load the concrete products of many records at once
+
+        Args:
+            theRecords - iterable of SearchRecord instances, passing a
+                queryset evaluates it so its cached rows get the products
+        Returns:
+            list - the records, getConcreteInstance on their products needs
+                no further queries
+        Exceptions:
+            None
+        """
+        myRecords = list(theRecords)
+        myField = SearchRecord._meta.get_field('product')
+        myProducts = GenericProduct.objects.in_bulk(set(
+            myRecord.product_id for myRecord in myRecords
+            if not myField.is_cached(myRecord)))
+        for myRecord in myRecords:
+            if myRecord.product_id in myProducts:
+                myRecord.product = myProducts[myRecord.product_id]
+        resolveConcreteProducts(
+            myRecord.product for myRecord in myRecords)
+        return myRecords
+
+    @staticmethod
+    def placeOrder(theOrder, theRecords, theProjectionCodes,
+                   theProcessingLevelIds):
+        """
+        Add many cart records to an order in a single transaction
+
+        The projections and processing levels are resolved with one query
+        each, the costs of all the records are snapshot in one pass and the
+        records are written with one bulk update.
+
+        Args:
+            theOrder - Order instance the records are added to
+            theRecords - iterable of SearchRecord instances in the cart
+            theProjectionCodes - dict, product id -> requested epsg code
+            theProcessingLevelIds - dict, product id -> requested processing
+                level id
+        Returns:
+            list - the updated records
+        Exceptions:
+            Projection.DoesNotExist - a requested projection does not exist
+            ProcessingLevel.DoesNotExist - a requested processing level does
+                not exist
+            Currency.DoesNotExist - there is no ZAR currency
+        """
+        myRecords = list(theRecords)
+        myEpsgField = Projection._meta.get_field('epsg_code')
+        myLevelField = ProcessingLevel._meta.get_field('id')
+        myCodes = {}
+        myLevelIds = {}
+        for myRecord in myRecords:
+            myCode = theProjectionCodes.get(myRecord.product_id)
+            myLevelId = theProcessingLevelIds.get(myRecord.product_id)
+            myCodes[myRecord.product_id] = (
+                None if myCode is None else myEpsgField.to_python(myCode))
+            myLevelIds[myRecord.product_id] = (
+                None if myLevelId is None else
+                myLevelField.to_python(myLevelId))
+        myProjections = Projection.objects.in_bulk(
+            set(myCodes.values()) - set([None]), field_name='epsg_code')
+        myLevels = ProcessingLevel.objects.in_bulk(
+            set(myLevelIds.values()) - set([None]))
+        for myRecord in myRecords:
+            myCode = myCodes[myRecord.product_id]
+            if myCode not in myProjections:
+                raise Projection.DoesNotExist(
+                    'Projection %s does not exist' % myCode)
+            myLevelId = myLevelIds[myRecord.product_id]
+            if myLevelId not in myLevels:
+                raise ProcessingLevel.DoesNotExist(
+                    'Processing level %s does not exist' % myLevelId)
+            myRecord.order = theOrder
+            myRecord.projection = myProjections[myCode]
+            myRecord.processing_level = myLevels[myLevelId]
+        # snapshot the current costs at the time of placing the order
+        for myRecord, myPrice in zip(
+                myRecords, priceSearchRecords(myRecords, PriceMatrix())):
+            (myRecord.currency, myRecord.cost_per_scene,
+             myRecord.rand_cost_per_scene) = myPrice
+        with transaction.atomic():
+            SearchRecord.objects.bulk_update(myRecords, [
+                'order', 'projection', 'processing_level', 'currency',
+                'cost_per_scene', 'rand_cost_per_scene'])
+        return myRecords
+
+    @staticmethod
+    def prefetchUTMZones(theRecords):
+        """
+        Compute the UTM zones of the products of many records at once
+
+        Call prefetchConcreteProducts first, the footprints of the loaded
+        products are used.
+
+        Args:
+            theRecords - iterable of SearchRecord instances, each gets a
+                _utm_zones attribute used by availableUTMZonesJSON
+        Returns:
+            list - the records
+        Exceptions:
+            None
+        """
+        myRecords = list(theRecords)
+        myZones = utmZonesForExtents(
+            myRecord.product.spatial_coverage.extent
+            for myRecord in myRecords)
+        for myRecord, myRecordZones in zip(myRecords, myZones):
+            myRecord._utm_zones = myRecordZones
+        return myRecords
+
     def save(self, *args, **kwargs):
         """
         Set product_ready according to local_storage_path and download_path
@@ -250,35 +328,9 @@ class SearchRecord(models.Model):
 
         This method is invoked by a post_save signal on Order model
         """
-        try:
-            # identify InstrumentTypeProcessingLevel
-            insTypeProcLevel = InstrumentTypeProcessingLevel.objects.filter(
-                processing_level=self.processing_level,
-                instrument_type=(
-                    self.product.getConcreteInstance().product_profile
-                        .satellite_instrument.satellite_instrument_group
-                        .instrument_type
-                )
-            ).get()
-            # retrieve the processing mode costs
-            mode = self.product.getConcreteInstance().product_profile.spectral_mode
-            spectralModeProcCosts = SpectralModeProcessingCosts.objects.filter(
-                spectral_mode=(
-                    self.product.getConcreteInstance().product_profile
-                        .spectral_mode
-                ),
-                instrument_type_processing_level=insTypeProcLevel
-            ).get()
-            self.currency = spectralModeProcCosts.get_currency()
-            self.cost_per_scene = spectralModeProcCosts.cost_per_scene
-            self.rand_cost_per_scene = convert_value(
-                spectralModeProcCosts.cost_per_scene,
-                self.currency.code, 'ZAR'
-            )
-        except ObjectDoesNotExist:
-            self.currency = Currency.objects.get(code='ZAR')
-            self.cost_per_scene = 0
-            self.rand_cost_per_scene = 0
+        (self.currency, self.cost_per_scene,
+         self.rand_cost_per_scene) = priceSearchRecords(
+            [self], PriceMatrix())[0]
 
         # snapshot current values
 
@@ -330,62 +382,20 @@ class BaseSearch(models.Model):
         super(BaseSearch, self).save(*args, **kwargs)
 
 
-class SearchHelpersManager(models.Manager):
+class SearchQuerySet(models.QuerySet):
     """
-    Search model helper methods
+    Search model extended query manager
     """
 
-    def monthly_report(self, date, **kwargs):
+    def with_list_columns(self):
         """
-        Count searches per country for user each month
-        """
-        sort_col = kwargs.get('sort_col', None)
-        sort_order = kwargs.get('sort_order', None)
-        valid_sort_col, valid_sort_order = validate_params(
-            sort_col, sort_order,
-            'count', 'DESC'
-        )
-        raw_str = """
-WITH search_geom AS (SELECT a.name, b.search_date FROM catalogue_worldborders a
-    INNER JOIN search_search b ON
-    st_intersects(a.geometry,b.ip_position))
-SELECT name as country, date_trunc('month',search_date) as month,
-    count(*) as count
-FROM search_geom
-WHERE search_date BETWEEN to_date({{date}},'MM-YYYY') AND
-    to_date({{date}},'MM-YYYY') + interval '1 month'
-GROUP BY name,date_trunc('month',search_date)
-ORDER BY %s %s;""" % (valid_sort_col, valid_sort_order)
-        raw_sql = raw_str.replace('{{date}}', '%(date)s')
-        results = executeRAWSQL(raw_sql, {
-            'date': date.strftime('%m-%Y'),
-        })
-        return results
-
-    def monthly_report_aoi(self, date, **kwargs):
-        """
-        Count AOI searches per country per each month
+        Load the users and criteria shown in the search lists
+
+        The satellites, instrument types and date ranges of all searches are
+        prefetched so SearchesTable needs no queries per search
         """
-        sort_col = kwargs.get('sort_col', None)
-        sort_order = kwargs.get('sort_order', None)
-        valid_sort_col, valid_sort_order = validate_params(
-            sort_col, sort_order,
-            'count', 'DESC'
-        )
-        raw_str = """
-SELECT a.name as country, date_trunc('month',b.search_date) as month,
-    count(*) as count
-FROM catalogue_worldborders a INNER JOIN search_search b ON
-    st_intersects(a.geometry,b.geometry)
-WHERE search_date between to_date({{date}},'MM-YYYY') AND
-        to_date({{date}},'MM-YYYY') + interval '1 month'
-GROUP BY  a.name,date_trunc('month',b.search_date)
-ORDER BY %s %s;""" % (valid_sort_col, valid_sort_order)
-        raw_sql = raw_str.replace('{{date}}', '%(date)s')
-        results = executeRAWSQL(raw_sql, {
-            'date': date.strftime('%m-%Y'),
-        })
-        return results
+        return self.select_related('user').prefetch_related(
+            'satellite', 'instrument_type', 'searchdaterange_set')
 
 
 class Search(BaseSearch):
@@ -527,14 +537,74 @@ class Search(BaseSearch):
         blank=True,
         help_text='Select one or more satellite collections.'
     )
+    # country of the ip position and countries intersecting the area of
+    # interest, stamped when the search is saved
+    ip_country = models.ForeignKey(
+        'catalogue.WorldBorders',
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        on_delete=models.SET_NULL
+    )
+    aoi_countries = models.ManyToManyField(
+        'catalogue.WorldBorders',
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+    # whether the search was added to the report rollups
+    report_counted = models.BooleanField(default=False, editable=False)
+    # the area of interest simplified and split into parts, used to filter
+    # the search results, see search.aoi
+    prepared_geometry = models.MultiPolygonField(
+        srid=4326, null=True, blank=True, editable=False)
     # Use the geo manager to handle geometry
-    objects = models.Manager()
-    helpers = SearchHelpersManager()
+    objects = SearchQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Search'
         verbose_name_plural = 'Searches'
         ordering = ('search_date',)
+        indexes = [
+            # search history of a user and recent searches
+            models.Index(
+                fields=['user', '-search_date'], name='search_user_history'),
+            models.Index(
+                fields=['-search_date'], name='search_recent',
+                condition=models.Q(deleted=False)),
+            models.Index(
+                fields=['report_counted'], name='search_report_pending',
+                condition=models.Q(report_counted=False))
+        ]
+
+    def save(self, *args, **kwargs):
+        # partial saves, e.g. of the record count, keep the country stamps
+        if kwargs.get('update_fields') is not None:
+            super(Search, self).save(*args, **kwargs)
+            return
+        self.prepared_geometry = prepareAOI(self.geometry)
+        # the country stamps are committed with the search so the report
+        # rollups never count a search without them
+        with transaction.atomic():
+            self.ip_country_id = None
+            if self.ip_position:
+                self.ip_country_id = WorldBorderPart.objects.filter(
+                    geometry__intersects=self.ip_position
+                ).values_list('border_id', flat=True).first()
+            super(Search, self).save(*args, **kwargs)
+            self.stamp_aoi_countries()
+
+    def stamp_aoi_countries(self):
+        """
+        Stamp the countries intersecting the area of interest
+        """
+        if not self.geometry:
+            self.aoi_countries.clear()
+            return
+        self.aoi_countries.set(set(WorldBorderPart.objects.filter(
+            geometry__intersects=self.geometry
+        ).values_list('border_id', flat=True)))
 
     def __unicode__(self):
         return "%s Guid: %s User: %s" % (
@@ -568,6 +638,117 @@ class Search(BaseSearch):
         return sensors
 
 
+###############################################################################
+#
+# Cached search results
+#
+###############################################################################
+
+
+class SearchResultCache(models.Model):
+    """
+    Stores the ordered product ids matching a search
+
+    Entries are keyed by the search guid and a hash of the search criteria so
+    result pages can be served by slicing the ids instead of re-running the
+    spatial query. Entries are removed when ingested products could change
+    the result, see search.cache.
+    """
+    guid = models.CharField(max_length=40)
+    criteria_hash = models.CharField(max_length=40)
+    product_ids = ArrayField(models.IntegerField())
+    date = models.DateTimeField(
+        verbose_name='Date', auto_now_add=True,
+        help_text='When the results were cached')
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Search result cache'
+        verbose_name_plural = 'Search result caches'
+        unique_together = ('guid', 'criteria_hash')
+        indexes = [
+            # entries holding saved products, see search.cache
+            GinIndex(
+                fields=['product_ids'], name='searchresultcache_products')
+        ]
+
+    def __unicode__(self):
+        return "%s Guid: %s Records: %s" % (
+            self.date, self.guid, len(self.product_ids))
+
+
+###############################################################################
+#
+# Flat product search index
+#
+###############################################################################
+
+
+class ProductSearchIndex(models.Model):
+    """
+    Denormalised copy of the searchable OpticalProduct attributes
+
+    Holds the product attributes spread across the GenericProduct inheritance
+    chain together with the dictionary ids resolved through the product
+    profile, so the Searcher can filter a single indexed table instead of
+    joining the inheritance chain and the dictionaries.
+
+    Field names match the OpticalProduct fields so the same search filters
+    apply to both. Rows are maintained by search.index.
+    """
+    product = models.OneToOneField(
+        'catalogue.OpticalProduct',
+        primary_key=True,
+        related_name='search_index',
+        on_delete=models.CASCADE
+    )
+    product_date = models.DateTimeField(db_index=True)
+    spatial_coverage = models.PolygonField(srid=4326)
+    cloud_cover = models.IntegerField(null=True, blank=True, db_index=True)
+    path = models.IntegerField(null=True, blank=True, db_index=True)
+    row = models.IntegerField(null=True, blank=True, db_index=True)
+    spatial_resolution = models.FloatField(db_index=True)
+    band_count = models.IntegerField(db_index=True)
+    sensor_inclination_angle = models.FloatField(
+        null=True, blank=True, db_index=True)
+    is_searchable = models.BooleanField(default=True, db_index=True)
+    # resolved dictionary ids, constraints are kept on the product tables
+    collection = models.ForeignKey(
+        'dictionaries.Collection', related_name='+', db_constraint=False,
+        on_delete=models.DO_NOTHING
+    )
+    satellite = models.ForeignKey(
+        'dictionaries.Satellite', related_name='+', db_constraint=False,
+        on_delete=models.DO_NOTHING
+    )
+    instrument_type = models.ForeignKey(
+        'dictionaries.InstrumentType', related_name='+', db_constraint=False,
+        on_delete=models.DO_NOTHING
+    )
+    spectral_group = models.ForeignKey(
+        'dictionaries.SpectralGroup', related_name='+', db_constraint=False,
+        on_delete=models.DO_NOTHING
+    )
+    license_type = models.ForeignKey(
+        'dictionaries.License', related_name='+', db_constraint=False,
+        on_delete=models.DO_NOTHING
+    )
+    product_profile = models.ForeignKey(
+        'dictionaries.OpticalProductProfile', related_name='+',
+        db_constraint=False, on_delete=models.DO_NOTHING
+    )
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Product search index'
+        verbose_name_plural = 'Product search index'
+
+    def __unicode__(self):
+        return '{}'.format(self.product_id)
+
+
 ###############################################################################
 #
 # Search date ranges
@@ -662,3 +843,8 @@ class Clip(models.Model):
     class Meta:
         verbose_name = 'Clip'
         verbose_name_plural = 'Clips'
+
+
+# connect the search result cache and search index signals
+from . import cache  # noqa
+from . import index  # noqa
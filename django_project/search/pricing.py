@@ -0,0 +1,323 @@
+"""
+SANSA-EO Catalogue - Processing level pricing of search records
+
+The processing costs (instrument type x processing level x spectral mode x
+sales region) and the exchange rates to ZAR are loaded into a PriceMatrix
+which is kept in the django cache, so pricing a cart costs one query for the
+products of its records and one for the price version. The version is a
+database sequence bumped whenever a price related row is committed, so the
+per process caches are refreshed by every process. Orders are priced from
+a fresh PriceMatrix.
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'tim@linfiniti.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.conf import settings
+from django.contrib.gis.db import models
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+
+from catalogue.models import OpticalProduct
+from dictionaries.models import (
+    InstrumentType,
+    InstrumentTypeProcessingLevel,
+    ProcessingLevel,
+    SpectralModeProcessingCosts
+)
+from exchange.models import Currency, ExchangeRate
+
+PRICE_MATRIX_CACHE_KEY = 'search.pricing.price_matrix'
+
+# the sequence is created by the search migrations, before its first nextval
+# last_value is already 1 and is_called is false
+PRICE_MATRIX_VERSION_SQL = (
+    'SELECT CASE WHEN is_called THEN last_value ELSE 0 END '
+    'FROM search_price_matrix_version')
+BUMP_PRICE_MATRIX_VERSION_SQL = (
+    "SELECT nextval('search_price_matrix_version')")
+
+# currency all prices are converted to
+RAND_CODE = 'ZAR'
+
+_SIG = 'product_profile__satellite_instrument__satellite_instrument_group'
+
+
+class PriceMatrix(object):
+    """
+    Processing levels, processing costs and exchange rates as plain values
+    """
+
+    def __init__(self):
+        # instrument type id -> [(processing level id, name)]
+        self.mLevels = {}
+        for myTypeId, myLevelId, myName in (
+                InstrumentTypeProcessingLevel.objects.order_by(
+                    'processing_level__abbreviation').values_list(
+                    'instrument_type_id', 'processing_level_id',
+                    'processing_level__name')):
+            self.mLevels.setdefault(myTypeId, []).append((myLevelId, myName))
+        # instrument type id -> base processing level id
+        self.mBaseLevels = dict(InstrumentType.objects.values_list(
+            'id', 'base_processing_level_id'))
+        self.mCurrencyCodes = dict(Currency.objects.values_list('id', 'code'))
+        self.mRandCurrencyId = None
+        for myId, myCode in self.mCurrencyCodes.items():
+            if myCode == RAND_CODE:
+                self.mRandCurrencyId = myId
+        # (instrument type id, processing level id, spectral mode id) ->
+        #     {sales region id: (cost per scene, currency id)}
+        self.mCosts = {}
+        for myRow in SpectralModeProcessingCosts.objects.values_list(
+                'instrument_type_processing_level__instrument_type_id',
+                'instrument_type_processing_level__processing_level_id',
+                'spectral_mode_id', 'sales_region_id', 'cost_per_scene',
+                'currency_id'):
+            myRegions = self.mCosts.setdefault(myRow[:3], {})
+            myRegions[myRow[3]] = (myRow[4], myRow[5])
+        # currency code -> rate to ZAR
+        self.mRates = dict(ExchangeRate.objects.filter(
+            target__code=RAND_CODE).values_list('source__code', 'rate'))
+
+    def levels(self, theInstrumentTypeId):
+        """
+        Return the (id, name) of the processing levels of an instrument type
+        """
+        return self.mLevels.get(theInstrumentTypeId, [])
+
+    def baseLevel(self, theInstrumentTypeId):
+        """
+        Return the base processing level id of an instrument type
+        """
+        return self.mBaseLevels.get(theInstrumentTypeId)
+
+    def currencyCode(self, theCurrencyId):
+        """
+        Return the code of a currency, costs without currency are in ZAR
+
+        Exceptions:
+            Currency.DoesNotExist - there is no ZAR currency
+        """
+        if theCurrencyId is None:
+            if self.mRandCurrencyId is None:
+                raise Currency.DoesNotExist('Currency %s does not exist' % (
+                    RAND_CODE))
+            return RAND_CODE
+        return self.mCurrencyCodes[theCurrencyId]
+
+    def cost(self, theInstrumentTypeId, theProcessingLevelId,
+             theSpectralModeId, theSalesRegionId=None):
+        """
+        Return the cost per scene of a processing level
+
+        Args:
+            theInstrumentTypeId - id of the product instrument type
+            theProcessingLevelId - id of the processing level
+            theSpectralModeId - id of the product spectral mode
+            theSalesRegionId - id of the sales region, the default region is
+                used when None and there are costs for several regions
+        Returns:
+            tuple - (cost per scene, currency code, currency id), the currency
+                id is the ZAR currency for costs without currency
+        Exceptions:
+            SpectralModeProcessingCosts.DoesNotExist - there is no cost
+        """
+        myRegions = self.mCosts.get(
+            (theInstrumentTypeId, theProcessingLevelId, theSpectralModeId),
+            {})
+        if theSalesRegionId is None and len(myRegions) == 1:
+            theSalesRegionId = list(myRegions)[0]
+        elif theSalesRegionId is None:
+            theSalesRegionId = SpectralModeProcessingCosts._meta.get_field(
+                'sales_region').default
+        if theSalesRegionId not in myRegions:
+            raise SpectralModeProcessingCosts.DoesNotExist(
+                'No processing cost for level %s' % theProcessingLevelId)
+        myCost, myCurrencyId = myRegions[theSalesRegionId]
+        myCode = self.currencyCode(myCurrencyId)
+        if myCurrencyId is None:
+            myCurrencyId = self.mRandCurrencyId
+        return myCost, myCode, myCurrencyId
+
+    def toRand(self, theValue, theCurrencyCode):
+        """
+        Convert a value to ZAR
+
+        Exceptions:
+            ExchangeRate.DoesNotExist - there is no rate for the currency
+        """
+        if theCurrencyCode == RAND_CODE:
+            return theValue
+        if theCurrencyCode not in self.mRates:
+            raise ExchangeRate.DoesNotExist(
+                'No exchange rate from %s to %s' % (
+                    theCurrencyCode, RAND_CODE))
+        return theValue * self.mRates[theCurrencyCode]
+
+    def randCost(self, theInstrumentTypeId, theProcessingLevelId,
+                 theSpectralModeId, theSalesRegionId=None):
+        """
+        Return the ZAR cost per scene of a processing level, 0 if unknown
+        """
+        try:
+            myCost, myCode, _ = self.cost(
+                theInstrumentTypeId, theProcessingLevelId, theSpectralModeId,
+                theSalesRegionId)
+            return self.toRand(myCost, myCode)
+        except ObjectDoesNotExist:
+            return 0
+
+
+def priceMatrixVersion():
+    """
+    Return the version of the prices shared by all processes
+    """
+    with connection.cursor() as myCursor:
+        myCursor.execute(PRICE_MATRIX_VERSION_SQL)
+        return myCursor.fetchone()[0]
+
+
+def bumpPriceMatrixVersion():
+    """
+    Make all processes reload their cached price matrix
+    """
+    with connection.cursor() as myCursor:
+        myCursor.execute(BUMP_PRICE_MATRIX_VERSION_SQL)
+
+
+def getPriceMatrix():
+    """
+    Return the cached price matrix, loading it if the prices changed
+    """
+    myVersion = priceMatrixVersion()
+    myCached = cache.get(PRICE_MATRIX_CACHE_KEY)
+    if myCached is not None and myCached[0] == myVersion:
+        return myCached[1]
+    myMatrix = PriceMatrix()
+    cache.set(
+        PRICE_MATRIX_CACHE_KEY, (myVersion, myMatrix),
+        settings.PRICE_MATRIX_CACHE_TIMEOUT)
+    return myMatrix
+
+
+def invalidate_price_matrix(sender, **kwargs):
+    """
+    Drop the cached price matrices after a price related row changed
+
+    The version is bumped once the change is committed, a process reading it
+    earlier would cache the old prices under the new version.
+    """
+    cache.delete(PRICE_MATRIX_CACHE_KEY)
+    transaction.on_commit(bumpPriceMatrixVersion)
+
+
+def prefetchPricingKeys(theRecords):
+    """
+    Resolve the pricing keys of the products of many records in one query
+
+    Args:
+        theRecords - iterable of SearchRecord instances, each gets a
+            _pricing_key attribute, None for products which are not optical
+    Returns:
+        list - the records
+    Exceptions:
+        None
+    """
+    myRecords = list(theRecords)
+    myKeys = dict(
+        (myId, (myTypeId, myModeId))
+        for myId, myTypeId, myModeId in OpticalProduct.objects.filter(
+            pk__in=set(myRecord.product_id for myRecord in myRecords)
+        ).values_list(
+            'pk', _SIG + '__instrument_type_id',
+            'product_profile__spectral_mode_id'))
+    for myRecord in myRecords:
+        myRecord._pricing_key = myKeys.get(myRecord.product_id)
+    return myRecords
+
+
+def priceSearchRecords(theRecords, theMatrix=None):
+    """
+    Price the chosen processing level of many records
+
+    Args:
+        theRecords - iterable of SearchRecord instances
+        theMatrix - PriceMatrix, the cached one when None
+    Returns:
+        list - (Currency, cost per scene, ZAR cost per scene) per record,
+            ZAR and 0 costs for records without a processing cost or
+            exchange rate
+    Exceptions:
+        Currency.DoesNotExist - there is no ZAR currency
+    """
+    myMatrix = theMatrix or getPriceMatrix()
+    myRecords = [
+        myRecord for myRecord in theRecords
+        if not hasattr(myRecord, '_pricing_key')]
+    if myRecords:
+        prefetchPricingKeys(myRecords)
+    myPrices = []
+    for myRecord in theRecords:
+        myTypeId, myModeId = myRecord._pricing_key or (None, None)
+        try:
+            myCost, myCode, myCurrencyId = myMatrix.cost(
+                myTypeId, myRecord.processing_level_id, myModeId)
+            myPrices.append(
+                (myCurrencyId, myCost, myMatrix.toRand(myCost, myCode)))
+        except ObjectDoesNotExist:
+            myMatrix.currencyCode(None)
+            myPrices.append((myMatrix.mRandCurrencyId, 0, 0))
+    myCurrencies = Currency.objects.in_bulk(
+        set(myPrice[0] for myPrice in myPrices))
+    return [
+        (myCurrencies[myCurrencyId], myCost, myRandCost)
+        for myCurrencyId, myCost, myRandCost in myPrices]
+
+
+def availableProcessingLevels(theRecord, theMatrix=None):
+    """
+    Return the processing levels of a record and their ZAR costs
+
+    Args:
+        theRecord - SearchRecord instance
+        theMatrix - PriceMatrix, the cached one when None
+    Returns:
+        list - [id, name, ZAR cost] of the levels, the base level last
+    Exceptions:
+        None
+    """
+    myMatrix = theMatrix or getPriceMatrix()
+    if not hasattr(theRecord, '_pricing_key'):
+        prefetchPricingKeys([theRecord])
+    myLevels = []
+    myTypeId, myModeId = theRecord._pricing_key or (None, None)
+    for myLevelId, myName in myMatrix.levels(myTypeId):
+        myLevels.append([
+            myLevelId, myName,
+            int(myMatrix.randCost(myTypeId, myLevelId, myModeId))])
+    # add base level and cost
+    myLevels.append([
+        14, 'Level 0 Raw instrument data',
+        myMatrix.randCost(myTypeId, myMatrix.baseLevel(myTypeId), myModeId)])
+    return myLevels
+
+
+for myModel in (InstrumentType, InstrumentTypeProcessingLevel,
+                 ProcessingLevel, SpectralModeProcessingCosts, Currency,
+                 ExchangeRate):
+    models.signals.post_save.connect(invalidate_price_matrix, sender=myModel)
+    models.signals.post_delete.connect(
+        invalidate_price_matrix, sender=myModel)
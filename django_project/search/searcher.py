@@ -17,6 +17,8 @@ __version__ = '0.1'
 __date__ = '16/02/2013'
 __copyright__ = 'South African National Space Agency'
 
+import hashlib
+import json
 import logging
 
 # Get an instance of a logger
@@ -24,7 +26,9 @@ logger = logging.getLogger(__name__)
 
 from datetime import timedelta
 
+from django.conf import settings
 from django.db.models import Q
+from django.shortcuts import get_object_or_404
 
 # Models and forms for our app
 
@@ -34,6 +38,33 @@ from dictionaries.models import SatelliteInstrumentGroup
 from catalogue.fields import IntegersCSVIntervalsField
 from catalogue.models import OpticalProduct
 
+from .aoi import aoiParts, searchAOI
+from .cache import CachedSearchResults
+from .models import ProductSearchIndex, Search, SearchResultCache
+
+# Search relations which hold the search criteria, they are loaded in one
+# prefetch by get_search_with_criteria
+SEARCH_CRITERIA_RELATIONS = (
+    'collection',
+    'satellite',
+    'instrument_type',
+    'spectral_group',
+    'license_type',
+    'searchdaterange_set'
+)
+
+
+def get_search_with_criteria(theGuid):
+    """
+    Return the Search for a guid with all of its criteria prefetched
+
+    Raises Http404 if the search does not exist
+    """
+    return get_object_or_404(
+        Search.objects.prefetch_related(*SEARCH_CRITERIA_RELATIONS),
+        guid=theGuid
+    )
+
 
 class Searcher:
     """
@@ -43,79 +74,151 @@ class Searcher:
     change.
     """
 
-    def __init__(self, theSearch):
+    def __init__(self, theSearch, theUpdateRecordCount=True):
 
         self.mSearch = theSearch
         self.mExtent = None
+        self.mUpdateRecordCount = theUpdateRecordCount
+        self.mUseIndex = getattr(settings, 'SEARCH_USE_PRODUCT_INDEX', False)
 
         self.filterCriteria()
 
-    def filterCriteria(self):
+    def _relatedPks(self, theRelation):
         """
-        Construct search filter
+        Return primary keys of a search criteria relation
+
+        Uses the prefetch cache when the search was loaded with
+        get_search_with_criteria, otherwise issues a single query
         """
+        return [
+            myObject.pk for myObject in getattr(
+                self.mSearch, theRelation).all()]
 
+    def _productQuerySet(self):
+        """
+        Return products matching the dictionary criteria of the search
+        """
         myOPP = OpticalProductProfile.objects
 
         # make sure we return only products which are searchable
         myOPP = myOPP.only_searchable()
 
         # filter instrument type
-        if self.mSearch.collection.count() > 0:
-            myOPP = myOPP.for_collection(
-                self.mSearch.collection)
+        if self.mCriteria['collection']:
+            myOPP = myOPP.for_collection(self.mCriteria['collection'])
             logger.debug(
-                'OPP filter - collection %s',
-                self.mSearch.collection.values_list('pk'))
+                'OPP filter - collection %s', self.mCriteria['collection'])
 
-        if self.mSearch.satellite.count() > 0:
-            myOPP = myOPP.for_satellite(self.mSearch.satellite)
+        if self.mCriteria['satellite']:
+            myOPP = myOPP.for_satellite(self.mCriteria['satellite'])
             logger.debug(
-                'OPP filter - satellite %s',
-                self.mSearch.satellite.values_list('pk'))
+                'OPP filter - satellite %s', self.mCriteria['satellite'])
 
         # filter instrument type
-        if self.mSearch.instrument_type.count() > 0:
+        if self.mCriteria['instrument_type']:
             myOPP = myOPP.for_instrumenttypes(
-                self.mSearch.instrument_type)
+                self.mCriteria['instrument_type'])
             logger.debug(
                 'OPP filter - instrumenttype %s',
-                self.mSearch.instrument_type.values_list('pk'))
+                self.mCriteria['instrument_type'])
 
-        if self.mSearch.spectral_group.count() > 0:
-            myOPP = myOPP.for_spectralgroup(self.mSearch.spectral_group)
+        if self.mCriteria['spectral_group']:
+            myOPP = myOPP.for_spectralgroup(self.mCriteria['spectral_group'])
             logger.debug(
                 'OPP filter - spectralgroup %s',
-                self.mSearch.spectral_group.values_list('pk'))
+                self.mCriteria['spectral_group'])
 
         # filter by licence
-        if self.mSearch.license_type.count() > 0:
-            myOPP = myOPP.for_licence_type(self.mSearch.license_type)
+        if self.mCriteria['license_type']:
+            myOPP = myOPP.for_licence_type(self.mCriteria['license_type'])
             logger.debug(
-                'Licence filter %s',
-                self.mSearch.license_type.values_list('pk')
-            )
+                'Licence filter %s', self.mCriteria['license_type'])
+
+        # product profiles are evaluated as a subquery of the product query
+        return OpticalProduct.objects.filter(
+            product_profile__in=myOPP.values('pk'))
+
+    def _indexQuerySet(self):
+        """
+        Return search index rows matching the dictionary criteria
+
+        The index carries the resolved dictionary ids, so the criteria are
+        plain column filters on a single table
+        """
+        myIndex = ProductSearchIndex.objects.filter(is_searchable=True)
+        for myRelation in (
+                'collection', 'satellite', 'instrument_type',
+                'spectral_group', 'license_type'):
+            if self.mCriteria[myRelation]:
+                myIndex = myIndex.filter(**{
+                    '%s__in' % myRelation: self.mCriteria[myRelation]})
+                logger.debug(
+                    'Index filter - %s %s',
+                    myRelation, self.mCriteria[myRelation])
+        return myIndex
+
+    def filterCriteria(self):
+        """
+        Construct search filter
+        """
 
-        self.mQuerySet = OpticalProduct.objects.filter(
-            product_profile__in=myOPP)
-        logger.info('Selected product profiles: %s', myOPP.values_list('pk'))
+        myCollections = self._relatedPks('collection')
+        mySatellites = self._relatedPks('satellite')
+        myInstrumentTypes = self._relatedPks('instrument_type')
+        mySpectralGroups = self._relatedPks('spectral_group')
+        myLicenceTypes = self._relatedPks('license_type')
+        myDateRanges = list(self.mSearch.searchdaterange_set.all())
+
+        # resolved criteria, used to key the search result cache
+        self.mCriteria = {
+            'collection': myCollections,
+            'satellite': mySatellites,
+            'instrument_type': myInstrumentTypes,
+            'spectral_group': mySpectralGroups,
+            'license_type': myLicenceTypes,
+            'date_ranges': [
+                (myRange.start_date, myRange.end_date)
+                for myRange in myDateRanges],
+            'sensor_inclination_angle': (
+                self.mSearch.sensor_inclination_angle_start,
+                self.mSearch.sensor_inclination_angle_end),
+            'spatial_resolution': self.mSearch.spatial_resolution,
+            'cloud': (self.mSearch.cloud_min, self.mSearch.cloud_max),
+            'band_count': self.mSearch.band_count,
+            'k_orbit_path': self.mSearch.k_orbit_path,
+            'j_frame_row': self.mSearch.j_frame_row,
+            'geometry': (
+                self.mSearch.geometry.hexewkb.decode()
+                if self.mSearch.geometry else None)
+        }
+
+        if self.mUseIndex:
+            self.mQuerySet = self._indexQuerySet()
+        else:
+            self.mQuerySet = self._productQuerySet()
 
         # eliminate specific dates as specified in dictionaries_satelliteinstrumentgroup
+        # sensor groups are only matched when both satellites and instrument
+        # types are selected, so skip the lookup otherwise
         myAllowedDate = Q()
-        for sig in SatelliteInstrumentGroup.objects.filter(
-            satellite_id__in=self.mSearch.satellite.values_list('pk')).filter(
-                instrument_type__in=self.mSearch.instrument_type.values_list('pk')):
-
-            if sig.start_date and sig.end_date:
-                sigEndDate = sig.end_date - timedelta(hours=1)
+        if mySatellites and myInstrumentTypes:
+            myHiddenRanges = SatelliteInstrumentGroup.objects.filter(
+                satellite_id__in=mySatellites,
+                instrument_type_id__in=myInstrumentTypes,
+                start_date__isnull=False,
+                end_date__isnull=False
+            ).values_list('start_date', 'end_date')
+            for myStartDate, myEndDate in myHiddenRanges:
+                sigEndDate = myEndDate - timedelta(hours=1)
                 myAllowedDate = (
-                    myAllowedDate | Q(product_date__range=(sig.start_date, sigEndDate)))
-        self.mQuerySet = self.mQuerySet.exclude(myAllowedDate)
+                    myAllowedDate | Q(product_date__range=(myStartDate, sigEndDate)))
+        if myAllowedDate:
+            self.mQuerySet = self.mQuerySet.exclude(myAllowedDate)
 
         # filter date ranges
-        if self.mSearch.searchdaterange_set.count():
+        if myDateRanges:
             myDateQuery = Q()
-            for date_range in self.mSearch.searchdaterange_set.all():
+            for date_range in myDateRanges:
                 # add one hour to end date to search in the last day
                 # search for 01-03-2012 -> 01-03-2012 yields no results
                 # because range only compares dates
@@ -203,21 +306,84 @@ class Searcher:
             self.mQuerySet = self.mQuerySet.filter(myJFrameRowQ)
             logger.debug('J Frame Row filter: %s', myParsedData)
 
-        # filter geometry
-        if self.mSearch.geometry:
-            myGeometryQuery = Q(
-                spatial_coverage__intersects=self.mSearch.geometry)
-            self.mQuerySet = self.mQuerySet.filter(myGeometryQuery)
+        # filter geometry, the extent of the area of interest is tested first
+        # and then each of its parts
+        myAOI = searchAOI(self.mSearch)
+        if myAOI:
+            myParts = aoiParts(myAOI)
+            myGeometryQuery = Q()
+            for myPart in myParts:
+                myGeometryQuery = myGeometryQuery | Q(
+                    spatial_coverage__intersects=myPart)
+            self.mQuerySet = self.mQuerySet.filter(
+                spatial_coverage__bboverlaps=myAOI.envelope
+            ).filter(myGeometryQuery)
             logger.debug(
-                'Geometry filter envelope: %s',
-                self.mSearch.geometry.envelope.extent
+                'Geometry filter envelope: %s, %s parts',
+                myAOI.envelope.extent, len(myParts)
             )
 
+        # index fields match the product fields, so all the filters above
+        # apply to the index as well, only the matching ids are selected
+        if self.mUseIndex:
+            self.mQuerySet = OpticalProduct.objects.filter(
+                pk__in=self.mQuerySet.values('product_id'))
+
         # we could use select_related here, however we also need to test this
         # self.mQuerySet = self.mQuerySet.select_related()
 
-        # Updates self.mSearch with the new object count
+        if self.mUpdateRecordCount:
+            self.updateRecordCount()
+
+    def updateRecordCount(self):
+        """
+        Update self.mSearch with the new object count
+
+        The search is only written when the count has changed
+        """
         myRecordCount = self.mQuerySet.count()
         logger.debug('Total records found: %s', myRecordCount)
-        self.mSearch.record_count = myRecordCount
-        self.mSearch.save()
+        if self.mSearch.record_count != myRecordCount:
+            self.mSearch.record_count = myRecordCount
+            self.mSearch.save(update_fields=['record_count'])
+
+    def criteriaHash(self):
+        """
+        Return a hash of the resolved search criteria
+        """
+        return hashlib.sha1(json.dumps(
+            self.mCriteria, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def cachedResults(self, theQuerySet=None):
+        """
+        Return the search results backed by the search result cache
+
+        On a cache miss the ordered product ids are computed once and stored,
+        later result pages only fetch the rows of the requested slice.
+        The search record count is kept in sync with the cached ids.
+
+        Args:
+            theQuerySet - optical products queryset the rows of a slice are
+                fetched from, e.g. a projection of the needed columns, all
+                columns when None
+        """
+        myHash = self.criteriaHash()
+        myCache = SearchResultCache.objects.filter(
+            guid=self.mSearch.guid, criteria_hash=myHash).first()
+        if myCache is None:
+            myProductIds = list(
+                self.mQuerySet.order_by('-product_date', 'pk').values_list(
+                    'pk', flat=True))
+            # concurrent page requests may race to fill the cache
+            myCache, _ = SearchResultCache.objects.get_or_create(
+                guid=self.mSearch.guid, criteria_hash=myHash,
+                defaults={'product_ids': myProductIds})
+            logger.debug(
+                'Search results cached: %s, %s', self.mSearch.guid,
+                len(myProductIds))
+
+        if self.mSearch.record_count != len(myCache.product_ids):
+            self.mSearch.record_count = len(myCache.product_ids)
+            self.mSearch.save(update_fields=['record_count'])
+        return CachedSearchResults(myCache.product_ids, theQuerySet)
@@ -67,7 +67,7 @@ class SearchesTable(tables.Table):
         We need to render record.dates_as_string in date_ranges column
         :param record: The SearchRecord object rendered in this row
         """
-        return record.dates_as_string
+        return record.dates_as_string()
 
     def render_actions(self, record):
         """
@@ -0,0 +1,127 @@
+"""
+SANSA-EO Catalogue - search_cache - test search result cache and its
+    invalidation on product ingestion
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.test import TestCase
+
+from catalogue.models import OpticalProduct
+from catalogue.models.signals import products_bulk_saved
+from search.models import Search, SearchResultCache
+from search.searcher import Searcher
+
+from catalogue.tests.model_factories import OpticalProductF
+from model_factories import SearchF
+
+
+class TestSearchResultCache(TestCase):
+    """
+    Tests search result cache
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mProducts = [
+            OpticalProductF.create(**{
+                'spatial_coverage': (
+                    'POLYGON ((18 -33, 19 -33, 19 -34, 18 -34, 18 -33))')
+            }),
+            OpticalProductF.create(**{
+                'spatial_coverage': (
+                    'POLYGON ((18 -33, 19 -33, 19 -34, 18 -34, 18 -33))')
+            })
+        ]
+        self.mSearch = SearchF.create()
+
+    def test_cachedResults(self):
+        """
+        Test cached results are stored and sliced
+        """
+        myResults = Searcher(self.mSearch).cachedResults()
+
+        self.assertEqual(myResults.count(), 2)
+        self.assertEqual(SearchResultCache.objects.count(), 1)
+        self.assertEqual(
+            Search.objects.get(pk=self.mSearch.pk).record_count, 2)
+        self.assertEqual(
+            set(myProduct.pk for myProduct in myResults[0:2]),
+            set(myProduct.pk for myProduct in self.mProducts))
+
+        # second page request reuses the cached ids
+        Searcher(self.mSearch).cachedResults()
+        self.assertEqual(SearchResultCache.objects.count(), 1)
+
+    def test_cache_invalidated_on_ingest(self):
+        """
+        Test cache entries are removed when a matching product is saved
+        """
+        Searcher(self.mSearch).cachedResults()
+
+        # product outside of the search area keeps the cache
+        OpticalProductF.create(**{
+            'spatial_coverage': (
+                'POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))')
+        })
+        self.assertEqual(SearchResultCache.objects.count(), 1)
+
+        # product inside the search area invalidates it
+        OpticalProductF.create(**{
+            'spatial_coverage': (
+                'POLYGON ((18 -33, 19 -33, 19 -34, 18 -34, 18 -33))')
+        })
+        self.assertEqual(SearchResultCache.objects.count(), 0)
+
+    def test_cache_invalidated_by_prepared_area(self):
+        """
+        Test products are matched with the area the results are filtered by
+        """
+        Searcher(self.mSearch).cachedResults()
+        # the prepared area extends beyond the original area
+        Search.objects.filter(pk=self.mSearch.pk).update(
+            prepared_geometry=MultiPolygon(
+                Polygon.from_bbox((17, -36, 21, -32)),
+                Polygon.from_bbox((-1, -1, 2, 2)), srid=4326))
+
+        OpticalProductF.create(**{
+            'spatial_coverage': (
+                'POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))')
+        })
+        self.assertEqual(SearchResultCache.objects.count(), 0)
+
+    def test_cache_invalidated_on_bulk_save(self):
+        """
+        Test only the entries affected by bulk saved products are removed
+        """
+        Searcher(self.mSearch).cachedResults()
+        myOtherSearch = SearchF.create(**{
+            'geometry': 'POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))'
+        })
+        Searcher(myOtherSearch).cachedResults()
+        self.assertEqual(SearchResultCache.objects.count(), 2)
+
+        # a cached product moves out of the search area
+        OpticalProduct.objects.filter(pk=self.mProducts[0].pk).update(
+            spatial_coverage='SRID=4326;POLYGON ((5 5, 6 5, 6 6, 5 6, 5 5))')
+        products_bulk_saved.send(
+            sender=OpticalProduct, product_ids=[self.mProducts[0].pk])
+        self.assertEqual(
+            list(SearchResultCache.objects.values_list('guid', flat=True)),
+            [myOtherSearch.guid])
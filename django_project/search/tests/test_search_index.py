@@ -0,0 +1,122 @@
+"""
+SANSA-EO Catalogue - search_index - test flat product search index
+    maintenance and index based searches
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from search.index import index_products, reindex_dictionary
+from search.models import ProductSearchIndex
+from search.searcher import Searcher
+
+from catalogue.tests.model_factories import OpticalProductF
+from dictionaries.models import Satellite
+from dictionaries.tests.model_factories import (
+    SatelliteF, SatelliteInstrumentGroupF,
+    SatelliteInstrumentF,
+    OpticalProductProfileF
+)
+from model_factories import SearchF
+
+
+@override_settings(SEARCH_USE_PRODUCT_INDEX=True)
+class TestSearchIndex(TestCase):
+    """
+    Tests flat product search index
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mSat = SatelliteF.create()
+        mySatInstGroup = SatelliteInstrumentGroupF.create(**{
+            'satellite': self.mSat
+        })
+        mySatInst = SatelliteInstrumentF.create(**{
+            'satellite_instrument_group': mySatInstGroup
+        })
+        myOPP = OpticalProductProfileF.create(**{
+            'satellite_instrument': mySatInst
+        })
+        self.mProduct = OpticalProductF.create(**{
+            'product_profile': myOPP,
+            'cloud_cover': 3
+        })
+        # create an optical product that should not appear in the results
+        OpticalProductF.create()
+
+    def test_index_follows_product_save(self):
+        """
+        Test index rows are written when products are saved
+        """
+        myRow = ProductSearchIndex.objects.get(product=self.mProduct)
+        self.assertEqual(myRow.satellite_id, self.mSat.pk)
+        self.assertEqual(myRow.collection_id, self.mSat.collection_id)
+        self.assertEqual(myRow.cloud_cover, 3)
+
+        self.mProduct.cloud_cover = 7
+        self.mProduct.save()
+        myRow = ProductSearchIndex.objects.get(product=self.mProduct)
+        self.assertEqual(myRow.cloud_cover, 7)
+
+    def test_index_products(self):
+        """
+        Test full index rebuild
+        """
+        ProductSearchIndex.objects.all().delete()
+        self.assertEqual(index_products(), 2)
+        self.assertEqual(ProductSearchIndex.objects.count(), 2)
+
+    def test_reindex_dictionary(self):
+        """
+        Test the products of a dictionary row are reindexed
+        """
+        ProductSearchIndex.objects.all().delete()
+        self.assertEqual(reindex_dictionary(Satellite, self.mSat.pk), 1)
+        self.assertEqual(
+            list(ProductSearchIndex.objects.values_list(
+                'product_id', flat=True)),
+            [self.mProduct.pk])
+
+    def test_Searcher_uses_index(self):
+        """
+        Test index based search returns the same products
+        """
+        mySearch = SearchF.create(**{
+            'satellites': [self.mSat]
+        })
+        mySearcher = Searcher(mySearch)
+        self.assertEqual(
+            list(mySearcher.mQuerySet.values_list('pk', flat=True)),
+            [self.mProduct.pk])
+
+
+class TestSearchIndexDisabled(TestCase):
+    """
+    Tests the search index is not maintained while searches do not use it
+    """
+
+    @override_settings(SEARCH_USE_PRODUCT_INDEX=False)
+    def test_index_not_maintained(self):
+        """
+        Test no index rows are written when products are saved
+        """
+        OpticalProductF.create()
+        self.assertEqual(ProductSearchIndex.objects.count(), 0)
@@ -19,9 +19,15 @@ __copyright__ = 'South African National Space Agency'
 
 from django.test import TestCase
 
+from catalogue.aoigeometry import geodesicCircle
 from core.model_factories import UserF
-from dictionaries.tests.model_factories import CollectionF
+from dictionaries.tests.model_factories import (
+    CollectionF,
+    InstrumentTypeF,
+    SatelliteF
+)
 from model_factories import SearchF, SearchDateRangeF
+from search.models import Search
 
 
 class TestSearchCRUD(TestCase):
@@ -167,3 +173,40 @@ class TestSearchCRUD(TestCase):
             str(search),
             '15-07-2010 Guid: 69d814b7-3164-42b9-9530-50ae77806da9 User: '
             'test user')
+
+    def test_Search_withListColumns(self):
+        """
+        Tests the search list columns are loaded in a fixed number of queries
+        """
+        for myX in range(3):
+            search = SearchF.create()
+            search.satellite.add(SatelliteF.create())
+            search.instrument_type.add(InstrumentTypeF.create())
+            SearchDateRangeF.create(search=search)
+
+        # searches, satellites, instrument types and date ranges
+        with self.assertNumQueries(4):
+            searches = list(Search.objects.order_by('pk').with_list_columns())
+            for search in searches:
+                self.assertEqual(len(search.satellites_as_list()), 1)
+                self.assertEqual(len(search.sensors_as_list()), 1)
+                self.assertEqual(
+                    search.dates_as_string(), '15-07-2010 : 15-07-2012')
+                self.assertTrue(search.user.username)
+
+    def test_Search_preparedGeometry(self):
+        """
+        Tests a complex area of interest is split into parts covering it
+        """
+        search = Search.objects.get(pk=SearchF.create().pk)
+        # a simple area is used as it is
+        self.assertEqual(len(search.prepared_geometry), 1)
+        self.assertTrue(search.prepared_geometry[0].equals(search.geometry))
+
+        search.geometry = geodesicCircle(20, -32, 500, theSegments=2000)
+        search.save()
+        search = Search.objects.get(pk=search.pk)
+        self.assertTrue(len(search.prepared_geometry) > 1)
+        for myPart in search.prepared_geometry:
+            self.assertTrue(myPart.num_points <= 256)
+        self.assertTrue(search.prepared_geometry.contains(search.geometry))
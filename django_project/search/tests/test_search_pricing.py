@@ -0,0 +1,138 @@
+"""
+SANSA-EO Catalogue - search_pricing - test batched processing level pricing
+    of search records
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.model_factories import CurrencyF, ExchangeRateF
+from catalogue.tests.model_factories import OpticalProductF
+from dictionaries.models import SpectralModeProcessingCosts
+from dictionaries.tests.model_factories import (
+    OpticalProductProfileF,
+    SpectralModeF,
+    SpectralModeProcessingCostsF,
+    ProcessingLevelF,
+    InstrumentTypeF,
+    SatelliteInstrumentGroupF,
+    SatelliteInstrumentF,
+    InstrumentTypeProcessingLevelF
+)
+from search.models import SearchRecord
+from search.pricing import (
+    PRICE_MATRIX_CACHE_KEY,
+    bumpPriceMatrixVersion,
+    getPriceMatrix,
+    prefetchPricingKeys,
+    priceSearchRecords
+)
+
+from model_factories import SearchRecordF
+
+
+class TestSearchPricing(TestCase):
+    """
+    Tests search record pricing
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        cache.delete(PRICE_MATRIX_CACHE_KEY)
+        myRand = CurrencyF.create(name='Rand', code='ZAR')
+        self.mCurrency = CurrencyF.create(name='SuperGold', code='SG')
+        ExchangeRateF.create(
+            source=self.mCurrency, target=myRand, rate=2.0)
+        mySpectralMode = SpectralModeF.create()
+        myInstrumentType = InstrumentTypeF.create()
+        self.mLevel = ProcessingLevelF.create(name='Level 1')
+        SpectralModeProcessingCostsF.create(
+            spectral_mode=mySpectralMode,
+            instrument_type_processing_level=(
+                InstrumentTypeProcessingLevelF.create(
+                    instrument_type=myInstrumentType,
+                    processing_level=self.mLevel)),
+            cost_per_scene=Decimal('100.00'),
+            currency=self.mCurrency)
+        myProfile = OpticalProductProfileF.create(
+            spectral_mode=mySpectralMode,
+            satellite_instrument=SatelliteInstrumentF.create(
+                satellite_instrument_group=SatelliteInstrumentGroupF.create(
+                    instrument_type=myInstrumentType)))
+        for _ in range(3):
+            SearchRecordF.create(
+                processing_level=self.mLevel,
+                product=OpticalProductF.create(product_profile=myProfile))
+        self.mRecords = list(SearchRecord.objects.order_by('pk'))
+
+    def test_priceSearchRecords(self):
+        """
+        Test a cart is priced with one product, currency and version query
+        """
+        getPriceMatrix()
+        with self.assertNumQueries(3):
+            myPrices = priceSearchRecords(self.mRecords)
+
+        self.assertEqual(
+            myPrices,
+            [(self.mCurrency, Decimal('100.00'), Decimal('200.00'))] * 3)
+
+    def test_availableProcessingLevelsJSON(self):
+        """
+        Test processing levels are priced from the cached matrix
+        """
+        getPriceMatrix()
+        prefetchPricingKeys(self.mRecords)
+        # the price version is checked
+        with self.assertNumQueries(1):
+            myLevels = json.loads(
+                self.mRecords[0].availableProcessingLevelsJSON())
+
+        self.assertEqual(myLevels[0], [self.mLevel.pk, 'Level 1', 200])
+        self.assertEqual(myLevels[-1], [14, 'Level 0 Raw instrument data', 0])
+
+    def test_price_matrix_version(self):
+        """
+        Test the cached matrix is reloaded when another process saved prices
+        """
+        getPriceMatrix()
+        SpectralModeProcessingCosts.objects.update(
+            cost_per_scene=Decimal('50.00'))
+        bumpPriceMatrixVersion()
+
+        self.assertEqual(
+            priceSearchRecords(self.mRecords[:1]),
+            [(self.mCurrency, Decimal('50.00'), Decimal('100.00'))])
+
+    def test_snapshot_current_prices(self):
+        """
+        Test orders are priced with the current costs, not the cached ones
+        """
+        getPriceMatrix()
+        SpectralModeProcessingCosts.objects.update(
+            cost_per_scene=Decimal('50.00'))
+        myRecord = self.mRecords[0]
+        myRecord._snapshot_cost_and_currency(save=False)
+
+        self.assertEqual(myRecord.cost_per_scene, Decimal('50.00'))
+        self.assertEqual(myRecord.rand_cost_per_scene, Decimal('100.00'))
@@ -0,0 +1,80 @@
+"""
+SANSA-EO Catalogue - search_results_serializer - test lean search results
+    grid serialization
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.test import TestCase
+
+from catalogue.serializers.product_serializer import (
+    SearchResultSerializer,
+    search_result_queryset
+)
+from search.searcher import Searcher
+
+from catalogue.tests.model_factories import OpticalProductF
+from model_factories import SearchF
+
+
+class TestSearchResultSerializer(TestCase):
+    """
+    Tests search results grid serializer
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mProduct = OpticalProductF.create(**{
+            'spatial_coverage': (
+                'POLYGON ((18 -33, 19 -33, 19 -34, 18 -34, 18 -33))'),
+            'metadata': '<metadata />',
+            'ingestion_log': 'created'
+        })
+        self.mSearch = SearchF.create()
+
+    def test_serializer(self):
+        """
+        Test only the grid columns are serialized
+        """
+        myResults = Searcher(self.mSearch).cachedResults(
+            search_result_queryset())
+
+        with self.assertNumQueries(1):
+            myData = SearchResultSerializer(myResults[0:1], many=True).data
+
+        self.assertEqual(len(myData), 1)
+        self.assertEqual(
+            sorted(myData[0].keys()), [
+                'cloud_cover', 'id', 'original_product_id', 'product_date',
+                'product_name', 'spatial_coverage'])
+        self.assertEqual(myData[0]['id'], self.mProduct.id)
+        self.assertEqual(
+            myData[0]['product_name'], self.mProduct.product_name())
+        self.assertEqual(
+            myData[0]['spatial_coverage'], self.mProduct.spatial_coverage.wkt)
+
+    def test_queryset_defers_metadata(self):
+        """
+        Test metadata and ingestion log are not loaded
+        """
+        myProduct = search_result_queryset().get(pk=self.mProduct.pk)
+
+        self.assertEqual(
+            myProduct.get_deferred_fields() & set([
+                'metadata', 'ingestion_log']),
+            set(['metadata', 'ingestion_log']))
@@ -0,0 +1,98 @@
+"""
+SANSA-EO Catalogue - search_searcher - test search criteria loading and
+    record count handling of the Searcher
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.http import Http404
+from django.test import TestCase
+
+from search.models import Search
+from search.searcher import Searcher, get_search_with_criteria
+
+from catalogue.tests.model_factories import OpticalProductF
+from dictionaries.tests.model_factories import (
+    SatelliteF, SatelliteInstrumentGroupF,
+    SatelliteInstrumentF,
+    OpticalProductProfileF
+)
+from model_factories import SearchF
+
+
+class TestSearchSearcher(TestCase):
+    """
+    Tests Searcher criteria loading
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        mySat = SatelliteF.create()
+        mySatInstGroup = SatelliteInstrumentGroupF.create(**{
+            'satellite': mySat
+        })
+        mySatInst = SatelliteInstrumentF.create(**{
+            'satellite_instrument_group': mySatInstGroup
+        })
+        myOPP = OpticalProductProfileF.create(**{
+            'satellite_instrument': mySatInst
+        })
+        OpticalProductF.create(**{
+            'product_profile': myOPP
+        })
+        # create an optical product that should not appear in the results
+        OpticalProductF.create()
+
+        self.mSearch = SearchF.create(**{
+            'geometry': None,
+            'satellites': [mySat]
+        })
+
+    def test_get_search_with_criteria(self):
+        """
+        Test search is loaded with prefetched criteria
+        """
+        mySearch = get_search_with_criteria(self.mSearch.guid)
+
+        # criteria are served from the prefetch cache
+        with self.assertNumQueries(0):
+            mySearch.satellite.all()[0]
+            list(mySearch.searchdaterange_set.all())
+
+        mySearcher = Searcher(mySearch)
+        self.assertEqual(mySearcher.mQuerySet.count(), 1)
+
+    def test_get_search_with_criteria_missing(self):
+        """
+        Test unknown search guid raises 404
+        """
+        self.assertRaises(
+            Http404, get_search_with_criteria,
+            '00000000-0000-0000-0000-000000000000')
+
+    def test_Searcher_record_count(self):
+        """
+        Test record count is stored only when requested
+        """
+        Searcher(self.mSearch, theUpdateRecordCount=False)
+        self.assertEqual(
+            Search.objects.get(pk=self.mSearch.pk).record_count, None)
+
+        Searcher(self.mSearch)
+        self.assertEqual(
+            Search.objects.get(pk=self.mSearch.pk).record_count, 1)
@@ -0,0 +1,66 @@
+"""
+SANSA-EO Catalogue - search_utils - test search view helper
+
+Contact : lkleyn@sansa.org.za
+
+.. note:: This program is the property of the South African National Space
+   Agency (SANSA) and may not be redistributed without expresse permission.
+   This program may include code which is the intellectual property of
+   Linfiniti Consulting CC. Linfiniti grants SANSA perpetual, non-transferrable
+   license to use any code contained herein which is the intellectual property
+   of Linfiniti Consulting CC.
+
+"""
+
+__author__ = 'dodobasic@gmail.com'
+__version__ = '0.1'
+__date__ = '18/10/2026'
+__copyright__ = 'South African National Space Agency'
+
+from django.test import TestCase
+
+from search.searcher import Searcher
+from search.utils import SearchView
+
+from catalogue.tests.model_factories import OpticalProductF
+from model_factories import SearchF
+
+
+class TestSearchView(TestCase):
+    """
+    Tests search view helper
+    """
+
+    def setUp(self):
+        """
+        Set up before each test
+        """
+        self.mProducts = [
+            OpticalProductF.create(**{
+                'spatial_coverage': (
+                    'POLYGON ((18 -33, 19 -33, 19 -34, 18 -34, 18 -33))')
+            }),
+            OpticalProductF.create(**{
+                'spatial_coverage': (
+                    'POLYGON ((18.5 -33.5, 19.5 -33.5, 19.5 -34, 18.5 -34, '
+                    '18.5 -33.5))')
+            })
+        ]
+        self.mSearch = SearchF.create()
+
+    def test_search(self):
+        """
+        Test the extent is aggregated and the records are built lazily
+        """
+        mySearcher = Searcher(self.mSearch)
+        # one query for the extent, no products are loaded
+        with self.assertNumQueries(1):
+            mySearchView = SearchView(None, mySearcher)
+
+        self.assertEqual(mySearchView.mExtent, str((18.0, -34.0, 19.5, -33.0)))
+        self.assertEqual(len(mySearchView.mSearchRecords), 2)
+        self.assertEqual(
+            set(myRecord.product.pk for myRecord in (
+                mySearchView.mSearchRecords)),
+            set(myProduct.pk for myProduct in self.mProducts))
+        self.assertEqual(len(list(mySearchView.mSearchRecords[:1])), 1)
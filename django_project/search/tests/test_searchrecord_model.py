@@ -45,6 +45,9 @@ from dictionaries.tests.model_factories import (
     InstrumentTypeProcessingLevelF
 )
 
+from dictionaries.models import Projection
+from search.models import SearchRecord
+
 from model_factories import SearchRecordF
 
 
@@ -304,3 +307,47 @@ class TestSearchRecordCRUD(TestCase):
             myModel.rand_cost_per_scene,
             Decimal(246.90).quantize(Decimal('.01'))
         )
+
+    def test_SearchRecord_placeOrder_method(self):
+        """
+        Tests SearchRecord model placeOrder method
+        """
+        myRand = CurrencyF.create(code='ZAR')
+        myProcLevel = ProcessingLevelF.create()
+        myProjection = ProjectionF.create(epsg_code=32734)
+        myUser = UserF.create(username='testuser')
+        myOrder = OrderF.create(user=myUser)
+        myRecords = [
+            SearchRecordF.create(user=myUser, order=None, currency=myRand)
+            for _ in range(3)]
+        myProductIds = [myRecord.product_id for myRecord in myRecords]
+
+        SearchRecord.placeOrder(
+            myOrder, myRecords,
+            dict((myId, '32734') for myId in myProductIds),
+            dict((myId, str(myProcLevel.pk)) for myId in myProductIds))
+
+        for myRecord in SearchRecord.objects.filter(pk__in=[
+                myRecord.pk for myRecord in myRecords]):
+            self.assertEqual(myRecord.order, myOrder)
+            self.assertEqual(myRecord.projection, myProjection)
+            self.assertEqual(myRecord.processing_level, myProcLevel)
+            # records without a processing cost are free
+            self.assertEqual(myRecord.currency, myRand)
+            self.assertEqual(myRecord.cost_per_scene, 0)
+
+    def test_SearchRecord_placeOrder_method_unknown_projection(self):
+        """
+        Tests SearchRecord model placeOrder method with unknown projection
+        """
+        myProcLevel = ProcessingLevelF.create()
+        myRecord = SearchRecordF.create(
+            order=None, currency=CurrencyF.create(code='ZAR'))
+
+        with self.assertRaises(Projection.DoesNotExist):
+            SearchRecord.placeOrder(
+                OrderF.create(), [myRecord],
+                {myRecord.product_id: '1'},
+                {myRecord.product_id: myProcLevel.pk})
+        self.assertEqual(
+            SearchRecord.objects.get(pk=myRecord.pk).order_id, None)
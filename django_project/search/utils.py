@@ -24,9 +24,46 @@ logger = logging.getLogger(__name__)
 
 from django.core.paginator import Paginator, InvalidPage, EmptyPage
 from django.conf import settings
+from django.contrib.gis.db.models import Extent
 
 from .models import SearchRecord
 
+# number of products fetched per database round trip while iterating
+SEARCH_RECORD_CHUNK_SIZE = 500
+
+
+class LazySearchRecords(object):
+    """
+    Search records wrapping the products of a queryset, built on demand
+
+    Iterating streams the products from the database chunk by chunk, so
+    exports of big searches never hold all products in memory. Slicing
+    returns a LazySearchRecords of the sliced queryset.
+    """
+
+    def __init__(self, theQuerySet):
+        self.mQuerySet = theQuerySet
+
+    def count(self):
+        return self.mQuerySet.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        for myProduct in self.mQuerySet.iterator(
+                chunk_size=SEARCH_RECORD_CHUNK_SIZE):
+            myRecord = SearchRecord()
+            myRecord.product = myProduct
+            yield myRecord
+
+    def __getitem__(self, theKey):
+        if isinstance(theKey, slice):
+            return LazySearchRecords(self.mQuerySet[theKey])
+        myRecord = SearchRecord()
+        myRecord.product = self.mQuerySet[theKey]
+        return myRecord
+
 
 class SearchView(object):
     """
@@ -66,23 +103,14 @@ class SearchView(object):
         #         'search by scene - paginator page requested is out of range')
         #     self.mSearchPage = self.mPaginator.page(self.mPaginator.num_pages)
 
-        myUnion = None
-        for myObject in self.mQuerySet:
-            myRecord = SearchRecord()
-            myRecord.product = myObject
-            self.mSearchRecords.append(myRecord)
-            if not myUnion:
-                # We only union the envelopes as we are only interested in
-                # the rectangular extents of all features, not their geometric
-                # union
-                myUnion = myObject.spatial_coverage.envelope
-            else:
-                # This can be done faster using cascaded union but needs
-                # geos 3.1
-                myUnion = myUnion.union(myObject.spatial_coverage.envelope)
-            # logger.debug('%s added to myRecords', myObject.product_id)
-        if myUnion:
-            self.mExtent = str(myUnion.extent)
+        # search records are built while the response is written
+        self.mSearchRecords = LazySearchRecords(self.mQuerySet)
+        # We are only interested in the rectangular extents of all
+        # features, not their geometric union
+        myExtent = self.mQuerySet.aggregate(
+            myExtent=Extent('spatial_coverage'))['myExtent']
+        if myExtent:
+            self.mExtent = str(myExtent)
 
         # -----------------------------------------------------
         # Wrap up now ...
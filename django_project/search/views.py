@@ -64,7 +64,7 @@ from catalogue.views.geoiputils import GeoIpUtils
 from dictionaries.models import Collection
 
 # modularized app dependencies
-from .searcher import Searcher
+from .searcher import Searcher, get_search_with_criteria
 
 from .models import (
     Search,
@@ -95,7 +95,7 @@ DateRangeInlineFormSet = inlineformset_factory(
 # @login_required
 def downloadSearchResult(request, guid_id):
     """Dispaches request and returns searchresults in desired file format"""
-    search = get_object_or_404(Search, guid=guid_id)
+    search = get_search_with_criteria(guid_id)
     searcher = Searcher(search)
     search_view = SearchView(request, searcher)
 
@@ -138,7 +138,7 @@ def downloadSearchResultMetadata(request, guid_id):
     unless a ?html is appended to the url
     """
 
-    search = get_object_or_404(Search, guid=guid_id)
+    search = get_search_with_criteria(guid_id)
     searcher = Searcher(search)
     search_view = SearchView(request, searcher)
 
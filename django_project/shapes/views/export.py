@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
 import zipfile
 import tempfile
+from itertools import islice
 from django.http import HttpResponse
 from django.utils.encoding import smart_str
+from django.core.exceptions import FieldDoesNotExist
 from django.contrib.gis.db.models.fields import GeometryField
 from django.contrib.gis.gdal import check_err, OGRGeomType
+
+from catalogue.models import OpticalProduct
+from catalogue.views.helpers import streamingZipResponse
+from search.models import SearchRecord
 # python logging support to django logging middleware
 import logging
 logger = logging.getLogger(__name__)
@@ -30,6 +38,133 @@ except ImportError:
         CoordTransform
     )
 
+# product attributes exported for search records
+SEARCH_RECORD_ATTRIBUTES = (
+    'product_id',
+    'satellite',
+    'instrument_type',
+    'product_profile',
+    'processing_level',
+    'owner',
+    'license',
+    'product_acquisition_start',
+    'product_acquisition_end',
+    'projection',
+    'quality',
+    'geometric_accuracy_mean',
+    'geometric_accuracy_1sigma',
+    'geometric_accuracy_2sigma',
+    'spectral_accuracy',
+    'radiometric_signal_to_noise_ratio',
+    'radiometric_percentage_error',
+    'spatial_resolution_x',
+    'spatial_resolution_y',
+    'spectral_resolution',
+    'radiometric_resolution',
+    'creating_software',
+    'original_product_id',
+    'orbit_number',
+    'product_revision',
+    'path',
+    'path_offset',
+    'row',
+    'row_offset'
+)
+
+# OGR type name, width and precision of django field types, other fields
+# and attributes are written as strings. Shapefiles have no date time type,
+# date times are strings too.
+OGR_FIELD_TYPES = {
+    'AutoField': ('OFTInteger', 10, 0),
+    'IntegerField': ('OFTInteger', 10, 0),
+    'SmallIntegerField': ('OFTInteger', 10, 0),
+    'PositiveIntegerField': ('OFTInteger', 10, 0),
+    'PositiveSmallIntegerField': ('OFTInteger', 10, 0),
+    'BigIntegerField': ('OFTReal', 20, 0),
+    'FloatField': ('OFTReal', 24, 15),
+    'DecimalField': ('OFTReal', 24, 15),
+    'DateField': ('OFTDate', 8, 0)
+}
+OGR_STRING_FIELD = ('OFTString', 255, 0)
+
+# number of search records whose products are downcast at once
+SEARCH_RECORD_CHUNK_SIZE = 500
+
+# size of the blocks the shapefile files are zipped in
+ZIP_BLOCK_SIZE = 64 * 1024
+
+
+def ogr_field_definition(model, name):
+    """
+    Return the OGR type, width and precision of a model attribute
+    """
+    try:
+        internal_type = model._meta.get_field(name).get_internal_type()
+    except FieldDoesNotExist:
+        internal_type = None
+    type_name, width, precision = OGR_FIELD_TYPES.get(
+        internal_type, OGR_STRING_FIELD)
+    return getattr(ogr, type_name), width, precision
+
+
+def set_ogr_field(feature, index, field_type, value):
+    """
+    Set a feature field to a value of the field type, None is left null
+    """
+    if value is None:
+        return
+    if field_type == ogr.OFTInteger:
+        feature.SetField(index, int(value))
+    elif field_type == ogr.OFTReal:
+        feature.SetField(index, float(value))
+    elif field_type == ogr.OFTDate:
+        feature.SetField(
+            index, value.year, value.month, value.day, 0, 0, 0, 0)
+    else:
+        feature.SetField(index, str(value))
+
+
+def chunked_search_records(records):
+    """
+    Yield search records, downcasting their products chunk by chunk
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, SEARCH_RECORD_CHUNK_SIZE))
+        if not chunk:
+            return
+        SearchRecord.prefetchConcreteProducts(chunk)
+        for record in chunk:
+            yield record
+
+
+def read_blocks(path):
+    """
+    Yield the content of a file block by block
+    """
+    with open(path, 'rb') as data_file:
+        block = data_file.read(ZIP_BLOCK_SIZE)
+        while block:
+            yield block
+            block = data_file.read(ZIP_BLOCK_SIZE)
+
+
+def shapefile_zip_entries(shapefile_path, file_name, readme=None):
+    """
+    Yield the zip entries of a shapefile, its files are read block by block,
+    and remove the folder of the shapefile once all entries were read
+    """
+    base_path = os.path.splitext(shapefile_path)[0]
+    try:
+        for extension in ('shp', 'shx', 'prj', 'dbf'):
+            yield (
+                '%s.%s' % (file_name.replace('.shp', ''), extension),
+                read_blocks('%s.%s' % (base_path, extension)))
+        if readme:
+            yield ('README.txt', readme)
+    finally:
+        shutil.rmtree(os.path.dirname(shapefile_path), ignore_errors=True)
+
 
 class ShpResponder(object):
     def __init__(
@@ -318,113 +453,92 @@ class ShpResponder(object):
 
     def write_search_records(self, recordsArray):
         """
-          Write a shapefile out to a file from a geoqueryset.
-          Added by Tim based on code written by Kibele and Dane Springmeyer.
+        Stream a zipped shapefile of the footprints of search records.
 
-        In this case we use the python bindings available with a build
-        of gdal when compiled with --with-python, instead of the ctypes-based
-        bindings that GeoDjango provides.
+        The attributes get the OGR type of their model field, so numbers and
+        dates stay numbers and dates, other attributes are strings. Records
+        of a queryset are read with a database cursor, the geometries are
+        passed to OGR as WKB and the shapefile is zipped while it is sent.
 
-        Also in this case we dont need a model but a searcher array of search
-        objects
-        @return an HttpResponse with shp payload
+        @return a StreamingHttpResponse with shp payload
         """
-        tmp = tempfile.NamedTemporaryFile(suffix='.shp', mode='w+b')
-        # we must close the file for GDAL to be able to open and write to it
-        tmp.close()
-
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            shapefile_path = os.path.join(tmp_dir, 'lyr.shp')
+            self._write_search_records_shapefile(
+                shapefile_path, recordsArray)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return self.streaming_zip_response(shapefile_path, self.file_name)
+
+    def _write_search_records_shapefile(self, shapefile_path, records):
         dr = ogr.GetDriverByName('ESRI Shapefile')
-        ds = dr.CreateDataSource(tmp.name)
+        ds = dr.CreateDataSource(shapefile_path)
         if ds is None:
             raise Exception('Could not create file!')
 
         native_srs = osr.SpatialReference()
         native_srs.ImportFromEPSG(4326)  # latlong wgs84
 
+        transform = None
         if self.proj_transform:
             output_srs = osr.SpatialReference()
             output_srs.ImportFromEPSG(self.proj_transform)
+            transform = osr.CoordinateTransformation(native_srs, output_srs)
         else:
             output_srs = native_srs
 
         ogr_type = OGRGeomType('POLYGON').num
         layer = ds.CreateLayer('lyr', srs=output_srs, geom_type=ogr_type)
 
-        attributes= []
-        attributes.append("product_id")
-        attributes.append("satellite")
-        attributes.append("instrument_type")
-        attributes.append("product_profile")
-        attributes.append("processing_level")
-        attributes.append("owner")
-        attributes.append("license")
-        attributes.append("product_acquisition_start")
-        attributes.append("product_acquisition_end")
-        attributes.append("projection")
-        attributes.append("quality")
-        attributes.append("geometric_accuracy_mean")
-        attributes.append("geometric_accuracy_1sigma")
-        attributes.append("geometric_accuracy_2sigma")
-        attributes.append("spectral_accuracy")
-        attributes.append("radiometric_signal_to_noise_ratio")
-        attributes.append("radiometric_percentage_error")
-        attributes.append("spatial_resolution_x")
-        attributes.append("spatial_resolution_y")
-        attributes.append("spectral_resolution")
-        attributes.append("radiometric_resolution")
-        attributes.append("creating_software")
-        attributes.append("original_product_id")
-        attributes.append("orbit_number")
-        attributes.append("product_revision")
-        attributes.append("path")
-        attributes.append("path_offset")
-        attributes.append("row")
-        attributes.append("row_offset")
-
-        for field in attributes:
-            field_defn = ogr.FieldDefn(str(field), ogr.OFTString)
-            field_defn.SetWidth(255)
+        attributes = []
+        for field in SEARCH_RECORD_ATTRIBUTES:
+            field_type, width, precision = ogr_field_definition(
+                OpticalProduct, field)
+            # truncate field name to 10 letters to deal with shp limitations
+            field_defn = ogr.FieldDefn(str(field[0:10]), field_type)
+            field_defn.SetWidth(width)
+            field_defn.SetPrecision(precision)
             if layer.CreateField(field_defn) != 0:
                 raise Exception('Faild to create field')
+            attributes.append((field, field_type))
 
         feature_def = layer.GetLayerDefn()
 
-        for item in recordsArray:
+        # read a queryset with a database cursor, not into memory
+        if hasattr(records, 'iterator'):
+            records = records.iterator()
+
+        for item in chunked_search_records(records):
             feat = ogr.Feature(feature_def)
+            product = item.product.getConcreteInstance()
 
-            for field in attributes:
-                #ABP: added getConcreteProduct and None
-                value = getattr(
-                    item.product.getConcreteInstance(), field, None)
-                logger.info("Shape writer: Setting %s to %s" % (field, value))
-                try:
-                    string_value = str(value)
-                except UnicodeEncodeError as E:
-                    string_value = ''
-                    logger.info("Unicode conversion error")
-                #truncate field name to 10 letters to deal with shp limitations
-                logger.info("Truncated field name: %s" % str(field[0:10]))
-                feat.SetField(str(field[0:10]), string_value)
+            # fields are set by index, truncated names may collide
+            for index, (field, field_type) in enumerate(attributes):
+                set_ogr_field(
+                    feat, index, field_type, getattr(product, field, None))
 
-            geom = getattr(item.product, "spatial_coverage")
+            geom = item.product.spatial_coverage
 
             if geom:
-                ogr_geom = ogr.CreateGeometryFromWkt(geom.wkt)
-                if self.proj_transform:
-                    ct = osr.CoordinateTransformation(native_srs, output_srs)
-                    ogr_geom.Transform(ct)
+                ogr_geom = ogr.CreateGeometryFromWkb(bytes(geom.wkb))
+                if transform is not None:
+                    ogr_geom.Transform(transform)
                 check_err(feat.SetGeometry(ogr_geom))
-            else:
-                pass
 
             check_err(layer.CreateFeature(feat))
 
         ds.Destroy()
-        # Next line for debugging only if you want to see log info in
-        # debugtoolbar
-        #return HttpResponse("<html><head></head><body>Done</body></html>")
-        content_type = 'application/zip'
-        return self.zip_response(tmp.name, self.file_name, content_type)
+
+    def streaming_zip_response(self, shapefile_path, file_name, readme=None):
+        """
+        Return a StreamingHttpResponse zipping a shapefile while it is sent,
+        the folder of the shapefile is removed afterwards.
+        """
+        return streamingZipResponse(
+            shapefile_zip_entries(shapefile_path, file_name, readme),
+            self.content_type, '%s.zip' % file_name.replace('.shp', ''))
 
     def write_request_records(self, recordsArray):
         """
@@ -568,99 +682,4 @@ class ShpResponder(object):
         """
           Write a shapefile out to a file from a ordered products geometry
         """
-        tmp = tempfile.NamedTemporaryFile(suffix='.shp', mode='w+b')
-        # we must close the file for GDAL to be able to open and write to it
-        tmp.close()
-
-        dr = ogr.GetDriverByName('ESRI Shapefile')
-        ds = dr.CreateDataSource(tmp.name)
-        if ds is None:
-            raise Exception('Could not create file!')
-
-        native_srs = osr.SpatialReference()
-        native_srs.ImportFromEPSG(4326)  # latlong wgs84
-
-        if self.proj_transform:
-            output_srs = osr.SpatialReference()
-            output_srs.ImportFromEPSG(self.proj_transform)
-        else:
-            output_srs = native_srs
-
-        ogr_type = OGRGeomType('POLYGON').num
-        layer = ds.CreateLayer('lyr', srs=output_srs, geom_type=ogr_type)
-
-        attributes = []
-        attributes.append("product_id")
-        attributes.append("satellite")
-        attributes.append("instrument_type")
-        attributes.append("product_profile")
-        attributes.append("processing_level")
-        attributes.append("owner")
-        attributes.append("license")
-        attributes.append("product_acquisition_start")
-        attributes.append("product_acquisition_end")
-        attributes.append("projection")
-        attributes.append("quality")
-        attributes.append("geometric_accuracy_mean")
-        attributes.append("geometric_accuracy_1sigma")
-        attributes.append("geometric_accuracy_2sigma")
-        attributes.append("spectral_accuracy")
-        attributes.append("radiometric_signal_to_noise_ratio")
-        attributes.append("radiometric_percentage_error")
-        attributes.append("spatial_resolution_x")
-        attributes.append("spatial_resolution_y")
-        attributes.append("spectral_resolution")
-        attributes.append("radiometric_resolution")
-        attributes.append("creating_software")
-        attributes.append("original_product_id")
-        attributes.append("orbit_number")
-        attributes.append("product_revision")
-        attributes.append("path")
-        attributes.append("path_offset")
-        attributes.append("row")
-        attributes.append("row_offset")
-
-        for field in attributes:
-            field_defn = ogr.FieldDefn(str(field), ogr.OFTString)
-            field_defn.SetWidth(255)
-            if layer.CreateField(field_defn) != 0:
-                raise Exception('Faild to create field')
-
-        feature_def = layer.GetLayerDefn()
-
-        for item in theRecordsArray:
-            feat = ogr.Feature(feature_def)
-
-            for field in attributes:
-                #ABP: added getConcreteProduct and None
-                value = getattr(
-                    item.product.getConcreteInstance(), field, None)
-                logger.info("Shape writer: Setting %s to %s" % (field, value))
-                try:
-                    string_value = str(value)
-                except UnicodeEncodeError as E:
-                    string_value = ''
-                    logger.info("Unicode conversion error")
-                #truncate field name to 10 letters to deal with shp limitations
-                logger.info("Truncated field name: %s" % str(field[0:10]))
-                feat.SetField(str(field[0:10]), string_value)
-
-            geom = getattr(item.product, "spatial_coverage")
-
-            if geom:
-                ogr_geom = ogr.CreateGeometryFromWkt(geom.wkt)
-                if self.proj_transform:
-                    ct = osr.CoordinateTransformation(native_srs, output_srs)
-                    ogr_geom.Transform(ct)
-                check_err(feat.SetGeometry(ogr_geom))
-            else:
-                pass
-
-            check_err(layer.CreateFeature(feat))
-
-        ds.Destroy()
-        # Next line for debugging only if you want to see log info in
-        # debugtoolbar
-        # return HttpResponse("<html><head></head><body>Done</body></html>")
-        content_type = 'application/zip'
-        return self.zip_response(tmp.name, self.file_name, content_type)
+        return self.write_search_records(theRecordsArray)